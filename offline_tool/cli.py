@@ -8,6 +8,7 @@ import yaml
 
 from core.data_processing.candata import CanData
 from core.data_processing.candecode import load_config_from_yaml
+from core.data_processing.decoded_io import DECODED_SUFFIXES, load_decoded, read_decoded_columns
 
 app = typer.Typer(help="Offline helper for download/compute/upload flows.")
 
@@ -39,7 +40,7 @@ def download(
 
 @app.command()
 def compute(
-    input_path: Path = typer.Argument(..., exists=True, readable=True, help="Local file to analyze (.csv aggregated CAN or BLF/ASC raw)"),
+    input_path: Path = typer.Argument(..., exists=True, readable=True, help="Local file to analyze (.csv/.parquet/.feather decoded CAN or BLF/ASC/MF4 raw)"),
     output_path: Path = typer.Option(Path("metrics/metrics.json"), help="Where to write computed metrics"),
     dbc: Optional[Path] = typer.Option(None, help="DBC file for BLF/ASC decode"),
     step: float = typer.Option(0.02, help="Raster step when decoding BLF/ASC")
@@ -47,14 +48,14 @@ def compute(
     output_path.parent.mkdir(parents=True, exist_ok=True)
 
     suffix = input_path.suffix.lower()
-    if suffix == ".csv":
-        typer.echo("Running CanData metrics extraction for CSV...")
+    if suffix in DECODED_SUFFIXES:
+        typer.echo(f"Running CanData metrics extraction for {suffix}...")
         can_data = CanData(str(input_path))
         metrics = can_data.get_all_metrics()
         output_path.write_text(json.dumps(metrics.all_metrics, indent=2, default=str), encoding="utf-8")
         typer.echo(f"Wrote metrics -> {output_path}")
-    elif suffix in {".blf", ".asc"} and dbc:
-        typer.echo("Decoding BLF/ASC via core.candecode with full raster processing...")
+    elif suffix in {".blf", ".asc", ".mf4", ".mdf"} and dbc:
+        typer.echo("Decoding CAN log via core.candecode with full raster processing...")
         from core.data_processing.candecode import process_candecode_from_config
         
         cfg = {
@@ -94,6 +95,216 @@ def compute(
         typer.echo(f"Wrote placeholder metrics -> {output_path}")
 
 
+@app.command()
+def follow(
+    asc_path: Path = typer.Argument(..., exists=True, readable=True, help="Growing ASC log to follow"),
+    dbc: Path = typer.Option(..., exists=True, readable=True, help="DBC file for decoding"),
+    output_dir: Path = typer.Option(Path("decoded"), help="Where to append the decoded CSV"),
+    step: float = typer.Option(0.02, help="Raster step"),
+    poll_interval: float = typer.Option(0.2, help="Seconds between checks for new data"),
+    idle_timeout: Optional[float] = typer.Option(None, help="Stop after the file has not grown for this many seconds"),
+    hold_seconds: float = typer.Option(1.0, help="Max seconds to wait for a signal's next sample before emitting rows")
+):
+    """Decode a growing ASC log incrementally, appending new rows as they are written."""
+    from core.data_processing.candecode import CanDecoder
+
+    decoder = CanDecoder(str(dbc), str(asc_path))
+    summary = decoder.follow(
+        asc_path,
+        step=step,
+        save_dir=output_dir,
+        poll_interval=poll_interval,
+        idle_timeout=idle_timeout,
+        hold_seconds=hold_seconds,
+    )
+    typer.echo(
+        f"Follow finished: {summary['total_msgs']} frames, {summary['rows']} rows -> {summary['output']}"
+    )
+
+
+@app.command()
+def quicklook(
+    log_path: Path = typer.Argument(..., exists=True, readable=True, help="BLF/ASC log or directory of logs"),
+    dbc: Path = typer.Option(..., exists=True, readable=True, help="DBC file for decoding"),
+    fraction: float = typer.Option(0.02, help="Share of BLF containers / ASC bytes to decode"),
+    output_dir: Optional[Path] = typer.Option(None, help="Write {name}.quicklook.json here"),
+    signal: Optional[list[str]] = typer.Option(None, help="Only decode these signals (repeatable)"),
+):
+    """Decode a stratified sample of each log for approximate statistics and previews."""
+    from core.data_processing.cancompress import compression_of
+    from core.data_processing.candecode import CanDecoder
+
+    decoder = CanDecoder(str(dbc), str(log_path))
+    for path in decoder.blf_urls + decoder.asc_urls:
+        if compression_of(path):
+            # 快速浏览依赖随机访问，压缩日志只能顺序解压
+            typer.echo(f"⚠ Skipping compressed log (quick look needs random access): {path}", err=True)
+            continue
+        result = decoder.quicklook(
+            path, fraction=fraction, signal_names=signal or None, save_dir=output_dir
+        )
+        typer.echo(
+            f"{result['file']}: {result['blocks_sampled']}/{result['blocks_total']} blocks, "
+            f"~{result['estimated_frames']:,} frames, {len(result['signals'])} signals "
+            f"in {result['seconds']:.1f}s"
+        )
+        for name, entry in sorted(result["signals"].items()):
+            rate = f"{entry['sample_rate_hz']:.1f}Hz" if entry["sample_rate_hz"] else "-"
+            typer.echo(
+                f"  {name}: min={entry['min']} max={entry['max']} mean={entry['mean']} "
+                f"rate≈{rate} coverage={entry['coverage']:.0%}"
+            )
+        if result.get("quicklook_file"):
+            typer.echo(f"  -> {result['quicklook_file']}")
+
+
+queue_app = typer.Typer(help="Shared work queue for decoding on several hosts.")
+app.add_typer(queue_app, name="queue")
+
+
+@queue_app.command("enqueue")
+def queue_enqueue(
+    queue_dir: Path = typer.Argument(..., help="Queue directory on a shared filesystem"),
+    config: Path = typer.Argument(..., exists=True, readable=True, help="candecode YAML config"),
+    max_attempts: int = typer.Option(3, help="Attempts before a job is marked failed")
+):
+    """Enqueue every BLF/ASC/MF4 file of the config's can_data_path as a decode job."""
+    from core.data_processing.canqueue import WorkQueue
+
+    added = WorkQueue(queue_dir).enqueue_from_config(config, max_attempts=max_attempts)
+    typer.echo(f"Enqueued {added} new jobs -> {queue_dir}")
+
+
+@queue_app.command("work")
+def queue_work(
+    queue_dir: Path = typer.Argument(..., help="Queue directory on a shared filesystem"),
+    worker_id: Optional[str] = typer.Option(None, help="Worker name (default host:pid)"),
+    lease_seconds: float = typer.Option(300.0, help="Lease length; crashed workers' jobs are retried after it"),
+    poll_interval: float = typer.Option(5.0, help="Seconds between polls when the queue is empty"),
+    wait: bool = typer.Option(False, help="Keep polling instead of exiting when the queue is drained")
+):
+    """Claim and decode jobs until the queue is drained."""
+    from core.data_processing.canqueue import run_worker
+
+    summary = run_worker(
+        queue_dir,
+        worker_id=worker_id,
+        lease_seconds=lease_seconds,
+        poll_interval=poll_interval,
+        exit_when_empty=not wait,
+    )
+    if summary["failed"]:
+        raise typer.Exit(code=1)
+
+
+@queue_app.command("finalize")
+def queue_finalize(
+    queue_dir: Path = typer.Argument(..., exists=True, help="Queue directory")
+):
+    """Merge the per-job run reports and build the dataset _metadata once all jobs are done."""
+    from core.data_processing.canqueue import WorkQueue
+
+    for output in WorkQueue(queue_dir).finalize():
+        typer.echo(f"{output['output_dir']}: {output['jobs']} jobs")
+        if output["run_report"]:
+            typer.echo(f"  run report -> {output['run_report']}")
+        for dataset_dir, summary in output["datasets"].items():
+            typer.echo(f"  dataset {dataset_dir}: {summary['files']} files, {summary['row_groups']} row groups")
+            for skipped in summary["skipped"]:
+                typer.echo(f"    schema mismatch, not in _metadata: {skipped}")
+
+
+@queue_app.command("status")
+def queue_status(
+    queue_dir: Path = typer.Argument(..., exists=True, help="Queue directory"),
+    retry_failed: bool = typer.Option(False, help="Requeue failed jobs")
+):
+    """Show job counts, running leases and failures."""
+    from core.data_processing.canqueue import WorkQueue
+
+    queue = WorkQueue(queue_dir)
+    if retry_failed:
+        typer.echo(f"Requeued {queue.retry_failed()} failed jobs")
+    status = queue.status()
+    typer.echo(json.dumps(status["counts"], indent=2))
+    for job in status["running"]:
+        typer.echo(f"running #{job['id']} {job['log_path']} by {job['worker']} (attempt {job['attempts']})")
+    for job in status["failed"]:
+        typer.echo(f"failed  #{job['id']} {job['log_path']}: {(job['error'] or '').splitlines()[0]}")
+
+
+inventory_app = typer.Typer(help="Index of frame IDs and signals per log file, for choosing inputs before decoding.")
+app.add_typer(inventory_app, name="inventory")
+
+
+@inventory_app.command("build")
+def inventory_build(
+    can_path: Path = typer.Argument(..., exists=True, help="BLF/ASC/MF4 file or directory to index"),
+    inventory: Path = typer.Option(Path("inventory.sqlite"), help="Inventory file to create or update"),
+    dbc: Optional[list[Path]] = typer.Option(None, exists=True, readable=True, help="DBC used to resolve IDs to signals (repeatable)"),
+    processes: Optional[int] = typer.Option(None, help="Scan processes (default CPU count - 1)"),
+    rescan: bool = typer.Option(False, help="Rescan files that are already indexed")
+):
+    """Scan frame headers (no decoding) and record IDs, frame counts, time ranges and signals."""
+    from core.data_processing.caninventory import CanInventory
+
+    summary = CanInventory(inventory).build(
+        str(can_path),
+        [str(path) for path in dbc] if dbc else None,
+        num_processes=processes,
+        rescan=rescan,
+    )
+    if summary["failed"]:
+        raise typer.Exit(code=1)
+
+
+@inventory_app.command("query")
+def inventory_query(
+    inventory: Path = typer.Argument(..., exists=True, help="Inventory file"),
+    signal: Optional[list[str]] = typer.Option(None, help="Signal the file must contain (repeatable)"),
+    start: Optional[str] = typer.Option(None, help="Period start (ISO date/time or epoch seconds)"),
+    end: Optional[str] = typer.Option(None, help="Period end (ISO date/time or epoch seconds)"),
+    any_signal: bool = typer.Option(False, "--any", help="Match files containing any of the signals instead of all"),
+    output: Optional[Path] = typer.Option(None, help="Also write the matching paths to this file, one per line")
+):
+    """List log files containing the given signals within the period."""
+    from core.data_processing.caninventory import CanInventory
+
+    paths = CanInventory(inventory).query(
+        signal or None, start=start, end=end, match="any" if any_signal else "all"
+    )
+    for path in paths:
+        typer.echo(path)
+    if output:
+        output.write_text("".join(f"{path}\n" for path in paths), encoding="utf-8")
+    typer.echo(f"{len(paths)} matching files", err=True)
+
+
+@app.command()
+def query(
+    sql: Optional[str] = typer.Argument(None, help="SQL over the tables decoded/dataset/signal_stats/quality/files/metrics"),
+    decoded_dir: Path = typer.Option(Path("decoded"), exists=True, file_okay=False, help="Decoded output directory (searched recursively)"),
+    metrics: Optional[list[Path]] = typer.Option(None, exists=True, help="Metrics file (.csv/.parquet/.json) to register (repeatable)"),
+    output: Optional[Path] = typer.Option(None, help="Write the result to .csv/.parquet/.json"),
+    threads: Optional[int] = typer.Option(None, help="Scan threads (default all cores)"),
+    max_rows: int = typer.Option(50, help="Rows to print")
+):
+    """Run SQL over decoded outputs in-process (DuckDB); without SQL, list the registered tables."""
+    from core.data_processing.canquery import CanQuery, run_query
+
+    if not sql:
+        with CanQuery(decoded_dir, threads=threads) as engine:
+            for path in metrics or []:
+                engine.register_metrics(str(path), "metrics" if len(metrics) == 1 else path.stem)
+            for name, columns in engine.tables().items():
+                typer.echo(f"{name} ({engine.registered[name]}): {', '.join(columns)}")
+        return
+    result = run_query(sql, decoded_dir, metrics=metrics, output=output, threads=threads)
+    typer.echo(result.to_string(max_rows=max_rows))
+    if output:
+        typer.echo(f"Wrote {len(result)} rows -> {output}")
+
+
 def create_tmp_cfg(cfg: dict) -> Path:
     tmp = Path(".candecode.tmp.yaml")
     tmp.write_text(yaml.safe_dump(cfg, allow_unicode=True), encoding="utf-8")
@@ -132,26 +343,23 @@ def upload(
 
 @app.command()
 def generate_chart(
-    data_path: Path = typer.Argument(..., exists=True, readable=True, help="Decoded parquet or CSV data"),
+    data_path: Path = typer.Argument(..., exists=True, readable=True, help="Decoded feather, parquet or CSV data"),
     output_dir: Path = typer.Option(Path("charts"), help="Where to save chart images"),
     signal_columns: Optional[str] = typer.Option(None, help="Comma-separated signal columns to plot")
 ):
     """Generate time-series charts from decoded CAN data."""
-    import pandas as pd
     import matplotlib.pyplot as plt
     
     output_dir.mkdir(parents=True, exist_ok=True)
     typer.echo(f"Loading data from {data_path}...")
     
-    if data_path.suffix == ".parquet":
-        df = pd.read_parquet(data_path)
-    elif data_path.suffix == ".csv":
-        df = pd.read_csv(data_path)
-    else:
-        typer.echo("Unsupported file type. Use .parquet or .csv")
+    if data_path.suffix.lower() not in DECODED_SUFFIXES:
+        typer.echo("Unsupported file type. Use .feather, .arrow, .parquet or .csv")
         raise typer.Exit(code=1)
     
-    columns = signal_columns.split(",") if signal_columns else df.columns[1:6].tolist()
+    # 只加载需要绘制的列（feather内存映射打开，parquet按列读取）
+    columns = signal_columns.split(",") if signal_columns else read_decoded_columns(data_path)[:5]
+    df = load_decoded(data_path, columns=columns)
     
     for col in columns:
         if col not in df.columns:
@@ -0,0 +1,205 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+author: fenwickxie
+date: 2026-10-19 23:52:36
+filename: cancompress.py
+version: 1.0
+"""
+
+import gzip
+import io
+import locale
+import lzma
+import os
+import queue
+import threading
+from typing import BinaryIO, Optional, Tuple, TypeAlias, Union
+
+# zstandard 为可选依赖，仅读取 .zst 日志时需要
+try:
+    import zstandard
+
+    ZSTD_AVAILABLE = True
+except ImportError:
+    ZSTD_AVAILABLE = False
+
+StringPathLike: TypeAlias = Union[str, os.PathLike]
+
+# 压缩后缀 -> 压缩格式
+COMPRESSION_SUFFIXES = {".gz": "gzip", ".zst": "zstd", ".zstd": "zstd", ".xz": "xz"}
+# 后台线程每次解压出的字节数
+READ_SIZE = 1024 * 1024
+# 解压线程最多领先消费者的块数（限制内存占用）
+QUEUE_BLOCKS = 8
+
+_EOF = object()
+
+
+def compression_of(path: StringPathLike) -> Optional[str]:
+    """按文件名后缀判断压缩格式（"gzip"/"zstd"/"xz"），未压缩返回None"""
+    return COMPRESSION_SUFFIXES.get(os.path.splitext(str(path))[1].lower())
+
+
+def split_log_name(path: StringPathLike) -> Tuple[str, str]:
+    """
+    拆分日志文件名为 (主干, 后缀)，后缀包含压缩扩展名。
+
+    Example:
+        >>> split_log_name("/data/drive_001.blf.zst")
+        ('drive_001', '.blf.zst')
+    """
+    name = os.path.basename(str(path))
+    inner, outer = os.path.splitext(name)
+    if outer.lower() not in COMPRESSION_SUFFIXES:
+        return inner, outer
+    stem, ext = os.path.splitext(inner)
+    return stem, ext + outer
+
+
+def log_file_type(path: StringPathLike) -> str:
+    """日志类型（去掉压缩后缀后的扩展名，如 "blf"）"""
+    suffix = split_log_name(path)[1]
+    return suffix.split(".")[1].lower() if suffix else ""
+
+
+def _open_decompressor(path: StringPathLike, compression: str) -> BinaryIO:
+    """打开解压读取流（多成员gzip、多流xz、多帧zstd均连续读出）"""
+    if compression == "gzip":
+        return gzip.open(path, "rb")
+    if compression == "xz":
+        return lzma.open(path, "rb")
+    if compression == "zstd":
+        if not ZSTD_AVAILABLE:
+            raise ImportError("Reading .zst logs requires zstandard (pip install zstandard)")
+        return zstandard.ZstdDecompressor().stream_reader(
+            open(path, "rb"), read_across_frames=True, closefd=True
+        )
+    raise ValueError(f"Unsupported compression: {compression}")
+
+
+class ThreadedDecompressor(io.RawIOBase):
+    """
+    在后台线程中流式解压日志文件的只读字节流。
+
+    解压线程每次解压 READ_SIZE 字节放入有界队列，消费者（BLF/ASC读取器）读取时
+    只从队列取数据；zlib/lzma/zstd 解压时释放GIL，解压与解码在两个线程上重叠执行。
+    全程不落盘，内存占用不超过 QUEUE_BLOCKS 个块。
+
+    Example:
+        >>> stream = io.BufferedReader(ThreadedDecompressor("drive_001.blf.zst"))
+        >>> reader = can.BLFReader(stream)
+    """
+
+    def __init__(
+        self,
+        path: StringPathLike,
+        compression: Optional[str] = None,
+        read_size: int = READ_SIZE,
+        queue_blocks: int = QUEUE_BLOCKS,
+    ):
+        super().__init__()
+        self.path = str(path)
+        compression = compression or compression_of(path)
+        if compression is None:
+            raise ValueError(f"Not a compressed log: {self.path}")
+        self._source = _open_decompressor(path, compression)
+        self._read_size = read_size
+        self._queue: "queue.Queue" = queue.Queue(maxsize=max(1, queue_blocks))
+        self._stop = threading.Event()
+        self._pending = memoryview(b"")
+        self._eof = False
+        self._thread = threading.Thread(
+            target=self._produce, name=f"decompress:{os.path.basename(self.path)}", daemon=True
+        )
+        self._thread.start()
+
+    def _put(self, item) -> bool:
+        """放入队列；关闭时放弃等待，避免解压线程阻塞"""
+        while not self._stop.is_set():
+            try:
+                self._queue.put(item, timeout=0.1)
+                return True
+            except queue.Full:
+                continue
+        return False
+
+    def _produce(self) -> None:
+        try:
+            while not self._stop.is_set():
+                block = self._source.read(self._read_size)
+                if not block:
+                    break
+                if not self._put(block):
+                    return
+        except Exception as e:
+            # 压缩数据损坏等错误交给消费者在读取时抛出
+            self._put(e)
+        self._put(_EOF)
+
+    def readable(self) -> bool:
+        return True
+
+    def readinto(self, buffer) -> int:
+        if not self._pending:
+            if self._eof:
+                return 0
+            item = self._queue.get()
+            if item is _EOF:
+                self._eof = True
+                return 0
+            if isinstance(item, Exception):
+                self._eof = True
+                raise item
+            self._pending = memoryview(item)
+        n = min(len(buffer), len(self._pending))
+        buffer[:n] = self._pending[:n]
+        self._pending = self._pending[n:]
+        return n
+
+    def close(self) -> None:
+        if not self.closed:
+            self._stop.set()
+            # 清空队列使解压线程尽快退出
+            while True:
+                try:
+                    self._queue.get_nowait()
+                except queue.Empty:
+                    break
+            self._thread.join()
+            self._source.close()
+        super().close()
+
+
+def open_log_stream(path: StringPathLike) -> BinaryIO:
+    """以二进制只读流打开日志文件，压缩文件（.gz/.zst/.xz）在后台线程中流式解压"""
+    if compression_of(path) is None:
+        return open(path, "rb")
+    return io.BufferedReader(ThreadedDecompressor(path), buffer_size=READ_SIZE)
+
+
+def open_log_reader(path: StringPathLike, file_type: Optional[str] = None):
+    """
+    打开BLF/ASC日志的python-can读取器，压缩文件透明地流式解压。
+
+    Args:
+        path: 日志路径（如 drive_001.blf、drive_001.asc.gz）
+        file_type: "blf"/"asc"，默认按去掉压缩后缀后的扩展名判断
+    """
+    import can
+
+    file_type = file_type or log_file_type(path)
+    if file_type not in ("blf", "asc"):
+        raise ValueError(f"Unsupported file type: {file_type}")
+    if compression_of(path) is None:
+        return can.BLFReader(path) if file_type == "blf" else can.ASCReader(path)
+    stream = open_log_stream(path)
+    if file_type == "blf":
+        return can.BLFReader(stream)
+    # 与python-can打开未压缩ASC时的默认编码一致
+    return can.ASCReader(io.TextIOWrapper(stream, encoding=locale.getpreferredencoding(False)))
+
+
+if __name__ == "__main__":
+    pass
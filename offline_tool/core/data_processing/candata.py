@@ -15,6 +15,13 @@ import pandas as pd
 import platform
 from typing import TypeAlias, Union
 
+try:
+    from .canjit import growth_phase_flags
+    from .decoded_io import list_decoded_files, load_decoded
+except ImportError:  # 作为脚本直接运行时
+    from canjit import growth_phase_flags
+    from decoded_io import list_decoded_files, load_decoded
+
 StringPathLike: TypeAlias = Union[str, os.PathLike]
 
 if platform.system() == "Windows":
@@ -26,18 +33,47 @@ R = 0.338
 FRONT_MOTOR_TRANSMISSION_RATIO = 10.79
 REAR_MOTOR_TRANSMISSION_RATIO = 10.81
 
+# 工况分组关键字（每个子列表取一个关键字组合成一个分组）
+DEFAULT_CONDITION_KEYWORDS = [["on", "off"], ["冰", "雪"], ["eco", "sport"]]
+
+
+def build_condition_groups(keywords: list = DEFAULT_CONDITION_KEYWORDS) -> dict[str, list]:
+    """根据关键字列表生成全部条件组合，格式为 {group_name: [keyword, ...]}"""
+    return {
+        "_".join(combination): list(combination) for combination in product(*keywords)
+    }
+
+
+def match_condition_group(
+    file_path: StringPathLike, keywords: list = DEFAULT_CONDITION_KEYWORDS
+) -> str | None:
+    """
+    按文件名匹配所属工况分组。
+
+    Args:
+        file_path: 文件路径或文件名
+        keywords: 关键字列表，同 CanData 的分组规则
+
+    Returns:
+        分组名（如 "on_冰_eco"），未匹配返回None
+    """
+    file_lower = os.path.basename(file_path).lower()  # 转为小写以便匹配
+    for group_name, group_keywords in build_condition_groups(keywords).items():
+        if all(keyword in file_lower for keyword in group_keywords):
+            return group_name
+    return None
+
 
 class CanData:
     def __init__(self, data: os.PathLike | str):
         self.files = []
         if os.path.isfile(data):
             self.files.append(data)
-            self.data = [pd.read_csv(data)]
+            self.data = [load_decoded(data, index_as_column=True)]
         elif os.path.isdir(data):
-            self.files = [
-                os.path.join(data, f) for f in os.listdir(data) if f.endswith(".csv")
-            ]
-            self.data = [pd.read_csv(f) for f in self.files]
+            # 同名文件有多种格式时只取加载最快的（feather > parquet > csv）
+            self.files = list_decoded_files(data)
+            self.data = [load_decoded(f, index_as_column=True) for f in self.files]
 
         self.grouped_files = self.__group_files_by_conditions()
         self.statics = pd.DataFrame()
@@ -45,7 +81,7 @@ class CanData:
 
     def __group_files_by_conditions(
         self,
-        keywords: list = [["on", "off"], ["冰", "雪"], ["eco", "sport"]],
+        keywords: list = DEFAULT_CONDITION_KEYWORDS,
     ) -> dict[str, list]:
         """
         根据关键字列表自动生成条件组合，并对文件进行分组。
@@ -58,19 +94,12 @@ class CanData:
         """
 
         # 生成条件组合
-        conditions = {
-            "_".join(combination): list(combination)
-            for combination in product(*keywords)
-        }
-
-        grouped_files = {group_name: [] for group_name in conditions}
+        grouped_files = {group_name: [] for group_name in build_condition_groups(keywords)}
 
         for file in self.files:
-            file_lower = os.path.basename(file).lower()  # 转为小写以便匹配
-            for group_name, keywords in conditions.items():
-                if all(keyword in file_lower for keyword in keywords):
-                    grouped_files[group_name].append(file)
-                    break  # 一个文件只归入一个分组
+            group_name = match_condition_group(file, keywords)
+            if group_name is not None:
+                grouped_files[group_name].append(file)  # 一个文件只归入一个分组
 
         return grouped_files
 
@@ -104,43 +133,10 @@ class CanData:
             #         in_growth_phase = False
             #     data[f"{signal_name}_flag"].iloc[i] = in_growth_phase
             # 标记信号值是否从 min 开始增长到 max，允许平台期（即值不降即可），但起步阶段不能有大段等于min_value的数据段
-            data[f"{signal_name}_flag"] = False
-            in_growth_phase = False
-            growth_indices = []
-            for i in range(start, end):
-                _v = int(data[signal_name].iloc[i])
-                if _v == min_val:
-                    # 如果前一个也在增长阶段且也是min_val，则把前一个的flag改为False，避免大段min_val
-                    if in_growth_phase and int(data.loc[i - 1, signal_name]) == min_val:
-                        data.at[i - 1, f"{signal_name}_flag"] = False
-                    in_growth_phase = True
-                    data.at[i, f"{signal_name}_flag"] = True
-                    growth_indices = [i]
-                    continue
-                if in_growth_phase:
-                    # 允许平台期，只要不降即可，并且数值不能减小
-                    # 允许小幅波动：如果下降幅度在允许范围内（如1单位），则不视为终止增长
-                    if _v < data.loc[i - 1, signal_name]:
-                        # 判断是否为小幅波动（如下降不超过1单位）
-                        if data.loc[i - 1, signal_name] - _v <= 2:
-                            data.at[i, f"{signal_name}_flag"] = True
-                            growth_indices.append(i)
-                            continue
-                        # 否则视为终止增长阶段
-                        for idx in growth_indices:
-                            data.at[idx, f"{signal_name}_flag"] = False
-                        in_growth_phase = False
-                        growth_indices = []
-                    elif _v >= min_val and _v <= max_val:  # 如果在范围内
-                        data.at[i, f"{signal_name}_flag"] = True
-                        growth_indices.append(i)
-                        if _v == max_val:  # 如果达到最大值，完成一个有效增长阶段
-                            in_growth_phase = False
-                            growth_indices = []
-                    elif _v > max_val:  # 如果超过max_val
-                        # 只结束增长阶段，不改变之前的标记
-                        in_growth_phase = False
-                        growth_indices = []
+            # 逐点状态机由 canjit.growth_phase_flags 实现（numba可用时JIT编译）
+            data[f"{signal_name}_flag"] = growth_phase_flags(
+                data[signal_name].to_numpy(dtype=np.float64), min_val, max_val, start, end
+            )
             # 更新综合标记
             data["combined_flag"] &= data[f"{signal_name}_flag"]
 
@@ -312,7 +308,7 @@ class CanData:
             "AccPdlPosn_342": (0, 40),
         },
     ):
-        data = pd.read_csv(file_path)
+        data = load_decoded(file_path, index_as_column=True)
         data["original_index"] = data.index  # 保存原始索引
         slice_idx = self.get_stage_idxs(
             data,
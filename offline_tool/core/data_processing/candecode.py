@@ -1,4 +1,8 @@
+import io
+import json
 import os
+import re
+import time
 import can
 import cantools
 from typing import List, Dict, Any, Optional, Tuple, TypeAlias, Union
@@ -17,21 +21,51 @@ from pathlib import Path
 # 添加项目根目录到Python路径
 project_root = Path(__file__).parent
 sys.path.insert(0, str(project_root))
-# 尝试导入numba用于JIT加速
-try:
-    from numba import jit
-
-    NUMBA_AVAILABLE = True
-except ImportError:
-    NUMBA_AVAILABLE = False
-
-    # 如果numba不可用，使用空装饰器
-    def jit(*args, **kwargs):
-        def decorator(func):
-            return func
-
-        return decorator if args and callable(args[0]) else decorator
 
+try:
+    from .candata import match_condition_group
+    from .cankernels import FrameBatch, MessageKernel, decode_signal, enum_code_dtype, is_enum_signal
+    from .canraster import StreamingRasterizer, iter_raster_windows
+    from .canstats import StreamingSignalStats, build_signal_meta, write_sidecar
+    from .canquality import QualityReport
+    from .canjit import NUMBA_AVAILABLE, dedup_keep_nb, numba_enabled, set_numba_enabled, warm_up
+    from .canmf4 import CAN_DATA_FRAME, MF4_WINDOW_RECORDS, MF4FrameReader
+    from .cancompress import compression_of, log_file_type, open_log_reader, split_log_name
+    from .canquicklook import DEFAULT_FRACTION, _asc_time_range, quick_look
+    from .decoded_io import (
+        DEFAULT_PARTITION_BY,
+        SUPPORTED_SAVE_FORMATS,
+        WINDOWED_FORMATS,
+        SharedDecodeResult,
+        WindowedTableWriter,
+        dataframe_to_table,
+        export_to_shared_memory,
+        save_dataframe,
+        value_table_field,
+        write_dataset_metadata,
+    )
+except ImportError:  # 作为脚本直接运行时
+    from candata import match_condition_group
+    from cankernels import FrameBatch, MessageKernel, decode_signal, enum_code_dtype, is_enum_signal
+    from canraster import StreamingRasterizer, iter_raster_windows
+    from canstats import StreamingSignalStats, build_signal_meta, write_sidecar
+    from canquality import QualityReport
+    from canjit import NUMBA_AVAILABLE, dedup_keep_nb, numba_enabled, set_numba_enabled, warm_up
+    from canmf4 import CAN_DATA_FRAME, MF4_WINDOW_RECORDS, MF4FrameReader
+    from cancompress import compression_of, log_file_type, open_log_reader, split_log_name
+    from canquicklook import DEFAULT_FRACTION, _asc_time_range, quick_look
+    from decoded_io import (
+        DEFAULT_PARTITION_BY,
+        SUPPORTED_SAVE_FORMATS,
+        WINDOWED_FORMATS,
+        SharedDecodeResult,
+        WindowedTableWriter,
+        dataframe_to_table,
+        export_to_shared_memory,
+        save_dataframe,
+        value_table_field,
+        write_dataset_metadata,
+    )
 
 StringPathLike: TypeAlias = Union[str, os.PathLike]
 
@@ -44,6 +78,15 @@ ENCODING = "utf-8"
 LARGE_FILE_THRESHOLD = 500 * 1024 * 1024  # 500MB
 VERY_LARGE_FILE_THRESHOLD = 1024 * 1024 * 1024  # 1GB
 
+# 栅格化峰值内存约为结果表大小的倍数（插值数组 + DataFrame + Arrow表）
+RASTER_PEAK_FACTOR = 3
+# 窗口化输出的最小窗口行数
+MIN_WINDOW_ROWS = 1000
+# 会话流式输出时累积到该行数再写出一次（避免产生过多小的行组）
+SESSION_WINDOW_ROWS = 20000
+# MDF总线记录文件的扩展名（类型）
+MF4_FILE_TYPES = ("mf4", "mdf")
+
 
 def load_config_from_yaml(yaml_path: StringPathLike) -> Dict[str, Any]:
     """
@@ -62,7 +105,9 @@ def load_config_from_yaml(yaml_path: StringPathLike) -> Dict[str, Any]:
     with open(yaml_path, "r", encoding="utf-8") as f:
         config = yaml.safe_load(f)
 
-    # 验证必需的配置项
+    # 验证必需的配置项（按通道配置DBC时可省略 dbc_path）
+    if config.get("channel_dbc") and not config.get("dbc_path"):
+        config["dbc_path"] = list(config["channel_dbc"].values())
     required_keys = ["dbc_path", "can_data_path"]
     missing_keys = [key for key in required_keys if key not in config]
     if missing_keys:
@@ -79,6 +124,34 @@ def load_config_from_yaml(yaml_path: StringPathLike) -> Dict[str, Any]:
         "signal_names": None,
         "signal_mapping": None,
         "time_from_zero": False,  # True: 从0开始索引；False: 使用原始时间戳
+        "ipc_compression": "uncompressed",  # .feather/.arrow压缩: uncompressed/lz4/zstd
+        "dataset_layout": "flat",  # flat: 扁平文件；hive: .parquet写入Hive分区数据集
+        "dataset_dir": None,  # 分区数据集根目录，默认 output_dir/dataset
+        "partition_by": list(DEFAULT_PARTITION_BY),
+        "vehicle_pattern": None,  # 从文件名提取车辆号的正则（第一个分组），默认取上级目录名
+        "row_group_size": 100000,
+        "j1939": None,  # J1939 PGN路由：None按DBC协议自动判断，true/false强制开关
+        "id_masks": None,  # ID掩码列表（如 0x1FFFFF00），仅扩展帧：帧ID & 掩码 == DBC扩展报文ID & 掩码
+        "channel_dbc": None,  # 通道号(1起) -> DBC，按 msg.channel 路由，各通道只用自己的DBC
+        "channel_output": "prefix",  # prefix: 信号名加 CH{n}_ 合并输出；split: 每个通道单独输出 {文件名}_CH{n}
+        "batch_small_files": True,  # 小文件按大小均衡打包为批任务
+        "small_file_mb": 16,
+        "batch_target_mb": 64,
+        "concat_sessions": False,  # 同一会话的连续片段合并为一个输出
+        "session_gap": 60,  # 会话内BLF/ASC片段间允许的最大间隔（秒）
+        "session_streaming": False,  # 会话片段k路归并后在同一网格上流式栅格化写出
+        "memory_budget_mb": None,  # 单个文件的内存预算，超出时自动降精度/窗口化/分组输出
+        "inventory_query": None,  # 按清单挑选文件 {path, signals, start, end, match}
+        "signal_stats": True,  # 解码时单遍统计各信号，写出 {文件名}.stats.json
+        "stats_histogram_bins": 0,  # 统计直方图分箱数（DBC min/max范围），0表示不统计
+        "quality_checks": False,  # 解码后检查丢帧/卡滞/越界/时间倒退/计数器断续，写出 {文件名}.quality.json
+        "quality_gap_factor": 3.0,  # 采样间隔超过该倍数的周期视为丢帧
+        "quality_stuck_seconds": 10.0,  # 非枚举信号保持同一值超过该秒数视为卡滞
+        "dedup_frames": False,  # 解码前去除ID和载荷相同、时间差在容差内的重复帧（网关镜像）
+        "dedup_tolerance": 0.001,  # 重复帧最大时间差（秒）
+        "dedup_scope": "across",  # across: 跨通道去重；within: 只在同一通道内去重
+        "dedup_keep": "first",  # first/last，或通道优先级列表（如 [2, 1]）
+        "categorical_enums": False,  # 枚举信号写为字典（分类）列，标签取自DBC值表
     }
 
     # 合并默认值
@@ -97,186 +170,1650 @@ def load_config_from_yaml(yaml_path: StringPathLike) -> Dict[str, Any]:
     return config
 
 
-@jit(nopython=False, cache=True, parallel=False)
-def _fast_array_conversion(timestamps_list, values_list):
-    """使用Numba加速数组转换（如果可用）"""
-    timestamps = np.array(timestamps_list, dtype=np.float64)
-    values = np.array(values_list, dtype=np.float64)
-    return timestamps, values
+def _j1939_pgn(frame_id: int) -> int:
+    """从29位扩展ID中提取J1939 PGN（PDU1格式时PS为目标地址，不属于PGN）"""
+    pgn = (frame_id >> 8) & 0x3FFFF
+    if (pgn >> 8) & 0xFF < 240:
+        pgn &= 0x3FF00
+    return pgn
 
 
-def _build_decoder_map(dbc_data: Database) -> Dict[int, Any]:
-    """预编译消息ID到解码函数的映射，避免运行时查找。"""
-    decoder_map: Dict[int, Any] = {}
-    for __msg in getattr(dbc_data, "messages", []):
-        decoder_map[__msg.frame_id] = __msg.decode
-    return decoder_map
+# 路由键：扩展帧ID加上此标志位，与数值相同的标准帧ID分开查找和缓存
+EXTENDED_KEY_FLAG = 1 << 32
 
 
-def _process_single_file_wrapper(args):
-    """
-    多进程wrapper函数，用于处理单个CAN文件。
-    必须在模块级别定义以支持multiprocessing序列化。
-    优化：批量处理、预分配内存、减少列表追加开销、大文件优化
+def route_key(frame_id: int, is_extended: bool) -> int:
+    """DecoderRouter 的查找键：标准帧为帧ID，扩展帧为帧ID | EXTENDED_KEY_FLAG"""
+    return frame_id | EXTENDED_KEY_FLAG if is_extended else frame_id
+
+
+class DecoderRouter(dict):
     """
-    import traceback
+    CAN帧到DBC报文（cantools Message）的路由表，按 route_key(帧ID, 是否扩展帧) 查找。
 
-    (
-        dbc_url,
-        log_file_path,
-        file_type,
-        signal_names,
-        signal_corr,
-        step,
-        time_from_zero,
-        save_dir,
-        save_formats,
-    ) = args
+    精确匹配：帧ID等于DBC报文ID（不区分帧类型），在构造时预先写入字典。
+    J1939 PGN 匹配和ID掩码只作用于扩展帧，且只匹配DBC中的扩展帧报文：
+    掩码规则为 (帧ID & 掩码) == (DBC报文ID & 掩码)，按掩码后的DBC报文ID预先建表。
+    掩码/PGN 匹配的帧ID是29位ID空间中的等价类，无法逐个枚举预计算；
+    未精确命中的扩展帧ID首次出现时查一次预建的表，结果（包括“无法解码”的None）
+    写回字典，之后同一ID只需一次字典查找。
 
-    # 检查文件大小
-    try:
-        file_size = os.path.getsize(log_file_path)
-        is_large_file = file_size > LARGE_FILE_THRESHOLD
-        is_very_large_file = file_size > VERY_LARGE_FILE_THRESHOLD
+    查找须使用 router[key] 或 lookup()（dict.get 不会触发 __missing__）。
+    各报文的批量解码核（MessageKernel）在首次使用时编译并缓存。
+    """
 
-        if is_very_large_file:
-            print(
-                f"\n⚠ 超大文件: {os.path.basename(log_file_path)} ({file_size/1024/1024:.0f}MB)"
+    def __init__(
+        self,
+        dbc_data: Database,
+        j1939: Optional[bool] = None,
+        id_masks: Optional[List[Union[int, str]]] = None,
+    ):
+        super().__init__()
+        messages = list(getattr(dbc_data, "messages", []))
+        for __msg in messages:
+            self[__msg.frame_id] = __msg
+            self[__msg.frame_id | EXTENDED_KEY_FLAG] = __msg
+
+        # None: DBC中存在J1939协议报文时自动启用
+        if j1939 is None:
+            j1939 = any(getattr(__msg, "protocol", None) == "j1939" for __msg in messages)
+        extended = [__msg for __msg in messages if __msg.is_extended_frame]
+
+        self._pgn_map: Dict[int, Any] = {}
+        if j1939:
+            for __msg in extended:
+                self._pgn_map.setdefault(_j1939_pgn(__msg.frame_id), __msg)
+
+        self._masked: List[Tuple[int, Dict[int, Any]]] = []
+        for mask in id_masks or []:
+            mask = int(mask, 0) if isinstance(mask, str) else int(mask)
+            table: Dict[int, Any] = {}
+            for __msg in extended:
+                table.setdefault(__msg.frame_id & mask, __msg)
+            self._masked.append((mask, table))
+
+        self._kernels: Dict[str, Optional[MessageKernel]] = {}
+
+    def kernel(self, message) -> Optional[MessageKernel]:
+        """返回报文的批量解码核，不支持批量解码的报文返回None"""
+        if message.name not in self._kernels:
+            self._kernels[message.name] = (
+                MessageKernel(message) if MessageKernel.supports(message) else None
             )
-            print(f"  使用优化模式处理，请耐心等待...")
-    except:
-        file_size = 0
-        is_large_file = False
-        is_very_large_file = False
+        return self._kernels[message.name]
 
-    # 在子进程中加载DBC文件并预编译解码函数
-    with open(dbc_url, "r", encoding=ENCODING) as f:
-        dbc_data = cantools.db.load(f, database_format="dbc", strict=False)
-    decoder_map = _build_decoder_map(dbc_data)
+    def lookup(self, frame_id: int, is_extended: bool):
+        """按帧ID和帧类型查找DBC报文，无法解码时返回None"""
+        return self[route_key(frame_id, is_extended)]
 
-    # 处理CAN文件
-    try:
-        # 根据文件类型加载日志数据
-        if file_type == "blf":
-            log_data = can.BLFReader(log_file_path)
-        elif file_type == "asc":
-            log_data = can.ASCReader(log_file_path)
-        else:
-            return None
+    def __missing__(self, key: int):
+        message = None
+        # 标准帧只做精确匹配（已在构造时写入），未命中即无法解码
+        if key & EXTENDED_KEY_FLAG:
+            frame_id = key & ~EXTENDED_KEY_FLAG
+            if self._pgn_map:
+                message = self._pgn_map.get(_j1939_pgn(frame_id))
+            if message is None:
+                for mask, table in self._masked:
+                    message = table.get(frame_id & mask)
+                    if message is not None:
+                        break
+        self[key] = message
+        return message
 
-        # 解码信号 - 使用优化的数据结构与预编译解码函数
-        from asammdf import Signal
 
-        decoded: Dict[str, Dict[str, list]] = {}
-        signal_names_set = set(signal_names) if signal_names else None
+# 按通道路由且合并输出时的信号名前缀，{} 为通道号（1起，与CANalyzer/CANoe一致）
+CHANNEL_PREFIX = "CH{}_"
 
-        # 统计信息
-        total_msgs = 0
-        decoded_msgs = 0
-        error_count = 0
-        error_types = {}  # 错误类型统计
 
-        # 根据文件大小动态调整批处理大小
-        if is_very_large_file:
-            batch_size = 500  # 超大文件使用小批次
-        elif is_large_file:
-            batch_size = 800
+class _PrefixedSignal:
+    """只改名的信号视图（元数据用途：统计、质量检查、数据集列），其余属性取自原信号"""
+
+    def __init__(self, signal, prefix: str):
+        self._signal = signal
+        self.name = prefix + signal.name
+
+    def __getattr__(self, attr):
+        return getattr(self._signal, attr)
+
+
+class _PrefixedMessage:
+    def __init__(self, message, prefix: str):
+        self._message = message
+        self.signals = [_PrefixedSignal(__sig, prefix) for __sig in message.signals]
+
+    def __getattr__(self, attr):
+        return getattr(self._message, attr)
+
+
+class _ChannelDatabase:
+    """多个通道DBC合并后的报文视图，信号名带各自通道前缀；channel_databases 为 {前缀: 原DBC}"""
+
+    def __init__(self, databases: List[Tuple[str, Database]]):
+        self.channel_databases = dict(databases)
+        self.messages = [
+            _PrefixedMessage(__msg, prefix) if prefix else __msg
+            for prefix, dbc_data in databases
+            for __msg in dbc_data.messages
+        ]
+
+
+class ChannelRouter:
+    """
+    按CAN通道（msg.channel，0起）选择解码路由表，用于多路总线日志：
+    每个通道只用自己的DBC解码，跨总线ID冲突不会混淆，未配置的通道直接跳过不解码。
+
+    各通道的信号名可加前缀（CH{n}_）合并到同一输出；拆分输出时每个任务只路由一个通道。
+    """
+
+    def __init__(self, routes: Dict[int, Tuple[DecoderRouter, str]]):
+        self.routes = routes
+
+    def route(self, channel: int) -> Optional[Tuple[DecoderRouter, str]]:
+        """返回 (路由表, 信号名前缀)，未配置的通道返回None"""
+        return self.routes.get(channel)
+
+    @staticmethod
+    def wanted(prefix: str, signal_names_set: Optional[set]) -> Optional[set]:
+        """通道内需要解码的原始信号名（去掉前缀）"""
+        if signal_names_set is None or not prefix:
+            return signal_names_set
+        return {name[len(prefix):] for name in signal_names_set if name.startswith(prefix)}
+
+
+def _normalize_channel_dbc(
+    channel_dbc: Optional[Dict[Any, StringPathLike]],
+) -> Optional[Dict[int, str]]:
+    """通道→DBC映射统一为 {通道号(1起): DBC路径}"""
+    if not channel_dbc:
+        return None
+    normalized = {int(channel): str(path) for channel, path in channel_dbc.items()}
+    invalid = [channel for channel in normalized if channel < 1]
+    if invalid:
+        raise ValueError(f"channel_dbc 通道号从1开始: {invalid}")
+    return normalized
+
+
+_CHANNEL_PREFIX_PATTERN = re.compile(r"^CH\d+_")
+
+
+def _prefix_channel_signals(
+    signal_names: Optional[List[str]],
+    signal_corr: Optional[Dict[str, str]],
+    channels: List[int],
+) -> Tuple[Optional[List[str]], Optional[Dict[str, str]]]:
+    """
+    通道前缀模式下展开信号过滤和重命名：未带前缀的信号名作用于所有通道，
+    带前缀的（如 CH2_RMSpd_250）只作用于该通道。
+    """
+    if signal_names:
+        expanded: List[str] = []
+        for name in signal_names:
+            if _CHANNEL_PREFIX_PATTERN.match(name):
+                expanded.append(name)
+            else:
+                expanded.extend(CHANNEL_PREFIX.format(channel) + name for channel in channels)
+        signal_names = list(dict.fromkeys(expanded))
+    if signal_corr:
+        corr: Dict[str, str] = {}
+        for name, target in signal_corr.items():
+            if _CHANNEL_PREFIX_PATTERN.match(name):
+                corr[name] = target
+            else:
+                for channel in channels:
+                    prefix = CHANNEL_PREFIX.format(channel)
+                    corr.setdefault(prefix + name, prefix + str(target))
+        signal_corr = corr
+    return signal_names, signal_corr
+
+
+def _build_decoder_map(
+    dbc_data: Database,
+    j1939: Optional[bool] = None,
+    id_masks: Optional[List[Union[int, str]]] = None,
+) -> DecoderRouter:
+    """预编译消息ID到DBC报文的映射，避免运行时查找。"""
+    return DecoderRouter(dbc_data, j1939=j1939, id_masks=id_masks)
+
+
+# 批量校验的错误原因，按判定优先级排列（序号+1即原因编码，0表示有效）
+_FRAME_ERROR_REASONS = (
+    "ErrorFrame",
+    "RemoteFrame",
+    "UnknownMessage",
+    "DLCMismatch",
+    "FDFlagMismatch",
+    "UnknownMultiplexer",
+)
+
+
+def _payload_matrix(frames: FrameBatch, rows: np.ndarray, length: int) -> np.ndarray:
+    """取选中帧的前 length 字节组成 uint8 矩阵（调用方保证这些帧足够长）"""
+    return frames.payload[rows, :length]
+
+
+def _top_level_multiplexers(message) -> List[Tuple[Any, np.ndarray]]:
+    """返回报文顶层多路复用信号及其在DBC中出现过的取值"""
+    allowed: Dict[str, set] = defaultdict(set)
+    for __sig in message.signals:
+        if __sig.multiplexer_signal is not None and __sig.multiplexer_ids:
+            allowed[__sig.multiplexer_signal].update(__sig.multiplexer_ids)
+    return [
+        (__sig, np.array(sorted(allowed[__sig.name]), dtype=np.float64))
+        for __sig in message.signals
+        if __sig.is_multiplexer
+        and __sig.multiplexer_signal is None
+        and __sig.name in allowed
+    ]
+
+
+def _validate_frames(
+    frames: FrameBatch, decoder_map: Dict[int, Any], error_types: Dict[str, int]
+) -> Tuple[np.ndarray, np.ndarray, List[Any]]:
+    """
+    批量校验一批CAN帧，无效帧按原因计入 error_types，不再进入逐帧解码。
+
+    校验项（按优先级）：错误帧、远程帧、未知ID、数据长度短于DBC定义、
+    DBC定义为CAN FD但帧为经典CAN、顶层多路复用值不在DBC中。
+
+    Args:
+        frames: 列式帧批次
+        decoder_map: DecoderRouter
+        error_types: 错误类型计数字典，原地累加
+
+    Returns:
+        (有效帧布尔掩码, 各帧对应的报文序号, 去重后的DBC报文列表)
+    """
+    n = len(frames)
+    keys = np.where(frames.is_extended, frames.ids | EXTENDED_KEY_FLAG, frames.ids)
+    unique_keys, inverse = np.unique(keys, return_inverse=True)
+    messages = [decoder_map[int(key)] for key in unique_keys]
+    known = np.array([m is not None for m in messages], dtype=bool)
+    lengths = np.array([m.length if m is not None else 0 for m in messages], dtype=np.int32)
+    fd_only = np.array([bool(m is not None and m.is_fd) for m in messages], dtype=bool)
+
+    reason = np.zeros(n, dtype=np.int8)
+
+    def mark(mask: np.ndarray, code: int) -> None:
+        reason[(reason == 0) & mask] = code
+
+    mark(frames.is_error, 1)
+    mark(frames.is_remote, 2)
+    mark(~known[inverse], 3)
+    mark(frames.lengths < lengths[inverse], 4)
+    mark(fd_only[inverse] & ~frames.is_fd, 5)
+
+    for k, message in enumerate(messages):
+        if message is None or not message.is_multiplexed():
+            continue
+        rows = np.flatnonzero((inverse == k) & (reason == 0))
+        if len(rows) == 0:
+            continue
+        payload = _payload_matrix(frames, rows, message.length)
+        for mux_signal, allowed in _top_level_multiplexers(message):
+            unknown = ~np.isin(decode_signal(payload, mux_signal), allowed)
+            reason[rows[unknown]] = 6
+
+    counts = np.bincount(reason, minlength=len(_FRAME_ERROR_REASONS) + 1)
+    for code, name in enumerate(_FRAME_ERROR_REASONS, start=1):
+        if counts[code]:
+            error_types[name] = error_types.get(name, 0) + int(counts[code])
+    return reason == 0, inverse, messages
+
+
+def _duplicate_keep_mask(
+    frames: FrameBatch,
+    tolerance: float = 0.001,
+    scope: str = "across",
+    keep: Union[str, List[int]] = "first",
+) -> np.ndarray:
+    """
+    向量化检测网关镜像等产生的重复帧：ID和载荷相同、相邻时间差不超过 tolerance 的帧
+    视为同一帧的多个副本，每组只保留一个。
+
+    Args:
+        frames: 列式帧批次
+        tolerance: 副本间最大时间差（秒），链式判断（相邻副本间隔均不超过该值）
+        scope: "across" 不区分通道（跨通道镜像和同通道重复都会去除）；"within" 只在同一通道内去重
+        keep: "first" 保留最早的副本；"last" 保留最晚的；通道号列表（1起）按通道优先级保留
+
+    Returns:
+        布尔掩码，True 表示保留
+    """
+    n = len(frames)
+    timestamps = np.ascontiguousarray(frames.timestamps)
+    channels = np.ascontiguousarray(frames.channels)
+    # 组内保留 rank 最小的帧（同 rank 取最早）
+    if keep == "last":
+        rank = -timestamps
+    elif keep == "first":
+        rank = timestamps
+    else:
+        priority = {channel - 1: k for k, channel in enumerate(keep)}
+        rank = np.array([priority.get(int(c), len(priority)) for c in channels], dtype=np.float64)
+
+    if numba_enabled():
+        # JIT：按时间顺序扫描一遍，哈希表归组，不需要按分组键排序
+        if n > 1 and np.all(timestamps[1:] >= timestamps[:-1]):
+            order = np.arange(n)
         else:
-            batch_size = 1000
+            order = np.argsort(timestamps, kind="stable")
+        return dedup_keep_nb(
+            order,
+            np.ascontiguousarray(frames.ids),
+            np.ascontiguousarray(frames.lengths),
+            frames.payload,
+            channels,
+            scope == "within",
+            timestamps,
+            rank,
+            float(tolerance),
+        )
 
-        # 批量收集消息数据（减少频繁的字典操作）
-        temp_data = defaultdict(lambda: {"timestamps": [], "values": []})
+    # 载荷按整行字节比较：每行视为一个定长字节串，映射为组号
+    payload = np.ascontiguousarray(frames.payload)
+    if payload.shape[1]:
+        row_bytes = payload.view(np.dtype((np.void, payload.shape[1]))).ravel()
+        payload_key = np.unique(row_bytes, return_inverse=True)[1].ravel()
+    else:
+        payload_key = np.zeros(n, dtype=np.int64)
+    group_keys = [frames.ids, frames.lengths, payload_key] + (
+        [channels] if scope == "within" else []
+    )
+
+    # 按 (分组键, 时间) 排序后，键变化或时间差超过容差处开始新的副本组
+    order = np.lexsort([timestamps] + group_keys[::-1])
+    new_group = np.ones(n, dtype=bool)
+    if n > 1:
+        same_key = np.ones(n - 1, dtype=bool)
+        for key in group_keys:
+            sorted_key = key[order]
+            same_key &= sorted_key[1:] == sorted_key[:-1]
+        sorted_t = timestamps[order]
+        new_group[1:] = ~same_key | (np.diff(sorted_t) > tolerance)
+    group = np.empty(n, dtype=np.int64)
+    group[order] = np.cumsum(new_group) - 1
+
+    # 组内按保留策略排序，取每组第一个
+    chosen = np.lexsort([timestamps, rank, group])
+    first_of_group = np.ones(n, dtype=bool)
+    first_of_group[1:] = group[chosen][1:] != group[chosen][:-1]
+    mask = np.zeros(n, dtype=bool)
+    mask[chosen[first_of_group]] = True
+    return mask
+
+
+def _new_decode_stats() -> Dict[str, Any]:
+    """解码统计信息（由 _iter_decode_chunks 原地更新）"""
+    return {
+        "total_msgs": 0,
+        "decoded_msgs": 0,
+        "error_count": 0,
+        "error_types": {},
+        "channel_frames": {},  # {通道号(1起): 帧数}
+        "unrouted_frames": 0,  # 通道路由时未配置DBC的通道上的帧（跳过，不计为错误）
+        "duplicate_frames": 0,  # 去重时移除的重复帧
+    }
 
-        def flush_batch():
-            """将累积的列表转为NumPy数组并合并到主存储。"""
-            if not temp_data:
-                return
-            for sig_name, data in temp_data.items():
-                if not data["timestamps"]:
-                    continue
-                t_arr = np.asarray(data["timestamps"], dtype=np.float64)
-                v_arr = np.asarray(data["values"], dtype=np.float64)
-                bucket = decoded.setdefault(sig_name, {"timestamps": [], "values": []})
-                bucket["timestamps"].append(t_arr)
-                bucket["values"].append(v_arr)
-            temp_data.clear()
-
-        # 批量处理消息
-        for __msg in log_data:
-            total_msgs += 1
-            decoder = decoder_map.get(__msg.arbitration_id)
-            if decoder is None:
-                error_count += 1
-                error_types["UnknownMessage"] = error_types.get("UnknownMessage", 0) + 1
+
+def _add_decode_counts(target: Dict[str, Any], counts: Dict[str, Any]) -> None:
+    """把一组帧的解码/错误计数累加到统计字典"""
+    target["decoded_msgs"] += counts["decoded_msgs"]
+    target["error_count"] += counts["error_count"]
+    for name, count in counts["error_types"].items():
+        target["error_types"][name] = target["error_types"].get(name, 0) + count
+
+
+def _iter_decode_chunks(
+    log_data,
+    decoder_map: Dict[int, Any],
+    signal_names_set: Optional[set] = None,
+    chunk_frames: int = 1000,
+    chunk_seconds: Optional[float] = None,
+    stats: Optional[Dict[str, Any]] = None,
+    dedup: Optional[Dict[str, Any]] = None,
+    channel_stats: Optional[Dict[int, Dict[str, Any]]] = None,
+):
+    """
+    逐块解码CAN帧，每块就绪后立即以NumPy数组形式产出，内存占用只与块大小有关。
+
+    Args:
+        log_data: 可迭代的 can.Message 序列（BLFReader/ASCReader等），
+            或直接产出 FrameBatch 的列式读取器（如MF4总线记录）
+        decoder_map: 消息ID到DBC报文的映射（DecoderRouter，按 [] 查找），
+            或按通道选择路由表的 ChannelRouter
+        signal_names_set: 需要保留的信号名集合，None表示全部
+        chunk_frames: 每块最多包含的帧数
+        chunk_seconds: 每块最长覆盖的时间（秒），None表示只按帧数切分
+        stats: 可选统计字典（见 _new_decode_stats），原地累加
+        dedup: 重复帧去除参数 {"tolerance", "scope", "keep"}（见 _duplicate_keep_mask），
+            None表示不去重；按批检测，批边界两侧的副本不会被识别
+        channel_stats: 按通道路由时另外按通道累加的统计 {通道号(1起): 统计字典}，
+            用于每个通道单独输出；只统计已配置DBC的通道
+
+    Yields:
+        {"t_start": 块起始时间, "t_end": 块结束时间, "frames": 帧数,
+         "signals": {信号名: (timestamps, values)}}，时间戳为float64，值为float64（枚举信号为整数码值）
+    """
+    if stats is None:
+        stats = _new_decode_stats()
+    chunk_frames = chunk_frames if chunk_frames > 0 else 1000
+
+    # 每个信号的解码结果按数组片段累积，块结束时合并
+    temp_data: Dict[str, Dict[str, list]] = defaultdict(
+        lambda: {"timestamps": [], "values": []}
+    )
+    frames = 0
+    t_start = None
+    t_end = None
+    batch: List[FrameBatch] = []
+
+    def decode_frames(
+        frames: FrameBatch, router: DecoderRouter, prefix: str, wanted: Optional[set], counts: Dict[str, Any]
+    ):
+        """批量校验后按报文分组解码一组帧，信号名加上 prefix；解码/错误计数累加到 counts"""
+        error_types = counts["error_types"]
+        valid, inverse, messages = _validate_frames(frames, router, error_types)
+        counts["error_count"] += len(frames) - int(valid.sum())
+        timestamps = frames.timestamps
+        fallback: Dict[str, Dict[str, list]] = defaultdict(
+            lambda: {"timestamps": [], "values": []}
+        )
+
+        for k, message in enumerate(messages):
+            if message is None:
+                continue
+            rows = np.flatnonzero(valid & (inverse == k))
+            if len(rows) == 0:
+                continue
+            kernel = router.kernel(message)
+            if kernel is not None and message.signals:
+                # 向量化路径：多路复用值分派到预编译的信号提取核
+                payload = _payload_matrix(frames, rows, message.length)
+                counts["decoded_msgs"] += len(rows)
+                for name, sub_rows, values in kernel.decode(payload, wanted):
+                    entry = temp_data[prefix + name]
+                    entry["timestamps"].append(
+                        timestamps[rows] if sub_rows is None else timestamps[rows[sub_rows]]
+                    )
+                    entry["values"].append(values)
                 continue
 
-            try:
-                __dec = decoder(__msg.data)
-                if not __dec:
-                    error_count += 1
+            # 嵌套多路复用、容器报文等逐帧解码
+            for i in rows:
+                try:
+                    __dec = message.decode(frames.data(i))
+                    if not __dec:
+                        counts["error_count"] += 1
+                    else:
+                        counts["decoded_msgs"] += 1
+                        for __k, __v in __dec.items():
+                            if wanted is None or __k in wanted:
+                                entry = fallback[prefix + __k]
+                                entry["timestamps"].append(timestamps[i])
+                                entry["values"].append(getattr(__v, "value", __v))
+                except Exception as e:
+                    # 批量校验未覆盖的错误仍按异常类型计数
+                    counts["error_count"] += 1
+                    error_type = type(e).__name__
+                    error_types[error_type] = error_types.get(error_type, 0) + 1
+
+        for name, data in fallback.items():
+            temp_data[name]["timestamps"].append(np.asarray(data["timestamps"], dtype=np.float64))
+            temp_data[name]["values"].append(np.asarray(data["values"], dtype=np.float64))
+
+    def decode_batch():
+        """统计各通道帧数，按通道路由（如配置）后解码当前块的帧"""
+        if not batch:
+            return
+        block = FrameBatch.concat(batch)
+        batch.clear()
+        unique_channels, channel_inverse, channel_counts = np.unique(
+            block.channels, return_inverse=True, return_counts=True
+        )
+        channel_frames = stats["channel_frames"]
+        for channel, count in zip(unique_channels, channel_counts):
+            if channel >= 0:
+                channel_frames[int(channel) + 1] = channel_frames.get(int(channel) + 1, 0) + int(count)
+            if channel_stats is not None and decoder_map.route(int(channel)) is not None:
+                channel_stats.setdefault(int(channel) + 1, _new_decode_stats())["total_msgs"] += int(count)
+
+        # 去除镜像/重复帧，减少解码工作量
+        if dedup is not None and len(block) > 1:
+            keep_mask = _duplicate_keep_mask(block, **dedup)
+            removed = len(block) - int(keep_mask.sum())
+            if removed:
+                stats["duplicate_frames"] += removed
+                if channel_stats is not None:
+                    dropped, dropped_counts = np.unique(block.channels[~keep_mask], return_counts=True)
+                    for channel, count in zip(dropped, dropped_counts):
+                        if int(channel) + 1 in channel_stats:
+                            channel_stats[int(channel) + 1]["duplicate_frames"] += int(count)
+                kept = np.flatnonzero(keep_mask)
+                block = block.take(kept)
+                channel_inverse = channel_inverse[kept]
+
+        if not isinstance(decoder_map, ChannelRouter):
+            decode_frames(block, decoder_map, "", signal_names_set, stats)
+        else:
+            for k, channel in enumerate(unique_channels):
+                rows = np.flatnonzero(channel_inverse == k)
+                route = decoder_map.route(int(channel))
+                if route is None:
+                    stats["unrouted_frames"] += len(rows)
+                    continue
+                router, prefix = route
+                if len(rows) == 0:
                     continue
+                frames = block if len(rows) == len(block) else block.take(rows)
+                counts = _new_decode_stats()
+                decode_frames(frames, router, prefix, ChannelRouter.wanted(prefix, signal_names_set), counts)
+                _add_decode_counts(stats, counts)
+                if channel_stats is not None:
+                    _add_decode_counts(channel_stats[int(channel) + 1], counts)
+
+    def build_chunk():
+        decode_batch()
+        signals = {}
+        for sig_name, data in temp_data.items():
+            if not data["timestamps"]:
+                continue
+            timestamps = _concat_decoded(data["timestamps"])
+            values = _concat_decoded(data["values"])
+            if len(data["timestamps"]) > 1 and np.any(np.diff(timestamps) < 0):
+                # 同名信号来自多个报文或多路复用分组时按时间重新排序
+                order = np.argsort(timestamps, kind="stable")
+                timestamps, values = timestamps[order], values[order]
+            signals[sig_name] = (timestamps, values)
+        return {"t_start": t_start, "t_end": t_end, "frames": frames, "signals": signals}
+
+    for block in _iter_frame_batches(log_data, chunk_frames):
+        pos = 0
+        while pos < len(block):
+            if t_start is None:
+                t_start = float(block.timestamps[pos])
+            end = min(len(block), pos + chunk_frames - frames)
+            time_cut = False
+            if chunk_seconds is not None:
+                # 按时间切块：第一个超出当前块时间窗口的帧归入下一块（块首帧总是保留）
+                first = pos + 1 if frames == 0 else pos
+                over = np.flatnonzero(block.timestamps[first:end] - t_start >= chunk_seconds)
+                if len(over):
+                    end = first + int(over[0])
+                    time_cut = True
+            if end > pos:
+                batch.append(block.take(slice(pos, end)))
+                stats["total_msgs"] += end - pos
+                frames += end - pos
+                t_end = float(block.timestamps[end - 1])
+                pos = end
+
+            if time_cut or frames >= chunk_frames:
+                yield build_chunk()
+                temp_data.clear()
+                frames = 0
+                t_start = None
+
+    if frames:
+        yield build_chunk()
+
+
+def _iter_frame_batches(log_data, batch_frames: int):
+    """把逐帧 can.Message 序列按 batch_frames 打包为 FrameBatch；已是 FrameBatch 的直接透传"""
+    pending: List[Any] = []
+    for item in log_data:
+        if isinstance(item, FrameBatch):
+            if pending:
+                yield FrameBatch.from_messages(pending)
+                pending = []
+            yield item
+            continue
+        pending.append(item)
+        if len(pending) >= batch_frames:
+            yield FrameBatch.from_messages(pending)
+            pending = []
+    if pending:
+        yield FrameBatch.from_messages(pending)
+
+
+def _concat_decoded(parts: List[np.ndarray]) -> np.ndarray:
+    """合并逐块产出的数组（单块时不复制）"""
+    return np.concatenate(parts) if len(parts) > 1 else parts[0]
+
+
+def _open_can_reader(log_file_path: StringPathLike, file_type: str):
+    """
+    根据文件类型打开日志读取器：BLF/ASC为python-can读取器（.gz/.zst/.xz压缩文件
+    在后台线程中流式解压，不落盘），MF4总线记录为列式读取器。
+    """
+    if file_type in ("blf", "asc"):
+        return open_log_reader(log_file_path, file_type)
+    if file_type in MF4_FILE_TYPES:
+        if compression_of(log_file_path):
+            raise ValueError(f"Compressed MF4 is not supported (needs random access): {log_file_path}")
+        return MF4FrameReader(log_file_path)
+    raise ValueError(f"Unsupported file type: {file_type}")
 
-                decoded_msgs += 1
-                for __k, __v in __dec.items():
-                    if signal_names_set is None or __k in signal_names_set:
-                        value = getattr(__v, "value", __v)
-                        entry = temp_data[__k]
-                        entry["timestamps"].append(__msg.timestamp)
-                        entry["values"].append(value)
 
-                # 每处理batch_size条消息，转换为numpy数组并合并
-                if total_msgs % batch_size == 0:
-                    flush_batch()
+# ASC报文行以时间戳开头，用于定位文件头结束位置
+_ASC_EVENT_LINE = re.compile(r"^\s*\d+\.\d+\s")
 
-                    # 大文件显示进度
-                    if is_very_large_file and total_msgs % 50000 == 0:
-                        decode_rate = (
-                            decoded_msgs / total_msgs * 100 if total_msgs > 0 else 0
-                        )
-                        print(
-                            f"  已处理 {total_msgs} 条消息 (解码成功率: {decode_rate:.1f}%)..."
-                        )
 
-            except Exception as e:
-                # 捕获所有解码错误但不中断处理
-                error_count += 1
-                error_type = type(e).__name__
-                error_types[error_type] = error_types.get(error_type, 0) + 1
+def _read_asc_increment(log_file_path: StringPathLike, state: Dict[str, Any]) -> Optional[str]:
+    """
+    读取ASC文件自上次以来新追加的完整行。
+
+    state 记录已消费的字节偏移（offset）与文件头（header）；未以换行结尾的
+    最后一行留到下次读取。文件变小（被截断或重建）时从头开始并设置 state["restarted"]。
+
+    Returns:
+        新增的报文行文本，没有新数据时返回None
+    """
+    size = os.path.getsize(log_file_path)
+    if size < state["offset"]:
+        state.update(offset=0, header=None, restarted=True)
+    if size == state["offset"]:
+        return None
+
+    with open(log_file_path, "rb") as f:
+        f.seek(state["offset"])
+        data = f.read(size - state["offset"])
+    end = data.rfind(b"\n")
+    if end < 0:
+        return None
+    data = data[: end + 1]
+    text = data.decode(ENCODING, errors="replace")
+
+    if state["header"] is None:
+        # 文件头：第一条报文行之前的所有行（date/base/Begin Triggerblock等）
+        lines = text.splitlines(keepends=True)
+        for i, line in enumerate(lines):
+            if _ASC_EVENT_LINE.match(line):
+                state["header"] = "".join(lines[:i])
+                state["offset"] += len(data)
+                return "".join(lines[i:])
+        if not any(line.lower().startswith("begin triggerblock") for line in lines):
+            return None  # 文件头尚未写完整，等待更多数据
+        state["header"] = text
+        state["offset"] += len(data)
+        return None
+
+    state["offset"] += len(data)
+    return text
+
+
+def _save_mf4(sigs, file_url: str, compression: int = 2) -> None:
+    """
+    将未栅格化的信号直接写为压缩MF4。
+
+    mdf.append()会把一组信号合并到同一时间轴上（插值），因此按时间轴分组追加：
+    同一CAN报文解码出的信号共享时间戳，成为同一个通道组，其余信号保持各自原始时间戳。
+
+    Args:
+        sigs: asammdf Signal 列表
+        file_url: 输出路径
+        compression: asammdf压缩级别（0不压缩，1 deflate，2 transposed deflate）
+    """
+    from asammdf import MDF
+
+    groups: List[List[Any]] = []
+    for sig in sigs:
+        for group in groups:
+            reference = group[0].timestamps
+            if len(reference) == len(sig.timestamps) and np.array_equal(
+                reference, sig.timestamps
+            ):
+                group.append(sig)
+                break
+        else:
+            groups.append([sig])
+
+    mdf = MDF()
+    for group in groups:
+        mdf.append(group, comment="candecode")
+    mdf.save(file_url, overwrite=True, compression=compression)
+    mdf.close()
+
+
+def _dataset_signal_columns(
+    dbc_data: Database,
+    signal_names: Optional[List[str]] = None,
+    signal_corr: Optional[Dict[str, str]] = None,
+) -> List[str]:
+    """分区数据集的统一信号列：DBC中全部（经过滤和重命名的）信号，保持DBC顺序"""
+    columns: List[str] = []
+    for __msg in getattr(dbc_data, "messages", []):
+        for __sig in __msg.signals:
+            if signal_names and __sig.name not in signal_names:
                 continue
+            name = str(signal_corr.get(__sig.name, __sig.name) if signal_corr else __sig.name)
+            if name not in columns:
+                columns.append(name)
+    return columns
+
+
+def _dataset_signal_fields(
+    dbc_data: Database,
+    signal_corr: Optional[Dict[str, str]] = None,
+    categorical: bool = False,
+) -> Dict[str, Any]:
+    """分区数据集中不是float64的信号列 {输出列名: pyarrow.Field}：枚举信号为整数码值，
+    categorical 时为与扁平输出相同的字典列"""
+    import pyarrow as pa
+
+    value_tables = _enum_value_tables(dbc_data, signal_corr)
+    fields = {}
+    for name, __sig in _enum_signals(dbc_data).items():
+        name = str(signal_corr.get(name, name) if signal_corr else name)
+        if categorical:
+            fields[name] = value_table_field(name, value_tables[name])
+        else:
+            fields[name] = pa.field(name, pa.from_numpy_dtype(enum_code_dtype(__sig)))
+    return fields
 
-        # 处理剩余的批次数据
-        flush_batch()
 
-        # 构建Signal对象 - 优化：分批转为数组后再合并，减少中间对象
-        sigs = []
-        total_data_points = 0
+def _enum_signals(dbc_data: Database) -> Dict[str, Any]:
+    """按整数码值解码的枚举信号 {解码信号名: cantools Signal}"""
+    return {
+        __sig.name: __sig
+        for __msg in getattr(dbc_data, "messages", [])
+        for __sig in __msg.signals
+        if is_enum_signal(__sig)
+    }
 
-        for __k, __v in decoded.items():
-            if len(__v["timestamps"]) > 0:  # 只处理有数据的信号
-                timestamps = np.concatenate(__v["timestamps"]) if len(__v["timestamps"]) > 1 else __v["timestamps"][0]
-                values = np.concatenate(__v["values"]) if len(__v["values"]) > 1 else __v["values"][0]
-                signal_name = signal_corr.get(__k, __k) if signal_corr else __k
-                sigs.append(
-                    Signal(values, timestamps, name=str(signal_name), encoding="utf-8")
+
+def _enum_value_tables(
+    dbc_data: Database, signal_corr: Optional[Dict[str, str]] = None
+) -> Dict[str, Dict[int, str]]:
+    """枚举信号的DBC值表 {输出列名: {码值: 标签}}"""
+    return {
+        str(signal_corr.get(name, name) if signal_corr else name): {
+            int(code): str(label) for code, label in __sig.choices.items()
+        }
+        for name, __sig in _enum_signals(dbc_data).items()
+    }
+
+
+def _dataset_partition_values(
+    log_file_path: StringPathLike,
+    first_timestamp: Optional[float],
+    partition_by: List[str],
+    vehicle_pattern: Optional[str] = None,
+) -> Dict[str, str]:
+    """
+    计算单个日志文件的Hive分区值。
+
+    - vehicle: vehicle_pattern 匹配文件名的第一个分组，否则为日志所在目录名
+    - date: 首帧为绝对时间戳时取其日期，否则取文件修改日期
+    - condition: 与 CanData 相同的工况分组（未匹配为 other）
+    - source_file: 日志文件名（不含扩展名）
+    """
+    from datetime import datetime
+
+    log_file_path = str(log_file_path)
+    base_filename = split_log_name(log_file_path)[0]
+    values: Dict[str, str] = {}
+    for key in partition_by:
+        if key == "vehicle":
+            match = re.search(vehicle_pattern, base_filename) if vehicle_pattern else None
+            if match:
+                values[key] = match.group(1) if match.groups() else match.group(0)
+            else:
+                values[key] = os.path.basename(os.path.dirname(os.path.abspath(log_file_path)))
+        elif key == "date":
+            # 早于2000年的时间戳视为相对时间
+            if first_timestamp is not None and first_timestamp > 946684800:
+                values[key] = datetime.fromtimestamp(first_timestamp).strftime("%Y-%m-%d")
+            else:
+                values[key] = datetime.fromtimestamp(
+                    os.path.getmtime(log_file_path)
+                ).strftime("%Y-%m-%d")
+        elif key == "condition":
+            values[key] = match_condition_group(log_file_path) or "other"
+        elif key == "source_file":
+            values[key] = base_filename
+        else:
+            raise ValueError(f"Unsupported partition key: {key}")
+    return values
+
+
+def _dataset_file_stem(base_filename: str, dbc_url: StringPathLike) -> str:
+    """分区内的文件名：输出文件名加DBC文件名，多个DBC解码同一日志时互不覆盖"""
+    return f"{base_filename}.{os.path.splitext(os.path.basename(str(dbc_url)))[0]}"
+
+
+# 每个工作进程缓存已加载的DBC及其路由表，批处理多个文件时只加载一次
+_WORKER_DBC_CACHE: Dict[Tuple[Any, ...], Tuple[Database, "DecoderRouter"]] = {}
+
+
+def _load_worker_dbc(dbc_url: StringPathLike, options: Dict[str, Any]):
+    """
+    在子进程中加载DBC并构建路由表，同一进程内按路径和路由选项复用。
+
+    配置了 channel_dbc 时忽略 dbc_url，返回各通道DBC合并的报文视图和 ChannelRouter。
+    """
+    channel_dbc = options.get("channel_dbc")
+    if channel_dbc:
+        key = (
+            "channels",
+            tuple(sorted(channel_dbc.items())),
+            options.get("channel_output"),
+            options.get("j1939"),
+            tuple(options.get("id_masks") or ()),
+        )
+        if key not in _WORKER_DBC_CACHE:
+            routes: Dict[int, Tuple[DecoderRouter, str]] = {}
+            databases: List[Tuple[str, Database]] = []
+            for channel, path in sorted(channel_dbc.items()):
+                dbc_data, router = _load_worker_dbc(path, {**options, "channel_dbc": None})
+                # 拆分输出时前缀只用于区分通道，写出前去掉（见 _output_targets）
+                prefix = CHANNEL_PREFIX.format(channel)
+                routes[channel - 1] = (router, prefix)
+                databases.append((prefix, dbc_data))
+            _WORKER_DBC_CACHE[key] = (_ChannelDatabase(databases), ChannelRouter(routes))
+        return _WORKER_DBC_CACHE[key]
+
+    id_masks = options.get("id_masks")
+    key = (str(dbc_url), options.get("j1939"), tuple(id_masks) if id_masks else None)
+    if key not in _WORKER_DBC_CACHE:
+        with open(dbc_url, "r", encoding=ENCODING) as f:
+            dbc_data = cantools.db.load(f, database_format="dbc", strict=False)
+        _WORKER_DBC_CACHE[key] = (
+            dbc_data,
+            _build_decoder_map(dbc_data, options.get("j1939"), options.get("id_masks")),
+        )
+    return _WORKER_DBC_CACHE[key]
+
+
+# 片段文件名末尾以 _ 或 - 分隔的序号（最多4位），如 drive_001.blf 中的 001；
+# vehicle_20250301 这类日期后缀不是片段序号
+_SEGMENT_INDEX = re.compile(r"^(.+?)[_-](\d{1,4})$")
+
+
+def _session_output_name(segment_paths: List[StringPathLike]) -> str:
+    """会话输出文件名：单个文件取原名，多个片段取 首个片段名-末片段序号"""
+    first = split_log_name(segment_paths[0])[0]
+    if len(segment_paths) == 1:
+        return first
+    last = split_log_name(segment_paths[-1])[0]
+    match = _SEGMENT_INDEX.match(last)
+    return f"{first}-{match.group(2) if match else last}"
+
+
+def _blf_time_range(path: StringPathLike) -> Optional[Tuple[float, float]]:
+    """从BLF文件头读取起止时间，失败时返回None"""
+    try:
+        reader = open_log_reader(path, "blf")
+    except Exception:
+        return None
+    try:
+        start, stop = reader.start_timestamp, reader.stop_timestamp
+    finally:
+        reader.stop()
+    # 部分记录软件不写文件头时间
+    if not start or not stop or stop < start:
+        return None
+    return start, stop
+
+
+def _log_time_range(path: StringPathLike, file_type: str) -> Optional[Tuple[float, float]]:
+    """片段的绝对起止时间，无法确定时返回None（不做间隔检查）"""
+    if file_type == "blf":
+        return _blf_time_range(path)
+    if file_type == "asc" and compression_of(path) is None:
+        # 压缩文件无法定位到尾部；早于2000年说明文件头没有有效的 date 行
+        time_range = _asc_time_range(path, ENCODING, relative_timestamp=False)
+        if time_range and time_range[0] > 946684800:
+            return time_range
+    return None
+
+
+def _group_sessions(
+    paths: List[StringPathLike],
+    session_gap: Optional[float] = 60.0,
+    max_overlap: float = 1e-3,
+) -> List[List[StringPathLike]]:
+    """
+    把同一会话的连续片段分为一组。
+
+    同一目录下、去掉末尾序号后文件名相同的文件视为同一会话的片段，按文件名排序；
+    BLF/ASC片段还会比较起止时间（见 _log_time_range），前一片段结束到后一片段开始超过
+    session_gap 秒、或时间倒退超过 max_overlap 秒时断开为新会话。
+
+    Returns:
+        会话列表，每个会话为按时间顺序排列的片段路径
+    """
+    by_key: Dict[Tuple[str, str, str], List[StringPathLike]] = defaultdict(list)
+    for path in paths:
+        stem = split_log_name(path)[0]
+        match = _SEGMENT_INDEX.match(stem)
+        session = match.group(1) if match else stem
+        # 按日志类型分组（同一会话的片段可以有的压缩、有的未压缩）
+        by_key[(os.path.dirname(str(path)), session, log_file_type(path))].append(path)
+
+    sessions: List[List[StringPathLike]] = []
+    for (_, _, file_type), members in by_key.items():
+        members.sort(key=lambda p: os.path.basename(str(p)))
+        current = [members[0]]
+        previous = _log_time_range(members[0], file_type) if session_gap is not None else None
+        for path in members[1:]:
+            time_range = _log_time_range(path, file_type) if session_gap is not None else None
+            if previous and time_range and session_gap is not None:
+                gap = time_range[0] - previous[1]
+                if gap < -max_overlap or gap > session_gap:
+                    sessions.append(current)
+                    current = []
+            current.append(path)
+            previous = time_range
+        sessions.append(current)
+    return sessions
+
+
+def _balance_batches(
+    items: List[Tuple[Any, int]], small_bytes: int, target_bytes: int, min_batches: int
+) -> List[List[Any]]:
+    """
+    按大小把任务打包：大任务单独成批，小任务用贪心（大者优先放入最轻的批）
+    均衡分配，批数不少于 min_batches 以保证各进程都有任务。
+
+    Args:
+        items: [(任务, 字节数)]
+        small_bytes: 小于该大小的任务参与打包
+        target_bytes: 每批目标字节数
+        min_batches: 最少批数（通常为进程数）
+
+    Returns:
+        任务批列表
+    """
+    import heapq
+
+    batches = [[task] for task, size in items if size >= small_bytes]
+    small = sorted(
+        ((task, size) for task, size in items if size < small_bytes),
+        key=lambda item: item[1],
+        reverse=True,
+    )
+    if not small:
+        return batches
+
+    total = sum(size for _, size in small)
+    n_bins = max(-(-total // max(target_bytes, 1)), min(min_batches, len(small)), 1)
+    bins: List[List[Any]] = [[] for _ in range(n_bins)]
+    heap = [(0, i) for i in range(n_bins)]
+    for task, size in small:
+        load, i = heapq.heappop(heap)
+        bins[i].append(task)
+        heapq.heappush(heap, (load + size, i))
+    return batches + [b for b in bins if b]
+
+
+def _is_bus_logging_mf4(path: StringPathLike) -> bool:
+    """MF4文件是否含 CAN_DataFrame 总线记录通道组（解码写出的信号MF4没有）"""
+    from asammdf import MDF
+
+    try:
+        mdf = MDF(str(path))
+    except Exception:
+        return False
+    try:
+        return CAN_DATA_FRAME in mdf.channels_db
+    finally:
+        mdf.close()
+
+
+def _exclude_outputs(
+    urls: Dict[str, List[StringPathLike]],
+    save_dir: StringPathLike,
+    save_formats: Tuple[str, ...],
+) -> Dict[str, List[StringPathLike]]:
+    """
+    从输入中去掉解码输出，避免输出目录与日志目录重叠时把上次的结果当作日志再解码。
+
+    去掉的文件：位于 save_dir 子目录中的文件（save_dir 本身就是日志目录时除外）、
+    本次运行会为其他日志写出的同名输出（如 drive.blf 的 drive.mf4）、
+    输出会覆盖自身的日志（.mf4 日志以 .mf4 格式输出到同一目录），
+    以及没有 CAN_DataFrame 通道组的MF4（信号MF4而非总线记录）。
+
+    Args:
+        urls: {日志类型: 路径列表}
+        save_dir: 输出目录
+        save_formats: 输出格式
+
+    Returns:
+        过滤后的 {日志类型: 路径列表}
+    """
+    out_root = os.path.realpath(save_dir)
+    # 输出文件 -> 会写出它的日志
+    outputs: Dict[str, List[StringPathLike]] = defaultdict(list)
+    for paths in urls.values():
+        for path in paths:
+            base = split_log_name(path)[0]
+            for save_format in save_formats:
+                outputs[os.path.realpath(os.path.join(out_root, base + save_format))].append(path)
+
+    selected: Dict[str, List[StringPathLike]] = {}
+    for file_type, paths in urls.items():
+        selected[file_type] = []
+        for path in paths:
+            real = os.path.realpath(path)
+            sources = [source for source in outputs.get(real, ()) if source != path]
+            if os.path.dirname(real).startswith(os.path.join(out_root, "")):
+                print(f"⚠ 跳过输出目录中的文件: {path}")
+            elif sources:
+                print(f"⚠ 跳过 {sources[0]} 的解码输出: {path}")
+            elif file_type == "mf4" and not _is_bus_logging_mf4(path):
+                print(f"⚠ 跳过没有 {CAN_DATA_FRAME} 总线记录的MF4文件: {path}")
+            elif real in outputs:
+                print(f"⚠ 跳过 {path}：输出到 {save_dir} 会覆盖日志本身")
+            else:
+                selected[file_type].append(path)
+    return selected
+
+
+def _plan_memory(
+    n_rows: int,
+    n_columns: int,
+    decoded_mb: float,
+    budget_mb: float,
+    save_formats: Tuple[str, ...],
+    in_memory: bool = False,
+) -> Dict[str, Any]:
+    """
+    根据内存预算选择栅格化方案。
+
+    依次尝试：原样（float64）-> float32 -> 可追加格式窗口化输出、.mat 按信号分组输出。
+    内存模式必须整表放入共享内存，最多只能降为float32，仍超预算时标记 over_budget。
+
+    Args:
+        n_rows: 预期栅格行数
+        n_columns: 信号列数
+        decoded_mb: 已解码（未栅格化）数据占用的内存
+        budget_mb: 单个文件处理的内存预算
+        save_formats: 需要栅格化的输出格式
+        in_memory: 是否为共享内存模式
+
+    Returns:
+        {"budget_mb", "estimated_mb", "adaptations": [...], "dtype",
+         "window_rows"（窗口化时）, "group_columns"（分组时）}
+    """
+    mb = 1024 * 1024
+    available = budget_mb * mb - decoded_mb * mb
+
+    def peak_bytes(rows: int, value_bytes: int) -> float:
+        return rows * (8 + n_columns * value_bytes) * RASTER_PEAK_FACTOR
+
+    plan: Dict[str, Any] = {
+        "budget_mb": budget_mb,
+        "estimated_mb": round(decoded_mb + peak_bytes(n_rows, 8) / mb, 1),
+        "adaptations": [],
+        "dtype": "float64",
+    }
+    if peak_bytes(n_rows, 8) <= available:
+        return plan
+
+    plan["adaptations"].append("float32")
+    plan["dtype"] = "float32"
+    if peak_bytes(n_rows, 4) <= available:
+        return plan
+    if in_memory:
+        plan["adaptations"].append("over_budget")
+        return plan
+
+    if any(f in WINDOWED_FORMATS for f in save_formats):
+        plan["adaptations"].append("windowed")
+        plan["window_rows"] = max(MIN_WINDOW_ROWS, int(available // peak_bytes(1, 4)))
+    if any(f not in WINDOWED_FORMATS for f in save_formats):
+        plan["adaptations"].append("signal_groups")
+        plan["group_columns"] = max(
+            1, int((available / (max(n_rows, 1) * RASTER_PEAK_FACTOR) - 8) // 4)
+        )
+    return plan
+
+
+def _save_within_budget(
+    sigs,
+    memory_plan: Dict[str, Any],
+    save_dir: StringPathLike,
+    base_filename: str,
+    save_formats: Tuple[str, ...],
+    step: float,
+    time_from_zero: bool,
+    ipc_compression: Optional[str] = None,
+    dataset: Optional[Dict[str, Any]] = None,
+    interpolation: Optional[Dict[str, str]] = None,
+    value_tables: Optional[Dict[str, Dict[int, str]]] = None,
+) -> Dict[str, Any]:
+    """
+    按内存方案写出栅格化结果：可追加格式逐窗口写出，其余格式（.mat）按信号分组
+    各自写出 {base_filename}_part{k}。interpolation/value_tables 按列名指定零阶保持
+    和字典列（枚举信号）。
+
+    Returns:
+        {"files", "timings", "errors"}，与 save_dataframe 一致
+    """
+    import pandas as pd
+
+    signals = {str(sig.name): (sig.timestamps, sig.samples) for sig in sigs}
+    columns = list(signals)
+    dtype = np.float32 if memory_plan["dtype"] == "float32" else np.float64
+    report: Dict[str, Any] = {"files": {}, "timings": {}, "errors": {}}
+
+    windowed_formats = tuple(f for f in save_formats if f in WINDOWED_FORMATS)
+    if windowed_formats:
+        writer = WindowedTableWriter(
+            save_dir, base_filename, windowed_formats, ipc_compression, dataset, value_tables
+        )
+        for rows in iter_raster_windows(
+            signals, step, memory_plan.get("window_rows") or MIN_WINDOW_ROWS,
+            columns=columns, time_from_zero=time_from_zero,
+            interpolation=interpolation, dtype=dtype,
+        ):
+            # 经pandas转换以保留timestamps索引元数据，读回时与整表输出一致
+            writer.write(dataframe_to_table(pd.DataFrame(rows).set_index("timestamps")))
+        for key, value in writer.close().items():
+            report[key].update(value)
+
+    grouped_formats = tuple(f for f in save_formats if f not in WINDOWED_FORMATS)
+    if grouped_formats:
+        group_columns = memory_plan.get("group_columns") or len(columns)
+        for part, first in enumerate(range(0, len(columns), group_columns), start=1):
+            group = columns[first : first + group_columns]
+            for rows in iter_raster_windows(
+                {name: signals[name] for name in group}, step, sys.maxsize,
+                columns=group, time_from_zero=time_from_zero,
+                interpolation=interpolation, dtype=dtype,
+            ):
+                df = pd.DataFrame(rows).set_index("timestamps")
+                part_report = save_dataframe(
+                    df, save_dir, f"{base_filename}_part{part}", grouped_formats
+                )
+                for save_format, path in part_report["files"].items():
+                    report["files"].setdefault(save_format, []).append(path)
+                for save_format, seconds in part_report["timings"].items():
+                    report["timings"][save_format] = report["timings"].get(save_format, 0.0) + seconds
+                report["errors"].update(part_report["errors"])
+    return report
+
+
+def _iter_merged_frames(segment_paths: List[StringPathLike], file_type: str):
+    """
+    k路归并同一会话各片段的帧流（按时间戳）：每个片段只打开一个读取器，
+    内存中只保留各读取器当前的一帧，片段边界处有重叠时也得到单一时间线。
+    """
+    import heapq
+
+    readers = [_open_can_reader(path, file_type) for path in segment_paths]
+    try:
+        yield from heapq.merge(*readers, key=lambda msg: msg.timestamp)
+    finally:
+        for reader in readers:
+            reader.stop()
+
+
+class _SessionOutput:
+    """会话流式模式的一个输出：经 StreamingRasterizer 增量栅格化，逐窗口追加写出"""
+
+    def __init__(
+        self,
+        dbc_data,
+        dbc_url: StringPathLike,
+        base_filename: str,
+        segment_paths: List[StringPathLike],
+        signal_names: Optional[List[str]],
+        signal_corr: Optional[Dict[str, str]],
+        step: float,
+        time_from_zero: bool,
+        save_dir: StringPathLike,
+        save_formats: Tuple[str, ...],
+        options: Dict[str, Any],
+    ):
+        self.dbc_data = dbc_data
+        self.dbc_url = dbc_url
+        self.base_filename = base_filename
+        self.file_label = base_filename + split_log_name(segment_paths[0])[1]
+        self.segment_paths = segment_paths
+        self.signal_names = signal_names
+        self.signal_corr = signal_corr
+        self.save_dir = save_dir
+        self.save_formats = save_formats
+        self.options = options
+        columns = _dataset_signal_columns(dbc_data, signal_names)
+        self.rename = (
+            {name: str(signal_corr.get(name, name)) for name in columns} if signal_corr else None
+        )
+
+        # 枚举信号零阶保持，输出列可按DBC值表写为字典列
+        self.rasterizer = StreamingRasterizer(
+            step,
+            columns=columns,
+            time_from_zero=time_from_zero,
+            interpolation={name: "previous" for name in _enum_signals(dbc_data)},
+        )
+        self.value_tables = (
+            _enum_value_tables(dbc_data, signal_corr) if options.get("categorical_enums") else None
+        )
+        self.signal_stats = None
+        if options.get("signal_stats", True):
+            self.signal_stats = StreamingSignalStats(
+                build_signal_meta(dbc_data), options.get("stats_histogram_bins") or 0
+            )
+
+        self.writer = None
+        self.pending: List[Dict[str, np.ndarray]] = []
+        self.pending_rows = 0
+        self.rows_written = 0
+        self.seen: set = set()
+
+    def _flush_rows(self) -> None:
+        import pandas as pd
+
+        if not self.pending_rows:
+            return
+        rows = {key: np.concatenate([part[key] for part in self.pending]) for key in self.pending[0]}
+        df = pd.DataFrame(rows).set_index("timestamps")
+        if self.rename:
+            df = df.rename(columns=self.rename)
+        if self.writer is None:
+            options = self.options
+            dataset = None
+            if options.get("dataset_layout") == "hive" and ".parquet" in self.save_formats:
+                dataset = {
+                    "dataset_root": options["dataset_dir"],
+                    "file_stem": _dataset_file_stem(self.base_filename, self.dbc_url),
+                    "partition_values": _dataset_partition_values(
+                        self.segment_paths[0],
+                        self.rasterizer.t0,
+                        options.get("partition_by") or list(DEFAULT_PARTITION_BY),
+                        options.get("vehicle_pattern"),
+                    ),
+                    "dataset_columns": _dataset_signal_columns(
+                        self.dbc_data, self.signal_names, self.signal_corr
+                    ),
+                    "dataset_fields": _dataset_signal_fields(
+                        self.dbc_data, self.signal_corr, bool(options.get("categorical_enums"))
+                    ),
+                    "row_group_size": options.get("row_group_size"),
+                }
+            self.writer = WindowedTableWriter(
+                self.save_dir,
+                self.base_filename,
+                tuple(f for f in self.save_formats if f != ".mf4") or (".parquet",),
+                options.get("ipc_compression"),
+                dataset,
+                self.value_tables,
+            )
+        self.writer.write(dataframe_to_table(df))
+        self.rows_written += len(df)
+        self.pending, self.pending_rows = [], 0
+
+    def _collect(self, rows) -> None:
+        if rows is None or len(rows["timestamps"]) == 0:
+            return
+        self.pending.append(rows)
+        self.pending_rows += len(rows["timestamps"])
+        if self.pending_rows >= SESSION_WINDOW_ROWS:
+            self._flush_rows()
+
+    def push(self, signals: Dict[str, Tuple[np.ndarray, np.ndarray]]) -> None:
+        """推入一块解码结果"""
+        self.seen.update(signals)
+        if self.signal_stats is not None:
+            self.signal_stats.update(signals)
+        self._collect(self.rasterizer.push(signals))
+
+    def finish(self, stats: Dict[str, Any]) -> Dict[str, Any]:
+        """写出剩余数据并关闭输出，返回结果字典"""
+        self._collect(self.rasterizer.flush())
+        self._flush_rows()
+
+        result: Dict[str, Any] = {
+            "file": self.file_label,
+            "segments": [os.path.basename(str(path)) for path in self.segment_paths],
+            "total_msgs": stats["total_msgs"],
+            "decoded_msgs": stats["decoded_msgs"],
+            "error_count": stats["error_count"],
+            "error_types": stats["error_types"],
+            "signals": len(self.seen),
+            "channel_frames": stats["channel_frames"],
+            "rows": self.rows_written,
+            "success": self.rows_written > 0,
+        }
+        if stats["unrouted_frames"]:
+            result["unrouted_frames"] = stats["unrouted_frames"]
+        if stats["duplicate_frames"]:
+            result["duplicate_frames"] = stats["duplicate_frames"]
+        if self.writer is None:
+            result["error"] = "No valid signals decoded"
+            return result
+
+        save_report = self.writer.close()
+        result["save_timings"] = save_report["timings"]
+        save_errors = [f"{fmt}: {error}" for fmt, error in save_report["errors"].items()]
+        if self.writer.dataset is not None and ".parquet" in save_report["files"]:
+            result["dataset_file"] = save_report["files"][".parquet"]
+        if self.signal_stats is not None:
+            result["signal_stats"] = self.signal_stats.to_dict(self.signal_corr)
+            try:
+                result["stats_file"] = write_sidecar(
+                    os.path.join(self.save_dir, f"{self.base_filename}.stats.json"),
+                    {
+                        "file": self.file_label,
+                        "source_files": result["segments"],
+                        "total_msgs": result["total_msgs"],
+                        "decoded_msgs": result["decoded_msgs"],
+                        "signals": result["signal_stats"],
+                    },
                 )
-                total_data_points += len(timestamps)
+            except OSError as e:
+                save_errors.append(f".stats.json: {e}")
+        if save_errors:
+            result["save_warnings"] = save_errors
+        return result
+
+
+def _process_session_stream(
+    segment_paths: List[StringPathLike],
+    file_type: str,
+    dbc_url: StringPathLike,
+    dbc_data,
+    decoder_map,
+    signal_names: Optional[List[str]],
+    signal_corr: Optional[Dict[str, str]],
+    step: float,
+    time_from_zero: bool,
+    save_dir: StringPathLike,
+    save_formats: Tuple[str, ...],
+    options: Dict[str, Any],
+) -> Union[Dict[str, Any], List[Dict[str, Any]]]:
+    """
+    会话流式解码：各片段帧流k路归并后逐块解码，经 StreamingRasterizer 在同一时间网格上
+    增量栅格化，并逐窗口追加写出一个连续输出。内存占用与会话长度无关。
+
+    输出列为DBC中（经 signal_names 过滤的）全部信号，会话中未出现的信号为空列；
+    只支持可追加格式（parquet/csv/feather/arrow），其他格式记入 save_warnings。
+    按通道拆分输出时片段只读一遍，每个通道一个输出，返回结果列表。
+    """
+    targets = _output_targets(dbc_data, options, _session_output_name(segment_paths))
+    outputs = [
+        _SessionOutput(
+            target["dbc_data"],
+            dbc_url,
+            target["base_filename"],
+            segment_paths,
+            signal_names,
+            signal_corr,
+            step,
+            time_from_zero,
+            save_dir,
+            save_formats,
+            options,
+        )
+        for target in targets
+    ]
+    channel_stats = {} if targets[0]["channel"] is not None else None
+
+    stats = _new_decode_stats()
+    for chunk in _iter_decode_chunks(
+        _iter_merged_frames(segment_paths, file_type),
+        decoder_map,
+        _decode_signal_set(signal_names, targets),
+        1000,
+        stats=stats,
+        dedup=options.get("dedup"),
+        channel_stats=channel_stats,
+    ):
+        for target, output in zip(targets, outputs):
+            output.push(_target_signals(chunk["signals"], target["prefix"]))
+
+    if channel_stats is None:
+        return outputs[0].finish(stats)
+    return [
+        output.finish(channel_stats.get(target["channel"]) or _new_decode_stats())
+        for target, output in zip(targets, outputs)
+    ]
+
+
+# 运行报告中每个文件保留的结果字段
+_RUN_REPORT_FIELDS = (
+    "file",
+    "success",
+    "error",
+    "segments",
+    "rows",
+    "total_msgs",
+    "decoded_msgs",
+    "error_count",
+    "error_types",
+    "channel_frames",
+    "unrouted_frames",
+    "duplicate_frames",
+    "signals",
+    "save_timings",
+    "save_warnings",
+    "memory_plan",
+    "dataset_file",
+    "stats_file",
+    "signal_stats",
+    "quality_file",
+    "quality",
+)
+
+
+def _run_report(files: List[Dict[str, Any]], settings: Dict[str, Any]) -> Dict[str, Any]:
+    return {
+        "generated_at": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "settings": settings,
+        "totals": {
+            "files": len(files),
+            "succeeded": sum(1 for f in files if f.get("success")),
+            "total_msgs": sum(f.get("total_msgs", 0) for f in files),
+            "decoded_msgs": sum(f.get("decoded_msgs", 0) for f in files),
+            "error_count": sum(f.get("error_count", 0) for f in files),
+        },
+        "files": files,
+    }
 
-        # 估算内存使用（每个数据点约16字节：8字节timestamp + 8字节value）
-        estimated_memory_mb = (total_data_points * 16) / 1024 / 1024
 
-        if is_very_large_file and sigs:
-            print(f"  信号数量: {len(sigs)}")
-            print(f"  数据点总数: {total_data_points}")
-            print(f"  估算内存: {estimated_memory_mb:.1f} MB")
+def _write_run_report(
+    report_path: StringPathLike, results: List[Dict[str, Any]], settings: Dict[str, Any]
+) -> str:
+    """汇总本次运行所有文件的结果写出运行报告（默认 save_dir/run_report.json），返回路径"""
+    files = [
+        {key: r[key] for key in _RUN_REPORT_FIELDS if key in r} for r in results if r
+    ]
+    return write_sidecar(report_path, _run_report(files, settings))
 
-            if estimated_memory_mb > 2000:  # 超过2GB
-                print(f"  ⚠ 警告: 估算内存超过 2GB，建议增大step值")
 
-        # 保存结果
-        if sigs:
-            from asammdf import MDF
-            import scipy.io as sio
+def merge_run_reports(
+    report_paths: List[StringPathLike], output_path: StringPathLike
+) -> Dict[str, Any]:
+    """
+    把多次运行（例如队列中各任务）的运行报告合并为一个，按文件汇总totals。
+    同一文件出现在多个报告中时（任务重试）保留最后一个。
+
+    Args:
+        report_paths: 各运行报告路径，按先后顺序
+        output_path: 合并后的报告路径
+
+    Returns:
+        合并后的报告
+    """
+    files: Dict[str, Dict[str, Any]] = {}
+    settings: Dict[str, Any] = {}
+    for path in report_paths:
+        with open(path, "r", encoding="utf-8") as f:
+            report = json.load(f)
+        settings = report.get("settings") or settings
+        for entry in report.get("files", []):
+            files[entry.get("file")] = entry
+    report = _run_report(list(files.values()), settings)
+    write_sidecar(output_path, report)
+    return report
+
+
+def _save_decoded(
+    decoded: Dict[str, Dict[str, list]],
+    dbc_data,
+    stats: Dict[str, Any],
+    signal_stats: Optional[StreamingSignalStats],
+    quality: Optional[QualityReport],
+    base_filename: str,
+    file_label: str,
+    segment_paths: List[StringPathLike],
+    dbc_url: StringPathLike,
+    signal_names: Optional[List[str]],
+    signal_corr: Optional[Dict[str, str]],
+    step: float,
+    time_from_zero: bool,
+    save_dir: StringPathLike,
+    save_formats: Tuple[str, ...],
+    options: Dict[str, Any],
+    is_very_large_file: bool = False,
+) -> Dict[str, Any]:
+    """
+    把一个输出目标累积的解码结果构建为信号、栅格化并按所选格式写出（或放入共享内存）。
 
+    Returns:
+        该输出的结果字典（与 _process_single_file_wrapper 一致）
+    """
+    from asammdf import Signal
+
+    log_file_path = segment_paths[0]
+    total_msgs = stats["total_msgs"]
+    decoded_msgs = stats["decoded_msgs"]
+    error_count = stats["error_count"]
+    error_types = stats["error_types"]  # 错误类型统计
+
+    # 构建Signal对象 - 优化：分批转为数组后再合并，减少中间对象
+    sigs = []
+    total_data_points = 0
+    enum_signals = _enum_signals(dbc_data)
+
+    for __k, __v in decoded.items():
+        if len(__v["timestamps"]) > 0:  # 只处理有数据的信号
+            timestamps = _concat_decoded(__v["timestamps"])
+            values = _concat_decoded(__v["values"])
+            if __k in enum_signals and values.dtype.kind == "f" and np.isfinite(values).all():
+                # 逐帧回退路径解码的枚举信号同样保持整数码值（asammdf按零阶保持栅格化）
+                values = values.astype(enum_code_dtype(enum_signals[__k]))
+            if quality is not None:
+                # 在排序前检查，保留原始到达顺序中的时间戳倒退
+                quality.check(__k, timestamps, values)
+            if len(segment_paths) > 1 and np.any(np.diff(timestamps) < 0):
+                # 片段时间有重叠时按时间排序
+                order = np.argsort(timestamps, kind="stable")
+                timestamps, values = timestamps[order], values[order]
+            signal_name = signal_corr.get(__k, __k) if signal_corr else __k
+            sigs.append(
+                Signal(values, timestamps, name=str(signal_name), encoding="utf-8")
+            )
+            total_data_points += len(timestamps)
+
+    # 估算内存使用（每个数据点约16字节：8字节timestamp + 8字节value）
+    estimated_memory_mb = (total_data_points * 16) / 1024 / 1024
+
+    if is_very_large_file and sigs:
+        print(f"  信号数量: {len(sigs)}")
+        print(f"  数据点总数: {total_data_points}")
+        print(f"  估算内存: {estimated_memory_mb:.1f} MB")
+
+        if estimated_memory_mb > 2000:  # 超过2GB
+            print(f"  ⚠ 警告: 估算内存超过 2GB，建议增大step值")
+
+    # 内存预算：栅格化前按预期大小调整方案（float32/窗口化/按信号分组）
+    memory_plan = None
+    if sigs and options.get("memory_budget_mb"):
+        starts = [sig.timestamps[0] for sig in sigs if len(sig.timestamps) > 0]
+        ends = [sig.timestamps[-1] for sig in sigs if len(sig.timestamps) > 0]
+        expected_rows = int(np.ceil((max(ends) - min(starts)) / step)) if step > 0 else 0
+        memory_plan = _plan_memory(
+            expected_rows,
+            len(sigs),
+            estimated_memory_mb,
+            options["memory_budget_mb"],
+            tuple(f for f in save_formats if f != ".mf4"),
+            bool(options.get("in_memory")),
+        )
+        if memory_plan["adaptations"]:
+            print(
+                f"  ⚠ {file_label}: 预计 {memory_plan['estimated_mb']:.0f}MB 超出预算 "
+                f"{memory_plan['budget_mb']}MB，采用: {', '.join(memory_plan['adaptations'])}"
+            )
+
+    # 保存结果
+    if sigs:
+        from asammdf import MDF
+
+        save_timings: Dict[str, float] = {}
+        save_errors: List[str] = []
+        dataset_file = None
+        # 内存模式：栅格化结果放入共享内存交给父进程，不写磁盘
+        in_memory = bool(options.get("in_memory"))
+        shared_descriptor = None
+
+        # MF4直接由未栅格化的信号写出，保留每个信号的原始时间戳，无需栅格化
+        if ".mf4" in save_formats and not in_memory:
+            if is_very_large_file:
+                print(f"  正在保存 .mf4 格式...")
+            mf4_start = time.perf_counter()
+            try:
+                _save_mf4(sigs, os.path.join(save_dir, f"{base_filename}.mf4"))
+            except Exception as e:
+                save_errors.append(f".mf4: {type(e).__name__}: {e}")
+            save_timings[".mf4"] = round(time.perf_counter() - mf4_start, 4)
+
+        raster_formats = tuple(f for f in save_formats if f != ".mf4")
+        value_tables = _enum_value_tables(dbc_data, signal_corr)
+        dataset = None
+        if (
+            not in_memory
+            and options.get("dataset_layout") == "hive"
+            and ".parquet" in raster_formats
+        ):
+            first_timestamp = min(
+                sig.timestamps[0] for sig in sigs if len(sig.timestamps) > 0
+            )
+            dataset = {
+                "dataset_root": options["dataset_dir"],
+                "file_stem": _dataset_file_stem(base_filename, dbc_url),
+                "partition_values": _dataset_partition_values(
+                    log_file_path,
+                    first_timestamp,
+                    options.get("partition_by") or list(DEFAULT_PARTITION_BY),
+                    options.get("vehicle_pattern"),
+                ),
+                "dataset_columns": _dataset_signal_columns(
+                    dbc_data, signal_names, signal_corr
+                ),
+                "dataset_fields": _dataset_signal_fields(
+                    dbc_data, signal_corr, bool(options.get("categorical_enums"))
+                ),
+                "row_group_size": options.get("row_group_size"),
+            }
+
+        if memory_plan and {"windowed", "signal_groups"} & set(memory_plan["adaptations"]):
+            # 超出预算：不生成整表，逐窗口/按信号分组写出
+            save_report = _save_within_budget(
+                sigs,
+                memory_plan,
+                save_dir,
+                base_filename,
+                raster_formats,
+                step,
+                time_from_zero,
+                ipc_compression=options.get("ipc_compression"),
+                dataset=dataset,
+                interpolation={name: "previous" for name in value_tables},
+                value_tables=value_tables if options.get("categorical_enums") else None,
+            )
+            save_timings.update(save_report["timings"])
+            save_errors.extend(
+                f"{save_format}: {error}"
+                for save_format, error in save_report["errors"].items()
+            )
+            if dataset is not None:
+                dataset_file = save_report["files"].get(".parquet")
+        elif raster_formats or in_memory:
             try:
                 if is_very_large_file:
                     print(f"  正在生成MDF对象...")
@@ -315,120 +1852,399 @@ def _process_single_file_wrapper(args):
                 if is_very_large_file and step < 0.01:
                     print(f"  ⚠ 超大文件检测，建议使用更大的step值 (>=0.05)")
 
-                df = mdf.to_dataframe(raster=step, time_from_zero=time_from_zero)
+                df = mdf.to_dataframe(
+                    raster=step,
+                    time_from_zero=time_from_zero,
+                    reduce_memory_usage=bool(
+                        memory_plan and memory_plan["dtype"] == "float32"
+                    ),
+                )
+
+                if is_very_large_file:
+                    print(f"  DataFrame大小: {len(df)} 行, {len(df.columns)} 列")
+                    print(
+                        f"  内存占用: {df.memory_usage(deep=True).sum() / 1024 / 1024:.1f} MB"
+                    )
+
+            except MemoryError as e:
+                return {
+                    "file": file_label,
+                    "total_msgs": total_msgs,
+                    "decoded_msgs": decoded_msgs,
+                    "signals": len(sigs),
+                    "data_points": total_data_points,
+                    "estimated_memory_mb": estimated_memory_mb,
+                    "success": False,
+                    "error": f"内存不足: 转换DataFrame时内存耗尽 (估算需要 {estimated_memory_mb:.0f}MB). 建议: 1)增大step值至{step*5:.3f}或更大 2)使用signal_names过滤信号 3)减少进程数至1",
+                }
+            except Exception as e:
+                return {
+                    "file": file_label,
+                    "total_msgs": total_msgs,
+                    "success": False,
+                    "error": f"DataFrame转换失败: {str(e)}",
+                }
+
+            if in_memory:
+                shared_descriptor = export_to_shared_memory(df)
+                del df
+            else:
+                # 一次转换为Arrow表，各格式由线程池并发写出
+                if is_very_large_file:
+                    print(f"  正在保存 {', '.join(raster_formats)} 格式...")
+                save_report = save_dataframe(
+                    df,
+                    save_dir,
+                    base_filename,
+                    raster_formats,
+                    ipc_compression=options.get("ipc_compression"),
+                    dataset=dataset,
+                    value_tables=value_tables if options.get("categorical_enums") else None,
+                )
+                save_timings.update(save_report["timings"])
+                save_errors.extend(
+                    f"{save_format}: {error}"
+                    for save_format, error in save_report["errors"].items()
+                )
+                if dataset is not None:
+                    dataset_file = save_report["files"].get(".parquet")
+
+        # 返回统计信息
+        result = {
+            "file": file_label,
+            "dbc": str(dbc_url),
+            "total_msgs": total_msgs,
+            "decoded_msgs": decoded_msgs,
+            "error_count": error_count,
+            "error_types": error_types,  # 添加错误类型统计
+            "signals": len(sigs),
+            "save_timings": save_timings,
+            "success": True,
+        }
+
+        if dataset_file:
+            result["dataset_file"] = dataset_file
+        if shared_descriptor:
+            result["shared_memory"] = shared_descriptor
+
+        if save_errors:
+            result["save_warnings"] = save_errors
+        if len(segment_paths) > 1:
+            result["segments"] = [os.path.basename(path) for path in segment_paths]
+        if stats["channel_frames"]:
+            result["channel_frames"] = stats["channel_frames"]
+        if stats["unrouted_frames"]:
+            result["unrouted_frames"] = stats["unrouted_frames"]
+        if options.get("dedup") is not None:
+            result["duplicate_frames"] = stats["duplicate_frames"]
+        if memory_plan:
+            result["memory_plan"] = memory_plan
+
+        # 质量报告：丢帧、卡滞、越界、时间倒退、计数器断续
+        if quality is not None:
+            result["quality"] = quality.to_dict(signal_corr)
+            flagged = result["quality"]["summary"]["signals_flagged"]
+            if flagged:
+                kinds = ", ".join(
+                    f"{kind}×{count}"
+                    for kind, count in result["quality"]["summary"]["issues"].items()
+                )
+                print(f"  ⚠ {file_label}: {flagged} 个信号存在质量问题 ({kinds})")
+            if not in_memory:
+                try:
+                    result["quality_file"] = write_sidecar(
+                        os.path.join(save_dir, f"{base_filename}.quality.json"),
+                        {"file": file_label, **result["quality"]},
+                    )
+                except OSError as e:
+                    save_errors.append(f".quality.json: {e}")
+                    result["save_warnings"] = save_errors
+
+        # 统计旁路文件：概览类问题无需再读取完整数据
+        if signal_stats is not None:
+            result["signal_stats"] = signal_stats.to_dict(signal_corr)
+            if not in_memory:
+                try:
+                    result["stats_file"] = write_sidecar(
+                        os.path.join(save_dir, f"{base_filename}.stats.json"),
+                        {
+                            "file": file_label,
+                            "source_files": [os.path.basename(p) for p in segment_paths],
+                            "total_msgs": total_msgs,
+                            "decoded_msgs": decoded_msgs,
+                            "signals": result["signal_stats"],
+                        },
+                    )
+                except OSError as e:
+                    save_errors.append(f".stats.json: {e}")
+                    result["save_warnings"] = save_errors
+
+        if is_very_large_file:
+            print(f"  ✓ 完成处理: {file_label}")
+
+        return result
+    else:
+        # 没有成功解码任何信号
+        return {
+            "file": file_label,
+            "total_msgs": total_msgs,
+            "decoded_msgs": decoded_msgs,
+            "error_count": error_count,
+            "error_types": error_types,  # 添加错误类型统计
+            "signals": 0,
+            "success": False,
+            "error": "No valid signals decoded",
+        }
+
+
+def _output_targets(dbc_data, options: Dict[str, Any], base_filename: str) -> List[Dict[str, Any]]:
+    """
+    解码结果的输出目标 [{"prefix", "dbc_data", "base_filename", "channel"}]。
+
+    channel_output=split 时每个配置的通道一个目标：解码时信号名带 CH{n}_ 前缀，
+    写出时去掉前缀，输出到 {文件名}_CH{n}；否则只有一个不拆分的目标。
+    """
+    channel_dbc = options.get("channel_dbc")
+    if channel_dbc and options.get("channel_output") == "split":
+        return [
+            {
+                "prefix": CHANNEL_PREFIX.format(channel),
+                "dbc_data": dbc_data.channel_databases[CHANNEL_PREFIX.format(channel)],
+                "base_filename": f"{base_filename}_CH{channel}",
+                "channel": channel,
+            }
+            for channel in sorted(channel_dbc)
+        ]
+    return [{"prefix": "", "dbc_data": dbc_data, "base_filename": base_filename, "channel": None}]
+
+
+def _decode_signal_set(
+    signal_names: Optional[List[str]], targets: List[Dict[str, Any]]
+) -> Optional[set]:
+    """解码时保留的信号名；按通道拆分输出时 signal_names 作用于每个通道，展开为带前缀的名称"""
+    if not signal_names:
+        return None
+    if targets[0]["channel"] is None:
+        return set(signal_names)
+    return set(_prefix_channel_signals(signal_names, None, [t["channel"] for t in targets])[0])
+
+
+def _target_signals(
+    signals: Dict[str, Tuple[np.ndarray, np.ndarray]], prefix: str
+) -> Dict[str, Tuple[np.ndarray, np.ndarray]]:
+    """取一块解码结果中属于某个输出目标（信号名前缀）的信号，并去掉前缀"""
+    if not prefix:
+        return signals
+    return {name[len(prefix):]: arrays for name, arrays in signals.items() if name.startswith(prefix)}
+
+
+def _process_task_batch(tasks):
+    """多进程wrapper：依次处理一批任务（小文件打包），返回各输出的结果列表"""
+    results = []
+    for task in tasks:
+        # 按通道拆分输出的任务每个通道一个结果
+        result = _process_single_file_wrapper(task)
+        results.extend(result if isinstance(result, list) else [result])
+    return results
 
-                if is_very_large_file:
-                    print(f"  DataFrame大小: {len(df)} 行, {len(df.columns)} 列")
-                    print(
-                        f"  内存占用: {df.memory_usage(deep=True).sum() / 1024 / 1024:.1f} MB"
-                    )
 
-            except MemoryError as e:
-                return {
-                    "file": os.path.basename(log_file_path),
-                    "total_msgs": total_msgs,
-                    "decoded_msgs": decoded_msgs,
-                    "signals": len(sigs),
-                    "data_points": total_data_points,
-                    "estimated_memory_mb": estimated_memory_mb,
-                    "success": False,
-                    "error": f"内存不足: 转换DataFrame时内存耗尽 (估算需要 {estimated_memory_mb:.0f}MB). 建议: 1)增大step值至{step*5:.3f}或更大 2)使用signal_names过滤信号 3)减少进程数至1",
-                }
-            except Exception as e:
-                return {
-                    "file": os.path.basename(log_file_path),
-                    "total_msgs": total_msgs,
-                    "success": False,
-                    "error": f"DataFrame转换失败: {str(e)}",
-                }
+def _process_single_file_wrapper(args):
+    """
+    多进程wrapper函数，用于处理单个CAN文件。
+    必须在模块级别定义以支持multiprocessing序列化。
+    优化：批量处理、预分配内存、减少列表追加开销、大文件优化
+    """
+    import traceback
 
-            base_filename = os.path.splitext(os.path.basename(log_file_path))[0]
+    (
+        dbc_url,
+        log_file_path,
+        file_type,
+        signal_names,
+        signal_corr,
+        step,
+        time_from_zero,
+        save_dir,
+        save_formats,
+        options,
+    ) = args
+    # 子进程不继承主进程的JIT开关
+    set_numba_enabled(options.get("use_numba", True))
 
-            # 优化：使用更高效的保存参数
-            save_methods = {
-                ".mat": lambda file_url: sio.savemat(
-                    file_url, df.to_dict(orient="list"), do_compression=True  # 启用压缩
-                ),
-                ".csv": lambda file_url: df.to_csv(
-                    file_url,
-                    index=True,
-                    chunksize=(
-                        10000 if not is_very_large_file else 5000
-                    ),  # 大文件使用更小块
-                ),
-                ".parquet": lambda file_url: df.to_parquet(
-                    file_url,
-                    compression="snappy",
-                    index=True,
-                    engine="pyarrow",  # 使用pyarrow引擎更快
-                ),
-            }
+    # 会话合并：log_file_path 可以是同一会话按时间顺序排列的多个片段，合并为一个输出
+    if isinstance(log_file_path, (list, tuple)):
+        segment_paths = list(log_file_path)
+    else:
+        segment_paths = [log_file_path]
+    log_file_path = segment_paths[0]
+    # 输出文件名主干（按通道拆分输出时各通道再加 _CH{n} 后缀，见 _output_targets）
+    base_filename = _session_output_name(segment_paths)
+    file_label = base_filename + split_log_name(log_file_path)[1]
 
-            save_errors = []
-            for save_format in save_formats:
-                __file_url = os.path.join(save_dir, f"{base_filename}{save_format}")
-                save_method = save_methods.get(save_format)
-                if save_method:
-                    try:
-                        if is_very_large_file:
-                            print(f"  正在保存 {save_format} 格式...")
-                        save_method(__file_url)
-                    except Exception as e:
-                        # 记录错误但继续尝试其他格式
-                        error_msg = f"{save_format}: {str(e)}"
-                        save_errors.append(error_msg)
-                        # 尝试降级方案
-                        try:
-                            if save_format == ".csv":
-                                df.to_csv(__file_url, index=False)
-                            elif save_format == ".parquet":
-                                df.to_parquet(
-                                    __file_url, compression="snappy", index=False
-                                )
-                        except Exception as e2:
-                            save_errors.append(f"{save_format} fallback: {str(e2)}")
-
-            # 返回统计信息
-            result = {
-                "file": os.path.basename(log_file_path),
-                "total_msgs": total_msgs,
-                "decoded_msgs": decoded_msgs,
-                "error_count": error_count,
-                "error_types": error_types,  # 添加错误类型统计
-                "signals": len(sigs),
-                "success": True,
-            }
+    # 检查文件大小
+    try:
+        file_size = sum(os.path.getsize(path) for path in segment_paths)
+        is_large_file = file_size > LARGE_FILE_THRESHOLD
+        is_very_large_file = file_size > VERY_LARGE_FILE_THRESHOLD
 
-            if save_errors:
-                result["save_warnings"] = save_errors
+        if is_very_large_file:
+            print(
+                f"\n⚠ 超大文件: {file_label} ({file_size/1024/1024:.0f}MB)"
+            )
+            print(f"  使用优化模式处理，请耐心等待...")
+    except:
+        file_size = 0
+        is_large_file = False
+        is_very_large_file = False
 
-            if is_very_large_file:
-                print(f"  ✓ 完成处理: {os.path.basename(log_file_path)}")
+    # 在子进程中加载DBC文件并预编译解码函数（同一进程内复用）
+    dbc_data, decoder_map = _load_worker_dbc(dbc_url, options)
 
-            return result
-        else:
-            # 没有成功解码任何信号
+    # 会话流式模式：多个片段归并为一条时间线，逐窗口写出
+    if (
+        len(segment_paths) > 1
+        and options.get("session_streaming")
+        and not options.get("in_memory")
+        and file_type in ("blf", "asc")
+    ):
+        try:
+            return _process_session_stream(
+                segment_paths,
+                file_type,
+                dbc_url,
+                dbc_data,
+                decoder_map,
+                signal_names,
+                signal_corr,
+                step,
+                time_from_zero,
+                save_dir,
+                save_formats,
+                options,
+            )
+        except Exception as e:
             return {
-                "file": os.path.basename(log_file_path),
-                "total_msgs": total_msgs,
-                "decoded_msgs": decoded_msgs,
-                "error_count": error_count,
-                "error_types": error_types,  # 添加错误类型统计
-                "signals": 0,
+                "file": file_label,
                 "success": False,
-                "error": "No valid signals decoded",
+                "error": f"{type(e).__name__}: {str(e)}",
+                "traceback": traceback.format_exc(),
             }
+
+    # 处理CAN文件
+    try:
+        # 根据文件类型加载日志数据
+        if file_type not in ("blf", "asc") + MF4_FILE_TYPES:
+            return None
+
+        # 解码信号 - 使用优化的数据结构与预编译解码函数
+        # 根据文件大小动态调整批处理大小
+        if file_type in MF4_FILE_TYPES:
+            batch_size = MF4_WINDOW_RECORDS  # 列式读取，按读取窗口整块解码
+        elif is_very_large_file:
+            batch_size = 500  # 超大文件使用小批次
+        elif is_large_file:
+            batch_size = 800
+        else:
+            batch_size = 1000
+
+        # 输出目标：通常只有一个；按通道拆分时日志只读一遍，解码结果按通道前缀分给各通道的输出
+        targets = _output_targets(dbc_data, options, base_filename)
+        signal_names_set = _decode_signal_set(signal_names, targets)
+        channel_stats: Optional[Dict[int, Dict[str, Any]]] = (
+            {} if targets[0]["channel"] is not None else None
+        )
+
+        # 逐块解码并合并到主存储，同时单遍累积各信号统计
+        stats = _new_decode_stats()
+        for target in targets:
+            target["decoded"] = {}
+            target["signal_stats"] = None
+            target["quality"] = None
+            if options.get("signal_stats", True) or options.get("quality_checks"):
+                signal_meta = build_signal_meta(target["dbc_data"])
+                if options.get("signal_stats", True):
+                    target["signal_stats"] = StreamingSignalStats(
+                        signal_meta, options.get("stats_histogram_bins") or 0
+                    )
+                if options.get("quality_checks"):
+                    target["quality"] = QualityReport(
+                        signal_meta,
+                        options.get("quality_gap_factor") or 3.0,
+                        options.get("quality_stuck_seconds"),
+                    )
+        next_progress = 50000
+        for segment_path in segment_paths:
+            log_data = _open_can_reader(segment_path, file_type)
+            try:
+                for chunk in _iter_decode_chunks(
+                    log_data,
+                    decoder_map,
+                    signal_names_set,
+                    batch_size,
+                    stats=stats,
+                    dedup=options.get("dedup"),
+                    channel_stats=channel_stats,
+                ):
+                    for target in targets:
+                        signals = _target_signals(chunk["signals"], target["prefix"])
+                        decoded = target["decoded"]
+                        for sig_name, (t_arr, v_arr) in signals.items():
+                            bucket = decoded.setdefault(
+                                sig_name, {"timestamps": [], "values": []}
+                            )
+                            bucket["timestamps"].append(t_arr)
+                            bucket["values"].append(v_arr)
+                        if target["signal_stats"] is not None:
+                            target["signal_stats"].update(signals)
+
+                    # 大文件显示进度
+                    if is_very_large_file and stats["total_msgs"] >= next_progress:
+                        next_progress += 50000
+                        decode_rate = stats["decoded_msgs"] / stats["total_msgs"] * 100
+                        print(
+                            f"  已处理 {stats['total_msgs']} 条消息 (解码成功率: {decode_rate:.1f}%)..."
+                        )
+            finally:
+                log_data.stop()
+
+        results = []
+        for target in targets:
+            target_stats = stats
+            if channel_stats is not None:
+                target_stats = channel_stats.get(target["channel"]) or _new_decode_stats()
+            results.append(
+                _save_decoded(
+                    target["decoded"],
+                    target["dbc_data"],
+                    target_stats,
+                    target["signal_stats"],
+                    target["quality"],
+                    target["base_filename"],
+                    target["base_filename"] + split_log_name(log_file_path)[1],
+                    segment_paths,
+                    dbc_url,
+                    signal_names,
+                    signal_corr,
+                    step,
+                    time_from_zero,
+                    save_dir,
+                    save_formats,
+                    options,
+                    is_very_large_file,
+                )
+            )
+        return results if channel_stats is not None else results[0]
     except MemoryError as e:
         # 内存不足错误
         return {
-            "file": os.path.basename(log_file_path),
+            "file": file_label,
             "success": False,
             "error": f"内存不足: {str(e)}. 建议: 1)增大step值 2)过滤信号 3)减少进程数",
         }
     except KeyboardInterrupt:
         # 用户中断
         return {
-            "file": os.path.basename(log_file_path),
+            "file": file_label,
             "success": False,
             "error": "用户中断",
         }
@@ -436,7 +2252,7 @@ def _process_single_file_wrapper(args):
         # 捕获所有其他异常，记录详细信息
         error_detail = traceback.format_exc()
         return {
-            "file": os.path.basename(log_file_path),
+            "file": file_label,
             "success": False,
             "error": f"{type(e).__name__}: {str(e)}",
             "traceback": error_detail[-500:],  # 只保留最后500字符
@@ -450,11 +2266,21 @@ class CanDecoder:
         can_url: StringPathLike,
         use_numba: bool = True,  # 是否使用Numba加速
         batch_size: int = 1000,  # 批处理大小
+        j1939: Optional[bool] = None,  # J1939 PGN路由，None表示按DBC自动判断
+        id_masks: Optional[List[Union[int, str]]] = None,  # 额外的ID掩码路由
+        channel_dbc: Optional[Dict[Any, StringPathLike]] = None,  # 通道号(1起) -> DBC
+        channel_output: str = "prefix",  # 通道路由输出：prefix 信号名加 CH{n}_ / split 每个通道单独输出
     ):  # 构造函数，初始化对象
         self.dbc_url = dbc_url  # 将传入的dbc_url参数赋值给对象的dbc_url属性
         self.can_url = can_url  # 将传入的can_url参数赋值给对象的can_url属性
-        self.use_numba = use_numba and NUMBA_AVAILABLE  # 只有在可用时才启用
+        self.use_numba = set_numba_enabled(use_numba)  # 只有在可用时才启用
         self.batch_size = batch_size  # 批处理大小
+        self.j1939 = j1939
+        self.id_masks = id_masks
+        if channel_output not in ("prefix", "split"):
+            raise ValueError(f"Unsupported channel_output: {channel_output} (可选: prefix, split)")
+        self.channel_dbc = _normalize_channel_dbc(channel_dbc)
+        self.channel_output = channel_output
 
         # 性能统计
         self.performance_mode = True  # 启用性能优化模式
@@ -462,24 +2288,28 @@ class CanDecoder:
         self.dbcs = self.__load_dbc_multi(
             dbc_url
         )  # 调用私有方法__load_dbc_multi加载dbc文件，并将结果赋值给对象的dbcs属性
-        self.blf_urls, self.asc_urls = self.__load_can_multi(
+        self.blf_urls, self.asc_urls, self.mf4_urls = self.__load_can_multi(
             can_url
-        )  # 调用私有方法__load_can_multi加载can文件，并将结果分别赋值给对象的blf_urls和asc_urls属性
+        )  # 调用私有方法__load_can_multi加载can文件，并将结果分别赋值给对象的blf_urls、asc_urls和mf4_urls属性
 
         # 打印性能配置信息
         if self.use_numba:
-            print("✓ Numba JIT加速已启用")
-        else:
+            print(f"✓ Numba JIT加速已启用（内核预热 {warm_up():.2f}s）")
+        elif use_numba:
             print("⚠ Numba不可用，使用标准模式")
+        else:
+            print("⚠ Numba JIT加速已关闭，使用标准模式")
         print(f"✓ 批处理大小: {self.batch_size}")
 
     @classmethod
-    def from_config(cls, config_path: StringPathLike) -> "CanDecoder":
+    def from_config(
+        cls, config_path: Union[StringPathLike, Dict[str, Any]]
+    ) -> "CanDecoder":
         """
         从YAML配置文件创建CanDecoder实例
 
         Args:
-            config_path: YAML配置文件路径
+            config_path: YAML配置文件路径，或已加载的配置字典（load_config_from_yaml 的结果）
 
         Returns:
             CanDecoder实例
@@ -488,7 +2318,11 @@ class CanDecoder:
             >>> decoder = CanDecoder.from_config('config.yaml')
             >>> decoder.read_can_files_multi()
         """
-        config = load_config_from_yaml(config_path)
+        if isinstance(config_path, dict):
+            config = config_path
+            config_path = "<dict>"
+        else:
+            config = load_config_from_yaml(config_path)
 
         print(f"\n{'='*60}")
         print(f"从配置文件加载: {config_path}")
@@ -511,18 +2345,80 @@ class CanDecoder:
             can_url=config["can_data_path"],
             use_numba=config["use_numba"],
             batch_size=config["batch_size"],
+            j1939=config["j1939"],
+            id_masks=config["id_masks"],
+            channel_dbc=config["channel_dbc"],
+            channel_output=config["channel_output"],
         )
 
         # 保存配置供后续使用
         instance._config = config
 
+        # 按清单只保留包含目标信号/时间段的文件
+        if config["inventory_query"]:
+            instance.select_from_inventory(**config["inventory_query"])
+
         return instance
 
-    def run_from_config(self) -> None:
+    def select_from_inventory(
+        self,
+        path: StringPathLike,
+        signals: Optional[List[str]] = None,
+        start: Any = None,
+        end: Any = None,
+        match: str = "all",
+        arbitration_ids: Optional[List[int]] = None,
+    ) -> int:
+        """
+        用 caninventory 清单过滤待解码的文件，只保留包含指定信号且在时间段内有数据的文件。
+
+        Args:
+            path: 清单文件（CanInventory.build 生成的SQLite）
+            signals: 信号名列表
+            start: 时间段起点（Unix时间戳、ISO日期字符串或date/datetime）
+            end: 时间段终点
+            match: "all" 包含全部信号 / "any" 包含任一信号
+            arbitration_ids: 报文ID列表，文件须包含其中任一
+
+        Returns:
+            保留的文件数
+        """
+        try:
+            from .caninventory import select_log_files
+        except ImportError:
+            from caninventory import select_log_files
+
+        query = {
+            "path": path,
+            "signals": signals,
+            "start": start,
+            "end": end,
+            "match": match,
+            "arbitration_ids": arbitration_ids,
+        }
+        before = len(self.blf_urls) + len(self.asc_urls) + len(self.mf4_urls)
+        self.blf_urls = select_log_files(self.blf_urls, query)
+        self.asc_urls = select_log_files(self.asc_urls, query)
+        self.mf4_urls = select_log_files(self.mf4_urls, query)
+        kept = len(self.blf_urls) + len(self.asc_urls) + len(self.mf4_urls)
+        print(f"✓ 清单筛选: {kept}/{before} 个文件符合条件")
+        return kept
+
+    def run_from_config(
+        self,
+        in_memory: bool = False,
+        dataset_metadata: bool = True,
+        run_report_path: Optional[str] = None,
+    ) -> Union[List[Dict[str, Any]], SharedDecodeResult]:
         """
         使用加载的配置运行CAN文件处理
 
         该方法仅在通过from_config()创建实例后可用
+
+        Args:
+            in_memory: True时结果保留在共享内存中返回，不写出文件
+            dataset_metadata: 运行结束后重建分区数据集的 _metadata（队列任务由 finalize 统一生成）
+            run_report_path: 运行报告路径，默认 output_dir/run_report.json
         """
         if not hasattr(self, "_config"):
             raise RuntimeError(
@@ -532,7 +2428,7 @@ class CanDecoder:
 
         config = self._config
 
-        self.read_can_files_multi(
+        return self.read_can_files_multi(
             signal_names=config["signal_names"],
             signal_corr=config["signal_mapping"],
             step=config["step"],
@@ -540,6 +2436,32 @@ class CanDecoder:
             save_formats=config["save_formats"],
             num_processes=config["num_processes"],
             time_from_zero=config["time_from_zero"],
+            ipc_compression=config["ipc_compression"],
+            dataset_layout=config["dataset_layout"],
+            dataset_dir=config["dataset_dir"],
+            partition_by=config["partition_by"],
+            vehicle_pattern=config["vehicle_pattern"],
+            row_group_size=config["row_group_size"],
+            in_memory=in_memory,
+            batch_small_files=config["batch_small_files"],
+            small_file_mb=config["small_file_mb"],
+            batch_target_mb=config["batch_target_mb"],
+            concat_sessions=config["concat_sessions"],
+            session_gap=config["session_gap"],
+            session_streaming=config["session_streaming"],
+            memory_budget_mb=config["memory_budget_mb"],
+            signal_stats=config["signal_stats"],
+            stats_histogram_bins=config["stats_histogram_bins"],
+            quality_checks=config["quality_checks"],
+            quality_gap_factor=config["quality_gap_factor"],
+            quality_stuck_seconds=config["quality_stuck_seconds"],
+            dedup_frames=config["dedup_frames"],
+            dedup_tolerance=config["dedup_tolerance"],
+            dedup_scope=config["dedup_scope"],
+            dedup_keep=config["dedup_keep"],
+            categorical_enums=config["categorical_enums"],
+            dataset_metadata=dataset_metadata,
+            run_report_path=run_report_path,
         )
 
     def __load_dbc_single(self, dbc_url: StringPathLike) -> Tuple[str, Any]:
@@ -603,21 +2525,25 @@ class CanDecoder:
     def __load_can_multi(
         self,
         can_url: Union[StringPathLike, List[StringPathLike]],
-    ) -> Tuple[List[StringPathLike], List[StringPathLike]]:
+    ) -> Tuple[List[StringPathLike], List[StringPathLike], List[StringPathLike]]:
         """
-        加载多个 CAN 文件路径，并根据文件类型（.blf 或 .asc）分类。
+        加载多个 CAN 文件路径，并根据文件类型（.blf、.asc 或 .mf4/.mdf 总线记录）分类。
+        压缩的 BLF/ASC（.gz/.zst/.xz，如 drive_001.blf.zst）按内层扩展名分类，解码时流式解压。
 
         Args:
             can_url (Union[StringPathLike, List[StringPathLike]]): CAN 文件路径或目录路径，或包含多个路径的列表。
 
         Returns:
-            Tuple[List[StringPathLike], List[StringPathLike]]: 包含 .blf 文件路径列表和 .asc 文件路径列表的元组。
+            Tuple[List[StringPathLike], List[StringPathLike], List[StringPathLike]]:
+                .blf 文件路径列表、.asc 文件路径列表和 .mf4/.mdf 文件路径列表。
         """
         blf_urls = []  # 存储所有 .blf 文件路径的列表
         asc_urls = []  # 存储所有 .asc 文件路径的列表
+        mf4_urls = []  # 存储所有 .mf4/.mdf 总线记录文件路径的列表
+        compressed_map = {"blf": blf_urls, "asc": asc_urls}  # 压缩日志按内层类型分类
 
         def __process_path(path: StringPathLike):
-            """处理单个路径，分类为 .blf 或 .asc 文件"""
+            """处理单个路径，分类为 .blf、.asc 或 .mf4/.mdf 文件"""
             if os.path.isdir(path):
                 # 如果路径是目录，列出目录中的所有文件
                 files = os.listdir(path)
@@ -629,13 +2555,23 @@ class CanDecoder:
                 asc_urls.extend(
                     os.path.join(path, file) for file in files if file.endswith(".asc")
                 )
+                mf4_urls.extend(
+                    os.path.join(path, file)
+                    for file in files
+                    if file.lower().endswith((".mf4", ".mdf"))
+                )
+                for file in files:
+                    if compression_of(file) and log_file_type(file) in compressed_map:
+                        compressed_map[log_file_type(file)].append(os.path.join(path, file))
             elif os.path.isfile(path):
                 # 使用字典映射减少 if-else 判断
-                extension_map = {".blf": blf_urls, ".asc": asc_urls}
+                extension_map = {".blf": blf_urls, ".asc": asc_urls, ".mf4": mf4_urls, ".mdf": mf4_urls}
                 ext = os.path.splitext(path)[1].lower()
                 if ext in extension_map:
                     extension_map[ext].append(path)
-            return blf_urls, asc_urls
+                elif compression_of(path) and log_file_type(path) in compressed_map:
+                    compressed_map[log_file_type(path)].append(path)
+            return blf_urls, asc_urls, mf4_urls
 
         # 单个路径
         if isinstance(can_url, (str, os.PathLike)):
@@ -651,7 +2587,7 @@ class CanDecoder:
                 "can_url must be a string, PathLike, or a list of such objects."
             )
 
-        return blf_urls, asc_urls
+        return blf_urls, asc_urls, mf4_urls
 
     def __decode_can(
         self,
@@ -666,68 +2602,26 @@ class CanDecoder:
         """
         from asammdf import Signal  # 从 asammdf 库导入 Signal 类
 
-        decoder_map = _build_decoder_map(dbc_data)
+        decoder_map = _build_decoder_map(dbc_data, self.j1939, self.id_masks)
 
         decoded = defaultdict(lambda: {"timestamps": [], "values": []})
         signal_names_set = set(signal_names) if signal_names else None
 
         batch_limit = self.batch_size if self.batch_size > 0 else 1000
 
-        def flush_batch(temp_storage: Dict[str, Dict[str, list]]):
-            if not temp_storage:
-                return
-            for sig_name, data in temp_storage.items():
-                if not data["timestamps"]:
-                    continue
-                t_arr = np.asarray(data["timestamps"], dtype=np.float64)
-                v_arr = np.asarray(data["values"], dtype=np.float64)
+        for chunk in _iter_decode_chunks(
+            can_data, decoder_map, signal_names_set, batch_limit
+        ):
+            for sig_name, (t_arr, v_arr) in chunk["signals"].items():
                 bucket = decoded[sig_name]
                 bucket["timestamps"].append(t_arr)
                 bucket["values"].append(v_arr)
-            temp_storage.clear()
-
-        temp_data: Dict[str, Dict[str, list]] = defaultdict(lambda: {"timestamps": [], "values": []})
-        batch_count = 0
-        for __msg in can_data:
-            decoder = decoder_map.get(__msg.arbitration_id)
-            if decoder is None:
-                continue
-            try:
-                __dec = decoder(__msg.data)
-                if not __dec:
-                    continue
-
-                for __k, __v in __dec.items():
-                    if signal_names_set is None or __k in signal_names_set:
-                        value = getattr(__v, "value", __v)
-                        entry = temp_data[__k]
-                        entry["timestamps"].append(__msg.timestamp)
-                        entry["values"].append(value)
-
-                batch_count += 1
-                if self.performance_mode and batch_count % batch_limit == 0:
-                    flush_batch(temp_data)
-
-            except (KeyError, ValueError, Exception):
-                continue
-
-        flush_batch(temp_data)
 
         sigs = []
         for __k, __v in decoded.items():
             if __v["timestamps"]:
-                if self.use_numba:
-                    try:
-                        timestamps, values = _fast_array_conversion(
-                            np.concatenate(__v["timestamps"]) if len(__v["timestamps"]) > 1 else __v["timestamps"][0],
-                            np.concatenate(__v["values"]) if len(__v["values"]) > 1 else __v["values"][0],
-                        )
-                    except Exception:
-                        timestamps = np.concatenate(__v["timestamps"]) if len(__v["timestamps"]) > 1 else __v["timestamps"][0]
-                        values = np.concatenate(__v["values"]) if len(__v["values"]) > 1 else __v["values"][0]
-                else:
-                    timestamps = np.concatenate(__v["timestamps"]) if len(__v["timestamps"]) > 1 else __v["timestamps"][0]
-                    values = np.concatenate(__v["values"]) if len(__v["values"]) > 1 else __v["values"][0]
+                timestamps = np.concatenate(__v["timestamps"]) if len(__v["timestamps"]) > 1 else __v["timestamps"][0]
+                values = np.concatenate(__v["values"]) if len(__v["values"]) > 1 else __v["values"][0]
 
                 signal_name = signal_corr.get(__k, __k) if signal_corr else __k
                 sigs.append(
@@ -736,6 +2630,253 @@ class CanDecoder:
 
         return sigs
 
+    def iter_decoded_chunks(
+        self,
+        log_file_path: StringPathLike,
+        dbc_data: Optional[Database] = None,
+        signal_names: Optional[List[str]] = None,
+        signal_corr: Optional[Dict[str, str]] = None,
+        chunk_frames: int = 50000,
+        chunk_seconds: Optional[float] = None,
+        stats: Optional[Dict[str, Any]] = None,
+    ):
+        """
+        流式解码单个CAN文件：按块产出解码结果，不在内存中保留整个文件。
+
+        Args:
+            log_file_path: BLF/ASC/MF4（总线记录）文件路径
+            dbc_data: DBC数据库对象，默认使用加载的第一个DBC
+            signal_names: 需要解码的信号，None表示全部
+            signal_corr: 信号重命名映射
+            chunk_frames: 每块最多包含的帧数
+            chunk_seconds: 每块最长覆盖的时间（秒），用于按时间片消费
+            stats: 可选统计字典（可为空字典），解码过程中原地更新 total_msgs/decoded_msgs/error_count/error_types
+
+        Yields:
+            {"t_start", "t_end", "frames", "signals": {信号名: (timestamps, values)}}
+
+        Example:
+            >>> decoder = CanDecoder("vehicle.dbc", "logs/")
+            >>> for chunk in decoder.iter_decoded_chunks("logs/drive_001.blf", chunk_seconds=10):
+            ...     t, v = chunk["signals"].get("RMSpd_250", (None, None))
+        """
+        if dbc_data is None:
+            if not self.dbcs:
+                raise ValueError("No DBC loaded")
+            dbc_data = self.dbcs[0][1]
+        if stats is not None:
+            # 调用方可以传入空字典
+            for key, value in _new_decode_stats().items():
+                stats.setdefault(key, value)
+        log_data = _open_can_reader(log_file_path, log_file_type(log_file_path))
+        decoder_map = _build_decoder_map(dbc_data, self.j1939, self.id_masks)
+        signal_names_set = set(signal_names) if signal_names else None
+
+        try:
+            for chunk in _iter_decode_chunks(
+                log_data,
+                decoder_map,
+                signal_names_set,
+                chunk_frames,
+                chunk_seconds=chunk_seconds,
+                stats=stats,
+            ):
+                if signal_corr:
+                    chunk["signals"] = {
+                        str(signal_corr.get(name, name)): arrays
+                        for name, arrays in chunk["signals"].items()
+                    }
+                yield chunk
+        finally:
+            log_data.stop()
+
+    def follow(
+        self,
+        log_file_path: StringPathLike,
+        step: float = 0.02,
+        save_dir: StringPathLike = r"./can_decoded",
+        signal_names: Optional[List[str]] = None,
+        signal_corr: Optional[Dict[str, str]] = None,
+        time_from_zero: bool = False,
+        dbc_data: Optional[Database] = None,
+        callback=None,
+        poll_interval: float = 0.2,
+        idle_timeout: Optional[float] = None,
+        write_csv: bool = True,
+        hold_seconds: float = 1.0,
+    ) -> Dict[str, Any]:
+        """
+        跟随模式：持续解码仍在写入的ASC文件。
+
+        记录已消费的字节偏移，只解析新追加的行；新数据增量栅格化到统一时间网格后
+        追加到 save_dir/{文件名}.csv，并（可选）通过回调发出。文件在 idle_timeout
+        秒内不再增长或按 Ctrl+C 时结束，剩余数据全部输出。
+
+        Args:
+            log_file_path: 正在增长的 .asc 文件
+            step: 栅格步长
+            save_dir: CSV输出目录
+            signal_names: 需要解码的信号，None表示全部
+            signal_corr: 信号重命名映射
+            time_from_zero: 输出时间是否从0开始
+            dbc_data: DBC数据库对象，默认使用加载的第一个DBC
+            callback: callback(chunk, rows)，chunk为解码块（结束时为None），
+                rows为本次新确定的栅格行 {列名: ndarray}（可能为None）
+            poll_interval: 无新数据时的轮询间隔（秒）
+            idle_timeout: 文件停止增长多少秒后退出，None表示一直跟随
+            write_csv: 是否追加写出CSV
+            hold_seconds: 最多等待一个信号的下一个采样多久（秒）。线性插值的行要等到
+                各信号都有更晚的采样才能输出，停发超过自身周期3倍的信号不再等待；
+                低频信号较多时减小该值可降低输出延迟（停顿期间按最后值保持）
+
+        Returns:
+            统计信息（消息数、输出行数、已消费字节数等）
+        """
+        import pandas as pd
+
+        if os.path.splitext(str(log_file_path))[1].lower() != ".asc":
+            raise ValueError("Follow mode only supports .asc files")
+        if dbc_data is None:
+            if not self.dbcs:
+                raise ValueError("No DBC loaded")
+            dbc_data = self.dbcs[0][1]
+
+        decoder_map = _build_decoder_map(dbc_data, self.j1939, self.id_masks)
+        signal_names_set = set(signal_names) if signal_names else None
+        columns = _dataset_signal_columns(dbc_data, signal_names, signal_corr)
+        interpolation = {name: "previous" for name in _enum_value_tables(dbc_data, signal_corr)}
+        base_filename = os.path.splitext(os.path.basename(str(log_file_path)))[0]
+        csv_url = os.path.join(str(save_dir), f"{base_filename}.csv")
+        if write_csv:
+            os.makedirs(save_dir, exist_ok=True)
+            if os.path.exists(csv_url):
+                os.remove(csv_url)  # 从头跟随，重新生成输出
+
+        state: Dict[str, Any] = {"offset": 0, "header": None}
+        stats = _new_decode_stats()
+        rasterizer = StreamingRasterizer(
+            step,
+            columns,
+            time_from_zero=time_from_zero,
+            hold_seconds=hold_seconds,
+            interpolation=interpolation,
+        )
+
+        def emit(chunk, rows):
+            if rows is not None and write_csv:
+                pd.DataFrame(rows).to_csv(
+                    csv_url, mode="a", header=not os.path.exists(csv_url), index=False
+                )
+            if callback is not None:
+                callback(chunk, rows)
+
+        print(f"跟随文件: {log_file_path} (Ctrl+C 结束)")
+        last_growth = time.monotonic()
+        try:
+            while True:
+                text = _read_asc_increment(log_file_path, state)
+                if state.pop("restarted", False):
+                    print(f"⚠ 文件被截断或重建，从头开始跟随")
+                    rasterizer = StreamingRasterizer(
+                        step,
+                        columns,
+                        time_from_zero=time_from_zero,
+                        hold_seconds=hold_seconds,
+                        interpolation=interpolation,
+                    )
+                    if write_csv and os.path.exists(csv_url):
+                        os.remove(csv_url)
+                if not text:
+                    if idle_timeout is not None and time.monotonic() - last_growth >= idle_timeout:
+                        break
+                    time.sleep(poll_interval)
+                    continue
+
+                last_growth = time.monotonic()
+                reader = can.ASCReader(io.StringIO(state["header"] + text))
+                for chunk in _iter_decode_chunks(
+                    reader, decoder_map, signal_names_set, 50000, stats=stats
+                ):
+                    if signal_corr:
+                        chunk["signals"] = {
+                            str(signal_corr.get(name, name)): arrays
+                            for name, arrays in chunk["signals"].items()
+                        }
+                    emit(chunk, rasterizer.push(chunk["signals"]))
+        except KeyboardInterrupt:
+            print(f"\n用户中断跟随")
+        emit(None, rasterizer.flush())
+
+        return {
+            "file": os.path.basename(str(log_file_path)),
+            "bytes_consumed": state["offset"],
+            "rows": rasterizer.rows_emitted,
+            "output": csv_url if write_csv else None,
+            **stats,
+        }
+
+    def quicklook(
+        self,
+        log_file_path: StringPathLike,
+        fraction: float = DEFAULT_FRACTION,
+        signal_names: Optional[List[str]] = None,
+        signal_corr: Optional[Dict[str, str]] = None,
+        save_dir: Optional[StringPathLike] = None,
+        dbc_data: Optional[Database] = None,
+    ) -> Dict[str, Any]:
+        """
+        快速浏览：只解码均匀分布在文件各处的一小部分BLF容器/ASC块（默认2%），
+        几秒内给出各信号的近似统计、覆盖比例和低分辨率预览（见 canquicklook.quick_look）。
+
+        Args:
+            log_file_path: BLF/ASC文件
+            fraction: 抽样比例
+            signal_names: 需要解码的信号，None表示全部
+            signal_corr: 信号重命名映射
+            save_dir: 指定时写出 {文件名}.quicklook.json
+            dbc_data: DBC数据库对象，默认使用加载的第一个DBC（配置了 channel_dbc 时按通道路由）
+
+        Returns:
+            快速浏览结果字典，写出文件时带 "quicklook_file"
+        """
+        if not 0 < fraction <= 1:
+            raise ValueError(f"fraction must be in (0, 1]: {fraction}")
+        if dbc_data is None and self.channel_dbc:
+            dbc_data, decoder_map = _load_worker_dbc(
+                None,
+                {
+                    "channel_dbc": self.channel_dbc,
+                    "channel_output": "prefix",
+                    "j1939": self.j1939,
+                    "id_masks": self.id_masks,
+                },
+            )
+            signal_names, signal_corr = _prefix_channel_signals(
+                signal_names, signal_corr, sorted(self.channel_dbc)
+            )
+        else:
+            if dbc_data is None:
+                if not self.dbcs:
+                    raise ValueError("No DBC loaded")
+                dbc_data = self.dbcs[0][1]
+            decoder_map = _build_decoder_map(dbc_data, self.j1939, self.id_masks)
+
+        result = quick_look(
+            log_file_path,
+            dbc_data,
+            decoder_map,
+            fraction=fraction,
+            signal_names=signal_names,
+            signal_corr=signal_corr,
+            encoding=ENCODING,
+        )
+        if save_dir is not None:
+            base_filename = os.path.splitext(os.path.basename(str(log_file_path)))[0]
+            result["quicklook_file"] = write_sidecar(
+                os.path.join(str(save_dir), f"{base_filename}.quicklook.json"), result
+            )
+        return result
+
     def __save_to(
         self,
         dbc_file_url,
@@ -745,6 +2886,7 @@ class CanDecoder:
         time_from_zero: bool = True,
         save_dir: StringPathLike = r"./can_decoded",
         save_formats: Tuple[str, ...] = (".csv", ".parquet", ".mat"),
+        ipc_compression: Optional[str] = None,
     ):
         """
         Save decoded CAN data to specified formats.
@@ -755,19 +2897,35 @@ class CanDecoder:
             signals (list): Decoded signals.
             step (float): Raster step size.
             save_dir (str): Directory to save the output files.
-            save_formats (tuple): File formats to save (e.g., .csv, .parquet, .mat).
+            save_formats (tuple): File formats to save (e.g., .csv, .parquet, .mat, .feather, .mf4).
+            ipc_compression (str): Compression for .feather/.arrow (uncompressed, lz4, zstd).
         """
         # 检查保存目录是否存在，如果不存在则创建
         os.makedirs(save_dir, exist_ok=True)
 
-        # 导入asammdf库中的MDF类和scipy库中的io模块
+        # 导入asammdf库中的MDF类
         from asammdf import MDF
-        import scipy.io as sio
 
         # 如果没有信号数据，直接返回
         if not signals:
             return
 
+        # 提前检查格式，避免解码结果写了一半才失败
+        for save_format in save_formats:
+            if save_format not in SUPPORTED_SAVE_FORMATS and save_format != ".mf4":
+                # 如果不支持的文件格式，抛出异常
+                raise ValueError(f"Unsupported save format: {save_format}")
+
+        # 生成基础文件名，由DBC文件名和CAN文件名组合而成
+        base_filename = split_log_name(can_file_url)[0]
+
+        # MF4由未栅格化信号直接写出，只需要MF4时跳过栅格化
+        if ".mf4" in save_formats:
+            _save_mf4(signals, os.path.join(save_dir, f"{base_filename}.mf4"))
+        save_formats = tuple(f for f in save_formats if f != ".mf4")
+        if not save_formats:
+            return None
+
         # 创建一个MDF对象
         mdf = MDF()
         # 将解码后的信号添加到MDF对象中
@@ -775,48 +2933,10 @@ class CanDecoder:
         # 将MDF对象转换为DataFrame，指定栅格步长
         df = mdf.to_dataframe(raster=step, time_from_zero=time_from_zero)
 
-        # 生成基础文件名，由DBC文件名和CAN文件名组合而成
-        base_filename = os.path.splitext(os.path.basename(can_file_url))[0]
-
-        # 定义文件格式与保存方法的映射 - 优化版本
-        save_methods = {
-            ".mat": lambda file_url: sio.savemat(
-                file_url,
-                df.to_dict(orient="list"),
-                do_compression=True,  # MAT文件启用压缩
-            ),
-            ".csv": lambda file_url: df.to_csv(
-                file_url, index=False, chunksize=10000  # 分块写入大文件
-            ),
-            ".parquet": lambda file_url: df.to_parquet(
-                file_url,
-                compression="snappy",
-                index=False,
-                engine="pyarrow" if self._has_pyarrow() else "fastparquet",
-            ),
-        }
-
-        # 遍历保存格式并调用对应的保存方法
-        for save_format in save_formats:
-            # 生成完整的文件路径
-            __file_url = os.path.join(save_dir, f"{base_filename}{save_format}")
-            # 获取对应的保存方法
-            save_method = save_methods.get(save_format)
-            if save_method:
-                try:
-                    # 调用保存方法
-                    save_method(__file_url)
-                except Exception as e:
-                    # 如果优化方法失败，使用基础方法
-                    if save_format == ".csv":
-                        df.to_csv(__file_url, index=False)
-                    elif save_format == ".parquet":
-                        df.to_parquet(__file_url, compression="snappy", index=False)
-                    elif save_format == ".mat":
-                        sio.savemat(__file_url, df.to_dict(orient="list"))
-            else:
-                # 如果不支持的文件格式，抛出异常
-                raise ValueError(f"Unsupported save format: {save_format}")
+        # 一次转换为Arrow表后并发写出所有格式，返回各格式耗时与错误
+        return save_dataframe(
+            df, save_dir, base_filename, save_formats, ipc_compression=ipc_compression
+        )
 
     def _has_pyarrow(self) -> bool:
         """检查是否安装了pyarrow"""
@@ -839,35 +2959,32 @@ class CanDecoder:
         time_from_zero: bool = True,
         save_dir: str = r"./can_decoded",
         save_formats: Tuple[str, ...] = (".csv", ".parquet", ".mat"),
+        ipc_compression: Optional[str] = None,
     ) -> List[Dict[str, Any]] | None:
         """
-        Process a single CAN file (BLF or ASC) and save the decoded data.
+        Process a single CAN file (BLF, ASC or MF4 bus logging) and save the decoded data.
 
         Args:
             dbc_url (str): Path to the DBC file.
             dbc_data (Database): DBC database object.
             log_file_path (str): Path to the CAN log file.
-            file_type (str): Type of the CAN file ("blf" or "asc").
+            file_type (str): Type of the CAN file ("blf", "asc" or "mf4").
             signal_names (Optional[List[str]]): List of signal names to decode.
             signal_corr (Optional[Dict[str, str]]): Signal name corrections.
             step (float): Raster step size.
             save_dir (str): Directory to save the output files.
             save_formats (Tuple[str, ...]): File formats to save (e.g., ".csv", ".parquet").
+            ipc_compression (Optional[str]): Compression for .feather/.arrow outputs.
         """
         try:
             # 根据文件类型加载日志数据
-            if file_type == "blf":
-                log_data = can.BLFReader(log_file_path)
-            elif file_type == "asc":
-                log_data = can.ASCReader(log_file_path)
-            else:
-                raise ValueError(f"Unsupported file type: {file_type}")
+            log_data = _open_can_reader(log_file_path, file_type)
 
             # 解码信号
             signals = self.__decode_can(dbc_data, log_data, signal_names, signal_corr)
 
             # 保存解码结果
-            self.__save_to(
+            save_report = self.__save_to(
                 dbc_url,
                 log_file_path,
                 signals,
@@ -875,7 +2992,11 @@ class CanDecoder:
                 time_from_zero,
                 save_dir,
                 save_formats,
+                ipc_compression,
             )
+            if save_report and save_report["errors"]:
+                for save_format, error in save_report["errors"].items():
+                    print(f"⚠ 保存 {log_file_path} 的 {save_format} 格式失败: {error}")
             return signals
         except Exception as e:
             print(f"Error processing file {log_file_path}: {e}")
@@ -888,6 +3009,7 @@ class CanDecoder:
         time_from_zero: bool = True,
         save_dir: str = r"./can_decoded",
         save_formats: Tuple[str, ...] = (".csv", ".parquet", ".mat"),
+        ipc_compression: Optional[str] = None,
     ) -> None:
         """
         Read CAN files and decode them using the provided DBC data (single-threaded).
@@ -895,12 +3017,17 @@ class CanDecoder:
 
         # 确保保存目录存在
         os.makedirs(save_dir, exist_ok=True)
+        log_urls = _exclude_outputs(
+            {"blf": self.blf_urls, "asc": self.asc_urls, "mf4": self.mf4_urls},
+            save_dir,
+            tuple(save_formats),
+        )
 
         # 遍历每个 DBC 文件
         for __dbc_url, __dbc_data in self.dbcs:
             # 处理 BLF 文件
             for __blf_url in tqdm(
-                self.blf_urls,
+                log_urls["blf"],
                 desc=f"Processing BLF files for {os.path.basename(__dbc_url)}",
             ):
                 self.read_single_can(
@@ -914,11 +3041,12 @@ class CanDecoder:
                     time_from_zero,
                     save_dir,
                     save_formats,
+                    ipc_compression,
                 )
 
             # 处理 ASC 文件
             for __asc_url in tqdm(
-                self.asc_urls,
+                log_urls["asc"],
                 desc=f"Processing ASC files for {os.path.basename(__dbc_url)}",
             ):
                 self.read_single_can(
@@ -932,6 +3060,26 @@ class CanDecoder:
                     time_from_zero,
                     save_dir,
                     save_formats,
+                    ipc_compression,
+                )
+
+            # 处理 MF4 总线记录文件
+            for __mf4_url in tqdm(
+                log_urls["mf4"],
+                desc=f"Processing MF4 files for {os.path.basename(__dbc_url)}",
+            ):
+                self.read_single_can(
+                    __dbc_url,
+                    __dbc_data,
+                    str(__mf4_url),
+                    "mf4",
+                    signal_names,
+                    signal_corr,
+                    step,
+                    time_from_zero,
+                    save_dir,
+                    save_formats,
+                    ipc_compression,
                 )
 
     def read_can_files_multi(
@@ -943,7 +3091,33 @@ class CanDecoder:
         save_dir: str = r"./can_decoded",
         save_formats: Tuple[str, ...] = (".csv", ".parquet", ".mat"),
         num_processes: Optional[int] = None,
-    ) -> None:
+        ipc_compression: Optional[str] = None,
+        dataset_layout: str = "flat",
+        dataset_dir: Optional[str] = None,
+        partition_by: Optional[List[str]] = None,
+        vehicle_pattern: Optional[str] = None,
+        row_group_size: Optional[int] = None,
+        in_memory: bool = False,
+        batch_small_files: bool = True,
+        small_file_mb: float = 16,
+        batch_target_mb: float = 64,
+        concat_sessions: bool = False,
+        session_gap: Optional[float] = 60.0,
+        session_streaming: bool = False,
+        memory_budget_mb: Optional[float] = None,
+        signal_stats: bool = True,
+        stats_histogram_bins: int = 0,
+        quality_checks: bool = False,
+        quality_gap_factor: float = 3.0,
+        quality_stuck_seconds: Optional[float] = 10.0,
+        dedup_frames: bool = False,
+        dedup_tolerance: float = 0.001,
+        dedup_scope: str = "across",
+        dedup_keep: Union[str, List[int]] = "first",
+        categorical_enums: bool = False,
+        dataset_metadata: bool = True,
+        run_report_path: Optional[str] = None,
+    ) -> Union[List[Dict[str, Any]], SharedDecodeResult]:
         """
         Read multiple CAN files and decode them using the provided DBC data (multi-process).
 
@@ -954,40 +3128,147 @@ class CanDecoder:
             save_dir (str): Directory to save the output files.
             save_formats (Tuple[str, ...]): File formats to save (e.g., ".csv", ".parquet", ".mat").
             num_processes (Optional[int]): Number of processes to use. Default is CPU count - 1.
+            ipc_compression (Optional[str]): Compression for .feather/.arrow outputs (uncompressed, lz4, zstd).
+            dataset_layout (str): "flat" writes {base_filename}.parquet; "hive" writes .parquet into a
+                Hive-partitioned dataset with row-group statistics and a dataset-level _metadata file.
+            dataset_dir (Optional[str]): Root of the partitioned dataset. Default is save_dir/dataset.
+            partition_by (Optional[List[str]]): Partition keys (vehicle, date, condition, source_file).
+            vehicle_pattern (Optional[str]): Regex extracting the vehicle id from the file name.
+            row_group_size (Optional[int]): Rows per Parquet row group in the dataset.
+            in_memory (bool): Keep the rasterized data in shared memory instead of writing files.
+            batch_small_files (bool): Pack files smaller than small_file_mb into size-balanced
+                batches so each worker task amortizes DBC loading and IPC over several files.
+            small_file_mb (float): Size below which a file (or session) is batched.
+            batch_target_mb (float): Target total size of one batch.
+            concat_sessions (bool): Decode consecutive snippets of the same session
+                (same directory and file name apart from a trailing _NNN or -NNN index) into one output.
+            session_gap (Optional[float]): Max gap in seconds between BLF/ASC snippets of one session.
+            session_streaming (bool): Group sessions like concat_sessions, but k-way merge the
+                segment frame streams and rasterize/write incrementally on one time grid, so memory
+                does not grow with session length (parquet/csv/feather/arrow outputs only).
+            memory_budget_mb (Optional[float]): Per-file memory budget. When the rasterized table
+                would exceed it, switch to float32, windowed output or per-signal-group outputs
+                instead of running out of memory; the chosen plan is recorded as "memory_plan".
+            signal_stats (bool): Accumulate per-signal statistics while decoding and write
+                {base_filename}.stats.json plus save_dir/run_report.json.
+            stats_histogram_bins (int): Fixed-bin histogram over the DBC min/max range (0 = off).
+            quality_checks (bool): Run vectorized quality checks on every decoded signal and write
+                {base_filename}.quality.json (also included in run_report.json).
+            quality_gap_factor (float): Flag sample intervals longer than this multiple of the
+                DBC cycle time (median interval when the DBC has none).
+            quality_stuck_seconds (float): Flag non-enum signals holding one value at least this long.
+            dedup_frames (bool): Drop duplicate frames (same ID and payload within dedup_tolerance
+                seconds, e.g. gateway-mirrored traffic) before decoding; counted as "duplicate_frames".
+            dedup_tolerance (float): Max time difference in seconds between copies.
+            dedup_scope (str): "across" channels (also catches same-channel repeats) or "within" one channel.
+            dedup_keep (Union[str, List[int]]): "first", "last", or a channel priority list (1-based).
+            categorical_enums (bool): Write enum (value-table) signals as Arrow dictionary / pandas
+                categorical columns labelled from the DBC; otherwise they stay raw integer codes.
+            dataset_metadata (bool): Rebuild the dataset-level _metadata after this run ("hive" only).
+                Queue workers turn this off and leave it to a single finalize step.
+            run_report_path (Optional[str]): Where to write the run report. Default is
+                save_dir/run_report.json.
+
+        Returns:
+            Per-file result dicts, or a SharedDecodeResult ({file: zero-copy pyarrow.Table})
+            when in_memory is True. Call close() on it (or use it as a context manager) to
+            release the shared memory.
         """
 
         # 确保保存目录存在
         os.makedirs(save_dir, exist_ok=True)
 
+        if dataset_layout not in ("flat", "hive"):
+            raise ValueError(f"Unsupported dataset_layout: {dataset_layout}")
+        if dedup_scope not in ("across", "within"):
+            raise ValueError(f"Unsupported dedup_scope: {dedup_scope} (可选: across, within)")
+        if not isinstance(dedup_keep, list) and dedup_keep not in ("first", "last"):
+            raise ValueError(f"Unsupported dedup_keep: {dedup_keep} (可选: first, last, 通道优先级列表)")
+        if dataset_layout == "hive" and dataset_dir is None:
+            dataset_dir = os.path.join(save_dir, "dataset")
+
+        # 附加选项统一放在字典中传给子进程
+        options = {
+            "ipc_compression": ipc_compression,
+            "dataset_layout": dataset_layout,
+            "dataset_dir": dataset_dir,
+            "partition_by": partition_by,
+            "vehicle_pattern": vehicle_pattern,
+            "row_group_size": row_group_size,
+            "in_memory": in_memory,
+            "j1939": self.j1939,
+            "id_masks": self.id_masks,
+            "use_numba": self.use_numba,
+            "memory_budget_mb": memory_budget_mb,
+            "signal_stats": signal_stats,
+            "stats_histogram_bins": stats_histogram_bins,
+            "quality_checks": quality_checks,
+            "quality_gap_factor": quality_gap_factor,
+            "quality_stuck_seconds": quality_stuck_seconds,
+            "session_streaming": session_streaming,
+            "channel_output": self.channel_output,
+            "categorical_enums": categorical_enums,
+            "dedup": (
+                {"tolerance": dedup_tolerance, "scope": dedup_scope, "keep": dedup_keep}
+                if dedup_frames
+                else None
+            ),
+        }
+
         # 构建任务列表 - 只传递DBC文件路径而非Database对象（不可序列化）
-        tasks = []
-        for __dbc_url, _ in self.dbcs:
-            for __blf_url in self.blf_urls:
-                tasks.append(
-                    (
-                        __dbc_url,
-                        __blf_url,
-                        "blf",
-                        signal_names,
-                        signal_corr,
-                        step,
-                        time_from_zero,
-                        save_dir,
-                        save_formats,
-                    )
+        inputs: List[Tuple[Any, str]] = []
+        log_urls = _exclude_outputs(
+            {"blf": self.blf_urls, "asc": self.asc_urls, "mf4": self.mf4_urls},
+            save_dir,
+            tuple(save_formats),
+        )
+        for file_type, urls in log_urls.items():
+            if session_streaming:
+                # 归并允许片段边界处有重叠
+                inputs.extend(
+                    (session, file_type)
+                    for session in _group_sessions(urls, session_gap, max_overlap=session_gap or 0.0)
+                )
+            elif concat_sessions:
+                inputs.extend((session, file_type) for session in _group_sessions(urls, session_gap))
+            else:
+                inputs.extend((url, file_type) for url in urls)
+
+        # 通道路由：每个通道只用自己的DBC，每个日志只读取一次；
+        # 合并输出时信号名加通道前缀，拆分输出时同一任务按通道写出多个输出
+        if self.channel_dbc:
+            if self.channel_output == "prefix":
+                signal_names, signal_corr = _prefix_channel_signals(
+                    signal_names, signal_corr, list(self.channel_dbc)
                 )
-            for __asc_url in self.asc_urls:
-                tasks.append(
+            dbc_tasks = [
+                (next(iter(self.channel_dbc.values())), {**options, "channel_dbc": self.channel_dbc})
+            ]
+        else:
+            dbc_tasks = [(__dbc_url, options) for __dbc_url, _ in self.dbcs]
+
+        sized_tasks = []
+        for __dbc_url, task_options in dbc_tasks:
+            for log_input, file_type in inputs:
+                paths = log_input if isinstance(log_input, list) else [log_input]
+                if len(paths) == 1:
+                    log_input = paths[0]
+                size = sum(os.path.getsize(path) for path in paths if os.path.exists(path))
+                sized_tasks.append(
                     (
-                        __dbc_url,
-                        __asc_url,
-                        "asc",
-                        signal_names,
-                        signal_corr,
-                        step,
-                        time_from_zero,
-                        save_dir,
-                        save_formats,
+                        (
+                            __dbc_url,
+                            log_input,
+                            file_type,
+                            signal_names,
+                            signal_corr,
+                            step,
+                            time_from_zero,
+                            save_dir,
+                            save_formats,
+                            task_options,
+                        ),
+                        size,
                     )
                 )
 
@@ -995,18 +3276,38 @@ class CanDecoder:
         if num_processes is None:
             num_processes = max(1, cpu_count() - 1)
 
+        # 小文件按大小均衡打包，每个任务批内复用DBC、减少进程间通信
+        if batch_small_files:
+            batches = _balance_batches(
+                sized_tasks,
+                int(small_file_mb * 1024 * 1024),
+                int(batch_target_mb * 1024 * 1024),
+                num_processes,
+            )
+        else:
+            batches = [[task] for task, _ in sized_tasks]
+
         # 使用进程池并行处理
+        results = []
         with Pool(processes=num_processes) as pool:
-            results = list(
-                tqdm(
-                    pool.imap_unordered(
-                        _process_single_file_wrapper,
-                        tasks,
-                    ),
-                    total=len(tasks),
-                    desc="Processing CAN files",
-                )
+            # 按通道拆分输出时每个任务产出每个通道一个结果
+            outputs_per_task = (
+                len(self.channel_dbc) if self.channel_dbc and self.channel_output == "split" else 1
             )
+            with tqdm(total=len(sized_tasks) * outputs_per_task, desc="Processing CAN files") as progress:
+                for batch_results in pool.imap_unordered(_process_task_batch, batches):
+                    results.extend(batch_results)
+                    progress.update(len(batch_results))
+
+        # 内存模式：挂载各子进程导出的共享内存
+        shared_result = SharedDecodeResult() if in_memory else None
+        if shared_result is not None:
+            # 多个DBC解码同一日志时结果同名，按DBC区分
+            by_dbc = len(dbc_tasks) > 1 and not self.channel_dbc
+            for r in results:
+                if r and r.get("shared_memory"):
+                    label = f"{os.path.basename(r['dbc'])}/{r['file']}" if by_dbc else r["file"]
+                    shared_result.attach(label, r.pop("shared_memory"))
 
         # 统计处理结果
         success_count = sum(1 for r in results if r and r.get("success"))
@@ -1039,6 +3340,50 @@ class CanDecoder:
                 if r and r.get("save_warnings"):
                     print(f"  {r.get('file')}: {', '.join(r['save_warnings'])}")
 
+        # 分区数据集：所有文件写完后汇总footer生成 _metadata
+        if (
+            dataset_layout == "hive"
+            and dataset_metadata
+            and any(r and r.get("dataset_file") for r in results)
+        ):
+            metadata_summary = write_dataset_metadata(dataset_dir)
+            print(
+                f"\n分区数据集: {dataset_dir} "
+                f"({metadata_summary['files']} 个文件, {metadata_summary['row_groups']} 个行组)"
+            )
+            for skipped in metadata_summary["skipped"]:
+                print(f"  ⚠ schema不一致，未写入_metadata: {skipped}")
+
+        # 运行报告：各文件结果与信号统计汇总
+        if not in_memory:
+            report_path = _write_run_report(
+                run_report_path or os.path.join(save_dir, "run_report.json"),
+                results,
+                {
+                    "dbc": [str(url) for url, _ in self.dbcs],
+                    "channel_dbc": self.channel_dbc,
+                    "channel_output": self.channel_output if self.channel_dbc else None,
+                    "step": step,
+                    "save_formats": list(save_formats),
+                    "time_from_zero": time_from_zero,
+                    "memory_budget_mb": memory_budget_mb,
+                    "quality_checks": quality_checks,
+                    "dedup": options["dedup"],
+                },
+            )
+            print(f"\n运行报告: {report_path}")
+
+        # 汇总各格式写出耗时
+        save_timings: Dict[str, float] = {}
+        for r in results:
+            if r and r.get("save_timings"):
+                for save_format, seconds in r["save_timings"].items():
+                    save_timings[save_format] = save_timings.get(save_format, 0.0) + seconds
+        if save_timings:
+            print(f"\n保存耗时:")
+            for save_format, seconds in save_timings.items():
+                print(f"  {save_format}: {seconds:.2f}s")
+
         # 显示详细统计
         total_msgs = sum(r.get("total_msgs", 0) for r in results if r)
         decoded_msgs = sum(r.get("decoded_msgs", 0) for r in results if r)
@@ -1057,6 +3402,9 @@ class CanDecoder:
             print(f"  总消息数: {total_msgs:,}")
             print(f"  成功解码: {decoded_msgs:,} ({decoded_msgs/total_msgs*100:.1f}%)")
             print(f"  解码错误: {error_msgs:,} ({error_msgs/total_msgs*100:.1f}%)")
+            duplicate_msgs = sum(r.get("duplicate_frames", 0) for r in results if r)
+            if duplicate_msgs:
+                print(f"  重复帧(已去除): {duplicate_msgs:,} ({duplicate_msgs/total_msgs*100:.1f}%)")
             if total_data_points > 0:
                 print(f"  数据点总数: {total_data_points:,}")
 
@@ -1084,6 +3432,10 @@ class CanDecoder:
             print(f"  - 考虑使用 signal_names 过滤不需要的信号")
             print(f"  - 如遇到内存不足，可减少 num_processes 参数")
 
+        if shared_result is not None:
+            return shared_result
+        return results
+
 
 def main():
     # 获取配置文件路径
@@ -1135,26 +3487,31 @@ if __name__ == "__main__":
     sys.exit(exit_code)
 
 
-def process_candecode_from_config(config_yaml_path: StringPathLike) -> int:
+def process_candecode_from_config(
+    config_yaml_path: StringPathLike, in_memory: bool = False
+) -> Union[int, SharedDecodeResult]:
     """
     Convenience function to process CAN data using a config YAML file.
     Returns number of signals decoded successfully.
     
     Args:
         config_yaml_path: Path to the configuration YAML file
+        in_memory: Return the decoded tables via shared memory instead of writing files
         
     Returns:
-        Number of signals decoded
+        Number of signals decoded, or a SharedDecodeResult when in_memory is True
     """
     config_path = Path(config_yaml_path)
     if not config_path.exists():
         raise FileNotFoundError(f"Configuration file not found: {config_path}")
     
     decoder = CanDecoder.from_config(config_path)
+    if in_memory:
+        return decoder.run_from_config(in_memory=True)
     decoder.run_from_config()
     
     # Return count of output files as proxy for signals
-    output_dir = Path(decoder.save_dir)
+    output_dir = Path(decoder._config["output_dir"])
     if output_dir.exists():
         return len(list(output_dir.glob("*.parquet")))
     return 0
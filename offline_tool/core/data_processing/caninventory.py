@@ -0,0 +1,452 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+author: fenwickxie
+date: 2026-10-19 21:03:36
+filename: caninventory.py
+version: 1.0
+"""
+
+import datetime
+import os
+import sqlite3
+import time
+import traceback
+from contextlib import contextmanager
+from multiprocessing import Pool, cpu_count
+from typing import Any, Dict, List, Optional, TypeAlias, Union
+
+import numpy as np
+
+StringPathLike: TypeAlias = Union[str, os.PathLike]
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS files (
+    path TEXT PRIMARY KEY,
+    file_type TEXT NOT NULL,
+    size INTEGER NOT NULL,
+    mtime REAL NOT NULL,
+    frames INTEGER NOT NULL,
+    t_start REAL,
+    t_end REAL,
+    indexed_at REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS frame_ids (
+    path TEXT NOT NULL,
+    arbitration_id INTEGER NOT NULL,
+    is_extended INTEGER NOT NULL,
+    frames INTEGER NOT NULL,
+    t_start REAL NOT NULL,
+    t_end REAL NOT NULL,
+    PRIMARY KEY (path, arbitration_id, is_extended)
+);
+CREATE TABLE IF NOT EXISTS signals (
+    path TEXT NOT NULL,
+    dbc TEXT NOT NULL,
+    signal TEXT NOT NULL,
+    message TEXT NOT NULL,
+    arbitration_id INTEGER NOT NULL,
+    frames INTEGER NOT NULL,
+    t_start REAL NOT NULL,
+    t_end REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS signals_by_name ON signals (signal, t_start, t_end);
+CREATE INDEX IF NOT EXISTS signals_by_path ON signals (path, dbc);
+CREATE INDEX IF NOT EXISTS files_by_time ON files (t_start, t_end);
+"""
+
+
+def _to_epoch(value: Any) -> Optional[float]:
+    """
+    把查询时间转换为Unix时间戳（秒）。
+
+    支持数字、数字字符串、ISO日期/时间字符串（如 "2025-03-01"、"2025-03-01T08:00"，
+    按本地时区解释）以及 datetime/date 对象（YAML中的日期会被解析为 date）。
+    """
+    if value is None or value == "":
+        return None
+    if isinstance(value, (int, float)):
+        return float(value)
+    if isinstance(value, datetime.datetime):
+        return value.timestamp()
+    if isinstance(value, datetime.date):
+        return datetime.datetime.combine(value, datetime.time()).timestamp()
+    text = str(value).strip()
+    try:
+        return float(text)
+    except ValueError:
+        return datetime.datetime.fromisoformat(text).timestamp()
+
+
+def scan_log_file(path: StringPathLike, file_type: Optional[str] = None) -> Dict[str, Any]:
+    """
+    只读取帧头（不解码）统计日志中出现的报文ID。
+
+    Args:
+        path: BLF/ASC/MF4（总线记录）文件路径，BLF/ASC可为 .gz/.zst/.xz 压缩文件
+        file_type: "blf"/"asc"/"mf4"，默认按（去掉压缩后缀后的）扩展名判断
+
+    Returns:
+        {"path", "file_type", "size", "mtime", "frames", "t_start", "t_end",
+         "ids": [(arbitration_id, is_extended, 帧数, 首帧时间, 末帧时间)]}
+    """
+    try:
+        from .cancompress import log_file_type, open_log_reader
+    except ImportError:
+        from cancompress import log_file_type, open_log_reader
+
+    path = os.path.abspath(str(path))
+    file_type = file_type or log_file_type(path)
+    ids: Any = []
+    stamps: Any = []
+    if file_type in ("mf4", "mdf"):
+        try:
+            from .canmf4 import MF4FrameReader
+        except ImportError:
+            from canmf4 import MF4FrameReader
+
+        # 总线记录按块读取为列式批次（错误帧位于单独通道组，不会读入）
+        reader = MF4FrameReader(path)
+        try:
+            for batch in reader:
+                ids.append((batch.ids << 1) | batch.is_extended)
+                stamps.append(batch.timestamps)
+        finally:
+            reader.stop()
+        ids = np.concatenate(ids) if ids else []
+        stamps = np.concatenate(stamps) if stamps else []
+    else:
+        reader = open_log_reader(path, "blf" if file_type == "blf" else "asc")
+        try:
+            for msg in reader:
+                if msg.is_error_frame:
+                    continue
+                # 扩展帧标志并入最低位，按整数键一次性分组
+                ids.append((msg.arbitration_id << 1) | int(msg.is_extended_id))
+                stamps.append(msg.timestamp)
+        finally:
+            reader.stop()
+
+    stat = os.stat(path)
+    result: Dict[str, Any] = {
+        "path": path,
+        "file_type": file_type,
+        "size": stat.st_size,
+        "mtime": stat.st_mtime,
+        "frames": len(ids),
+        "t_start": None,
+        "t_end": None,
+        "ids": [],
+    }
+    if not len(ids):
+        return result
+
+    keys = np.asarray(ids, dtype=np.int64)
+    timestamps = np.asarray(stamps, dtype=np.float64)
+    unique, inverse, counts = np.unique(keys, return_inverse=True, return_counts=True)
+    first = np.full(len(unique), np.inf)
+    last = np.full(len(unique), -np.inf)
+    np.minimum.at(first, inverse, timestamps)
+    np.maximum.at(last, inverse, timestamps)
+    result["t_start"] = float(timestamps.min())
+    result["t_end"] = float(timestamps.max())
+    result["ids"] = [
+        (int(key >> 1), int(key & 1), int(count), float(t0), float(t1))
+        for key, count, t0, t1 in zip(unique, counts, first, last)
+    ]
+    return result
+
+
+def _scan_worker(path: str) -> Dict[str, Any]:
+    """进程池入口：扫描失败时返回错误信息而不是抛出"""
+    try:
+        return scan_log_file(path)
+    except Exception as e:
+        return {"path": path, "error": f"{type(e).__name__}: {e}", "traceback": traceback.format_exc()}
+
+
+class CanInventory:
+    """
+    跨文件的报文ID/信号清单索引（单个SQLite文件）。
+
+    记录每个日志文件出现的报文ID、帧数和时间范围，以及这些ID按DBC解析出的信号，
+    用于在解码前按“包含哪些信号、在什么时间段”挑选文件。重复构建时只扫描
+    新增或大小/修改时间有变化的文件；更换DBC只需重新解析已记录的ID，无需重新扫描。
+
+    用法:
+        >>> inventory = CanInventory("inventory.sqlite")
+        >>> inventory.build("/data/logs", ["vehicle.dbc"])
+        >>> inventory.query(["RMSpd_250", "Gear"], start="2025-03-01", end="2025-03-02")
+    """
+
+    def __init__(self, inventory_path: StringPathLike, timeout: float = 60.0):
+        self.path = str(inventory_path)
+        self.timeout = timeout
+        os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+        conn = sqlite3.connect(self.path, timeout=self.timeout)
+        try:
+            conn.executescript(_SCHEMA)
+        finally:
+            conn.close()
+
+    @contextmanager
+    def _transaction(self):
+        conn = sqlite3.connect(self.path, timeout=self.timeout, isolation_level=None)
+        conn.row_factory = sqlite3.Row
+        try:
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                yield conn
+            except BaseException:
+                conn.execute("ROLLBACK")
+                raise
+            conn.execute("COMMIT")
+        finally:
+            conn.close()
+
+    def _stale_paths(self, paths: List[str]) -> List[str]:
+        """需要（重新）扫描的文件：未记录或大小/修改时间已变化"""
+        conn = sqlite3.connect(self.path, timeout=self.timeout)
+        try:
+            known = {
+                row[0]: (row[1], row[2])
+                for row in conn.execute("SELECT path, size, mtime FROM files")
+            }
+        finally:
+            conn.close()
+        stale = []
+        for path in paths:
+            stat = os.stat(path)
+            if known.get(path) != (stat.st_size, stat.st_mtime):
+                stale.append(path)
+        return stale
+
+    def _store_scan(self, conn, scan: Dict[str, Any]) -> None:
+        path = scan["path"]
+        conn.execute("DELETE FROM frame_ids WHERE path = ?", (path,))
+        conn.execute("DELETE FROM signals WHERE path = ?", (path,))
+        conn.execute(
+            "INSERT OR REPLACE INTO files (path, file_type, size, mtime, frames, t_start, t_end, indexed_at) "
+            "VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+            (
+                path,
+                scan["file_type"],
+                scan["size"],
+                scan["mtime"],
+                scan["frames"],
+                scan["t_start"],
+                scan["t_end"],
+                time.time(),
+            ),
+        )
+        conn.executemany(
+            "INSERT INTO frame_ids (path, arbitration_id, is_extended, frames, t_start, t_end) "
+            "VALUES (?, ?, ?, ?, ?, ?)",
+            [(path, *entry) for entry in scan["ids"]],
+        )
+
+    def _resolve_signals(self, dbc_path: str, router) -> int:
+        """为尚未按该DBC解析的文件写入信号记录，返回处理的文件数"""
+        dbc_key = os.path.abspath(dbc_path)
+        with self._transaction() as conn:
+            pending = [
+                row[0]
+                for row in conn.execute(
+                    "SELECT path FROM files WHERE path NOT IN "
+                    "(SELECT DISTINCT path FROM signals WHERE dbc = ?)",
+                    (dbc_key,),
+                )
+            ]
+            for path in pending:
+                rows = []
+                for frame in conn.execute(
+                    "SELECT arbitration_id, is_extended, frames, t_start, t_end FROM frame_ids WHERE path = ?",
+                    (path,),
+                ):
+                    message = router.lookup(frame["arbitration_id"], bool(frame["is_extended"]))
+                    if message is None:
+                        continue
+                    rows.extend(
+                        (
+                            path,
+                            dbc_key,
+                            __sig.name,
+                            message.name,
+                            frame["arbitration_id"],
+                            frame["frames"],
+                            frame["t_start"],
+                            frame["t_end"],
+                        )
+                        for __sig in message.signals
+                    )
+                conn.executemany(
+                    "INSERT INTO signals (path, dbc, signal, message, arbitration_id, frames, t_start, t_end) "
+                    "VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                    rows,
+                )
+        return len(pending)
+
+    def build(
+        self,
+        can_data_path: Union[StringPathLike, List[StringPathLike]],
+        dbc_paths: Union[StringPathLike, List[StringPathLike], None] = None,
+        num_processes: Optional[int] = None,
+        j1939: Optional[bool] = None,
+        id_masks: Optional[List[Union[int, str]]] = None,
+        rescan: bool = False,
+    ) -> Dict[str, Any]:
+        """
+        扫描日志文件并更新清单。
+
+        Args:
+            can_data_path: 日志文件、目录或它们的列表
+            dbc_paths: 用于把报文ID解析为信号的DBC文件（可多个），None表示只记录ID
+            num_processes: 扫描进程数，默认CPU核心数-1
+            j1939: J1939 PGN路由，与 CanDecoder 一致
+            id_masks: 额外的ID掩码路由，与 CanDecoder 一致
+            rescan: True时忽略已有记录，全部重新扫描
+
+        Returns:
+            {"files": 清单中的文件数, "scanned": 本次扫描数, "failed": [{"path", "error"}]}
+        """
+        try:
+            from .candecode import _build_decoder_map
+            from .canqueue import _list_log_files
+        except ImportError:
+            from candecode import _build_decoder_map
+            from canqueue import _list_log_files
+
+        paths = _list_log_files(can_data_path)
+        stale = paths if rescan else self._stale_paths(paths)
+        failed: List[Dict[str, str]] = []
+
+        if stale:
+            if num_processes is None:
+                num_processes = max(1, cpu_count() - 1)
+            print(f"扫描 {len(stale)} 个文件（已索引 {len(paths) - len(stale)} 个）...")
+            with Pool(processes=min(num_processes, len(stale))) as pool:
+                for scan in pool.imap_unordered(_scan_worker, stale):
+                    if "error" in scan:
+                        failed.append({"path": scan["path"], "error": scan["error"]})
+                        print(f"  ✖ {os.path.basename(scan['path'])}: {scan['error']}")
+                        continue
+                    with self._transaction() as conn:
+                        self._store_scan(conn, scan)
+
+        if dbc_paths:
+            import cantools
+
+            for dbc_path in dbc_paths if isinstance(dbc_paths, list) else [dbc_paths]:
+                dbc_data = cantools.database.load_file(str(dbc_path))
+                router = _build_decoder_map(dbc_data, j1939=j1939, id_masks=id_masks)
+                resolved = self._resolve_signals(str(dbc_path), router)
+                if resolved:
+                    print(f"✓ {os.path.basename(str(dbc_path))}: 解析 {resolved} 个文件的信号")
+
+        summary = {"files": self.count(), "scanned": len(stale) - len(failed), "failed": failed}
+        print(f"✓ 清单已更新: {self.path} (共 {summary['files']} 个文件)")
+        return summary
+
+    def count(self) -> int:
+        conn = sqlite3.connect(self.path, timeout=self.timeout)
+        try:
+            return conn.execute("SELECT COUNT(*) FROM files").fetchone()[0]
+        finally:
+            conn.close()
+
+    def query(
+        self,
+        signals: Optional[List[str]] = None,
+        start: Any = None,
+        end: Any = None,
+        match: str = "all",
+        arbitration_ids: Optional[List[int]] = None,
+    ) -> List[str]:
+        """
+        查询包含指定信号/报文ID、且在时间段内有数据的文件。
+
+        Args:
+            signals: 信号名列表，None表示不按信号过滤
+            start: 时间段起点（Unix时间戳、ISO日期字符串或date/datetime），None表示不限
+            end: 时间段终点，同上
+            match: "all" 文件须包含全部信号，"any" 包含任一即可
+            arbitration_ids: 报文ID列表，文件须包含其中任一
+
+        Returns:
+            按路径排序的文件列表（绝对路径）
+        """
+        if match not in ("all", "any"):
+            raise ValueError(f"Unsupported match: {match} (可选: all, any)")
+        t0, t1 = _to_epoch(start), _to_epoch(end)
+        clauses: List[str] = []
+        params: List[Any] = []
+
+        def overlaps(table: str) -> str:
+            parts = []
+            if t0 is not None:
+                parts.append(f"{table}.t_end >= ?")
+                params.append(t0)
+            if t1 is not None:
+                parts.append(f"{table}.t_start <= ?")
+                params.append(t1)
+            return " AND ".join(parts)
+
+        time_clause = overlaps("f")
+        if time_clause:
+            clauses.append(time_clause)
+        if signals:
+            names = list(dict.fromkeys(signals))
+            placeholders = ", ".join("?" for _ in names)
+            subquery = (
+                "SELECT COUNT(DISTINCT s.signal) FROM signals s "
+                f"WHERE s.path = f.path AND s.signal IN ({placeholders})"
+            )
+            params.extend(names)
+            signal_time = overlaps("s")
+            if signal_time:
+                subquery += f" AND {signal_time}"
+            if match == "all":
+                clauses.append(f"({subquery}) = ?")
+                params.append(len(names))
+            else:
+                clauses.append(f"({subquery}) > 0")
+        if arbitration_ids:
+            placeholders = ", ".join("?" for _ in arbitration_ids)
+            clauses.append(
+                "EXISTS (SELECT 1 FROM frame_ids i WHERE i.path = f.path "
+                f"AND i.arbitration_id IN ({placeholders}))"
+            )
+            params.extend(int(__id) for __id in arbitration_ids)
+
+        sql = "SELECT f.path FROM files f"
+        if clauses:
+            sql += " WHERE " + " AND ".join(clauses)
+        sql += " ORDER BY f.path"
+        conn = sqlite3.connect(self.path, timeout=self.timeout)
+        try:
+            return [row[0] for row in conn.execute(sql, params)]
+        finally:
+            conn.close()
+
+
+def select_log_files(
+    log_paths: List[StringPathLike], inventory_query: Dict[str, Any]
+) -> List[StringPathLike]:
+    """
+    按配置中的 inventory_query 过滤待解码文件，保持原有顺序。
+
+    Args:
+        log_paths: 候选日志文件
+        inventory_query: {"path": 清单文件, "signals", "start", "end", "match", "arbitration_ids"}
+    """
+    options = dict(inventory_query)
+    inventory_path = options.pop("path")
+    if not os.path.exists(inventory_path):
+        raise FileNotFoundError(f"Inventory not found: {inventory_path}")
+    selected = set(CanInventory(inventory_path).query(**options))
+    return [path for path in log_paths if os.path.abspath(str(path)) in selected]
+
+
+if __name__ == "__main__":
+    pass
@@ -0,0 +1,329 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+author: fenwickxie
+date: 2026-10-19 23:57:14
+filename: canjit.py
+version: 1.0
+"""
+
+import sys
+import time
+from typing import Dict, Optional
+
+import numpy as np
+
+# numba 为可选依赖：可用时热点内核按 nopython 模式编译，否则调用方使用 NumPy 实现
+try:
+    from numba import njit
+
+    NUMBA_AVAILABLE = True
+except ImportError:
+    NUMBA_AVAILABLE = False
+
+_enabled = NUMBA_AVAILABLE
+_warmed = False
+
+_FNV_OFFSET = np.uint64(0xCBF29CE484222325)
+_FNV_PRIME = np.uint64(0x100000001B3)
+
+
+def _growth_phase_flags_py(
+    values: np.ndarray, min_val: float, max_val: float, start: int, end: int
+) -> np.ndarray:
+    """
+    逐点标记信号从 min_val 增长到 max_val 的阶段（CanData.get_stage_idxs 的状态机）。
+
+    允许平台期和不超过2个单位的小幅回落；起步阶段连续等于 min_val 时只保留最后一个点；
+    回落过大时撤销本阶段已标记的点，超过 max_val 时结束阶段但保留已标记的点。
+    NaN/inf（信号缺失）不标记，按回落过大处理：撤销未完成阶段已标记的点。
+    显式判断而不是依赖 int() 的行为（Python 下抛异常，numba 下结果未定义），两条路径结果一致。
+
+    Args:
+        values: 信号值（float64）
+        min_val / max_val: 增长阶段的起止值
+        start / end: 处理的位置范围 [start, end)
+
+    Returns:
+        bool 标记数组
+    """
+    n = len(values)
+    flags = np.zeros(n, dtype=np.bool_)
+    phase = np.empty(n, dtype=np.int64)  # 当前增长阶段已标记的位置
+    count = 0
+    in_phase = False
+    for i in range(start, end):
+        x = values[i]
+        if not np.isfinite(x):
+            for k in range(count):
+                flags[phase[k]] = False
+            in_phase = False
+            count = 0
+            continue
+        v = int(x)
+        if v == min_val:
+            if in_phase and int(values[i - 1]) == min_val:
+                flags[i - 1] = False
+            in_phase = True
+            flags[i] = True
+            phase[0] = i
+            count = 1
+            continue
+        if in_phase:
+            previous = values[i - 1]
+            if v < previous:
+                if previous - v <= 2:
+                    flags[i] = True
+                    phase[count] = i
+                    count += 1
+                    continue
+                for k in range(count):
+                    flags[phase[k]] = False
+                in_phase = False
+                count = 0
+            elif min_val <= v <= max_val:
+                flags[i] = True
+                phase[count] = i
+                count += 1
+                if v == max_val:
+                    in_phase = False
+                    count = 0
+            elif v > max_val:
+                in_phase = False
+                count = 0
+    return flags
+
+
+if NUMBA_AVAILABLE:
+
+    @njit(cache=True, nogil=True)
+    def extract_window_nb(payload, first, n_bytes, shift, mask, sign_bit, little):
+        """逐行拼接载荷字节窗口为uint64并移位、掩码（n_bytes <= 8），sign_bit 非0时按补码符号扩展"""
+        n = payload.shape[0]
+        out = np.empty(n, dtype=np.uint64)
+        eight = np.uint64(8)
+        for i in range(n):
+            word = np.uint64(0)
+            if little:
+                for j in range(n_bytes - 1, -1, -1):
+                    word = (word << eight) | np.uint64(payload[i, first + j])
+            else:
+                for j in range(n_bytes):
+                    word = (word << eight) | np.uint64(payload[i, first + j])
+            value = (word >> shift) & mask
+            if value & sign_bit:
+                value |= ~mask
+            out[i] = value
+        return out
+
+    @njit(cache=True, nogil=True)
+    def zoh_indices_nb(timestamps, grid):
+        """零阶保持：每个网格点取不晚于它的最后一个采样序号（两者均升序，线性归并）"""
+        n = len(timestamps)
+        out = np.empty(len(grid), dtype=np.int64)
+        j = 0
+        for k in range(len(grid)):
+            g = grid[k]
+            while j < n and timestamps[j] <= g:
+                j += 1
+            out[k] = j - 1 if j > 0 else 0
+        return out
+
+    @njit(cache=True, nogil=True)
+    def _same_frame(a, b, ids, lengths, payload, channels, by_channel):
+        """两帧的ID、长度、载荷整行（及通道）是否完全相同"""
+        if ids[a] != ids[b] or lengths[a] != lengths[b]:
+            return False
+        if by_channel and channels[a] != channels[b]:
+            return False
+        for j in range(payload.shape[1]):
+            if payload[a, j] != payload[b, j]:
+                return False
+        return True
+
+    @njit(cache=True, nogil=True)
+    def dedup_keep_nb(order, ids, lengths, payload, channels, by_channel, timestamps, rank, tolerance):
+        """
+        按时间顺序 order 扫描一遍，用开放寻址哈希表按 (ID, 长度, 载荷[, 通道]) 归组，
+        与组内上一副本时间差不超过 tolerance 时并入该组，否则结束该组、开始新组；
+        每组保留 rank 最小（同 rank 取最早）的帧。不需要按分组键排序。
+        """
+        n = len(order)
+        keep = np.zeros(n, dtype=np.bool_)
+        size = 16
+        while size < 2 * n:
+            size *= 2
+        slot_mask = np.uint64(size - 1)
+        last = np.full(size, -1, dtype=np.int64)  # 每个分组键最近一帧
+        best = np.empty(size, dtype=np.int64)  # 每个分组键当前组的保留帧
+        for p in range(n):
+            row = order[p]
+            h = (_FNV_OFFSET ^ np.uint64(ids[row])) * _FNV_PRIME
+            h = (h ^ np.uint64(lengths[row])) * _FNV_PRIME
+            if by_channel:
+                h = (h ^ np.uint64(channels[row])) * _FNV_PRIME
+            for j in range(payload.shape[1]):
+                h = (h ^ np.uint64(payload[row, j])) * _FNV_PRIME
+            s = np.int64((h ^ (h >> np.uint64(32))) & slot_mask)
+            while last[s] != -1 and not _same_frame(row, last[s], ids, lengths, payload, channels, by_channel):
+                s = (s + 1) & (size - 1)
+            if last[s] == -1:
+                best[s] = row
+            elif timestamps[row] - timestamps[last[s]] <= tolerance:
+                b = best[s]
+                if rank[row] < rank[b] or (rank[row] == rank[b] and timestamps[row] < timestamps[b]):
+                    best[s] = row
+            else:
+                keep[best[s]] = True
+                best[s] = row
+            last[s] = row
+        for s in range(size):
+            if last[s] != -1:
+                keep[best[s]] = True
+        return keep
+
+    growth_phase_flags_nb = njit(cache=True, nogil=True)(_growth_phase_flags_py)
+else:
+    extract_window_nb = zoh_indices_nb = dedup_keep_nb = growth_phase_flags_nb = None
+
+
+def set_numba_enabled(enabled: bool) -> bool:
+    """开关JIT内核（numba不可用时始终关闭），返回实际状态"""
+    global _enabled
+    _enabled = bool(enabled) and NUMBA_AVAILABLE
+    return _enabled
+
+
+def numba_enabled() -> bool:
+    """JIT内核是否启用；首次使用时编译（或从磁盘缓存加载）全部内核"""
+    if _enabled and not _warmed:
+        warm_up()
+    return _enabled
+
+
+def warm_up() -> float:
+    """
+    用小输入触发全部内核的编译，结果写入 __pycache__ 磁盘缓存，
+    之后的进程（含多进程子进程）直接加载，不再重复编译。
+
+    Returns:
+        耗时（秒），numba不可用时为0
+    """
+    global _warmed
+    if not NUMBA_AVAILABLE or _warmed:
+        return 0.0
+    started = time.perf_counter()
+    payload = np.zeros((4, 8), dtype=np.uint8)
+    lengths = np.full(4, 8, dtype=np.int32)
+    t = np.arange(4, dtype=np.float64)
+    ids = np.zeros(4, dtype=np.int64)
+    # 载荷矩阵可能是连续数组或切片视图，两种布局都预先编译
+    for block in (payload, payload[:2], payload[:, :4], payload[::2]):
+        extract_window_nb(block, 0, 2, np.uint64(0), np.uint64(0xFFFF), np.uint64(0), True)
+        dedup_keep_nb(np.arange(len(block)), ids, lengths, block, ids, False, t, t, 0.001)
+    zoh_indices_nb(t, t)
+    growth_phase_flags_nb(t, 0.0, 3.0, 0, 3)
+    _warmed = True
+    return time.perf_counter() - started
+
+
+def growth_phase_flags(
+    values: np.ndarray, min_val: float, max_val: float, start: int, end: int
+) -> np.ndarray:
+    """增长阶段标记（见 _growth_phase_flags_py），启用时使用JIT内核"""
+    values = np.ascontiguousarray(values, dtype=np.float64)
+    if numba_enabled():
+        return growth_phase_flags_nb(values, float(min_val), float(max_val), int(start), int(end))
+    return _growth_phase_flags_py(values, min_val, max_val, start, end)
+
+
+def _benchmark(log_file_path: Optional[str] = None, dbc_path: Optional[str] = None) -> Dict[str, float]:
+    """
+    对比JIT内核与NumPy实现的耗时（并校验结果一致）；指定日志和DBC时另外对比整文件解码。
+
+    用法: python canjit.py [日志文件 DBC文件]
+    """
+    try:
+        from .cankernels import FrameBatch, extract_raw
+        from .canraster import raster_signal
+    except ImportError:
+        from cankernels import FrameBatch, extract_raw
+        from canraster import raster_signal
+    try:
+        from .candecode import _duplicate_keep_mask
+    except ImportError:
+        from candecode import _duplicate_keep_mask
+    # 作为脚本运行时本文件是 __main__，开关需作用于其他模块导入的 canjit
+    try:
+        from . import canjit as jit
+    except ImportError:
+        import canjit as jit
+
+    def timed(fn, repeat=3):
+        best = float("inf")
+        for _ in range(repeat):
+            started = time.perf_counter()
+            result = fn()
+            best = min(best, time.perf_counter() - started)
+        return best, result
+
+    print(f"numba: {'可用' if NUMBA_AVAILABLE else '不可用'}，预热 {jit.warm_up():.2f}s")
+    rng = np.random.default_rng(0)
+    n = 1_000_000
+    payload = rng.integers(0, 256, (n, 8), dtype=np.uint8)
+    t = np.cumsum(rng.uniform(0.0005, 0.0015, n))
+    grid = np.arange(t[0], t[-1], 0.002)
+    ids = rng.choice(np.array([0x100, 0x101, 0x200]), n)
+    frames = FrameBatch(np.repeat(t[: n // 2], 2), np.repeat(ids[: n // 2], 2),
+                        np.tile([0, 1], n // 2), np.full(n, 8), np.repeat(payload[: n // 2], 2, axis=0))
+    gear = np.clip(np.cumsum(rng.choice([-1, 0, 0, 1], n)) % 120, 0, 100).astype(np.float64)
+
+    cases = {
+        "extract_raw (1M帧, 12位Motorola)": lambda: extract_raw(payload, 12, 12, "big_endian", True),
+        "extract_raw (1M帧, 32位Intel)": lambda: extract_raw(payload, 8, 32, "little_endian"),
+        "zero-order hold (1M采样 -> 网格)": lambda: raster_signal(t, gear, grid, "previous"),
+        "duplicate detection (1M帧)": lambda: _duplicate_keep_mask(frames, 0.001, "across", "first"),
+        "growth phase (1M点)": lambda: jit.growth_phase_flags(gear, 0, 100, 0, n - 1),
+    }
+    results: Dict[str, float] = {}
+    for name, case in cases.items():
+        jit.set_numba_enabled(False)
+        base, expected = timed(case, 1 if "growth" in name else 3)
+        jit.set_numba_enabled(True)
+        fast, actual = timed(case)
+        same = np.array_equal(expected, actual)
+        results[name] = base / fast if fast else float("nan")
+        print(f"  {name}: NumPy {base*1000:.1f}ms, JIT {fast*1000:.1f}ms, "
+              f"{results[name]:.1f}x {'✓' if same else '⚠ 结果不一致'}")
+
+    if log_file_path and dbc_path:
+        import cantools
+
+        try:
+            from .candecode import _build_decoder_map, _iter_decode_chunks, _open_can_reader
+            from .cancompress import log_file_type
+        except ImportError:
+            from candecode import _build_decoder_map, _iter_decode_chunks, _open_can_reader
+            from cancompress import log_file_type
+
+        decoder_map = _build_decoder_map(cantools.database.load_file(dbc_path, strict=False))
+
+        def decode_file():
+            reader = _open_can_reader(log_file_path, log_file_type(log_file_path))
+            try:
+                return sum(len(c["signals"]) for c in _iter_decode_chunks(reader, decoder_map, chunk_frames=50000))
+            finally:
+                reader.stop()
+
+        jit.set_numba_enabled(False)
+        base, _ = timed(decode_file, 1)
+        jit.set_numba_enabled(True)
+        fast, _ = timed(decode_file, 1)
+        results["decode file"] = base / fast if fast else float("nan")
+        print(f"  解码 {log_file_path}: NumPy {base:.2f}s, JIT {fast:.2f}s, {results['decode file']:.1f}x")
+    return results
+
+
+if __name__ == "__main__":
+    _benchmark(*sys.argv[1:3])
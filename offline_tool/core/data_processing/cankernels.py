@@ -0,0 +1,360 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+author: fenwickxie
+date: 2026-10-19 16:02:41
+filename: cankernels.py
+version: 1.0
+"""
+
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+try:
+    from .canjit import extract_window_nb, numba_enabled
+except ImportError:  # 作为脚本直接运行时
+    from canjit import extract_window_nb, numba_enabled
+
+_U64_ONE = np.uint64(1)
+
+
+def signal_byte_window(start: int, length: int, byte_order: str) -> Tuple[int, int, int]:
+    """
+    计算信号在报文中占用的连续字节窗口。
+
+    Args:
+        start: DBC起始位（cantools Signal.start；Motorola格式为最高位所在位置）
+        length: 信号位长度
+        byte_order: "little_endian"（Intel）或 "big_endian"（Motorola）
+
+    Returns:
+        (首字节序号, 字节数, 最低位在拼接整数中的偏移)
+    """
+    if byte_order == "little_endian":
+        first = start // 8
+        last = (start + length - 1) // 8
+        return first, last - first + 1, start % 8
+
+    # Motorola：从最高位开始按锯齿顺序走到最低位
+    lsb = start
+    for _ in range(length - 1):
+        lsb = lsb + 15 if lsb % 8 == 0 else lsb - 1
+    first = start // 8
+    last = lsb // 8
+    return first, last - first + 1, lsb % 8
+
+
+def extract_raw(
+    payload: np.ndarray,
+    start: int,
+    length: int,
+    byte_order: str,
+    is_signed: bool = False,
+) -> np.ndarray:
+    """
+    从报文载荷矩阵中批量提取信号原始值。
+
+    Args:
+        payload: uint8 载荷矩阵，形状 (帧数, 报文长度)
+        start: DBC起始位
+        length: 信号位长度（1~64）
+        byte_order: "little_endian" 或 "big_endian"
+        is_signed: 是否按二进制补码解释
+
+    Returns:
+        原始值数组（有符号为int64，无符号为uint64）
+    """
+    first, n_bytes, shift = signal_byte_window(start, length, byte_order)
+    window = payload[:, first : first + n_bytes]
+    little = byte_order == "little_endian"
+
+    if n_bytes > 8:
+        # 非字节对齐的64位信号跨9个字节，超出uint64，逐行按Python整数处理
+        mask = (1 << length) - 1
+        values = [
+            (int.from_bytes(bytes(row), "little" if little else "big") >> shift) & mask
+            for row in window
+        ]
+        raw = np.array(values, dtype=np.uint64)
+    elif numba_enabled():
+        # JIT内核逐行拼接、移位、掩码和符号扩展一次完成，不产生中间数组
+        mask = (_U64_ONE << np.uint64(length)) - _U64_ONE if length < 64 else ~np.uint64(0)
+        sign_bit = _U64_ONE << np.uint64(length - 1) if is_signed else np.uint64(0)
+        raw = extract_window_nb(payload, first, n_bytes, np.uint64(shift), mask, sign_bit, little)
+        return raw.view(np.int64) if is_signed else raw
+    else:
+        word = np.zeros(len(payload), dtype=np.uint64)
+        for j in range(n_bytes):
+            byte_shift = 8 * j if little else 8 * (n_bytes - 1 - j)
+            word |= window[:, j].astype(np.uint64) << np.uint64(byte_shift)
+        raw = word >> np.uint64(shift)
+        if length < 64:
+            raw &= (_U64_ONE << np.uint64(length)) - _U64_ONE
+
+    if not is_signed:
+        return raw
+    if length == 64:
+        return raw.view(np.int64)
+    signed = raw.astype(np.int64)
+    negative = signed >= (1 << (length - 1))
+    signed[negative] -= 1 << length
+    return signed
+
+
+def decode_signal(payload: np.ndarray, signal) -> np.ndarray:
+    """
+    批量解码单个信号的物理值（raw * scale + offset）。
+
+    Args:
+        payload: uint8 载荷矩阵，形状 (帧数, 报文长度)
+        signal: cantools Signal
+
+    Returns:
+        float64 物理值数组
+    """
+    raw = extract_raw(
+        payload,
+        signal.start,
+        signal.length,
+        signal.byte_order,
+        signal.is_signed and not signal.is_float,
+    )
+    if signal.is_float:
+        if signal.length == 32:
+            with np.errstate(invalid="ignore"):  # signaling NaN 转换时会置invalid标志
+                values = raw.astype(np.uint32).view(np.float32).astype(np.float64)
+        else:
+            values = raw.view(np.float64).copy()
+    else:
+        values = raw.astype(np.float64)
+    if signal.scale != 1 or signal.offset != 0:
+        values = values * signal.scale + signal.offset
+    return values
+
+
+def is_enum_signal(signal) -> bool:
+    """带值表（VAL_）且物理值即原始值（scale=1, offset=0）的整数信号，按码值输出"""
+    return bool(signal.choices) and not signal.is_float and signal.scale == 1 and signal.offset == 0
+
+
+def enum_code_dtype(signal) -> np.dtype:
+    """容纳值表信号原始码值的最小整数类型"""
+    for bits in (8, 16, 32, 64):
+        if signal.length <= bits:
+            return np.dtype(f"{'int' if signal.is_signed else 'uint'}{bits}")
+    return np.dtype(np.int64)
+
+
+def decode_signal_choices(payload: np.ndarray, signal) -> np.ndarray:
+    """
+    批量解码信号，带值表（VAL_）的信号在原始值命中值表时输出原始码值，
+    与逐帧 cantools decode 后取 NamedSignalValue.value 的结果一致。
+
+    枚举信号（见 is_enum_signal）直接输出紧凑整数码值，标签不逐样本展开，
+    由输出阶段按DBC值表附加（栅格化时也按整数零阶保持，不会插值出不存在的码值）。
+    """
+    if is_enum_signal(signal):
+        raw = extract_raw(
+            payload, signal.start, signal.length, signal.byte_order, signal.is_signed
+        )
+        return raw.astype(enum_code_dtype(signal))
+    values = decode_signal(payload, signal)
+    if signal.choices:
+        raw = extract_raw(
+            payload, signal.start, signal.length, signal.byte_order, signal.is_signed
+        )
+        codes = np.fromiter(signal.choices.keys(), dtype=np.int64, count=len(signal.choices))
+        hit = np.isin(raw, codes)
+        values[hit] = raw[hit]
+    return values
+
+
+class MessageKernel:
+    """
+    单个DBC报文的批量解码核。
+
+    编译时把报文拆成普通信号和“多路复用值 -> 信号集合”的分派表；解码时一次
+    提取整批帧的多路复用值，按取值分组后对每组的信号做向量化提取。
+    嵌套多路复用和容器报文不支持（见 supports），由调用方回退到逐帧解码。
+    """
+
+    def __init__(self, message):
+        self.name = message.name
+        self.length = message.length
+        self.plain = [s for s in message.signals if s.multiplexer_signal is None]
+        muxes = [s for s in self.plain if s.is_multiplexer]
+        self.mux_signal = muxes[0] if muxes else None
+        self.dispatch: Dict[int, List] = {}
+        for __sig in message.signals:
+            if __sig.multiplexer_signal is not None:
+                for mux_id in __sig.multiplexer_ids or []:
+                    self.dispatch.setdefault(mux_id, []).append(__sig)
+
+    @staticmethod
+    def supports(message) -> bool:
+        """报文是否可以批量解码（单层多路复用、非容器报文）"""
+        if getattr(message, "is_container", False):
+            return False
+        top_level = [
+            s.name for s in message.signals if s.is_multiplexer and s.multiplexer_signal is None
+        ]
+        if len(top_level) > 1:
+            return False
+        return all(
+            s.multiplexer_signal is None
+            or (s.multiplexer_signal in top_level and not s.is_multiplexer)
+            for s in message.signals
+        )
+
+    def decode(
+        self, payload: np.ndarray, wanted: Optional[set] = None
+    ) -> List[Tuple[str, Optional[np.ndarray], np.ndarray]]:
+        """
+        批量解码一组帧。
+
+        Args:
+            payload: uint8 载荷矩阵，形状 (帧数, 报文长度)
+            wanted: 需要输出的信号名集合，None表示全部
+
+        Returns:
+            [(信号名, 行序号或None（表示全部行）, 值数组)]
+        """
+        results: List[Tuple[str, Optional[np.ndarray], np.ndarray]] = []
+        for __sig in self.plain:
+            if wanted is None or __sig.name in wanted:
+                results.append((__sig.name, None, decode_signal_choices(payload, __sig)))
+        if self.mux_signal is None or not self.dispatch:
+            return results
+
+        mux_values = decode_signal(payload, self.mux_signal)
+        for mux_id, signals in self.dispatch.items():
+            selected = [s for s in signals if wanted is None or s.name in wanted]
+            if not selected:
+                continue
+            rows = np.flatnonzero(mux_values == mux_id)
+            if len(rows) == 0:
+                continue
+            group = payload[rows]
+            for __sig in selected:
+                results.append((__sig.name, rows, decode_signal_choices(group, __sig)))
+        return results
+
+
+class FrameBatch:
+    """
+    一批CAN帧的列式表示，批量校验/去重/解码都直接在这些数组上进行。
+
+    BLF/ASC读取器产出的 can.Message 逐帧打包一次（from_messages）；MF4总线记录
+    由读取器直接按记录数组构造，不经过逐帧对象。
+
+    Attributes:
+        timestamps: float64 绝对时间戳（秒）
+        ids: int64 仲裁ID
+        channels: int64 通道号（0起，未知为-1）
+        lengths: int32 数据字节数
+        payload: uint8 载荷矩阵，形状 (帧数, 最大字节数)，不足部分补0
+        is_fd / is_error / is_remote / is_extended: bool 帧类型标志
+    """
+
+    def __init__(
+        self,
+        timestamps: np.ndarray,
+        ids: np.ndarray,
+        channels: np.ndarray,
+        lengths: np.ndarray,
+        payload: np.ndarray,
+        is_fd: Optional[np.ndarray] = None,
+        is_error: Optional[np.ndarray] = None,
+        is_remote: Optional[np.ndarray] = None,
+        is_extended: Optional[np.ndarray] = None,
+    ):
+        n = len(timestamps)
+        self.timestamps = np.asarray(timestamps, dtype=np.float64)
+        self.ids = np.asarray(ids, dtype=np.int64)
+        self.channels = np.asarray(channels, dtype=np.int64)
+        self.lengths = np.asarray(lengths, dtype=np.int32)
+        self.payload = np.asarray(payload, dtype=np.uint8).reshape(n, -1)
+        self.is_fd = np.zeros(n, dtype=bool) if is_fd is None else np.asarray(is_fd, dtype=bool)
+        self.is_error = (
+            np.zeros(n, dtype=bool) if is_error is None else np.asarray(is_error, dtype=bool)
+        )
+        self.is_remote = (
+            np.zeros(n, dtype=bool) if is_remote is None else np.asarray(is_remote, dtype=bool)
+        )
+        # 未提供时按ID范围推断（超过11位即为扩展帧）
+        self.is_extended = (
+            self.ids > 0x7FF if is_extended is None else np.asarray(is_extended, dtype=bool)
+        )
+
+    def __len__(self) -> int:
+        return len(self.timestamps)
+
+    @classmethod
+    def from_messages(cls, messages: List) -> "FrameBatch":
+        """把 can.Message 列表打包为列式批次"""
+        n = len(messages)
+        lengths = np.fromiter((len(m.data) for m in messages), dtype=np.int32, count=n)
+        width = int(lengths.max()) if n else 0
+        buffer = b"".join(bytes(m.data).ljust(width, b"\x00") for m in messages)
+        return cls(
+            np.fromiter((m.timestamp for m in messages), dtype=np.float64, count=n),
+            np.fromiter((m.arbitration_id for m in messages), dtype=np.int64, count=n),
+            np.fromiter(
+                (m.channel if isinstance(m.channel, int) else -1 for m in messages),
+                dtype=np.int64,
+                count=n,
+            ),
+            lengths,
+            np.frombuffer(buffer, dtype=np.uint8).reshape(n, width),
+            np.fromiter((m.is_fd for m in messages), dtype=bool, count=n),
+            np.fromiter((m.is_error_frame for m in messages), dtype=bool, count=n),
+            np.fromiter((m.is_remote_frame for m in messages), dtype=bool, count=n),
+            np.fromiter((m.is_extended_id for m in messages), dtype=bool, count=n),
+        )
+
+    def take(self, rows) -> "FrameBatch":
+        """按切片或行序号取子批次"""
+        return FrameBatch(
+            self.timestamps[rows],
+            self.ids[rows],
+            self.channels[rows],
+            self.lengths[rows],
+            self.payload[rows],
+            self.is_fd[rows],
+            self.is_error[rows],
+            self.is_remote[rows],
+            self.is_extended[rows],
+        )
+
+    @staticmethod
+    def concat(batches: List["FrameBatch"]) -> "FrameBatch":
+        """合并多个批次（载荷宽度不同时补0对齐）"""
+        if len(batches) == 1:
+            return batches[0]
+        width = max(b.payload.shape[1] for b in batches)
+        payload = np.zeros((sum(len(b) for b in batches), width), dtype=np.uint8)
+        row = 0
+        for b in batches:
+            payload[row : row + len(b), : b.payload.shape[1]] = b.payload
+            row += len(b)
+        return FrameBatch(
+            np.concatenate([b.timestamps for b in batches]),
+            np.concatenate([b.ids for b in batches]),
+            np.concatenate([b.channels for b in batches]),
+            np.concatenate([b.lengths for b in batches]),
+            payload,
+            np.concatenate([b.is_fd for b in batches]),
+            np.concatenate([b.is_error for b in batches]),
+            np.concatenate([b.is_remote for b in batches]),
+            np.concatenate([b.is_extended for b in batches]),
+        )
+
+    def data(self, i: int) -> bytes:
+        """第 i 帧的原始数据字节（逐帧回退解码用）"""
+        return self.payload[i, : self.lengths[i]].tobytes()
+
+
+if __name__ == "__main__":
+    pass
@@ -0,0 +1,165 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+author: fenwickxie
+date: 2026-10-19 23:18:52
+filename: canmf4.py
+version: 1.0
+"""
+
+import os
+from typing import Dict, Iterator, List, Optional, TypeAlias, Union
+
+import numpy as np
+
+try:
+    from .cankernels import FrameBatch
+except ImportError:  # 作为脚本直接运行时
+    from cankernels import FrameBatch
+
+StringPathLike: TypeAlias = Union[str, os.PathLike]
+
+# ASAM MDF总线记录（bus logging）中CAN数据帧的通道名
+CAN_DATA_FRAME = "CAN_DataFrame"
+# 每次从通道组读取的记录数
+MF4_WINDOW_RECORDS = 100_000
+# CAN FD 的 DLC 到数据字节数
+_FD_DLC_LENGTHS = np.array([0, 1, 2, 3, 4, 5, 6, 7, 8, 12, 16, 20, 24, 32, 48, 64], dtype=np.int32)
+
+
+def _field(samples: np.ndarray, name: str) -> Optional[np.ndarray]:
+    """取记录数组中的 CAN_DataFrame.<name> 字段，不存在时返回None"""
+    key = f"{CAN_DATA_FRAME}.{name}"
+    return samples[key] if key in (samples.dtype.names or ()) else None
+
+
+def _frame_batch(samples: np.ndarray, timestamps: np.ndarray) -> FrameBatch:
+    """
+    把 CAN_DataFrame 记录数组转换为列式帧批次。
+
+    Args:
+        samples: CAN_DataFrame 结构化数组（asammdf raw=True 读取）
+        timestamps: 绝对时间戳（秒）
+
+    Returns:
+        FrameBatch
+    """
+    n = len(samples)
+    ids = _field(samples, "ID").astype(np.int64) & 0x1FFFFFFF
+    bus = _field(samples, "BusChannel")
+    channels = bus.astype(np.int64) - 1 if bus is not None else np.full(n, -1, dtype=np.int64)
+
+    data = _field(samples, "DataBytes")
+    if data.dtype == object:
+        # 可变长度存储（VLSD）：每条记录一个字节串
+        stored = np.fromiter((len(d) for d in data), dtype=np.int32, count=n)
+        width = int(stored.max()) if n else 0
+        buffer = b"".join(bytes(d).ljust(width, b"\x00") for d in data)
+        payload = np.frombuffer(buffer, dtype=np.uint8).reshape(n, width)
+    else:
+        payload = np.asarray(data, dtype=np.uint8).reshape(n, -1)
+        stored = np.full(n, payload.shape[1], dtype=np.int32)
+
+    data_length = _field(samples, "DataLength")
+    if data_length is not None:
+        lengths = data_length.astype(np.int32)
+    else:
+        dlc = _field(samples, "DLC")
+        lengths = _FD_DLC_LENGTHS[np.clip(dlc.astype(np.int64), 0, 15)] if dlc is not None else stored
+    edl = _field(samples, "EDL")
+    ide = _field(samples, "IDE")
+    return FrameBatch(
+        timestamps,
+        ids,
+        channels,
+        np.minimum(lengths, stored),
+        payload,
+        is_fd=edl.astype(bool) if edl is not None else None,
+        is_extended=ide.astype(bool) if ide is not None else None,
+    )
+
+
+class MF4FrameReader:
+    """
+    MF4总线记录文件的CAN帧读取器。
+
+    按 ASAM MDF 总线记录规范读取 CAN_DataFrame 通道组，每次整块读取
+    window_records 条记录并直接产出 FrameBatch，不逐帧构造 can.Message。
+    多个总线的通道组按时间归并为一条时间线；时间戳加上文件头起始时间，与BLF/ASC一致为绝对时间。
+
+    远程帧/错误帧位于单独的 CAN_RemoteFrame/CAN_ErrorFrame 通道组，不读取。
+
+    Example:
+        >>> reader = MF4FrameReader("logs/drive_001.mf4")
+        >>> for batch in reader:
+        ...     print(len(batch), batch.timestamps[0])
+        >>> reader.stop()
+    """
+
+    def __init__(self, log_file_path: StringPathLike, window_records: int = MF4_WINDOW_RECORDS):
+        from asammdf import MDF
+
+        self.path = str(log_file_path)
+        self.window_records = window_records if window_records > 0 else MF4_WINDOW_RECORDS
+        self._mdf = MDF(self.path)
+        self.groups: List[int] = sorted(
+            {group for group, _ in self._mdf.channels_db.get(CAN_DATA_FRAME, ())}
+        )
+        if not self.groups:
+            self._mdf.close()
+            raise ValueError(f"No {CAN_DATA_FRAME} bus logging group in {self.path}")
+        self._t0 = self._mdf.header.start_time.timestamp()
+
+    def _iter_group(self, group: int) -> Iterator[FrameBatch]:
+        """按窗口读取单个通道组"""
+        cycles = int(self._mdf.groups[group].channel_group.cycles_nr)
+        for offset in range(0, cycles, self.window_records):
+            sig = self._mdf.get(
+                CAN_DATA_FRAME,
+                group=group,
+                record_offset=offset,
+                record_count=min(self.window_records, cycles - offset),
+                raw=True,
+            )
+            if len(sig.timestamps):
+                yield _frame_batch(sig.samples, sig.timestamps + self._t0)
+
+    def __iter__(self) -> Iterator[FrameBatch]:
+        if len(self.groups) == 1:
+            yield from self._iter_group(self.groups[0])
+            return
+
+        # 多个通道组：每轮只产出不晚于各组当前窗口末尾最小时间的帧，保证整体按时间有序
+        sources = {g: self._iter_group(g) for g in self.groups}
+        pending: Dict[int, FrameBatch] = {}
+        for g, source in sources.items():
+            batch = next(source, None)
+            if batch is not None:
+                pending[g] = batch
+        while pending:
+            frontier = min(batch.timestamps[-1] for batch in pending.values())
+            parts = []
+            for g in list(pending):
+                batch = pending[g]
+                cut = int(np.searchsorted(batch.timestamps, frontier, side="right"))
+                if cut:
+                    parts.append(batch.take(slice(0, cut)))
+                if cut < len(batch):
+                    pending[g] = batch.take(slice(cut, None))
+                else:
+                    following = next(sources[g], None)
+                    if following is None:
+                        del pending[g]
+                    else:
+                        pending[g] = following
+            merged = FrameBatch.concat(parts)
+            yield merged.take(np.argsort(merged.timestamps, kind="stable"))
+
+    def stop(self) -> None:
+        """关闭文件（与 python-can 读取器接口一致）"""
+        self._mdf.close()
+
+
+if __name__ == "__main__":
+    pass
@@ -0,0 +1,245 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+author: fenwickxie
+date: 2026-10-19 20:12:48
+filename: canquality.py
+version: 1.0
+"""
+
+import re
+from typing import Any, Dict, List, Optional
+
+import numpy as np
+
+# 计数器/校验信号的命名约定（RollingCounter、AliveCnt、MsgCntr、xxx_CRC、Checksum 等）；
+# 计数器关键字须是完整的词（按下划线/驼峰切分），避免 Encounter、DiscountRate 之类误判
+COUNTER_PATTERN = re.compile(r"(?i)(?:^|_)(counter|cnt|cntr|alive|rolling)(?:_|$|\d)")
+CRC_PATTERN = re.compile(r"(?i)(crc|checksum|chks)")
+
+# 每类问题在报告中最多列出的时间区间数
+MAX_EXAMPLES = 5
+
+
+def _word_split(name: str) -> str:
+    """驼峰命名在大小写边界处插入下划线：AliveCnt -> Alive_Cnt"""
+    return re.sub(r"(?<=[a-z0-9])(?=[A-Z])", "_", name)
+
+
+def _is_counter_name(name: str) -> bool:
+    """信号名是否符合计数器命名约定（CRC/校验信号除外）"""
+    return bool(COUNTER_PATTERN.search(_word_split(name))) and not CRC_PATTERN.search(name)
+
+
+def _runs_of_equal(values: np.ndarray):
+    """相等值连续段的起止下标 (starts, ends)，ends 为含端点"""
+    change = np.flatnonzero(values[1:] != values[:-1]) + 1
+    starts = np.concatenate(([0], change))
+    ends = np.concatenate((change - 1, [len(values) - 1]))
+    return starts, ends
+
+
+def _examples(t_start: np.ndarray, t_end: np.ndarray, weight: np.ndarray) -> List[List[float]]:
+    """按 weight 从大到小取前几个 [t_start, t_end] 区间"""
+    top = np.argsort(-weight, kind="stable")[:MAX_EXAMPLES]
+    return [[float(t_start[i]), float(t_end[i])] for i in top]
+
+
+def _counter_modulus(meta: Dict[str, Any]) -> Optional[int]:
+    """计数器回绕模数：DBC最大值+1（整数计数器），否则 2^位长"""
+    length = meta.get("length")
+    if not length:
+        return None
+    if (meta.get("scale", 1) == 1 and meta.get("offset", 0) == 0 and meta.get("maximum")
+            and 0 < meta["maximum"] < 2**length - 1):
+        return int(meta["maximum"]) + 1
+    return 2**length
+
+
+def check_signal_quality(
+    name: str,
+    timestamps: np.ndarray,
+    values: np.ndarray,
+    meta: Optional[Dict[str, Any]] = None,
+    gap_factor: float = 3.0,
+    stuck_seconds: Optional[float] = 10.0,
+) -> Dict[str, Any]:
+    """
+    对单个信号的解码数组做向量化质量检查（只用NumPy，不再读取原始数据）。
+
+    Args:
+        name: 信号名（用于识别计数器/CRC信号）
+        timestamps: 解码时间戳（按到达顺序，未排序）
+        values: 物理值
+        meta: build_signal_meta 给出的DBC元数据（minimum/maximum/cycle_time/length/scale/offset/choices）
+        gap_factor: 采样间隔超过 gap_factor × 周期 视为丢帧；DBC无周期时用间隔中位数
+        stuck_seconds: 非枚举信号保持同一值超过该时长视为卡滞，None 表示不检查
+
+    Returns:
+        {问题类型: 详情}，无问题时为空字典。问题类型包括
+        non_monotonic、gaps、stuck、out_of_range、counter_breaks、crc_repeats
+    """
+    meta = meta or {}
+    issues: Dict[str, Any] = {}
+    n = len(timestamps)
+    if n < 2:
+        return issues
+    timestamps = np.asarray(timestamps, dtype=np.float64)
+    values = np.asarray(values, dtype=np.float64)
+    dt = np.diff(timestamps)
+
+    # 时间戳倒退
+    backwards = np.flatnonzero(dt < 0)
+    if len(backwards):
+        issues["non_monotonic"] = {
+            "count": int(len(backwards)),
+            "max_backstep": float(-dt[backwards].min()),
+            "examples": _examples(
+                timestamps[backwards], timestamps[backwards + 1], -dt[backwards]
+            ),
+        }
+
+    # 丢帧/发送中断：间隔超过 k 倍周期
+    forward = dt[dt > 0]
+    cycle = meta.get("cycle_time") or (float(np.median(forward)) if len(forward) else None)
+    if cycle:
+        gap_idx = np.flatnonzero(dt > gap_factor * cycle)
+        if len(gap_idx):
+            issues["gaps"] = {
+                "count": int(len(gap_idx)),
+                "expected_cycle": float(cycle),
+                "max_gap": float(dt[gap_idx].max()),
+                "total_gap_seconds": float(dt[gap_idx].sum()),
+                "examples": _examples(
+                    timestamps[gap_idx], timestamps[gap_idx + 1], dt[gap_idx]
+                ),
+            }
+
+    finite = np.isfinite(values)
+
+    # 超出DBC物理范围（min=max=0 表示DBC未定义范围）
+    lo, hi = meta.get("minimum"), meta.get("maximum")
+    if lo is not None and hi is not None and hi > lo:
+        tolerance = 1e-9 * max(abs(lo), abs(hi), 1.0)
+        outside = finite & ((values < lo - tolerance) | (values > hi + tolerance))
+        n_out = int(outside.sum())
+        if n_out:
+            issues["out_of_range"] = {
+                "count": n_out,
+                "range": [float(lo), float(hi)],
+                "observed": [float(values[finite].min()), float(values[finite].max())],
+            }
+
+    is_counter = _is_counter_name(name)
+    is_crc = bool(CRC_PATTERN.search(name))
+
+    # 卡滞：长时间保持同一值（枚举/计数器/CRC信号另行处理）
+    if stuck_seconds and not meta.get("choices") and not is_counter and not is_crc:
+        starts, ends = _runs_of_equal(values)
+        durations = timestamps[ends] - timestamps[starts]
+        stuck = np.flatnonzero((durations >= stuck_seconds) & (ends > starts))
+        if len(stuck):
+            issues["stuck"] = {
+                "count": int(len(stuck)),
+                "constant": bool(len(starts) == 1),
+                "longest_seconds": float(durations[stuck].max()),
+                "examples": _examples(
+                    timestamps[starts[stuck]], timestamps[ends[stuck]], durations[stuck]
+                ),
+            }
+
+    # 计数器：相邻帧原始值之差（按回绕模数）应为1
+    modulus = _counter_modulus(meta) if is_counter else None
+    if modulus:
+        scale = meta.get("scale") or 1
+        raw = np.rint((values[finite] - meta.get("offset", 0)) / scale).astype(np.int64)
+        t_raw = timestamps[finite]
+        step = np.mod(np.diff(raw), modulus)
+        breaks = np.flatnonzero(step != 1)
+        if len(breaks):
+            issues["counter_breaks"] = {
+                "count": int(len(breaks)),
+                "repeats": int((step[breaks] == 0).sum()),
+                "modulus": int(modulus),
+                "examples": _examples(
+                    t_raw[breaks], t_raw[breaks + 1], np.ones(len(breaks))
+                ),
+            }
+
+    # CRC：校验值在相邻帧重复说明发送端数据冻结（重算CRC需原始载荷和E2E配置）
+    if is_crc:
+        repeat_idx = np.flatnonzero(np.diff(values) == 0)
+        if len(repeat_idx):
+            issues["crc_repeats"] = {
+                "count": int(len(repeat_idx)),
+                "examples": _examples(
+                    timestamps[repeat_idx], timestamps[repeat_idx + 1], np.ones(len(repeat_idx))
+                ),
+            }
+    return issues
+
+
+class QualityReport:
+    """
+    汇总一个文件内所有信号的质量检查结果，只记录有问题的信号。
+
+    用法:
+        >>> report = QualityReport(build_signal_meta(dbc_data), gap_factor=3.0)
+        >>> for name, (timestamps, values) in decoded_arrays.items():
+        ...     report.check(name, timestamps, values)
+        >>> report.to_dict(signal_corr)
+    """
+
+    def __init__(
+        self,
+        signal_meta: Optional[Dict[str, Dict[str, Any]]] = None,
+        gap_factor: float = 3.0,
+        stuck_seconds: Optional[float] = 10.0,
+    ):
+        self.signal_meta = signal_meta or {}
+        self.gap_factor = gap_factor
+        self.stuck_seconds = stuck_seconds
+        self.checked = 0
+        self.signals: Dict[str, Dict[str, Any]] = {}
+
+    def check(self, name: str, timestamps: np.ndarray, values: np.ndarray) -> Dict[str, Any]:
+        """检查单个信号，返回该信号的问题字典"""
+        self.checked += 1
+        issues = check_signal_quality(
+            name,
+            timestamps,
+            values,
+            self.signal_meta.get(name),
+            self.gap_factor,
+            self.stuck_seconds,
+        )
+        if issues:
+            self.signals[name] = issues
+        return issues
+
+    def to_dict(self, signal_corr: Optional[Dict[str, str]] = None) -> Dict[str, Any]:
+        """
+        Returns:
+            {"summary": {"signals_checked", "signals_flagged", "issues": {问题类型: 信号数}},
+             "signals": {输出信号名: {问题类型: 详情}}}
+        """
+        totals: Dict[str, int] = {}
+        for issues in self.signals.values():
+            for kind in issues:
+                totals[kind] = totals.get(kind, 0) + 1
+        return {
+            "summary": {
+                "signals_checked": self.checked,
+                "signals_flagged": len(self.signals),
+                "issues": totals,
+            },
+            "signals": {
+                (str(signal_corr.get(name, name)) if signal_corr else name): issues
+                for name, issues in self.signals.items()
+            },
+        }
+
+
+if __name__ == "__main__":
+    pass
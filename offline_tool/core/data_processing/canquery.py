@@ -0,0 +1,356 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+author: fenwickxie
+date: 2026-10-19 21:48:19
+filename: canquery.py
+version: 1.0
+"""
+
+import glob
+import json
+import os
+from typing import Any, Dict, List, Optional, Sequence, TypeAlias, Union
+
+import pandas as pd
+
+try:
+    import duckdb
+
+    DUCKDB_AVAILABLE = True
+except ImportError:
+    duckdb = None
+    DUCKDB_AVAILABLE = False
+
+StringPathLike: TypeAlias = Union[str, os.PathLike]
+
+# 同一输出存在多种格式时注册的优先级：Parquet可按列/行组下推，其次是可内存映射的Arrow IPC
+QUERY_SUFFIXES = (".parquet", ".feather", ".arrow", ".csv")
+
+# 从文件路径取输出名（不含目录和扩展名），用于关联解码数据与旁路文件
+_OUTPUT_NAME_SQL = r"regexp_extract(filename, '([^/\\]+)\.[^./\\]+$', 1)"
+
+_STATS_COLUMNS = (
+    "count",
+    "nan_count",
+    "min",
+    "max",
+    "mean",
+    "std",
+    "duration",
+    "sample_rate_hz",
+    "dt_min",
+    "dt_max",
+    "unit",
+)
+
+
+def _sql_string(value: str) -> str:
+    """SQL字符串字面量"""
+    return "'" + str(value).replace("'", "''") + "'"
+
+
+def _sql_list(paths: Sequence[str]) -> str:
+    """路径列表转为SQL列表字面量"""
+    return "[" + ", ".join(_sql_string(path) for path in paths) + "]"
+
+
+def _collect_outputs(root: str, skip_dirs: Sequence[str]) -> Dict[str, List[str]]:
+    """
+    递归收集解码输出和旁路文件，同名输出只取优先级最高的格式。
+
+    Returns:
+        {".parquet"/".feather"/".arrow"/".csv": 文件列表, "stats": [...], "quality": [...], "reports": [...]}
+    """
+    chosen: Dict[str, str] = {}
+    found: Dict[str, List[str]] = {"stats": [], "quality": [], "reports": []}
+    skip = {os.path.abspath(path) for path in skip_dirs}
+    for directory, subdirs, files in os.walk(root):
+        subdirs[:] = [d for d in subdirs if os.path.abspath(os.path.join(directory, d)) not in skip]
+        for file in sorted(files):
+            path = os.path.join(directory, file)
+            if file.endswith(".stats.json"):
+                found["stats"].append(path)
+            elif file.endswith(".quality.json"):
+                found["quality"].append(path)
+            elif file == "run_report.json":
+                found["reports"].append(path)
+            else:
+                stem, suffix = os.path.splitext(path)
+                suffix = suffix.lower()
+                if suffix not in QUERY_SUFFIXES:
+                    continue
+                current = chosen.get(stem)
+                if current is None or QUERY_SUFFIXES.index(suffix) < QUERY_SUFFIXES.index(
+                    os.path.splitext(current)[1].lower()
+                ):
+                    chosen[stem] = path
+    for path in sorted(chosen.values()):
+        found.setdefault(os.path.splitext(path)[1].lower(), []).append(path)
+    return found
+
+
+def _read_json(path: str) -> Dict[str, Any]:
+    with open(path, "r", encoding="utf-8") as f:
+        return json.load(f)
+
+
+def _sidecar_output(path: str, suffix: str) -> str:
+    """{输出名}.stats.json -> 输出名"""
+    return os.path.basename(path)[: -len(suffix)]
+
+
+class CanQuery:
+    """
+    进程内SQL查询层（DuckDB）：把解码输出、分区数据集、统计/质量旁路文件和指标
+    注册为表，用SQL跨成千上万个文件查询。Parquet按列裁剪、按行组统计过滤，
+    多线程并行扫描；不需要把整个文件加载到pandas。
+
+    注册的表:
+        decoded       所有解码输出（按列名合并schema），附 filename、output 列
+        dataset       Hive分区数据集（存在时），分区键为普通列
+        signal_stats  {输出名}.stats.json 展开的信号统计
+        quality       {输出名}.quality.json 展开的质量问题
+        files         run_report.json 中的逐文件处理结果
+        metrics       register_metrics 注册的 CanData 指标
+
+    用法:
+        >>> with CanQuery("decoded") as query:
+        ...     df = query.sql("SELECT output, max(RMSpd_250) FROM decoded GROUP BY output")
+    """
+
+    def __init__(
+        self,
+        decoded_dir: Optional[StringPathLike] = None,
+        dataset_dir: Optional[StringPathLike] = None,
+        threads: Optional[int] = None,
+        memory_limit: Optional[str] = None,
+    ):
+        if not DUCKDB_AVAILABLE:
+            raise ImportError("CanQuery 需要 duckdb: pip install duckdb")
+        self.conn = duckdb.connect(":memory:")
+        if threads:
+            self.conn.execute(f"SET threads = {int(threads)}")
+        if memory_limit:
+            self.conn.execute(f"SET memory_limit = '{memory_limit}'")
+        self.registered: Dict[str, str] = {}
+        self._arrow_sources: Dict[str, Any] = {}  # 保持注册的Arrow表存活
+        if decoded_dir is not None:
+            self.register_decoded(decoded_dir, dataset_dir)
+
+    def __enter__(self) -> "CanQuery":
+        return self
+
+    def __exit__(self, exc_type, exc, tb) -> None:
+        self.close()
+
+    def close(self) -> None:
+        self.conn.close()
+        self._arrow_sources.clear()
+
+    def _register_frame(self, name: str, data, description: str) -> None:
+        self._arrow_sources[name] = data
+        self.conn.register(name, data)
+        self.registered[name] = description
+
+    def register_decoded(
+        self, decoded_dir: StringPathLike, dataset_dir: Optional[StringPathLike] = None
+    ) -> Dict[str, str]:
+        """
+        注册解码输出目录（递归）及其中的旁路文件。
+
+        Args:
+            decoded_dir: 解码输出目录（CanDecoder 的 save_dir）
+            dataset_dir: Hive分区数据集目录，默认 decoded_dir/dataset（存在时）
+
+        Returns:
+            {表名: 说明}
+        """
+        root = str(decoded_dir)
+        if dataset_dir is None and os.path.isdir(os.path.join(root, "dataset")):
+            dataset_dir = os.path.join(root, "dataset")
+        found = _collect_outputs(root, [str(dataset_dir)] if dataset_dir else [])
+
+        parts = []
+        if found.get(".parquet"):
+            parts.append(
+                f"SELECT * FROM read_parquet({_sql_list(found['.parquet'])}, "
+                "union_by_name = true, filename = true)"
+            )
+        ipc_files = found.get(".feather", []) + found.get(".arrow", [])
+        if ipc_files:
+            import pyarrow.dataset as ds
+
+            # 每个IPC文件注册为惰性的Arrow数据集：查询时DuckDB只扫描用到的列，
+            # 过滤条件下推到扫描，不预先读入内存
+            for index, path in enumerate(ipc_files):
+                name = f"_decoded_ipc_{index}"
+                self._arrow_sources[name] = ds.dataset(path, format="ipc")
+                self.conn.register(name, self._arrow_sources[name])
+                parts.append(f"SELECT *, {_sql_string(path)} AS filename FROM {name}")
+        if found.get(".csv"):
+            parts.append(
+                f"SELECT * FROM read_csv({_sql_list(found['.csv'])}, "
+                "union_by_name = true, filename = true)"
+            )
+        if parts:
+            union = " UNION ALL BY NAME ".join(f"({part})" for part in parts)
+            self.conn.execute(
+                f"CREATE OR REPLACE VIEW decoded AS SELECT *, {_OUTPUT_NAME_SQL} AS output FROM ({union})"
+            )
+            n_files = sum(len(found.get(suffix, [])) for suffix in QUERY_SUFFIXES)
+            self.registered["decoded"] = f"{n_files} 个解码文件"
+
+        if dataset_dir and glob.glob(os.path.join(str(dataset_dir), "**", "*.parquet"), recursive=True):
+            pattern = os.path.join(str(dataset_dir), "**", "*.parquet").replace("'", "''")
+            self.conn.execute(
+                "CREATE OR REPLACE VIEW dataset AS SELECT * FROM "
+                f"read_parquet('{pattern}', hive_partitioning = true, union_by_name = true)"
+            )
+            self.registered["dataset"] = f"Hive分区数据集 {dataset_dir}"
+
+        self._register_sidecars(found)
+        return dict(self.registered)
+
+    def _register_sidecars(self, found: Dict[str, List[str]]) -> None:
+        if found["stats"]:
+            rows = []
+            for path in found["stats"]:
+                payload = _read_json(path)
+                for signal, entry in payload.get("signals", {}).items():
+                    row = {
+                        "output": _sidecar_output(path, ".stats.json"),
+                        "file": payload.get("file"),
+                        "signal": signal,
+                    }
+                    row.update({key: entry.get(key) for key in _STATS_COLUMNS})
+                    row["first_t"] = (entry.get("first") or {}).get("t")
+                    row["last_t"] = (entry.get("last") or {}).get("t")
+                    rows.append(row)
+            self._register_frame("signal_stats", pd.DataFrame(rows), f"{len(found['stats'])} 个统计文件")
+
+        if found["quality"]:
+            rows = []
+            for path in found["quality"]:
+                payload = _read_json(path)
+                for signal, issues in payload.get("signals", {}).items():
+                    for issue, detail in issues.items():
+                        rows.append(
+                            {
+                                "output": _sidecar_output(path, ".quality.json"),
+                                "file": payload.get("file"),
+                                "signal": signal,
+                                "issue": issue,
+                                "count": detail.get("count"),
+                                "detail": json.dumps(detail, ensure_ascii=False),
+                            }
+                        )
+            frame = pd.DataFrame(
+                rows, columns=["output", "file", "signal", "issue", "count", "detail"]
+            )
+            self._register_frame("quality", frame, f"{len(found['quality'])} 个质量报告")
+
+        if found["reports"]:
+            rows = []
+            for path in found["reports"]:
+                payload = _read_json(path)
+                for entry in payload.get("files", []):
+                    rows.append(
+                        {
+                            "report": path,
+                            "generated_at": payload.get("generated_at"),
+                            "file": entry.get("file"),
+                            "success": entry.get("success"),
+                            "error": entry.get("error"),
+                            "total_msgs": entry.get("total_msgs"),
+                            "decoded_msgs": entry.get("decoded_msgs"),
+                            "error_count": entry.get("error_count"),
+                            "signals": entry.get("signals"),
+                        }
+                    )
+            self._register_frame("files", pd.DataFrame(rows), f"{len(found['reports'])} 个运行报告")
+
+    def register_metrics(self, metrics, name: str = "metrics") -> None:
+        """
+        注册指标表。
+
+        Args:
+            metrics: DataFrame；CanData.all_metrics 形式的 {分组名: DataFrame}（合并并加 group 列）；
+                或 .csv/.parquet/.json 文件路径（.json 为记录列表或 {分组名: 记录列表}）
+            name: 表名
+        """
+        if isinstance(metrics, (str, os.PathLike)):
+            path = str(metrics)
+            suffix = os.path.splitext(path)[1].lower()
+            if suffix == ".parquet":
+                metrics = pd.read_parquet(path)
+            elif suffix == ".csv":
+                metrics = pd.read_csv(path)
+            elif suffix == ".json":
+                payload = _read_json(path)
+                metrics = (
+                    {group: pd.DataFrame(records) for group, records in payload.items()}
+                    if isinstance(payload, dict)
+                    else pd.DataFrame(payload)
+                )
+            else:
+                raise ValueError(f"Unsupported metrics file type: {suffix}")
+        if isinstance(metrics, dict):
+            frames = [frame.assign(group=group) for group, frame in metrics.items() if len(frame)]
+            metrics = pd.concat(frames, ignore_index=True) if frames else pd.DataFrame()
+        self._register_frame(name, metrics, f"指标 {len(metrics)} 行")
+
+    def register_table(self, name: str, data) -> None:
+        """注册任意 DataFrame / pyarrow.Table 为表"""
+        self._register_frame(name, data, type(data).__name__)
+
+    def sql(self, query: str) -> pd.DataFrame:
+        """执行SQL，返回pandas DataFrame"""
+        return self.conn.sql(query).df()
+
+    def sql_arrow(self, query: str):
+        """执行SQL，返回pyarrow.Table（大结果时避免转换为pandas）"""
+        return self.conn.sql(query).arrow()
+
+    def tables(self) -> Dict[str, List[str]]:
+        """已注册的表及其列名"""
+        return {
+            name: [row[0] for row in self.conn.execute(f'DESCRIBE "{name}"').fetchall()]
+            for name in self.registered
+        }
+
+
+def run_query(
+    query: str,
+    decoded_dir: StringPathLike,
+    metrics: Optional[List[StringPathLike]] = None,
+    output: Optional[StringPathLike] = None,
+    threads: Optional[int] = None,
+) -> pd.DataFrame:
+    """
+    注册解码目录并执行一条SQL，可选把结果写出为 .csv/.parquet/.json。
+
+    Returns:
+        查询结果 DataFrame
+    """
+    with CanQuery(decoded_dir, threads=threads) as engine:
+        for path in metrics or []:
+            name = "metrics" if len(metrics) == 1 else os.path.splitext(os.path.basename(str(path)))[0]
+            engine.register_metrics(path, name)
+        result = engine.sql(query)
+    if output:
+        output = str(output)
+        os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+        suffix = os.path.splitext(output)[1].lower()
+        if suffix == ".parquet":
+            result.to_parquet(output, index=False)
+        elif suffix == ".json":
+            result.to_json(output, orient="records", force_ascii=False, indent=2)
+        else:
+            result.to_csv(output, index=False)
+    return result
+
+
+if __name__ == "__main__":
+    pass
@@ -0,0 +1,492 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+author: fenwickxie
+date: 2026-10-19 17:20:13
+filename: canqueue.py
+version: 1.0
+"""
+
+import hashlib
+import json
+import os
+import socket
+import sqlite3
+import threading
+import time
+import traceback
+from contextlib import contextmanager
+from typing import Any, Dict, List, Optional, TypeAlias, Union
+
+try:
+    from .cancompress import COMPRESSION_SUFFIXES
+except ImportError:  # 作为脚本直接运行时
+    from cancompress import COMPRESSION_SUFFIXES
+
+StringPathLike: TypeAlias = Union[str, os.PathLike]
+
+QUEUE_FILENAME = "queue.sqlite"
+DEFAULT_LEASE_SECONDS = 300.0
+DEFAULT_MAX_ATTEMPTS = 3
+JOB_REPORT_DIRNAME = "run_reports"
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS jobs (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    log_path TEXT NOT NULL,
+    config TEXT NOT NULL,
+    config_hash TEXT NOT NULL,
+    status TEXT NOT NULL DEFAULT 'pending',
+    attempts INTEGER NOT NULL DEFAULT 0,
+    max_attempts INTEGER NOT NULL,
+    worker TEXT,
+    lease_until REAL,
+    heartbeat_at REAL,
+    enqueued_at REAL NOT NULL,
+    started_at REAL,
+    finished_at REAL,
+    result TEXT,
+    error TEXT,
+    UNIQUE (log_path, config_hash)
+);
+CREATE INDEX IF NOT EXISTS jobs_status ON jobs (status, id);
+"""
+
+
+def default_worker_id() -> str:
+    """工作进程标识：主机名:进程号"""
+    return f"{socket.gethostname()}:{os.getpid()}"
+
+
+# 可解码的日志扩展名（与 CanDecoder 收集的文件类型一致，含压缩的BLF/ASC）
+_LOG_SUFFIXES = (".blf", ".asc", ".mf4", ".mdf") + tuple(
+    ext + suffix for ext in (".blf", ".asc") for suffix in COMPRESSION_SUFFIXES
+)
+
+
+def _list_log_files(can_data_path: Union[StringPathLike, List[StringPathLike]]) -> List[str]:
+    """展开配置中的 can_data_path（文件、目录或列表）为 .blf/.asc/.mf4 日志文件的绝对路径"""
+    paths = can_data_path if isinstance(can_data_path, list) else [can_data_path]
+    files: List[str] = []
+    for path in paths:
+        if os.path.isdir(path):
+            for name in sorted(os.listdir(path)):
+                if name.lower().endswith(_LOG_SUFFIXES):
+                    files.append(os.path.abspath(os.path.join(path, name)))
+        elif os.path.isfile(path) and str(path).lower().endswith(_LOG_SUFFIXES):
+            files.append(os.path.abspath(path))
+    return files
+
+
+class WorkQueue:
+    """
+    基于SQLite的解码任务队列，放在共享文件系统上即可供多台主机的工作进程使用。
+
+    协调端 enqueue 任务（日志文件 + 解码配置）；工作进程 claim 任务时获得租约，
+    处理期间定期 heartbeat 续约，完成后 complete/fail。工作进程崩溃后租约过期，
+    任务在下一次 claim 时重新排队（超过最大尝试次数则标记为失败）。
+
+    每次操作使用独立连接并在 BEGIN IMMEDIATE 事务中完成，多进程/多线程安全。
+    日志未使用WAL，因为WAL依赖共享内存，不适用于网络文件系统。
+
+    用法:
+        >>> queue = WorkQueue("/mnt/share/decode_queue")
+        >>> queue.enqueue_from_config("config.yaml")
+        >>> run_worker("/mnt/share/decode_queue")  # 在任意主机上启动多个
+    """
+
+    def __init__(self, queue_dir: StringPathLike, timeout: float = 60.0):
+        self.queue_dir = str(queue_dir)
+        self.path = os.path.join(self.queue_dir, QUEUE_FILENAME)
+        self.timeout = timeout
+        os.makedirs(self.queue_dir, exist_ok=True)
+        conn = sqlite3.connect(self.path, timeout=self.timeout)
+        try:
+            conn.executescript(_SCHEMA)
+        finally:
+            conn.close()
+
+    @contextmanager
+    def _transaction(self):
+        conn = sqlite3.connect(self.path, timeout=self.timeout, isolation_level=None)
+        conn.row_factory = sqlite3.Row
+        try:
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                yield conn
+            except BaseException:
+                conn.execute("ROLLBACK")
+                raise
+            conn.execute("COMMIT")
+        finally:
+            conn.close()
+
+    def enqueue(
+        self,
+        log_paths: List[StringPathLike],
+        config: Dict[str, Any],
+        max_attempts: int = DEFAULT_MAX_ATTEMPTS,
+    ) -> int:
+        """
+        添加任务，同一日志文件+相同配置的任务只会添加一次。
+
+        Args:
+            log_paths: 日志文件路径（工作进程所在主机上须可访问）
+            config: 解码配置（load_config_from_yaml 的结果），can_data_path 会被替换为各任务的文件
+            max_attempts: 最大尝试次数
+
+        Returns:
+            新添加的任务数
+        """
+        config_text = json.dumps(config, sort_keys=True, ensure_ascii=False, default=str)
+        config_hash = hashlib.sha1(config_text.encode("utf-8")).hexdigest()
+        now = time.time()
+        with self._transaction() as conn:
+            before = conn.total_changes
+            conn.executemany(
+                "INSERT OR IGNORE INTO jobs (log_path, config, config_hash, max_attempts, enqueued_at) "
+                "VALUES (?, ?, ?, ?, ?)",
+                [(str(path), config_text, config_hash, max_attempts, now) for path in log_paths],
+            )
+            return conn.total_changes - before
+
+    def enqueue_from_config(
+        self, config_path: StringPathLike, max_attempts: int = DEFAULT_MAX_ATTEMPTS
+    ) -> int:
+        """按candecode YAML配置展开 can_data_path 中的所有 .blf/.asc/.mf4 文件（配置了 inventory_query 时按清单过滤）并添加任务"""
+        try:
+            from .candecode import load_config_from_yaml
+        except ImportError:  # 作为脚本直接运行时
+            from candecode import load_config_from_yaml
+
+        config = load_config_from_yaml(config_path)
+        log_paths = _list_log_files(config["can_data_path"])
+        if config.get("inventory_query"):
+            try:
+                from .caninventory import select_log_files
+            except ImportError:
+                from caninventory import select_log_files
+            log_paths = select_log_files(log_paths, config["inventory_query"])
+        for key in ("dbc_path", "output_dir", "dataset_dir"):
+            value = config.get(key)
+            if isinstance(value, list):
+                config[key] = [os.path.abspath(v) for v in value]
+            elif value:
+                config[key] = os.path.abspath(value)
+        if config.get("channel_dbc"):
+            config["channel_dbc"] = {
+                channel: os.path.abspath(path) for channel, path in config["channel_dbc"].items()
+            }
+        return self.enqueue(log_paths, config, max_attempts)
+
+    def _expire_leases(self, conn: sqlite3.Connection, now: float) -> None:
+        """租约过期的任务重新排队，超过最大尝试次数的标记为失败"""
+        conn.execute(
+            "UPDATE jobs SET status = 'failed', finished_at = ?, "
+            "error = 'lease expired after ' || attempts || ' attempts' "
+            "WHERE status = 'running' AND lease_until < ? AND attempts >= max_attempts",
+            (now, now),
+        )
+        conn.execute(
+            "UPDATE jobs SET status = 'pending', worker = NULL, lease_until = NULL, "
+            "error = 'lease expired' "
+            "WHERE status = 'running' AND lease_until < ?",
+            (now,),
+        )
+
+    def claim(
+        self, worker_id: str, lease_seconds: float = DEFAULT_LEASE_SECONDS
+    ) -> Optional[Dict[str, Any]]:
+        """
+        领取一个待处理任务并获得租约。
+
+        Returns:
+            任务字典（id、log_path、config、attempts），没有任务时返回None
+        """
+        now = time.time()
+        with self._transaction() as conn:
+            self._expire_leases(conn, now)
+            row = conn.execute(
+                "SELECT id, log_path, config, attempts FROM jobs "
+                "WHERE status = 'pending' ORDER BY id LIMIT 1"
+            ).fetchone()
+            if row is None:
+                return None
+            conn.execute(
+                "UPDATE jobs SET status = 'running', worker = ?, attempts = attempts + 1, "
+                "lease_until = ?, heartbeat_at = ?, started_at = ? WHERE id = ?",
+                (worker_id, now + lease_seconds, now, now, row["id"]),
+            )
+        return {
+            "id": row["id"],
+            "log_path": row["log_path"],
+            "config": json.loads(row["config"]),
+            "attempts": row["attempts"] + 1,
+        }
+
+    def heartbeat(
+        self, job_id: int, worker_id: str, lease_seconds: float = DEFAULT_LEASE_SECONDS
+    ) -> bool:
+        """续约；任务已不属于该工作进程（租约过期被重新领取）时返回False"""
+        now = time.time()
+        with self._transaction() as conn:
+            cursor = conn.execute(
+                "UPDATE jobs SET lease_until = ?, heartbeat_at = ? "
+                "WHERE id = ? AND worker = ? AND status = 'running'",
+                (now + lease_seconds, now, job_id, worker_id),
+            )
+            return cursor.rowcount == 1
+
+    def complete(self, job_id: int, worker_id: str, result: Dict[str, Any]) -> bool:
+        """记录任务成功；租约已丢失时不覆盖，返回False"""
+        with self._transaction() as conn:
+            cursor = conn.execute(
+                "UPDATE jobs SET status = 'done', finished_at = ?, lease_until = NULL, "
+                "result = ?, error = NULL WHERE id = ? AND worker = ? AND status = 'running'",
+                (time.time(), json.dumps(result, default=str), job_id, worker_id),
+            )
+            return cursor.rowcount == 1
+
+    def fail(self, job_id: int, worker_id: str, error: str) -> bool:
+        """记录任务失败；未达到最大尝试次数时重新排队"""
+        with self._transaction() as conn:
+            cursor = conn.execute(
+                "UPDATE jobs SET "
+                "status = CASE WHEN attempts < max_attempts THEN 'pending' ELSE 'failed' END, "
+                "finished_at = CASE WHEN attempts < max_attempts THEN NULL ELSE ? END, "
+                "worker = NULL, lease_until = NULL, error = ? "
+                "WHERE id = ? AND worker = ? AND status = 'running'",
+                (time.time(), error, job_id, worker_id),
+            )
+            return cursor.rowcount == 1
+
+    def retry_failed(self) -> int:
+        """把失败的任务重新排队（尝试次数清零），返回任务数"""
+        with self._transaction() as conn:
+            cursor = conn.execute(
+                "UPDATE jobs SET status = 'pending', attempts = 0, finished_at = NULL "
+                "WHERE status = 'failed'"
+            )
+            return cursor.rowcount
+
+    def finalize(self) -> List[Dict[str, Any]]:
+        """
+        汇总已完成任务的输出（在所有工作进程结束后由一处调用一次）：
+        按输出目录把各任务的运行报告合并为 output_dir/run_report.json，
+        Hive分区数据集汇总所有分区文件生成 _metadata。
+
+        Returns:
+            每个输出目录一项 {"output_dir", "jobs", "run_report", "datasets"}
+        """
+        try:
+            from .candecode import merge_run_reports
+            from .decoded_io import write_dataset_metadata
+        except ImportError:  # 作为脚本直接运行时
+            from candecode import merge_run_reports
+            from decoded_io import write_dataset_metadata
+
+        with self._transaction() as conn:
+            rows = conn.execute(
+                "SELECT id, config FROM jobs WHERE status = 'done' ORDER BY id"
+            ).fetchall()
+        outputs: Dict[str, Dict[str, Any]] = {}
+        for row in rows:
+            config = json.loads(row["config"])
+            output = outputs.setdefault(
+                config["output_dir"], {"jobs": [], "reports": [], "datasets": {}}
+            )
+            output["jobs"].append(row["id"])
+            report_path = _job_report_path(config["output_dir"], row["id"])
+            if os.path.exists(report_path):
+                output["reports"].append(report_path)
+            if config.get("dataset_layout") == "hive":
+                dataset_dir = config.get("dataset_dir") or os.path.join(config["output_dir"], "dataset")
+                output["datasets"][dataset_dir] = None
+
+        summary = []
+        for output_dir, output in outputs.items():
+            run_report = None
+            if output["reports"]:
+                run_report = os.path.join(output_dir, "run_report.json")
+                merge_run_reports(output["reports"], run_report)
+            datasets = {
+                dataset_dir: write_dataset_metadata(dataset_dir)
+                for dataset_dir in output["datasets"]
+                if os.path.isdir(dataset_dir)
+            }
+            summary.append(
+                {
+                    "output_dir": output_dir,
+                    "jobs": len(output["jobs"]),
+                    "run_report": run_report,
+                    "datasets": datasets,
+                }
+            )
+        return summary
+
+    def status(self) -> Dict[str, Any]:
+        """
+        队列状态。
+
+        Returns:
+            {"counts": {状态: 数量}, "running": [...], "failed": [...]}
+        """
+        now = time.time()
+        with self._transaction() as conn:
+            self._expire_leases(conn, now)
+            counts = {
+                row["status"]: row["n"]
+                for row in conn.execute("SELECT status, COUNT(*) AS n FROM jobs GROUP BY status")
+            }
+            running = [
+                dict(row)
+                for row in conn.execute(
+                    "SELECT id, log_path, worker, attempts, lease_until, heartbeat_at "
+                    "FROM jobs WHERE status = 'running' ORDER BY id"
+                )
+            ]
+            failed = [
+                dict(row)
+                for row in conn.execute(
+                    "SELECT id, log_path, attempts, error FROM jobs WHERE status = 'failed' ORDER BY id"
+                )
+            ]
+        return {"counts": counts, "running": running, "failed": failed}
+
+
+class _Heartbeat(threading.Thread):
+    """后台续约线程，租约丢失时设置 lost 标志"""
+
+    def __init__(self, queue: WorkQueue, job_id: int, worker_id: str, lease_seconds: float, interval: float):
+        super().__init__(daemon=True)
+        self.queue = queue
+        self.job_id = job_id
+        self.worker_id = worker_id
+        self.lease_seconds = lease_seconds
+        self.interval = interval
+        self.lost = False
+        self._stop_event = threading.Event()
+
+    def run(self) -> None:
+        while not self._stop_event.wait(self.interval):
+            try:
+                if not self.queue.heartbeat(self.job_id, self.worker_id, self.lease_seconds):
+                    self.lost = True
+                    return
+            except sqlite3.Error:
+                continue  # 共享文件系统短暂不可用时下次重试
+
+    def stop(self) -> None:
+        self._stop_event.set()
+        self.join()
+
+
+def _job_report_path(output_dir: StringPathLike, job_id: int) -> str:
+    """任务的运行报告：output_dir/run_reports/job_{id}.json"""
+    return os.path.join(str(output_dir), JOB_REPORT_DIRNAME, f"job_{job_id}.json")
+
+
+def _run_job(job: Dict[str, Any]) -> Dict[str, Any]:
+    """在当前进程中解码任务对应的日志文件，返回结果摘要"""
+    try:
+        from .candecode import CanDecoder
+    except ImportError:  # 作为脚本直接运行时
+        from candecode import CanDecoder
+
+    config = dict(job["config"])
+    config["can_data_path"] = job["log_path"]
+    config["num_processes"] = 1
+    config["inventory_query"] = None  # 入队时已按清单筛选
+    if isinstance(config.get("save_formats"), list):
+        config["save_formats"] = tuple(config["save_formats"])
+
+    # 与 queue enqueue 读取的YAML配置走同一条构建路径（通道路由、J1939、ID掩码等）
+    decoder = CanDecoder.from_config(config)
+    # 各任务写自己的运行报告，分区数据集的 _metadata 由 finalize 统一生成
+    results = decoder.run_from_config(
+        dataset_metadata=False,
+        run_report_path=_job_report_path(config["output_dir"], job["id"]),
+    ) or []
+    return {
+        "success": bool(results) and all(r and r.get("success") for r in results),
+        "files": [
+            {
+                key: r.get(key)
+                for key in ("file", "success", "total_msgs", "decoded_msgs", "error_count", "error")
+                if r and key in r
+            }
+            for r in results
+        ],
+    }
+
+
+def run_worker(
+    queue_dir: StringPathLike,
+    worker_id: Optional[str] = None,
+    lease_seconds: float = DEFAULT_LEASE_SECONDS,
+    heartbeat_interval: Optional[float] = None,
+    poll_interval: float = 5.0,
+    exit_when_empty: bool = True,
+    max_jobs: Optional[int] = None,
+) -> Dict[str, int]:
+    """
+    工作进程主循环：领取任务、后台续约、记录结果。
+
+    Args:
+        queue_dir: 队列目录（共享文件系统）
+        worker_id: 工作进程标识，默认 主机名:进程号
+        lease_seconds: 租约时长，工作进程崩溃后任务最迟在该时间后被重新领取
+        heartbeat_interval: 续约间隔，默认租约时长的1/3
+        poll_interval: 队列为空时的轮询间隔（秒）
+        exit_when_empty: 队列中没有待处理和处理中的任务时退出
+        max_jobs: 最多处理的任务数，None表示不限
+
+    Returns:
+        {"done": 成功数, "failed": 失败数, "lost": 租约丢失数}
+    """
+    queue = WorkQueue(queue_dir)
+    worker_id = worker_id or default_worker_id()
+    heartbeat_interval = heartbeat_interval or lease_seconds / 3
+    summary = {"done": 0, "failed": 0, "lost": 0}
+
+    print(f"✓ 工作进程 {worker_id} 已连接队列: {queue.path}")
+    while max_jobs is None or sum(summary.values()) < max_jobs:
+        job = queue.claim(worker_id, lease_seconds)
+        if job is None:
+            counts = queue.status()["counts"]
+            if exit_when_empty and not counts.get("pending") and not counts.get("running"):
+                break
+            time.sleep(poll_interval)
+            continue
+
+        print(f"\n▶ 任务 {job['id']} (第{job['attempts']}次): {job['log_path']}")
+        heartbeat = _Heartbeat(queue, job["id"], worker_id, lease_seconds, heartbeat_interval)
+        heartbeat.start()
+        try:
+            result = _run_job(job)
+            error = None if result["success"] else json.dumps(result["files"], ensure_ascii=False)
+        except Exception as e:
+            result = None
+            error = f"{type(e).__name__}: {e}\n{traceback.format_exc()[-500:]}"
+        finally:
+            heartbeat.stop()
+
+        if heartbeat.lost:
+            summary["lost"] += 1
+            print(f"⚠ 任务 {job['id']} 租约已丢失，结果未记录")
+        elif error is None:
+            queue.complete(job["id"], worker_id, result)
+            summary["done"] += 1
+            print(f"✓ 任务 {job['id']} 完成")
+        else:
+            queue.fail(job["id"], worker_id, error)
+            summary["failed"] += 1
+            print(f"✖ 任务 {job['id']} 失败: {error.splitlines()[0]}")
+
+    print(f"\n工作进程 {worker_id} 退出: {summary}")
+    return summary
+
+
+if __name__ == "__main__":
+    pass
@@ -0,0 +1,374 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+author: fenwickxie
+date: 2026-10-19 22:41:07
+filename: canquicklook.py
+version: 1.0
+"""
+
+import io
+import os
+import time
+import zlib
+from typing import Any, Dict, Iterator, List, Optional, Tuple, TypeAlias, Union
+
+import numpy as np
+
+StringPathLike: TypeAlias = Union[str, os.PathLike]
+
+# 默认抽样比例（按BLF容器数/ASC字节数）
+DEFAULT_FRACTION = 0.02
+# 文件较小时至少抽取的块数，保证首尾和中段都有覆盖
+MIN_BLOCKS = 16
+# ASC按固定字节块抽样
+ASC_BLOCK_BYTES = 256 * 1024
+# 每个信号预览的最大点数（每点为一段时间内的 min/max/mean）
+PREVIEW_POINTS = 200
+
+
+def _sample_blocks(n_blocks: int, fraction: float, min_blocks: int = MIN_BLOCKS) -> np.ndarray:
+    """
+    分层抽样：把 n_blocks 个块均分为 k 层，每层取中间一块，保证抽样均匀分布在整个文件上。
+
+    Returns:
+        升序的块序号
+    """
+    if n_blocks <= 0:
+        return np.zeros(0, dtype=np.int64)
+    k = int(np.ceil(n_blocks * fraction))
+    k = min(max(k, min_blocks, 1), n_blocks)
+    edges = np.linspace(0, n_blocks, k + 1)
+    return np.unique(((edges[:-1] + edges[1:]) / 2).astype(np.int64))
+
+
+def _blf_containers(path: StringPathLike) -> Tuple[bytes, List[Tuple[int, int]]]:
+    """
+    只读取对象头（不解压）列出BLF中所有日志容器的位置。
+
+    Returns:
+        (文件头字节, [(容器偏移, 对象大小)])
+    """
+    from can.io.blf import FILE_HEADER_STRUCT, LOG_CONTAINER, OBJ_HEADER_BASE_STRUCT
+
+    containers: List[Tuple[int, int]] = []
+    with open(path, "rb") as f:
+        header = f.read(FILE_HEADER_STRUCT.size)
+        header_size = FILE_HEADER_STRUCT.unpack(header)[1]
+        header += f.read(header_size - FILE_HEADER_STRUCT.size)
+        offset = header_size
+        file_size = os.fstat(f.fileno()).st_size
+        while offset + OBJ_HEADER_BASE_STRUCT.size <= file_size:
+            f.seek(offset)
+            signature, _, _, obj_size, obj_type = OBJ_HEADER_BASE_STRUCT.unpack(
+                f.read(OBJ_HEADER_BASE_STRUCT.size)
+            )
+            if signature != b"LOBJ" or obj_size <= 0:
+                break  # 文件尾部损坏或截断
+            if obj_type == LOG_CONTAINER:
+                containers.append((offset, obj_size))
+            offset += obj_size + obj_size % 4
+    return header, containers
+
+
+def _iter_blf_blocks(
+    path: StringPathLike, fraction: float, min_blocks: int = MIN_BLOCKS
+) -> Iterator[Tuple[int, int, List[Any]]]:
+    """
+    逐个解码抽中的BLF容器。
+
+    容器首部可能是上一容器中对象的后半段，跳到第一个完整对象头（LOBJ）开始解析；
+    末尾跨容器的对象丢弃。解析复用 python-can 的 BLFReader：把截取后的对象流
+    重新包装为一个未压缩容器。
+
+    Yields:
+        (块序号, 块总数, can.Message 列表)
+    """
+    import can
+    from can.io.blf import (
+        LOG_CONTAINER,
+        LOG_CONTAINER_STRUCT,
+        NO_COMPRESSION,
+        OBJ_HEADER_BASE_STRUCT,
+        ZLIB_DEFLATE,
+    )
+
+    header, containers = _blf_containers(path)
+    with open(path, "rb") as f:
+        for index in _sample_blocks(len(containers), fraction, min_blocks):
+            offset, obj_size = containers[index]
+            f.seek(offset + OBJ_HEADER_BASE_STRUCT.size)
+            obj_data = f.read(obj_size - OBJ_HEADER_BASE_STRUCT.size)
+            method = LOG_CONTAINER_STRUCT.unpack_from(obj_data)[0]
+            data = obj_data[LOG_CONTAINER_STRUCT.size :]
+            if method == ZLIB_DEFLATE:
+                data = zlib.decompressobj().decompress(data)
+            elif method != NO_COMPRESSION:
+                continue
+            start = data.find(b"LOBJ")
+            if start < 0:
+                continue
+            body = LOG_CONTAINER_STRUCT.pack(NO_COMPRESSION, len(data) - start) + data[start:]
+            container = OBJ_HEADER_BASE_STRUCT.pack(
+                b"LOBJ",
+                OBJ_HEADER_BASE_STRUCT.size,
+                1,
+                OBJ_HEADER_BASE_STRUCT.size + len(body),
+                LOG_CONTAINER,
+            )
+            padding = b"\x00" * ((OBJ_HEADER_BASE_STRUCT.size + len(body)) % 4)
+            reader = can.BLFReader(io.BytesIO(header + container + body + padding))
+            messages: List[Any] = []
+            try:
+                for msg in reader:
+                    messages.append(msg)
+            except Exception:
+                pass  # 容器内对象损坏时保留已解析的部分
+            yield int(index), len(containers), messages
+
+
+def _asc_header(path: StringPathLike, encoding: str) -> str:
+    """ASC文件头：第一条报文行之前的所有行（date/base/Begin Triggerblock等）"""
+    try:
+        from .candecode import _ASC_EVENT_LINE
+    except ImportError:
+        from candecode import _ASC_EVENT_LINE
+
+    lines: List[str] = []
+    with open(path, "r", encoding=encoding, errors="replace") as f:
+        for line in f:
+            if _ASC_EVENT_LINE.match(line):
+                break
+            lines.append(line)
+    return "".join(lines)
+
+
+def _asc_time_range(
+    path: StringPathLike,
+    encoding: str,
+    probe_bytes: int = 64 * 1024,
+    relative_timestamp: bool = True,
+) -> Optional[Tuple[float, float]]:
+    """
+    ASC首尾时间：只解析文件开头和结尾各 probe_bytes 字节中的完整行。
+
+    relative_timestamp=False 时加上文件头 date 行的绝对时间（与 can.ASCReader 一致）。
+    """
+    import can
+
+    header = _asc_header(path, encoding)
+    size = os.path.getsize(path)
+    stamps: List[float] = []
+    with open(path, "rb") as f:
+        for offset in (0, max(size - probe_bytes, 0)):
+            f.seek(offset)
+            data = f.read(probe_bytes)
+            if offset > 0:
+                data = data[data.find(b"\n") + 1 :]
+            data = data[: data.rfind(b"\n") + 1]
+            try:
+                timestamps = [
+                    msg.timestamp
+                    for msg in can.ASCReader(
+                        io.StringIO(header + data.decode(encoding, errors="replace")),
+                        relative_timestamp=relative_timestamp,
+                    )
+                ]
+            except Exception:
+                continue
+            if timestamps:
+                stamps.extend((timestamps[0], timestamps[-1]))
+    return (min(stamps), max(stamps)) if stamps else None
+
+
+def _iter_asc_blocks(
+    path: StringPathLike,
+    fraction: float,
+    min_blocks: int = MIN_BLOCKS,
+    block_bytes: int = ASC_BLOCK_BYTES,
+    encoding: str = "utf-8",
+) -> Iterator[Tuple[int, int, List[Any]]]:
+    """
+    按固定字节块抽样ASC：定位到块起点后跳过不完整的首行，只解析块内的完整行，
+    拼上文件头后交给 ASCReader。
+
+    Yields:
+        (块序号, 块总数, can.Message 列表)
+    """
+    import can
+
+    header = _asc_header(path, encoding)
+    size = os.path.getsize(path)
+    n_blocks = max(int(np.ceil(size / block_bytes)), 1)
+    with open(path, "rb") as f:
+        for index in _sample_blocks(n_blocks, fraction, min_blocks):
+            f.seek(int(index) * block_bytes)
+            data = f.read(block_bytes)
+            if index > 0:
+                data = data[data.find(b"\n") + 1 :]
+            data = data[: data.rfind(b"\n") + 1]
+            if not data:
+                continue
+            reader = can.ASCReader(io.StringIO(header + data.decode(encoding, errors="replace")))
+            messages: List[Any] = []
+            try:
+                for msg in reader:
+                    messages.append(msg)
+            except Exception:
+                pass  # 块内出现无法解析的行时保留已解析的部分
+            yield int(index), n_blocks, messages
+
+
+def _preview(points: List[Tuple[float, float, float, float]], max_points: int) -> Dict[str, list]:
+    """把逐块的 (时间, min, max, mean) 合并为不超过 max_points 个点"""
+    array = np.asarray(points, dtype=np.float64)
+    if len(array) > max_points:
+        groups = np.array_split(array, max_points)
+        array = np.array(
+            [
+                (g[:, 0].mean(), g[:, 1].min(), g[:, 2].max(), g[:, 3].mean())
+                for g in groups
+            ]
+        )
+    return {
+        "t": array[:, 0].tolist(),
+        "min": array[:, 1].tolist(),
+        "max": array[:, 2].tolist(),
+        "mean": array[:, 3].tolist(),
+    }
+
+
+def quick_look(
+    log_file_path: StringPathLike,
+    dbc_data,
+    decoder_map,
+    fraction: float = DEFAULT_FRACTION,
+    signal_names: Optional[List[str]] = None,
+    signal_corr: Optional[Dict[str, str]] = None,
+    min_blocks: int = MIN_BLOCKS,
+    preview_points: int = PREVIEW_POINTS,
+    encoding: str = "utf-8",
+) -> Dict[str, Any]:
+    """
+    抽样快速浏览：只解码均匀分布在整个文件上的一部分BLF容器/ASC字节块，
+    给出各信号的近似统计、覆盖情况和低分辨率预览，用于分诊大文件。
+
+    Args:
+        log_file_path: BLF/ASC文件路径
+        dbc_data: DBC数据库对象（统计用的单位/范围）
+        decoder_map: 路由表（DecoderRouter 或 ChannelRouter）
+        fraction: 抽样比例（BLF按容器数，ASC按字节数）
+        signal_names: 需要解码的信号，None表示全部
+        signal_corr: 信号重命名映射
+        min_blocks: 至少抽取的块数
+        preview_points: 每个信号预览的最大点数
+        encoding: ASC文件编码
+
+    Returns:
+        {"file", "file_type", "size", "fraction", "blocks_total", "blocks_sampled",
+         "sampled_fraction", "sampled_frames", "estimated_frames", "decoded_msgs", "error_count",
+         "t_start", "t_end", "seconds",
+         "signals": {输出信号名: {count/min/max/mean/std 等近似统计, "estimated_samples",
+                     "sample_rate_hz", "coverage"（出现该信号的抽样块比例）,
+                     "preview": {"t", "min", "max", "mean"}}}}
+    """
+    try:
+        from .candecode import _blf_time_range, _iter_decode_chunks, _new_decode_stats
+        from .canstats import StreamingSignalStats, build_signal_meta
+        from .cancompress import compression_of
+    except ImportError:
+        from candecode import _blf_time_range, _iter_decode_chunks, _new_decode_stats
+        from canstats import StreamingSignalStats, build_signal_meta
+        from cancompress import compression_of
+
+    started = time.perf_counter()
+    if compression_of(log_file_path):
+        # 抽样依赖随机访问，压缩流只能顺序解压
+        raise ValueError(f"Quick look needs an uncompressed BLF/ASC file: {log_file_path}")
+    file_type = os.path.splitext(str(log_file_path))[1].lstrip(".").lower()
+    if file_type == "blf":
+        blocks = _iter_blf_blocks(log_file_path, fraction, min_blocks)
+    elif file_type == "asc":
+        blocks = _iter_asc_blocks(log_file_path, fraction, min_blocks, encoding=encoding)
+    else:
+        raise ValueError(f"Unsupported file type: {file_type}")
+
+    stats = _new_decode_stats()
+    signal_stats = StreamingSignalStats(build_signal_meta(dbc_data))
+    signal_names_set = set(signal_names) if signal_names else None
+    previews: Dict[str, List[Tuple[float, float, float, float]]] = {}
+    blocks_total = 0
+    blocks_sampled = 0
+    t_first: Optional[float] = None
+    t_last: Optional[float] = None
+    for _, blocks_total, messages in blocks:
+        blocks_sampled += 1
+        if not messages:
+            continue
+        t_first = messages[0].timestamp if t_first is None else t_first
+        t_last = messages[-1].timestamp
+        # 每个块整体作为一个解码块，块间的时间空洞不参与统计
+        for chunk in _iter_decode_chunks(
+            messages, decoder_map, signal_names_set, len(messages), stats=stats
+        ):
+            signal_stats.update(chunk["signals"])
+            for name, (timestamps, values) in chunk["signals"].items():
+                finite = values[np.isfinite(values)] if values.dtype.kind == "f" else values
+                if len(finite) == 0:
+                    continue
+                previews.setdefault(name, []).append(
+                    (
+                        float(timestamps.mean()),
+                        float(finite.min()),
+                        float(finite.max()),
+                        float(finite.mean()),
+                    )
+                )
+
+    # BLF文件头记录了完整时间范围；ASC读取文件首尾；都失败时用首末抽样块近似
+    if file_type == "blf":
+        time_range = _blf_time_range(log_file_path)
+    else:
+        time_range = _asc_time_range(log_file_path, encoding)
+    t_start, t_end = time_range if time_range else (t_first, t_last)
+    sampled_fraction = blocks_sampled / blocks_total if blocks_total else 0.0
+    duration = t_end - t_start if t_start is not None and t_end is not None else 0.0
+
+    signals: Dict[str, Dict[str, Any]] = {}
+    for name, entry in signal_stats.to_dict().items():
+        # 跨块的首末采样、最大间隔和时长没有意义，改为按抽样比例外推
+        for key in ("first", "last", "duration", "dt_max", "sample_rate_hz"):
+            entry.pop(key, None)
+        estimated = entry["count"] + entry["nan_count"]
+        estimated = estimated / sampled_fraction if sampled_fraction else estimated
+        entry["estimated_samples"] = int(round(estimated))
+        entry["sample_rate_hz"] = estimated / duration if duration > 0 else None
+        entry["coverage"] = len(previews.get(name, [])) / blocks_sampled if blocks_sampled else 0.0
+        if name in previews:
+            entry["preview"] = _preview(previews[name], preview_points)
+        signals[str(signal_corr.get(name, name)) if signal_corr else name] = entry
+
+    return {
+        "file": os.path.basename(str(log_file_path)),
+        "file_type": file_type,
+        "size": os.path.getsize(log_file_path),
+        "fraction": fraction,
+        "blocks_total": blocks_total,
+        "blocks_sampled": blocks_sampled,
+        "sampled_fraction": sampled_fraction,
+        "sampled_frames": stats["total_msgs"],
+        "estimated_frames": (
+            int(round(stats["total_msgs"] / sampled_fraction)) if sampled_fraction else 0
+        ),
+        "decoded_msgs": stats["decoded_msgs"],
+        "error_count": stats["error_count"],
+        "t_start": t_start,
+        "t_end": t_end,
+        "seconds": round(time.perf_counter() - started, 3),
+        "signals": signals,
+    }
+
+
+if __name__ == "__main__":
+    pass
@@ -0,0 +1,241 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+author: fenwickxie
+date: 2026-10-19 14:36:05
+filename: canraster.py
+version: 1.0
+"""
+
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+try:
+    from .canjit import numba_enabled, zoh_indices_nb
+except ImportError:  # 作为脚本直接运行时
+    from canjit import numba_enabled, zoh_indices_nb
+
+
+def raster_signal(
+    timestamps: np.ndarray,
+    values: np.ndarray,
+    grid: np.ndarray,
+    interpolation: str = "linear",
+) -> np.ndarray:
+    """
+    将单个信号重采样到时间网格上。
+
+    Args:
+        timestamps: 信号时间戳（升序）
+        values: 信号值
+        grid: 目标时间网格
+        interpolation: "linear" 线性插值（与asammdf对浮点信号的默认行为一致），
+            "previous" 零阶保持（取不晚于网格点的最后一个采样）
+
+    Returns:
+        网格上的信号值；早于首个采样的网格点取首个采样值
+    """
+    if len(timestamps) == 0:
+        return np.full(len(grid), np.nan)
+    if interpolation == "previous":
+        if numba_enabled():
+            # 时间戳与网格均升序，线性归并代替二分查找
+            idx = zoh_indices_nb(
+                np.ascontiguousarray(timestamps, dtype=np.float64),
+                np.ascontiguousarray(grid, dtype=np.float64),
+            )
+            return values[idx]
+        idx = np.searchsorted(timestamps, grid, side="right") - 1
+        np.clip(idx, 0, len(timestamps) - 1, out=idx)
+        return values[idx]
+    return np.interp(grid, timestamps, values)
+
+
+class StreamingRasterizer:
+    """
+    增量栅格化器：信号数据逐块到达，按固定步长的全局时间网格逐步输出行。
+
+    网格点 t0 + k*step 只有在所有仍活跃的线性插值信号都已有晚于该点的采样时才输出，
+    因此各块输出拼接后与一次性栅格化结果一致（帧按时间顺序到达，零阶保持的信号
+    不需要等待下一个采样）。超过自身周期 stale_periods 倍（默认3倍，容忍偶尔丢一帧）
+    或 hold_seconds 未更新的信号视为停发，保持最后值，不再阻塞输出。
+
+    零阶保持的列保持信号源类型；线性插值的列为float64，尚无采样的列以NaN填充（float64）。
+
+    用法:
+        >>> rasterizer = StreamingRasterizer(step=0.02, columns=["RMSpd_250"])
+        >>> for chunk in decoder.iter_decoded_chunks(path):
+        ...     rows = rasterizer.push(chunk["signals"])
+        ...     if rows is not None:
+        ...         consume(rows)
+        >>> consume(rasterizer.flush())
+    """
+
+    def __init__(
+        self,
+        step: float,
+        columns: Optional[List[str]] = None,
+        t0: Optional[float] = None,
+        time_from_zero: bool = False,
+        hold_seconds: float = 1.0,
+        interpolation: Optional[Dict[str, str]] = None,
+        stale_periods: float = 3.0,
+    ):
+        if step <= 0:
+            raise ValueError("step must be positive")
+        self.step = step
+        self.columns: List[str] = list(columns) if columns else []
+        self._fixed_columns = bool(columns)
+        self.t0 = t0
+        self.time_from_zero = time_from_zero
+        self.hold_seconds = hold_seconds
+        self.interpolation = interpolation or {}
+        self.stale_periods = stale_periods
+        self.next_index = 0  # 下一个待输出的网格序号
+        self.rows_emitted = 0
+        self._buffers: Dict[str, Tuple[np.ndarray, np.ndarray]] = {}
+        self._periods: Dict[str, float] = {}  # 各信号的采样周期（最近一块的采样间隔中位数）
+        self._t_seen: Optional[float] = None
+
+    def push(
+        self, signals: Dict[str, Tuple[np.ndarray, np.ndarray]]
+    ) -> Optional[Dict[str, np.ndarray]]:
+        """
+        追加一块信号数据，返回本次可以确定的网格行（无新行时返回None）。
+
+        Args:
+            signals: {信号名: (timestamps, values)}
+        """
+        for name, (timestamps, values) in signals.items():
+            if len(timestamps) == 0:
+                continue
+            if name not in self.columns:
+                if self._fixed_columns:
+                    continue
+                self.columns.append(name)
+            if name in self._buffers:
+                old_t, old_v = self._buffers[name]
+                self._buffers[name] = (
+                    np.concatenate([old_t, timestamps]),
+                    np.concatenate([old_v, values]),
+                )
+                if len(timestamps) == 1:
+                    self._periods[name] = float(timestamps[0] - old_t[-1])
+            else:
+                # 信号值保持源类型（枚举码值仍为整数）
+                self._buffers[name] = (
+                    np.asarray(timestamps, dtype=np.float64),
+                    np.asarray(values),
+                )
+            if len(timestamps) > 1:
+                self._periods[name] = float(np.median(np.diff(timestamps)))
+            last = float(timestamps[-1])
+            if self._t_seen is None or last > self._t_seen:
+                self._t_seen = last
+            # 网格起点为最早的采样时间（尚未输出任何行之前都可以前移）
+            if self.t0 is None or (self.next_index == 0 and timestamps[0] < self.t0):
+                self.t0 = float(timestamps[0])
+
+        if not self._buffers:
+            return None
+        # 仍在等待下一个采样的活跃信号中最慢的那个决定可以输出到哪里
+        frontier = self._t_seen
+        for name, (t, _) in self._buffers.items():
+            if self.interpolation.get(name, "linear") == "previous":
+                continue
+            wait = self.hold_seconds
+            if name in self._periods:
+                wait = min(wait, self.stale_periods * self._periods[name])
+            if t[-1] >= self._t_seen - wait:
+                frontier = min(frontier, float(t[-1]))
+        return self._emit_until(frontier)
+
+    def flush(self) -> Optional[Dict[str, np.ndarray]]:
+        """输出剩余的所有网格行（到最后一个采样为止）"""
+        if not self._buffers:
+            return None
+        return self._emit_until(self._t_seen)
+
+    def _emit_until(self, frontier: float) -> Optional[Dict[str, np.ndarray]]:
+        last_index = int(np.floor((frontier - self.t0) / self.step + 1e-9))
+        if last_index < self.next_index:
+            return None
+        grid = self.t0 + np.arange(self.next_index, last_index + 1) * self.step
+        rows: Dict[str, np.ndarray] = {
+            "timestamps": grid - self.t0 if self.time_from_zero else grid
+        }
+        for name in self.columns:
+            if name not in self._buffers:
+                rows[name] = np.full(len(grid), np.nan)
+                continue
+            timestamps, values = self._buffers[name]
+            rows[name] = raster_signal(
+                timestamps, values, grid, self.interpolation.get(name, "linear")
+            )
+            # 只保留插值下一个网格点仍需要的采样
+            keep = max(int(np.searchsorted(timestamps, grid[-1], side="right")) - 1, 0)
+            if keep:
+                self._buffers[name] = (timestamps[keep:], values[keep:])
+        self.next_index = last_index + 1
+        self.rows_emitted += len(grid)
+        return rows
+
+
+def iter_raster_windows(
+    signals: Dict[str, Tuple[np.ndarray, np.ndarray]],
+    step: float,
+    window_rows: int,
+    columns: Optional[List[str]] = None,
+    time_from_zero: bool = False,
+    interpolation: Optional[Dict[str, str]] = None,
+    dtype=np.float64,
+):
+    """
+    把已解码的信号按时间窗口逐段栅格化，每次只生成 window_rows 行，
+    峰值内存只与窗口大小有关，与文件长度无关。
+
+    网格与 asammdf to_dataframe(raster=step) 一致：np.arange(最早采样, 最晚采样, step)。
+
+    Args:
+        signals: {信号名: (timestamps, values)}，时间戳升序
+        step: 栅格步长
+        window_rows: 每个窗口的行数
+        columns: 输出列顺序，默认 signals 的顺序
+        time_from_zero: 输出时间是否从0开始
+        interpolation: {信号名: "linear"/"previous"}，默认线性插值
+        dtype: 信号列的数据类型（时间列始终为float64）
+
+    Yields:
+        {"timestamps": ndarray, 列名: ndarray}
+    """
+    columns = list(columns) if columns is not None else list(signals)
+    interpolation = interpolation or {}
+    present = [(t, v) for t, v in signals.values() if len(t)]
+    if not present:
+        return
+    t0 = min(float(t[0]) for t, _ in present)
+    t_end = max(float(t[-1]) for t, _ in present)
+    n_rows = max(int(np.ceil((t_end - t0) / step - 1e-9)), 1)
+    window_rows = max(int(window_rows), 1)
+
+    for first in range(0, n_rows, window_rows):
+        grid = t0 + np.arange(first, min(first + window_rows, n_rows)) * step
+        rows: Dict[str, np.ndarray] = {"timestamps": grid - t0 if time_from_zero else grid}
+        for name in columns:
+            if name not in signals or len(signals[name][0]) == 0:
+                rows[name] = np.full(len(grid), np.nan, dtype=dtype)
+                continue
+            timestamps, values = signals[name]
+            # 只取覆盖当前窗口（含两侧各一个采样）的片段参与插值
+            lo = max(int(np.searchsorted(timestamps, grid[0], side="right")) - 1, 0)
+            hi = min(int(np.searchsorted(timestamps, grid[-1], side="left")) + 1, len(timestamps))
+            rows[name] = raster_signal(
+                timestamps[lo:hi], values[lo:hi], grid, interpolation.get(name, "linear")
+            ).astype(dtype, copy=False)
+        yield rows
+
+
+if __name__ == "__main__":
+    pass
@@ -0,0 +1,214 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+author: fenwickxie
+date: 2026-10-19 19:05:27
+filename: canstats.py
+version: 1.0
+"""
+
+import json
+import os
+from typing import Any, Dict, Optional, Tuple, TypeAlias, Union
+
+import numpy as np
+
+StringPathLike: TypeAlias = Union[str, os.PathLike]
+
+
+def build_signal_meta(dbc_data) -> Dict[str, Dict[str, Any]]:
+    """
+    从DBC提取每个信号的元数据（统计和质量检查使用）。
+
+    Returns:
+        {信号名: {"minimum", "maximum", "unit", "cycle_time"（秒）, "message", "choices",
+        "length", "scale", "offset"}}
+    """
+    meta: Dict[str, Dict[str, Any]] = {}
+    for message in getattr(dbc_data, "messages", []):
+        cycle_ms = getattr(message, "cycle_time", None)
+        for signal in message.signals:
+            meta.setdefault(
+                signal.name,
+                {
+                    "minimum": signal.minimum,
+                    "maximum": signal.maximum,
+                    "unit": signal.unit,
+                    "cycle_time": cycle_ms / 1000.0 if cycle_ms else None,
+                    "message": message.name,
+                    "length": signal.length,
+                    "scale": signal.scale,
+                    "offset": signal.offset,
+                    "choices": (
+                        {int(k): str(v) for k, v in signal.choices.items()}
+                        if signal.choices
+                        else None
+                    ),
+                },
+            )
+    return meta
+
+
+def _finite_or_none(value: float) -> Optional[float]:
+    """JSON中不写NaN/inf"""
+    return float(value) if np.isfinite(value) else None
+
+
+class SignalAccumulator:
+    """
+    单个信号的单遍流式统计：计数、最小/最大、均值/方差（Welford，按块用Chan公式合并）、
+    首末采样、采样间隔，以及可选的固定分箱直方图。
+    """
+
+    def __init__(self, histogram_range: Optional[Tuple[float, float]] = None, bins: int = 0):
+        self.count = 0
+        self.nan_count = 0
+        self.mean = 0.0
+        self.m2 = 0.0
+        self.minimum = np.inf
+        self.maximum = -np.inf
+        self.first: Optional[Tuple[float, float]] = None
+        self.last: Optional[Tuple[float, float]] = None
+        self.samples = 0  # 含NaN的采样数，用于采样率
+        self.dt_min = np.inf
+        self.dt_max = 0.0
+        self.histogram = None
+        if bins and histogram_range and histogram_range[1] > histogram_range[0]:
+            self.histogram = {
+                "range": [float(histogram_range[0]), float(histogram_range[1])],
+                "counts": np.zeros(bins, dtype=np.int64),
+                "underflow": 0,
+                "overflow": 0,
+            }
+
+    def update(self, timestamps: np.ndarray, values: np.ndarray) -> None:
+        """合并一块数据（时间戳升序）"""
+        if len(timestamps) == 0:
+            return
+        if self.last is not None:
+            intervals = np.diff(timestamps, prepend=self.last[0])
+        else:
+            intervals = np.diff(timestamps)
+        if len(intervals):
+            self.dt_min = min(self.dt_min, float(intervals.min()))
+            self.dt_max = max(self.dt_max, float(intervals.max()))
+        if self.first is None:
+            self.first = (float(timestamps[0]), float(values[0]))
+        self.last = (float(timestamps[-1]), float(values[-1]))
+        self.samples += len(timestamps)
+
+        finite = values[np.isfinite(values)]
+        self.nan_count += len(values) - len(finite)
+        n_b = len(finite)
+        if n_b == 0:
+            return
+        mean_b = float(finite.mean())
+        m2_b = float(((finite - mean_b) ** 2).sum())
+        n = self.count + n_b
+        delta = mean_b - self.mean
+        self.mean += delta * n_b / n
+        self.m2 += m2_b + delta * delta * self.count * n_b / n
+        self.count = n
+        self.minimum = min(self.minimum, float(finite.min()))
+        self.maximum = max(self.maximum, float(finite.max()))
+
+        if self.histogram is not None:
+            lo, hi = self.histogram["range"]
+            counts = self.histogram["counts"]
+            self.histogram["underflow"] += int((finite < lo).sum())
+            self.histogram["overflow"] += int((finite > hi).sum())
+            inside = finite[(finite >= lo) & (finite <= hi)]
+            counts += np.histogram(inside, bins=len(counts), range=(lo, hi))[0]
+
+    def to_dict(self) -> Dict[str, Any]:
+        duration = self.last[0] - self.first[0] if self.first and self.last else 0.0
+        result: Dict[str, Any] = {
+            "count": self.count,
+            "nan_count": self.nan_count,
+            "min": self.minimum if self.count else None,
+            "max": self.maximum if self.count else None,
+            "mean": self.mean if self.count else None,
+            "std": float(np.sqrt(self.m2 / (self.count - 1))) if self.count > 1 else None,
+            "first": (
+                {"t": self.first[0], "value": _finite_or_none(self.first[1])}
+                if self.first
+                else None
+            ),
+            "last": (
+                {"t": self.last[0], "value": _finite_or_none(self.last[1])}
+                if self.last
+                else None
+            ),
+            "duration": duration,
+            "sample_rate_hz": (self.samples - 1) / duration if duration > 0 else None,
+            "dt_min": self.dt_min if np.isfinite(self.dt_min) else None,
+            "dt_max": self.dt_max if self.samples > 1 else None,
+        }
+        if self.histogram is not None:
+            result["histogram"] = {
+                "range": self.histogram["range"],
+                "counts": self.histogram["counts"].tolist(),
+                "underflow": self.histogram["underflow"],
+                "overflow": self.histogram["overflow"],
+            }
+        return result
+
+
+class StreamingSignalStats:
+    """
+    解码过程中逐块累积所有信号的统计信息，不需要在解码后重新读取数据。
+
+    用法:
+        >>> stats = StreamingSignalStats(build_signal_meta(dbc_data), histogram_bins=20)
+        >>> for chunk in _iter_decode_chunks(...):
+        ...     stats.update(chunk["signals"])
+        >>> stats.to_dict(signal_corr)
+    """
+
+    def __init__(
+        self,
+        signal_meta: Optional[Dict[str, Dict[str, Any]]] = None,
+        histogram_bins: int = 0,
+    ):
+        self.signal_meta = signal_meta or {}
+        self.histogram_bins = histogram_bins
+        self.signals: Dict[str, SignalAccumulator] = {}
+
+    def update(self, signals: Dict[str, Tuple[np.ndarray, np.ndarray]]) -> None:
+        """合并一块解码结果 {信号名: (timestamps, values)}"""
+        for name, (timestamps, values) in signals.items():
+            accumulator = self.signals.get(name)
+            if accumulator is None:
+                meta = self.signal_meta.get(name, {})
+                histogram_range = None
+                if meta.get("minimum") is not None and meta.get("maximum") is not None:
+                    histogram_range = (meta["minimum"], meta["maximum"])
+                accumulator = self.signals[name] = SignalAccumulator(
+                    histogram_range, self.histogram_bins
+                )
+            accumulator.update(timestamps, values)
+
+    def to_dict(self, signal_corr: Optional[Dict[str, str]] = None) -> Dict[str, Dict[str, Any]]:
+        """
+        Returns:
+            {输出信号名: 统计字典}，带DBC单位
+        """
+        result = {}
+        for name, accumulator in self.signals.items():
+            entry = accumulator.to_dict()
+            entry["unit"] = self.signal_meta.get(name, {}).get("unit")
+            result[str(signal_corr.get(name, name)) if signal_corr else name] = entry
+        return result
+
+
+def write_sidecar(path: StringPathLike, payload: Dict[str, Any]) -> str:
+    """写出JSON旁路文件（统计、质量报告等），返回路径"""
+    os.makedirs(os.path.dirname(str(path)) or ".", exist_ok=True)
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(payload, f, ensure_ascii=False, indent=2, default=float)
+    return str(path)
+
+
+if __name__ == "__main__":
+    pass
@@ -0,0 +1,1174 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+author: fenwickxie
+date: 2026-10-19 10:12:40
+filename: decoded_io.py
+version: 1.0
+"""
+
+import csv
+import io
+import json
+import os
+import socket
+import sys
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, List, Optional, Sequence, TypeAlias, Union
+
+import numpy as np
+import pandas as pd
+
+StringPathLike: TypeAlias = Union[str, os.PathLike]
+
+# 并发写出的最大线程数（pyarrow 写出时释放GIL，少量线程即可打满IO）
+SAVE_MAX_WORKERS = 4
+
+SUPPORTED_SAVE_FORMATS = (".parquet", ".csv", ".mat", ".feather", ".arrow")
+
+# CSV按列格式化、拼接写出时每块的行数
+CSV_CHUNK_ROWS = 100_000
+
+# 可被图表/报表/CanData直接加载的解码文件格式，按加载优先级排序
+# （Arrow IPC可内存映射打开，最快；CSV最慢）
+DECODED_SUFFIXES = (".feather", ".arrow", ".parquet", ".csv")
+
+# Arrow IPC压缩方式：uncompressed时可零拷贝内存映射读取
+IPC_COMPRESSIONS = ("uncompressed", "lz4", "zstd")
+IPC_COMPRESSION_KEY = b"ipc_compression"
+
+# Hive分区数据集的默认分区键与行组大小
+DEFAULT_PARTITION_BY = ("vehicle", "date", "condition", "source_file")
+DEFAULT_ROW_GROUP_SIZE = 100_000
+
+
+def dataframe_to_table(df: pd.DataFrame):
+    """
+    将栅格化后的DataFrame一次性转换为Arrow表，时间索引保留为timestamps列。
+
+    Args:
+        df: mdf.to_dataframe() 生成的DataFrame
+
+    Returns:
+        pyarrow.Table
+    """
+    import pyarrow as pa
+
+    table = pa.Table.from_pandas(df, preserve_index=True)
+    # from_pandas把索引列放在最后，调整为第一列以保持与原CSV输出一致
+    index_columns = table.column_names[df.shape[1]:]
+    return table.select(index_columns + table.column_names[: df.shape[1]])
+
+
+def encode_value_tables(table, value_tables: Dict[str, Dict[int, str]]):
+    """
+    把枚举信号列（原始码值）转换为Arrow字典列：字典为按码值排序的DBC标签，每个样本只存
+    字典下标，pandas读回即为Categorical。值表外的码值写为空。
+
+    字段元数据 value_table 记录 {码值: 标签}（顺序与字典一致），value_table_codes 可据此还原码值。
+
+    Args:
+        table: 栅格化结果（pyarrow.Table）
+        value_tables: {列名: {码值: 标签}}
+    """
+    import numpy as np
+    import pyarrow as pa
+
+    for name, choices in value_tables.items():
+        if name not in table.column_names or not choices:
+            continue
+        position = table.column_names.index(name)
+        if pa.types.is_dictionary(table.schema.field(position).type):
+            continue
+        codes = np.array(sorted(int(code) for code in choices), dtype=np.int64)
+        values = table.column(position).to_numpy()
+        valid = np.isfinite(values) if values.dtype.kind == "f" else np.ones(len(values), dtype=bool)
+        raw = np.zeros(len(values), dtype=np.int64)
+        raw[valid] = np.rint(values[valid])
+        indices = np.clip(np.searchsorted(codes, raw), 0, len(codes) - 1)
+        valid &= codes[indices] == raw
+        field = value_table_field(name, choices)
+        labels = {int(code): str(label) for code, label in choices.items()}
+        array = pa.DictionaryArray.from_arrays(
+            pa.array(indices.astype(field.type.index_type.to_pandas_dtype()), mask=~valid),
+            pa.array([labels[code] for code in codes.tolist()], type=pa.string()),
+        )
+        table = table.set_column(position, field, array)
+    return table
+
+
+def value_table_field(name: str, choices: Dict[int, str]):
+    """encode_value_tables 为枚举列生成的字段：字典类型（按码值排序的标签）+ value_table 元数据"""
+    import pyarrow as pa
+
+    codes = sorted(int(code) for code in choices)
+    labels = {int(code): str(label) for code, label in choices.items()}
+    index_type = pa.int8() if len(codes) <= 127 else pa.int16() if len(codes) <= 32767 else pa.int32()
+    return pa.field(
+        name,
+        pa.dictionary(index_type, pa.string()),
+        metadata={
+            "value_table": json.dumps(
+                {str(code): labels[code] for code in codes}, ensure_ascii=False
+            )
+        },
+    )
+
+
+def value_table_codes(field, column):
+    """
+    encode_value_tables 生成的字典列还原为原始码值（float64，空值为NaN）。
+
+    Args:
+        field: 列的 pyarrow.Field（带 value_table 元数据）
+        column: 列数据（Array 或 ChunkedArray）
+    """
+    import numpy as np
+    import pyarrow as pa
+    import pyarrow.compute as pc
+
+    if hasattr(column, "combine_chunks"):
+        column = column.combine_chunks()
+    table = json.loads((field.metadata or {}).get(b"value_table", b"{}"))
+    codes = np.array([float(code) for code in table], dtype=np.float64)
+    indices = pc.fill_null(column.indices, 0).to_numpy(zero_copy_only=False)
+    values = codes[indices] if len(codes) else np.full(len(column), np.nan)
+    values[column.is_null().to_numpy(zero_copy_only=False)] = np.nan
+    return values
+
+
+def _numeric_column(table, name: str):
+    """按数值读取一列：枚举字典列还原为码值"""
+    import pyarrow as pa
+
+    field = table.schema.field(name)
+    if pa.types.is_dictionary(field.type):
+        return value_table_codes(field, table.column(name))
+    return table.column(name).to_numpy()
+
+
+def _index_columns(table) -> Dict[str, str]:
+    """dataframe_to_table 保留的pandas索引列：{列名: 索引名（未命名为空）}"""
+    metadata = table.schema.pandas_metadata or {}
+    return {
+        field["field_name"]: field["name"] or ""
+        for field in metadata.get("columns", [])
+        if field["field_name"] in metadata.get("index_columns", [])
+    }
+
+
+# 各格式写出函数返回实际写出的路径（Hive分区时为数据集中的文件），
+# 在写出线程中调用，不修改共享的 options
+def _write_parquet(table, file_url: str, options: Dict[str, Any]) -> str:
+    import pyarrow.parquet as pq
+
+    if options.get("dataset_root"):
+        # Hive分区布局：写入数据集目录，扁平文件不再生成
+        return write_partitioned_parquet(
+            table,
+            options["dataset_root"],
+            options.get("partition_values") or {},
+            options.get("file_stem") or os.path.splitext(os.path.basename(file_url))[0],
+            columns=options.get("dataset_columns"),
+            fields=options.get("dataset_fields"),
+            row_group_size=options.get("row_group_size") or DEFAULT_ROW_GROUP_SIZE,
+        )
+    pq.write_table(table, file_url, compression="snappy")
+    return file_url
+
+
+def _reformat_float_text(text, positional: np.ndarray):
+    """
+    把 pyarrow 的浮点文本改写为指定记数法：positional 为True的行用定点（至少一位小数），
+    其余用科学计数（指数至少两位）。只处理有限非零值。
+
+    pyarrow 的表示可能是定点（"0.00001"、"1500"）或科学计数（"1.5e+14"），先统一拆成
+    有效数字 digits（无首尾0）和 digits[0] 所在的十进制指数 exponent，再按指数重排。
+    """
+    import pyarrow as pa
+    import pyarrow.compute as pc
+
+    negative = pc.starts_with(text, "-")
+    body = pc.utf8_ltrim(text, characters="-")
+    sci = pc.extract_regex(body, r"^(?P<lead>\d)(?:\.(?P<frac>\d+))?e(?P<exp>[+-]\d+)$")
+    fixed = pc.extract_regex(body, r"^(?P<int>\d+)(?:\.(?P<frac>\d+))?$")
+    int_part = pc.struct_field(fixed, "int")
+    frac = pc.struct_field(fixed, "frac")
+    frac_digits = pc.utf8_ltrim(frac, characters="0")
+    leading_zeros = (
+        pc.utf8_length(frac).to_numpy(zero_copy_only=False)
+        - pc.utf8_length(frac_digits).to_numpy(zero_copy_only=False)
+    )
+    sci_exponent = pc.cast(
+        pc.if_else(pc.is_valid(sci), pc.utf8_ltrim(pc.struct_field(sci, "exp"), characters="+"), "0"),
+        pa.int64(),
+    ).to_numpy(zero_copy_only=False)
+    small = pc.equal(int_part, "0").to_numpy(zero_copy_only=False)
+    exponent = np.where(
+        pc.is_valid(sci).to_numpy(zero_copy_only=False),
+        sci_exponent,
+        np.where(small, -leading_zeros - 1, pc.utf8_length(int_part).to_numpy(zero_copy_only=False) - 1),
+    )
+    digits = pc.utf8_rtrim(
+        pc.if_else(
+            pc.is_valid(sci),
+            pc.binary_join_element_wise(pc.struct_field(sci, "lead"), pc.struct_field(sci, "frac"), ""),
+            pc.if_else(pa.array(small), frac_digits, pc.binary_join_element_wise(int_part, frac, "")),
+        ),
+        characters="0",
+    )
+
+    # 科学计数：d.ddd + e±XX
+    out = pc.binary_join_element_wise(
+        pc.replace_substring_regex(digits, r"^(\d)(\d+)$", r"\1.\2"),
+        pc.if_else(pa.array(exponent < 0), "e-", "e+"),
+        pc.utf8_lpad(pc.cast(pa.array(np.abs(exponent)), pa.string()), width=2, padding="0"),
+        "",
+    )
+    # 定点：每个指数一次正则重排（指数种类很少）
+    for e in np.unique(exponent[positional]):
+        mask = positional & (exponent == e)
+        part = pc.filter(digits, pa.array(mask))
+        if e >= 0:
+            part = pc.binary_join_element_wise(part, "0" * (int(e) + 1), "")
+            part = pc.replace_substring_regex(part, rf"^(\d{{{int(e) + 1}}})(\d*?)0*$", r"\1.\2")
+            part = pc.replace_substring_regex(part, r"\.$", ".0")
+        else:
+            part = pc.binary_join_element_wise("0." + "0" * (-int(e) - 1), part, "")
+        out = pc.replace_with_mask(out, pa.array(mask), part)
+    return pc.if_else(negative, pc.binary_join_element_wise("-", out, ""), out)
+
+
+def _float_csv_text(values):
+    """
+    浮点列按 pandas to_csv 的格式转为文本（即 numpy astype(str) 的规则）：
+    1e-4 <= |x| < 1e16（float32 为 1e6）时定点表示、至少一位小数，否则科学计数法、指数至少两位；
+    NaN 为空。有效数字取 pyarrow 的最短往返表示，全部由Arrow计算内核完成。
+    """
+    import pyarrow as pa
+    import pyarrow.compute as pc
+
+    if pa.types.is_float16(values.type):
+        values = pc.cast(values, pa.float32())
+    cutoff = 1e6 if pa.types.is_float32(values.type) else 1e16
+    text = pc.cast(values, pa.string())
+    magnitude = pc.abs(pc.cast(values, pa.float64())).to_numpy(zero_copy_only=False)
+
+    # 大多数值 pyarrow 已选了相同的记数法，只需补 ".0" 或把指数补足两位
+    out = pc.replace_substring_regex(text, r"^(-?\d+)$", r"\1.0")
+    out = pc.replace_substring_regex(out, r"e([+-])(\d)$", r"e\10\2")
+    with np.errstate(invalid="ignore"):
+        finite = np.isfinite(magnitude) & (magnitude > 0)
+        positional = (magnitude >= 1e-4) & (magnitude < cutoff)
+    sci_text = pc.match_substring(text, "e").to_numpy(zero_copy_only=False)
+    mismatch = finite & (positional == sci_text)
+    if mismatch.any():
+        out = pc.replace_with_mask(
+            out,
+            pa.array(mismatch),
+            _reformat_float_text(pc.filter(text, pa.array(mismatch)), positional[mismatch]),
+        )
+    return pc.if_else(pa.array(np.isnan(magnitude)), pa.scalar(None, pa.string()), out)
+
+
+def _csv_quote(text):
+    """按 csv.QUOTE_MINIMAL 给包含分隔符、引号或换行的文本加引号"""
+    import pyarrow.compute as pc
+
+    quoted = pc.binary_join_element_wise('"', pc.replace_substring(text, '"', '""'), '"', "")
+    return pc.if_else(pc.match_substring_regex(text, '[",\r\n]'), quoted, text)
+
+
+def _csv_text_column(column):
+    """把一列转换为与 pandas to_csv 相同的CSV文本，空值为null（写为空字段）"""
+    import pyarrow as pa
+    import pyarrow.compute as pc
+
+    if pa.types.is_dictionary(column.type):
+        column = column.dictionary_decode()
+    if pa.types.is_floating(column.type):
+        return _float_csv_text(column)
+    if pa.types.is_integer(column.type):
+        return pc.cast(column, pa.string())
+    if pa.types.is_boolean(column.type):
+        return pc.if_else(column, "True", "False")
+    if not pa.types.is_string(column.type):
+        column = pc.cast(column, pa.string())
+    return _csv_quote(column)
+
+
+def _csv_header(table) -> List[str]:
+    """表头：pandas索引列用索引名（未命名为空）"""
+    index_names = _index_columns(table)
+    return [index_names.get(name, name) for name in table.column_names]
+
+
+class _ArrowCSVWriter:
+    """
+    追加写出CSV，格式与 DataFrame.to_csv 一致（表头不加引号、QUOTE_MINIMAL、pandas数字格式、
+    行尾 os.linesep），但每一列直接在Arrow数组上格式化、拼接成行，不转换为pandas，
+    写出期间释放GIL，可与其他格式并发。每次处理 CSV_CHUNK_ROWS 行。
+    """
+
+    def __init__(self, file_url: str):
+        self._file = open(file_url, "wb")
+        self._header = True
+
+    def write_table(self, table) -> None:
+        import pyarrow as pa
+        import pyarrow.compute as pc
+
+        if self._header:
+            header = io.StringIO()
+            csv.writer(header, lineterminator=os.linesep).writerow(_csv_header(table))
+            self._file.write(header.getvalue().encode("utf-8"))
+            self._header = False
+        for offset in range(0, table.num_rows, CSV_CHUNK_ROWS):
+            chunk = table.slice(offset, CSV_CHUNK_ROWS)
+            columns = [_csv_text_column(chunk.column(k).combine_chunks()) for k in range(chunk.num_columns)]
+            lines = pc.binary_join_element_wise(
+                *columns, ",", null_handling="replace", null_replacement=""
+            )
+            # 所有行拼接为一个字符串后一次写出
+            rows = pa.ListArray.from_arrays(pa.array([0, len(lines)], pa.int32()), lines)
+            self._file.write(pc.binary_join(rows, os.linesep)[0].as_buffer())
+            self._file.write(os.linesep.encode("utf-8"))
+
+    def close(self) -> None:
+        self._file.close()
+
+
+def _write_csv(table, file_url: str, options: Dict[str, Any]) -> str:
+    writer = _ArrowCSVWriter(file_url)
+    try:
+        writer.write_table(table)
+    finally:
+        writer.close()
+    return file_url
+
+
+def _ipc_metadata(schema, compression: str) -> Dict[bytes, bytes]:
+    """schema元数据中记录IPC压缩方式，读取时据此选择投影方式（见 read_decoded_table）"""
+    return {**(schema.metadata or {}), IPC_COMPRESSION_KEY: compression.encode()}
+
+
+def _write_ipc(table, file_url: str, options: Dict[str, Any]) -> str:
+    import pyarrow.feather as feather
+
+    compression = options.get("ipc_compression") or "uncompressed"
+    if compression not in IPC_COMPRESSIONS:
+        raise ValueError(
+            f"Unsupported ipc_compression: {compression} (可选: {', '.join(IPC_COMPRESSIONS)})"
+        )
+    # 整表一个记录批次，读取时每列是连续内存，可零拷贝转换为numpy
+    feather.write_feather(
+        table.replace_schema_metadata(_ipc_metadata(table.schema, compression)),
+        file_url,
+        compression=compression,
+        chunksize=max(table.num_rows, 1),
+    )
+    return file_url
+
+
+def _write_mat(table, file_url: str, options: Dict[str, Any]) -> str:
+    import scipy.io as sio
+
+    # 与 df.to_dict(orient="list") 一致，只写信号列，不写时间索引
+    index_columns = _index_columns(table)
+    sio.savemat(
+        file_url,
+        {
+            name: _numeric_column(table, name)
+            for name in table.column_names
+            if name not in index_columns
+        },
+        do_compression=True,  # MAT文件启用压缩
+    )
+    return file_url
+
+
+_TABLE_WRITERS = {
+    ".parquet": _write_parquet,
+    ".csv": _write_csv,
+    ".mat": _write_mat,
+    ".feather": _write_ipc,
+    ".arrow": _write_ipc,
+}
+
+
+def _write_dataframe_fallback(df: pd.DataFrame, save_format: str, file_url: str) -> None:
+    """Arrow转换失败时使用pandas直接写出（仅作为降级方案）"""
+    if save_format == ".csv":
+        df.to_csv(file_url, index=True)
+    elif save_format == ".parquet":
+        df.to_parquet(file_url, compression="snappy", index=True)
+    elif save_format in (".feather", ".arrow"):
+        df.reset_index().to_feather(file_url)
+    elif save_format == ".mat":
+        import scipy.io as sio
+
+        sio.savemat(file_url, df.to_dict(orient="list"), do_compression=True)
+
+
+def save_dataframe(
+    df: pd.DataFrame,
+    save_dir: StringPathLike,
+    base_filename: str,
+    save_formats: Sequence[str],
+    max_workers: Optional[int] = None,
+    ipc_compression: Optional[str] = None,
+    dataset: Optional[Dict[str, Any]] = None,
+    value_tables: Optional[Dict[str, Dict[int, str]]] = None,
+) -> Dict[str, Any]:
+    """
+    将栅格化数据转换为一次Arrow表，然后用线程池并发写出所有请求的格式。
+
+    Args:
+        df: 栅格化后的DataFrame
+        save_dir: 输出目录
+        base_filename: 输出文件名（不含扩展名）
+        save_formats: 需要写出的格式，如 (".parquet", ".csv", ".mat")
+        max_workers: 线程数，默认 min(格式数, SAVE_MAX_WORKERS)
+        ipc_compression: .feather/.arrow 的压缩方式（uncompressed/lz4/zstd）
+        dataset: 指定后.parquet写入Hive分区数据集，包含 dataset_root、
+            partition_values、dataset_columns、row_group_size，可选 dataset_fields（非float64列的
+            类型，见 write_partitioned_parquet）、file_stem（分区内文件名，
+            默认为 base_filename）
+        value_tables: {列名: {码值: 标签}}，指定后这些列写为字典（分类）列，见 encode_value_tables
+
+    Returns:
+        {"files": {格式: 路径}, "timings": {格式: 秒}, "errors": {格式: 错误信息},
+         "convert_seconds": Arrow转换耗时}
+    """
+    os.makedirs(save_dir, exist_ok=True)
+
+    options = {"ipc_compression": ipc_compression, **(dataset or {})}
+    files: Dict[str, str] = {}
+    timings: Dict[str, float] = {}
+    errors: Dict[str, str] = {}
+
+    formats = []
+    for save_format in dict.fromkeys(save_formats):  # 去重并保持顺序
+        if save_format in _TABLE_WRITERS:
+            formats.append(save_format)
+        else:
+            errors[save_format] = "Unsupported save format"
+
+    # 只做一次列式转换，所有格式共享同一个Arrow表
+    convert_start = time.perf_counter()
+    try:
+        table = dataframe_to_table(df)
+        if value_tables:
+            table = encode_value_tables(table, value_tables)
+    except Exception as e:
+        table = None
+        errors["arrow"] = f"{type(e).__name__}: {e}"
+    convert_seconds = time.perf_counter() - convert_start
+
+    def write_one(save_format: str):
+        file_url = os.path.join(save_dir, f"{base_filename}{save_format}")
+        start = time.perf_counter()
+        try:
+            if table is not None:
+                file_url = _TABLE_WRITERS[save_format](table, file_url, options)
+            else:
+                _write_dataframe_fallback(df, save_format, file_url)
+            return save_format, file_url, time.perf_counter() - start, None
+        except Exception as e:
+            return (
+                save_format,
+                file_url,
+                time.perf_counter() - start,
+                f"{type(e).__name__}: {e}",
+            )
+
+    if formats:
+        workers = max_workers or min(len(formats), SAVE_MAX_WORKERS)
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            for save_format, file_url, seconds, error in executor.map(
+                write_one, formats
+            ):
+                timings[save_format] = round(seconds, 4)
+                if error:
+                    errors[save_format] = error
+                else:
+                    files[save_format] = file_url
+
+    return {
+        "files": files,
+        "timings": timings,
+        "errors": errors,
+        "convert_seconds": round(convert_seconds, 4),
+    }
+
+
+# 可以逐窗口追加写出的格式（.mat 需要一次性写出）
+WINDOWED_FORMATS = (".parquet", ".csv", ".feather", ".arrow")
+
+
+class WindowedTableWriter:
+    """
+    逐窗口追加写出栅格化结果（内存预算模式），各格式只在内存中保留当前窗口。
+
+    支持 .parquet（含Hive分区数据集）、.csv、.feather/.arrow；其他格式记为错误。
+    所有窗口须具有相同的schema；value_tables 中的列逐窗口转换为字典列（字典固定为DBC值表）。
+
+    用法:
+        >>> writer = WindowedTableWriter(save_dir, "drive_001", (".parquet", ".csv"))
+        >>> for table in windows:
+        ...     writer.write(table)
+        >>> report = writer.close()   # {"files", "timings", "errors"}
+    """
+
+    def __init__(
+        self,
+        save_dir: StringPathLike,
+        base_filename: str,
+        save_formats: Sequence[str],
+        ipc_compression: Optional[str] = None,
+        dataset: Optional[Dict[str, Any]] = None,
+        value_tables: Optional[Dict[str, Dict[int, str]]] = None,
+    ):
+        os.makedirs(save_dir, exist_ok=True)
+        self.save_dir = str(save_dir)
+        self.base_filename = base_filename
+        self.ipc_compression = ipc_compression or "uncompressed"
+        self.dataset = dataset
+        self.value_tables = value_tables
+        self.files: Dict[str, str] = {}
+        self.timings: Dict[str, float] = {}
+        self.errors: Dict[str, str] = {}
+        self._writers: Dict[str, Any] = {}
+        self._dataset_tmp: Optional[str] = None
+        self._schema = None
+        self._formats = []
+        for save_format in dict.fromkeys(save_formats):
+            if save_format in WINDOWED_FORMATS:
+                self._formats.append(save_format)
+            else:
+                self.errors[save_format] = "Not supported in windowed output"
+        if self.ipc_compression not in IPC_COMPRESSIONS:
+            raise ValueError(
+                f"Unsupported ipc_compression: {self.ipc_compression} (可选: {', '.join(IPC_COMPRESSIONS)})"
+            )
+
+    def _open(self, save_format: str, table):
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+
+        if save_format == ".parquet" and self.dataset:
+            file_url = _dataset_file_path(
+                self.dataset["dataset_root"],
+                self.dataset.get("partition_values") or {},
+                self.dataset.get("file_stem") or self.base_filename,
+            )
+            schema = _dataset_table(
+                table, self.dataset.get("dataset_columns"), self.dataset.get("dataset_fields")
+            ).schema
+            # 写完后再改名到位，见 write_partitioned_parquet
+            self._dataset_tmp = file_url + _tmp_suffix()
+            writer = pq.ParquetWriter(
+                self._dataset_tmp, schema, compression="snappy", write_statistics=True
+            )
+        else:
+            file_url = os.path.join(self.save_dir, f"{self.base_filename}{save_format}")
+            if save_format == ".parquet":
+                writer = pq.ParquetWriter(file_url, table.schema, compression="snappy")
+            elif save_format == ".csv":
+                writer = _ArrowCSVWriter(file_url)
+            else:
+                compression = None if self.ipc_compression == "uncompressed" else self.ipc_compression
+                writer = pa.ipc.new_file(
+                    file_url,
+                    table.schema.with_metadata(_ipc_metadata(table.schema, self.ipc_compression)),
+                    options=pa.ipc.IpcWriteOptions(compression=compression),
+                )
+        self.files[save_format] = file_url
+        return writer
+
+    def write(self, table) -> None:
+        """追加一个窗口（pyarrow.Table）"""
+        import pyarrow as pa
+
+        if self.value_tables:
+            # 字典固定为DBC值表，各窗口schema一致
+            table = encode_value_tables(table, self.value_tables)
+        if self._schema is None:
+            self._schema = table.schema
+        elif not table.schema.equals(self._schema):
+            # 列类型随窗口变化时（例如整数信号在前面的窗口中尚无采样、以NaN填充），
+            # 按第一个窗口的schema写出，NaN写为空
+            table = pa.Table.from_arrays(
+                [_dataset_column(table, field.name, field.type) for field in self._schema],
+                schema=self._schema,
+            )
+        for save_format in self._formats:
+            if save_format in self.errors:
+                continue
+            start = time.perf_counter()
+            try:
+                if save_format not in self._writers:
+                    self._writers[save_format] = self._open(save_format, table)
+                if save_format == ".parquet" and self.dataset:
+                    self._writers[save_format].write_table(
+                        _dataset_table(
+                            table,
+                            self.dataset.get("dataset_columns"),
+                            self.dataset.get("dataset_fields"),
+                        ),
+                        row_group_size=self.dataset.get("row_group_size") or DEFAULT_ROW_GROUP_SIZE,
+                    )
+                else:
+                    self._writers[save_format].write_table(table)
+            except Exception as e:
+                self.errors[save_format] = f"{type(e).__name__}: {e}"
+            self.timings[save_format] = self.timings.get(save_format, 0.0) + (
+                time.perf_counter() - start
+            )
+
+    def close(self) -> Dict[str, Any]:
+        """关闭所有写出器，返回 {"files", "timings", "errors"}"""
+        for save_format, writer in self._writers.items():
+            try:
+                writer.close()
+            except Exception as e:
+                self.errors.setdefault(save_format, f"{type(e).__name__}: {e}")
+        self._writers.clear()
+        if self._dataset_tmp:
+            try:
+                if ".parquet" in self.errors:
+                    _remove_quietly(self._dataset_tmp)
+                else:
+                    os.replace(self._dataset_tmp, self.files[".parquet"])
+            except OSError as e:
+                self.errors[".parquet"] = f"{type(e).__name__}: {e}"
+            self._dataset_tmp = None
+        return {
+            "files": {f: path for f, path in self.files.items() if f not in self.errors},
+            "timings": {f: round(t, 4) for f, t in self.timings.items()},
+            "errors": self.errors,
+        }
+
+
+def _tmp_suffix() -> str:
+    """临时文件后缀：主机名+进程号+随机串，共享文件系统上多台主机同时写出时互不冲突"""
+    return f".{socket.gethostname()}.{os.getpid()}.{uuid.uuid4().hex}.tmp"
+
+
+def _remove_quietly(path: str) -> None:
+    try:
+        os.remove(path)
+    except OSError:
+        pass
+
+
+def _partition_value(value: Any) -> str:
+    """分区目录名中不能出现路径分隔符和等号"""
+    text = str(value) if value not in (None, "") else "unknown"
+    for char in ("/", "\\", "=", os.sep):
+        text = text.replace(char, "_")
+    return text
+
+
+def _dataset_table(
+    table,
+    columns: Optional[Sequence[str]] = None,
+    fields: Optional[Dict[str, Any]] = None,
+):
+    """
+    把栅格化表转换为数据集统一schema：timestamps + columns，缺失信号补空列。
+    fields 指定列的类型（枚举信号的整数码值或字典列），其余信号列为float64；
+    类型来自DBC而不是数据，同一DBC写出的各文件schema一致，_metadata 才能合并。
+    """
+    import pyarrow as pa
+
+    table = table.replace_schema_metadata(None)
+    if "__index_level_0__" in table.column_names:
+        table = table.rename_columns(
+            ["timestamps" if n == "__index_level_0__" else n for n in table.column_names]
+        )
+    if columns is None:
+        return table
+    schema = pa.schema(
+        [pa.field("timestamps", pa.float64())]
+        + [(fields or {}).get(name) or pa.field(name, pa.float64()) for name in columns]
+    )
+    arrays = []
+    for field in schema:
+        if field.name in table.column_names:
+            arrays.append(_dataset_column(table, field.name, field.type))
+        else:
+            arrays.append(pa.nulls(table.num_rows, type=field.type))
+    return pa.Table.from_arrays(arrays, schema=schema)
+
+
+def _dataset_column(table, name: str, target):
+    """把一列转换为数据集schema中的类型：浮点转整数时NaN写为空，字典列转数值时还原为码值"""
+    import pyarrow as pa
+    import pyarrow.compute as pc
+
+    column = table.column(name)
+    if column.type == target:
+        return column
+    if pa.types.is_dictionary(column.type):
+        column = pa.array(_numeric_column(table, name), from_pandas=True)
+    if pa.types.is_floating(column.type) and pa.types.is_integer(target):
+        column = pc.if_else(pc.is_nan(column), pa.scalar(None, column.type), column)
+    return column.cast(target)
+
+
+def _dataset_file_path(
+    dataset_root: StringPathLike, partition_values: Dict[str, Any], file_stem: str
+) -> str:
+    """分区文件路径（自动创建分区目录）"""
+    partition_dir = os.path.join(
+        str(dataset_root),
+        *(f"{key}={_partition_value(value)}" for key, value in partition_values.items()),
+    )
+    os.makedirs(partition_dir, exist_ok=True)
+    return os.path.join(partition_dir, f"{file_stem}.parquet")
+
+
+def write_partitioned_parquet(
+    table,
+    dataset_root: StringPathLike,
+    partition_values: Dict[str, Any],
+    file_stem: str,
+    columns: Optional[Sequence[str]] = None,
+    row_group_size: int = DEFAULT_ROW_GROUP_SIZE,
+    fields: Optional[Dict[str, Any]] = None,
+) -> str:
+    """
+    将单个解码结果写入Hive分区Parquet数据集
+    （dataset_root/vehicle=../date=../condition=../source_file=../{file_stem}.parquet）。
+
+    为了让数据集级 _metadata 可以合并，所有文件使用统一schema：
+    timestamps + columns（DBC中的全部信号），缺失的信号补空列；pandas元数据被移除。
+
+    Args:
+        table: 栅格化后的Arrow表（含timestamps列）
+        dataset_root: 数据集根目录
+        partition_values: 有序的 {分区键: 值}
+        file_stem: 分区内的文件名（不含扩展名）
+        columns: 统一schema的信号列，None表示沿用表中的列
+        row_group_size: 每个行组的行数（每个行组都写min/max统计信息）
+        fields: {列名: pyarrow.Field}，枚举信号的整数码值或字典列类型；未指定的信号列为float64
+
+    Returns:
+        写出的文件路径
+    """
+    import pyarrow.parquet as pq
+
+    table = _dataset_table(table, columns, fields)
+    file_url = _dataset_file_path(dataset_root, partition_values, file_stem)
+    # 先写临时文件再改名到位，并发汇总 _metadata 或查询数据集时不会读到写了一半的文件
+    tmp_url = file_url + _tmp_suffix()
+    try:
+        pq.write_table(
+            table,
+            tmp_url,
+            compression="snappy",
+            row_group_size=row_group_size,
+            write_statistics=True,
+        )
+        os.replace(tmp_url, file_url)
+    except BaseException:
+        _remove_quietly(tmp_url)
+        raise
+    return file_url
+
+
+def write_dataset_metadata(dataset_root: StringPathLike) -> Dict[str, Any]:
+    """
+    汇总数据集中所有Parquet文件的footer，写出 _common_metadata 与 _metadata，
+    读取端（pyarrow/polars）可以只读这一个文件就按分区和行组统计信息裁剪。
+    schema与多数文件不一致的文件（例如换了DBC）不计入 _metadata。
+
+    Returns:
+        {"files": 计入的文件数, "row_groups": 行组数, "skipped": [跳过的文件]}
+    """
+    import pyarrow.parquet as pq
+
+    dataset_root = str(dataset_root)
+    part_files = []
+    for dirpath, _, filenames in os.walk(dataset_root):
+        for filename in filenames:
+            if filename.endswith(".parquet") and not filename.startswith(("_", ".")):
+                part_files.append(os.path.join(dirpath, filename))
+    part_files.sort()
+    if not part_files:
+        return {"files": 0, "row_groups": 0, "skipped": []}
+
+    footers = [(path, pq.read_metadata(path)) for path in part_files]
+    # 以出现次数最多的schema为准
+    schema_counts: Dict[Any, int] = {}
+    for _, footer in footers:
+        key = footer.schema.to_arrow_schema().to_string()
+        schema_counts[key] = schema_counts.get(key, 0) + 1
+    reference = max(schema_counts, key=schema_counts.get)
+
+    merged = None
+    skipped = []
+    for path, footer in footers:
+        if footer.schema.to_arrow_schema().to_string() != reference:
+            skipped.append(path)
+            continue
+        footer.set_file_path(os.path.relpath(path, dataset_root).replace(os.sep, "/"))
+        if merged is None:
+            merged = footer
+        else:
+            merged.append_row_groups(footer)
+
+    schema = merged.schema.to_arrow_schema()
+    # 先写临时文件再替换，读者不会看到半个文件
+    suffix = _tmp_suffix()
+    common_tmp = os.path.join(dataset_root, "_common_metadata" + suffix)
+    metadata_tmp = os.path.join(dataset_root, "_metadata" + suffix)
+    pq.write_metadata(schema, common_tmp)
+    merged.write_metadata_file(metadata_tmp)
+    os.replace(common_tmp, os.path.join(dataset_root, "_common_metadata"))
+    os.replace(metadata_tmp, os.path.join(dataset_root, "_metadata"))
+    return {
+        "files": len(footers) - len(skipped),
+        "row_groups": merged.num_row_groups,
+        "skipped": skipped,
+    }
+
+
+def open_decoded_dataset(dataset_root: StringPathLike):
+    """
+    打开Hive分区解码数据集；存在 _metadata 时直接用它构建，
+    过滤条件（分区键、timestamps范围）会下推到分区和行组统计信息。
+
+    Example:
+        >>> import pyarrow.dataset as ds
+        >>> dataset = open_decoded_dataset("decoded/dataset")
+        >>> dataset.to_table(filter=(ds.field("vehicle") == "EKEBA01") & (ds.field("timestamps") > 1.7e9))
+    """
+    import pyarrow.dataset as ds
+
+    dataset_root = str(dataset_root)
+    metadata_path = os.path.join(dataset_root, "_metadata")
+    if os.path.exists(metadata_path):
+        return ds.parquet_dataset(metadata_path, partitioning="hive")
+    return ds.dataset(dataset_root, format="parquet", partitioning="hive")
+
+
+def read_decoded_table(path: StringPathLike, columns: Optional[Sequence[str]] = None):
+    """
+    以Arrow表形式读取解码文件。Arrow IPC文件通过内存映射打开，
+    未压缩时不复制数据；Parquet只读取需要的列。
+
+    Args:
+        path: 解码文件路径（.feather/.arrow/.parquet/.csv）
+        columns: 需要的列，None表示全部
+
+    Returns:
+        pyarrow.Table
+    """
+    import pyarrow as pa
+
+    path = str(path)
+    suffix = os.path.splitext(path)[1].lower()
+    if suffix in (".feather", ".arrow"):
+        reader = pa.ipc.open_file(pa.memory_map(path, "r"))
+        if columns is None:
+            return reader.read_all()
+        names = _with_index_columns(reader.schema.names, columns)
+        if (reader.schema.metadata or {}).get(IPC_COMPRESSION_KEY) == b"uncompressed":
+            # 未压缩：整表零拷贝映射后选列，不读取任何数据
+            return reader.read_all().select(names)
+        # 压缩（或来源未知）：读取时投影，未请求的列不解压
+        options = pa.ipc.IpcReadOptions(
+            included_fields=[reader.schema.names.index(name) for name in names]
+        )
+        return pa.ipc.open_file(pa.memory_map(path, "r"), options=options).read_all()
+    if suffix == ".parquet":
+        import pyarrow.parquet as pq
+
+        if columns is not None:
+            columns = _with_index_columns(pq.read_schema(path).names, columns)
+        return pq.read_table(path, columns=columns, memory_map=True)
+    if suffix == ".csv":
+        import pyarrow.csv as pacsv
+
+        convert_options = (
+            pacsv.ConvertOptions(include_columns=_csv_usecols(path, columns))
+            if columns is not None
+            else None
+        )
+        return pacsv.read_csv(path, convert_options=convert_options)
+    raise ValueError(f"Unsupported decoded file type: {suffix}")
+
+
+def read_decoded_columns(path: StringPathLike) -> list:
+    """只读取文件schema获取列名（不加载数据），时间列不计入"""
+    import pyarrow as pa
+
+    path = str(path)
+    suffix = os.path.splitext(path)[1].lower()
+    if suffix in (".feather", ".arrow"):
+        names = pa.ipc.open_file(pa.memory_map(path, "r")).schema.names
+    elif suffix == ".parquet":
+        import pyarrow.parquet as pq
+
+        names = pq.read_schema(path).names
+    elif suffix == ".csv":
+        names = list(pd.read_csv(path, nrows=0).columns)
+    else:
+        raise ValueError(f"Unsupported decoded file type: {suffix}")
+    return [name for name in names if name not in ("timestamps", "__index_level_0__")]
+
+
+def table_to_dataframe(table, copy: bool = False) -> pd.DataFrame:
+    """
+    Arrow表转换为DataFrame，无空值的单块数值列直接引用Arrow内存（内存映射的IPC文件即文件页），
+    不复制；有空值的列和字典列按列单独转换。pandas索引列（timestamps）还原为索引。
+
+    Args:
+        table: pyarrow.Table
+        copy: True时复制为可写数组；默认零拷贝列为只读
+
+    Returns:
+        pandas DataFrame
+    """
+    import pyarrow as pa
+
+    index_columns = _index_columns(table)
+    data = {}
+    for name in table.column_names:
+        column = table.column(name)
+        if (
+            not copy
+            and column.num_chunks == 1
+            and column.null_count == 0
+            and (pa.types.is_integer(column.type) or pa.types.is_floating(column.type))
+        ):
+            data[name] = column.chunk(0).to_numpy(zero_copy_only=True)
+        else:
+            data[name] = column.to_pandas()
+    df = pd.DataFrame(data, columns=table.column_names, copy=copy)
+    if index_columns:
+        df = df.set_index(list(index_columns))
+        df.index.names = [index_columns[name] or None for name in index_columns]
+    return df
+
+
+def load_decoded(
+    path: StringPathLike,
+    columns: Optional[Sequence[str]] = None,
+    index_as_column: bool = False,
+    copy: bool = False,
+) -> pd.DataFrame:
+    """
+    加载解码文件为DataFrame（图表、报表、CanData共用的加载入口）。
+
+    只读取请求的列；未压缩的Arrow IPC文件经内存映射零拷贝加载，重复打开几乎没有开销，
+    这些列是只读的（需要原地修改时传 copy=True，或对列赋新值）。
+
+    Args:
+        path: 解码文件路径
+        columns: 需要的信号列，None表示全部（时间列总会带上）
+        index_as_column: True时把timestamps索引还原为普通列
+        copy: 复制为可写数组
+
+    Returns:
+        pandas DataFrame
+    """
+    if os.path.splitext(str(path))[1].lower() == ".csv":
+        df = pd.read_csv(path, usecols=_csv_usecols(path, columns))
+    else:
+        df = table_to_dataframe(read_decoded_table(path, columns), copy=copy)
+    if index_as_column and df.index.name is not None:
+        df = df.reset_index()
+    return df
+
+
+def list_decoded_files(directory: StringPathLike) -> list:
+    """
+    列出目录中的解码文件；同名文件存在多种格式时只取加载最快的一种。
+    """
+    chosen: Dict[str, str] = {}
+    for file in sorted(os.listdir(directory)):
+        stem, suffix = os.path.splitext(file)
+        suffix = suffix.lower()
+        if suffix not in DECODED_SUFFIXES:
+            continue
+        current = chosen.get(stem)
+        if current is None or DECODED_SUFFIXES.index(suffix) < DECODED_SUFFIXES.index(
+            os.path.splitext(current)[1].lower()
+        ):
+            chosen[stem] = file
+    return [os.path.join(directory, chosen[stem]) for stem in sorted(chosen)]
+
+
+def _with_index_columns(names: Sequence[str], columns: Sequence[str]) -> list:
+    """在请求的列前补上时间列，保证to_pandas能还原timestamps索引"""
+    index_columns = [
+        name for name in ("timestamps", "__index_level_0__") if name in names
+    ]
+    return index_columns + [
+        name for name in columns if name in names and name not in index_columns
+    ]
+
+
+def _csv_usecols(path: StringPathLike, columns: Optional[Sequence[str]]):
+    if columns is None:
+        return None
+    header = list(pd.read_csv(path, nrows=0).columns)
+    return [name for name in header if name == "timestamps" or name in columns]
+
+
+def _create_shared_memory(size: int):
+    """
+    创建不受当前进程resource_tracker管理的共享内存块。
+    子进程创建、父进程接管：若由子进程跟踪，子进程退出时内存块会被提前回收。
+    """
+    from multiprocessing import resource_tracker, shared_memory
+
+    if sys.version_info >= (3, 13):
+        return shared_memory.SharedMemory(create=True, size=size, track=False)
+    shm = shared_memory.SharedMemory(create=True, size=size)
+    resource_tracker.unregister(shm._name, "shared_memory")
+    return shm
+
+
+def export_to_shared_memory(df: pd.DataFrame) -> Optional[Dict[str, Any]]:
+    """
+    将栅格化DataFrame按列连续存放到共享内存，供父进程零拷贝读取。
+    各列保持自身的数值类型（枚举码值仍为整数，float32方案仍为float32），
+    非数值列转为float64；每列起始位置按8字节对齐。
+
+    Args:
+        df: 栅格化后的DataFrame（timestamps为索引）
+
+    Returns:
+        共享内存描述 {"name", "rows", "columns", "dtypes", "offsets"}，空数据返回None
+    """
+    import numpy as np
+
+    if df.empty:
+        return None
+    columns = [df.index.name or "timestamps", *map(str, df.columns)]
+    arrays = [df.index.to_numpy(dtype=np.float64)]
+    for column in df.columns:
+        values = df[column].to_numpy()
+        if values.dtype.kind not in "biuf":
+            values = df[column].to_numpy(dtype=np.float64, na_value=np.nan)
+        arrays.append(values)
+    offsets = []
+    size = 0
+    for values in arrays:
+        offsets.append(size)
+        size += -(-values.nbytes // 8) * 8
+    shm = _create_shared_memory(size)
+    try:
+        for values, offset in zip(arrays, offsets):
+            view = np.ndarray(values.shape, dtype=values.dtype, buffer=shm.buf, offset=offset)
+            view[:] = values
+            del view
+    except Exception:
+        shm.close()
+        shm.unlink()
+        raise
+    shm.close()
+    return {
+        "name": shm.name,
+        "rows": len(df),
+        "columns": columns,
+        "dtypes": [values.dtype.str for values in arrays],
+        "offsets": offsets,
+    }
+
+
+class SharedDecodeResult:
+    """
+    多进程内存模式的解码结果：子进程写入共享内存，父进程在此零拷贝挂载。
+
+    用法:
+        >>> with decoder.read_can_files_multi(in_memory=True) as result:
+        ...     table = result.tables["xxx.blf"]        # pyarrow.Table，零拷贝
+        ...     arrays = result.arrays("xxx.blf")        # {列名: NumPy视图}
+
+    注意：表和数组直接引用共享内存，close()之后不可再使用；需要长期持有时请先复制。
+    同一个日志按多个DBC解码时，键为 "{DBC文件名}/{日志文件名}"。
+    """
+
+    def __init__(self):
+        self._handles: Dict[str, Any] = {}
+        self._arrays: Dict[str, Dict[str, Any]] = {}
+        self.tables: Dict[str, Any] = {}
+
+    def attach(self, file: str, descriptor: Dict[str, Any]) -> None:
+        """挂载子进程导出的共享内存块"""
+        import numpy as np
+        import pyarrow as pa
+        from multiprocessing import shared_memory
+
+        if file in self._handles:
+            # 同名结果重复挂载时先释放旧块，否则它不会再被 unlink
+            self._release(file)
+        shm = shared_memory.SharedMemory(name=descriptor["name"])
+        arrays = {
+            name: np.ndarray(
+                (descriptor["rows"],), dtype=np.dtype(dtype), buffer=shm.buf, offset=offset
+            )
+            for name, dtype, offset in zip(
+                descriptor["columns"], descriptor["dtypes"], descriptor["offsets"]
+            )
+        }
+        self._handles[file] = shm
+        self._arrays[file] = arrays
+        # pa.array 对无掩码的连续数值数组不复制数据
+        self.tables[file] = pa.Table.from_arrays(
+            [pa.array(values) for values in arrays.values()], names=list(arrays)
+        )
+
+    def arrays(self, file: str) -> Dict[str, Any]:
+        """返回 {列名: NumPy视图}（与共享内存共用数据）"""
+        return dict(self._arrays[file])
+
+    def keys(self):
+        return self.tables.keys()
+
+    def __getitem__(self, file: str):
+        return self.tables[file]
+
+    def __contains__(self, file: str) -> bool:
+        return file in self.tables
+
+    def __len__(self) -> int:
+        return len(self.tables)
+
+    def _release(self, file: str) -> None:
+        """解除挂载并删除单个共享内存块"""
+        self.tables.pop(file, None)
+        self._arrays.pop(file, None)
+        shm = self._handles.pop(file)
+        try:
+            shm.close()
+        except BufferError:
+            # 外部仍持有视图时无法解除映射，只删除名字，进程退出时由系统回收
+            pass
+        try:
+            shm.unlink()
+        except FileNotFoundError:
+            pass
+
+    def close(self) -> None:
+        """释放所有共享内存块"""
+        for file in list(self._handles):
+            self._release(file)
+
+    def __enter__(self) -> "SharedDecodeResult":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+
+if __name__ == "__main__":
+    pass
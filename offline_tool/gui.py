@@ -24,6 +24,7 @@ import yaml
 
 from core.data_processing.candata import CanData
 from core.data_processing.candecode import process_candecode_from_config
+from core.data_processing.decoded_io import DECODED_SUFFIXES, load_decoded, read_decoded_columns
 
 
 class WorkerThread(QThread):
@@ -222,7 +223,7 @@ class ComputeTab(QWidget):
     def browse_input_file(self):
         file_path, _ = QFileDialog.getOpenFileName(
             self, "选择输入文件", "", 
-            "CAN 数据文件 (*.csv *.blf *.asc);;所有文件 (*.*)"
+            "CAN 数据文件 (*.csv *.parquet *.feather *.arrow *.blf *.asc);;所有文件 (*.*)"
         )
         if file_path:
             self.input_file.setText(file_path)
@@ -259,8 +260,8 @@ class ComputeTab(QWidget):
         suffix = input_path.suffix.lower()
         
         try:
-            if suffix == ".csv":
-                self.log_text.append("正在处理 CSV 文件...")
+            if suffix in DECODED_SUFFIXES:
+                self.log_text.append(f"正在处理 {suffix} 文件...")
                 self.progress_bar.setValue(30)
                 can_data = CanData(str(input_path))
                 metrics = can_data.get_all_metrics()
@@ -497,7 +498,7 @@ class ChartTab(QWidget):
     def browse_data_file(self):
         file_path, _ = QFileDialog.getOpenFileName(
             self, "选择数据文件", "", 
-            "数据文件 (*.parquet *.csv);;所有文件 (*.*)"
+            "数据文件 (*.feather *.arrow *.parquet *.csv);;所有文件 (*.*)"
         )
         if file_path:
             self.data_file_input.setText(file_path)
@@ -508,7 +509,6 @@ class ChartTab(QWidget):
             self.output_dir_input.setText(directory)
     
     def generate_charts(self):
-        import pandas as pd
         import matplotlib.pyplot as plt
         
         data_path = Path(self.data_file_input.text())
@@ -526,16 +526,14 @@ class ChartTab(QWidget):
         try:
             self.log_text.append(f"正在加载数据: {data_path.name}")
             
-            if data_path.suffix == ".parquet":
-                df = pd.read_parquet(data_path)
-            elif data_path.suffix == ".csv":
-                df = pd.read_csv(data_path)
-            else:
+            if data_path.suffix.lower() not in DECODED_SUFFIXES:
                 raise ValueError("不支持的文件类型")
             
-            self.progress_bar.setValue(20)
+            # 只加载需要绘制的列，feather文件内存映射打开
+            columns = signal_columns.split(",") if signal_columns else read_decoded_columns(data_path)[:5]
+            df = load_decoded(data_path, columns=columns)
             
-            columns = signal_columns.split(",") if signal_columns else df.columns[1:6].tolist()
+            self.progress_bar.setValue(20)
             output_dir.mkdir(parents=True, exist_ok=True)
             
             total = len(columns)
@@ -0,0 +1,60 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+author: fenwickxie
+date: 2026-10-19 21:40:12
+filename: conftest.py
+version: 1.0
+"""
+
+import os
+import sys
+
+import pytest
+
+# 与 cli.py 一致，从 offline_tool 目录导入 core.data_processing
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# 标准帧报文（Engine/Mux）与 J1939 扩展帧报文（EEC1/CCVS，源地址 0xFE）
+TEST_DBC = """VERSION ""
+
+NS_ :
+
+BS_:
+
+BU_: ECU
+
+BO_ 256 Engine: 8 ECU
+ SG_ EngSpd : 0|16@1+ (0.25,0) [0|16383] "rpm" ECU
+ SG_ EngTemp : 16|8@1- (1,-40) [-168|87] "degC" ECU
+ SG_ EngTorque : 31|12@0- (0.5,10) [0|0] "Nm" ECU
+ SG_ EngCnt : 56|4@1+ (1,0) [0|15] "" ECU
+
+BO_ 512 Mux: 8 ECU
+ SG_ Mode M : 0|8@1+ (1,0) [0|255] "" ECU
+ SG_ TempA m1 : 8|16@1- (0.1,-40) [0|0] "" ECU
+ SG_ TempB m1 : 24|12@0+ (1,0) [0|0] "" ECU
+ SG_ Volt m2 : 8|32@1+ (0.001,0) [0|0] "" ECU
+ SG_ Common : 56|8@1+ (1,0) [0|255] "" ECU
+
+BO_ 2364540158 EEC1: 8 ECU
+ SG_ EngineSpeed : 24|16@1+ (0.125,0) [0|8031.875] "rpm" ECU
+
+BO_ 2566844926 CCVS: 8 ECU
+ SG_ WheelSpeed : 8|16@1+ (0.00390625,0) [0|250.996] "km/h" ECU
+"""
+
+
+@pytest.fixture
+def dbc():
+    import cantools
+
+    return cantools.database.load_string(TEST_DBC, "dbc", strict=False)
+
+
+@pytest.fixture
+def dbc_path(tmp_path):
+    path = tmp_path / "test.dbc"
+    path.write_text(TEST_DBC)
+    return str(path)
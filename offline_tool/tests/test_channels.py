@@ -0,0 +1,90 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+author: fenwickxie
+date: 2026-10-19 22:31:06
+filename: test_channels.py
+version: 1.0
+"""
+
+import can
+import pandas as pd
+import pytest
+
+from conftest import TEST_DBC
+from core.data_processing import candecode
+from core.data_processing.candecode import CanDecoder, _process_single_file_wrapper
+
+FRAMES_PER_CHANNEL = {0: 40, 1: 25}
+
+
+@pytest.fixture
+def channel_setup(tmp_path):
+    """通道1、2各用一个DBC（通道2的信号改名），日志中两个通道都发送 0x100"""
+    (tmp_path / "ch1.dbc").write_text(TEST_DBC)
+    (tmp_path / "ch2.dbc").write_text(TEST_DBC.replace("EngSpd", "Ch2Spd"))
+    log_dir = tmp_path / "logs"
+    log_dir.mkdir()
+    with can.BLFWriter(str(log_dir / "bus.blf")) as writer:
+        for channel, count in FRAMES_PER_CHANNEL.items():
+            for i in range(count):
+                writer.on_message_received(
+                    can.Message(timestamp=1000.0 + i * 0.01, arbitration_id=0x100, is_extended_id=False,
+                                channel=channel, data=bytes([i, channel, 0, 0, 0, 0, 0, 0]))
+                )
+    return {1: str(tmp_path / "ch1.dbc"), 2: str(tmp_path / "ch2.dbc")}, log_dir / "bus.blf"
+
+
+def test_split_reads_log_once_and_writes_one_output_per_channel(tmp_path, channel_setup, monkeypatch):
+    channel_dbc, log_path = channel_setup
+    opened = []
+    open_reader = candecode._open_can_reader
+    monkeypatch.setattr(
+        candecode, "_open_can_reader", lambda path, file_type: opened.append(path) or open_reader(path, file_type)
+    )
+
+    results = _process_single_file_wrapper(
+        (channel_dbc[1], str(log_path), "blf", None, None, 0.01, True, str(tmp_path / "out"), (".parquet",),
+         {"channel_dbc": channel_dbc, "channel_output": "split"})
+    )
+
+    assert len(opened) == 1
+    assert [r["file"] for r in results] == ["bus_CH1.blf", "bus_CH2.blf"]
+    assert [r["total_msgs"] for r in results] == [40, 25]
+    assert [r["decoded_msgs"] for r in results] == [40, 25]
+    ch1 = pd.read_parquet(tmp_path / "out" / "bus_CH1.parquet")
+    ch2 = pd.read_parquet(tmp_path / "out" / "bus_CH2.parquet")
+    # 拆分输出的信号名不带通道前缀，各通道只含自己DBC的信号
+    assert "EngSpd" in ch1.columns and "Ch2Spd" not in ch1.columns
+    assert "Ch2Spd" in ch2.columns and "EngSpd" not in ch2.columns
+    assert ch1["EngSpd"].iloc[:3].tolist() == pytest.approx([0.0, 0.25, 0.5], rel=1e-6)
+    assert ch2["Ch2Spd"].iloc[:3].tolist() == pytest.approx([64.0, 64.25, 64.5], rel=1e-6)
+
+
+def test_split_signal_filter_applies_to_every_channel(tmp_path, channel_setup):
+    channel_dbc, log_path = channel_setup
+    results = _process_single_file_wrapper(
+        (channel_dbc[1], str(log_path), "blf", ["EngTemp"], None, 0.01, True, str(tmp_path / "out"),
+         (".parquet",), {"channel_dbc": channel_dbc, "channel_output": "split"})
+    )
+    assert [r["signals"] for r in results] == [1, 1]
+    assert list(pd.read_parquet(tmp_path / "out" / "bus_CH2.parquet").columns) == ["EngTemp"]
+
+
+@pytest.mark.parametrize("session_streaming", [False, True])
+def test_split_end_to_end(tmp_path, channel_setup, session_streaming):
+    channel_dbc, log_path = channel_setup
+    decoder = CanDecoder(channel_dbc[1], str(log_path.parent), channel_dbc=channel_dbc, channel_output="split")
+    results = decoder.read_can_files_multi(
+        step=0.01,
+        save_dir=str(tmp_path / "out"),
+        save_formats=(".parquet",),
+        num_processes=1,
+        session_streaming=session_streaming,
+    )
+    assert sorted(r["file"] for r in results) == ["bus_CH1.blf", "bus_CH2.blf"]
+    assert sorted(r["total_msgs"] for r in results) == [25, 40]
+    assert all(r["success"] for r in results)
+    ch2 = pd.read_parquet(tmp_path / "out" / "bus_CH2.parquet")
+    assert "Ch2Spd" in ch2.columns and len(ch2) == 25
@@ -0,0 +1,106 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+author: fenwickxie
+date: 2026-10-19 23:59:59
+filename: test_compress.py
+version: 1.0
+"""
+
+import gzip
+import io
+import lzma
+import os
+
+import can
+import pandas as pd
+import pytest
+
+from core.data_processing import cancompress
+from core.data_processing.cancompress import ThreadedDecompressor, log_file_type, split_log_name
+from core.data_processing.candecode import CanDecoder
+
+COMPRESSORS = {
+    ".gz": gzip.compress,
+    ".xz": lzma.compress,
+    ".zst": lambda data: cancompress.zstandard.ZstdCompressor().compress(data),
+}
+
+
+def _compress(path, suffix: str) -> str:
+    if suffix == ".zst" and not cancompress.ZSTD_AVAILABLE:
+        pytest.skip("zstandard 未安装")
+    target = f"{path}{suffix}"
+    with open(path, "rb") as src, open(target, "wb") as dst:
+        dst.write(COMPRESSORS[suffix](src.read()))
+    return target
+
+
+@pytest.mark.parametrize(
+    "name, stem, file_type",
+    [("drive_001.blf.zst", "drive_001", "blf"), ("a.b.asc.gz", "a.b", "asc"), ("drive.blf", "drive", "blf"),
+     ("x.MF4", "x", "mf4")],
+)
+def test_log_names(name, stem, file_type):
+    assert split_log_name(f"/data/{name}")[0] == stem
+    assert log_file_type(name) == file_type
+
+
+@pytest.mark.parametrize("suffix", list(COMPRESSORS))
+def test_stream_round_trip(tmp_path, suffix):
+    raw = tmp_path / "payload.bin"
+    data = os.urandom(300_000) * 3
+    raw.write_bytes(data)
+    # 小块、短队列：解压线程必须等待消费者
+    stream = io.BufferedReader(ThreadedDecompressor(_compress(raw, suffix), read_size=4096, queue_blocks=2))
+    try:
+        assert stream.read() == data
+    finally:
+        stream.close()
+
+
+def test_multi_member_gzip_and_early_close(tmp_path):
+    path = tmp_path / "parts.gz"
+    path.write_bytes(gzip.compress(b"a" * 100_000) + gzip.compress(b"b" * 100_000))
+    stream = ThreadedDecompressor(path, read_size=1000, queue_blocks=1)
+    assert io.BufferedReader(stream).read() == b"a" * 100_000 + b"b" * 100_000
+
+    stream = ThreadedDecompressor(path, read_size=1000, queue_blocks=1)
+    stream.read(10)
+    stream.close()  # 解压线程阻塞在满队列上时也能退出
+    assert not stream._thread.is_alive()
+
+
+def test_corrupt_data_raises_in_the_reader(tmp_path):
+    path = tmp_path / "broken.gz"
+    path.write_bytes(gzip.compress(b"x" * 100_000)[:-20] + b"garbage" * 3)
+    with pytest.raises(Exception):
+        io.BufferedReader(ThreadedDecompressor(path)).read()
+
+
+@pytest.mark.parametrize("file_type, suffix", [("blf", ".zst"), ("blf", ".xz"), ("asc", ".gz")])
+def test_compressed_logs_decode_like_plain_ones(tmp_path, dbc_path, file_type, suffix):
+    plain, archive = tmp_path / "plain", tmp_path / "archive"
+    plain.mkdir()
+    archive.mkdir()
+    writer = can.BLFWriter if file_type == "blf" else can.ASCWriter
+    with writer(str(plain / f"drive.{file_type}")) as log:
+        for i in range(500):
+            log.on_message_received(
+                can.Message(timestamp=1.7e9 + i * 0.01, arbitration_id=0x100, is_extended_id=False,
+                            data=bytes([i % 256, i // 256, 0, 0, 0, 0, 0, i % 16]))
+            )
+    compressed = _compress(plain / f"drive.{file_type}", suffix)
+    os.replace(compressed, archive / os.path.basename(compressed))
+
+    frames = {}
+    for source in (plain, archive):
+        [result] = CanDecoder(dbc_path, str(source)).read_can_files_multi(
+            step=0.01, save_dir=str(tmp_path / f"{source.name}_out"), save_formats=(".csv",), num_processes=1,
+        )
+        assert result["success"] and result["total_msgs"] == 500
+        frames[source.name] = pd.read_csv(tmp_path / f"{source.name}_out" / "drive.csv")
+    pd.testing.assert_frame_equal(frames["archive"], frames["plain"])
+    # 不产生解压后的临时副本
+    assert os.listdir(archive) == [f"drive.{file_type}{suffix}"]
@@ -0,0 +1,133 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+author: fenwickxie
+date: 2026-10-19 23:59:12
+filename: test_dataset.py
+version: 1.0
+"""
+
+import can
+import pytest
+
+from conftest import TEST_DBC
+from core.data_processing.candecode import CanDecoder
+
+
+@pytest.fixture
+def two_dbc_setup(tmp_path):
+    """同一日志用两个DBC解码（第二个DBC的信号改名）"""
+    dbc_dir = tmp_path / "dbc"
+    dbc_dir.mkdir()
+    (dbc_dir / "powertrain.dbc").write_text(TEST_DBC)
+    (dbc_dir / "chassis.dbc").write_text(TEST_DBC.replace("EngSpd", "VehSpd"))
+    log_dir = tmp_path / "logs"
+    log_dir.mkdir()
+    # 同一会话的两个片段，会话流式模式下合并为一个输出
+    for segment in (1, 2):
+        with can.BLFWriter(str(log_dir / f"drive_{segment}.blf")) as writer:
+            for i in range(50):
+                writer.on_message_received(
+                    can.Message(timestamp=1.7e9 + segment + i * 0.01, arbitration_id=0x100,
+                                is_extended_id=False, data=bytes([i, 0, 0, 0, 0, 0, 0, 0]))
+                )
+    return str(dbc_dir), str(log_dir)
+
+
+def test_each_dbc_writes_its_own_part(tmp_path, two_dbc_setup):
+    import pyarrow.parquet as pq
+
+    dbc_dir, log_dir = two_dbc_setup
+    decoder = CanDecoder(dbc_dir, log_dir)
+    results = decoder.read_can_files_multi(
+        step=0.01,
+        save_dir=str(tmp_path / "out"),
+        save_formats=(".parquet",),
+        num_processes=1,
+        dataset_layout="hive",
+        partition_by=["source_file"],
+        session_streaming=True,
+    )
+    assert all(r["success"] for r in results)
+    # 会话输出名为 drive_1-2，分区值取首个片段
+    partition = tmp_path / "out" / "dataset" / "source_file=drive_1"
+    assert sorted(p.name for p in partition.iterdir()) == ["drive_1-2.chassis.parquet", "drive_1-2.powertrain.parquet"]
+    assert "VehSpd" in pq.read_schema(partition / "drive_1-2.chassis.parquet").names
+    assert "EngSpd" in pq.read_schema(partition / "drive_1-2.powertrain.parquet").names
+    assert sorted(r["dataset_file"] for r in results) == sorted(str(p) for p in partition.iterdir())
+
+
+def test_per_file_parts_are_named_by_dbc(tmp_path, two_dbc_setup):
+    dbc_dir, log_dir = two_dbc_setup
+    CanDecoder(dbc_dir, log_dir).read_can_files_multi(
+        step=0.01,
+        save_dir=str(tmp_path / "out"),
+        save_formats=(".parquet",),
+        num_processes=1,
+        dataset_layout="hive",
+        partition_by=["source_file"],
+    )
+    for stem in ("drive_1", "drive_2"):
+        partition = tmp_path / "out" / "dataset" / f"source_file={stem}"
+        assert sorted(p.name for p in partition.iterdir()) == [f"{stem}.chassis.parquet", f"{stem}.powertrain.parquet"]
+
+
+def test_windowed_part_appears_only_when_complete(tmp_path):
+    import pyarrow as pa
+
+    from core.data_processing.decoded_io import WindowedTableWriter
+
+    dataset = {"dataset_root": str(tmp_path / "dataset"), "partition_values": {"source_file": "drive"},
+               "file_stem": "drive.powertrain"}
+    writer = WindowedTableWriter(str(tmp_path), "drive", (".parquet",), dataset=dataset)
+    for first in (0.0, 1.0):
+        writer.write(pa.table({"timestamps": [first, first + 0.5], "EngSpd": [1.0, 2.0]}))
+    partition = tmp_path / "dataset" / "source_file=drive"
+    [pending] = partition.iterdir()
+    # 写出过程中只有临时文件，读者和 _metadata 汇总都不会把它当作分区文件
+    assert pending.name.startswith("drive.powertrain.parquet.") and pending.suffix == ".tmp"
+    assert writer.close()["files"][".parquet"] == str(partition / "drive.powertrain.parquet")
+    assert [p.name for p in partition.iterdir()] == ["drive.powertrain.parquet"]
+
+
+@pytest.mark.parametrize("categorical_enums", [False, True])
+def test_enum_columns_keep_their_type_in_the_dataset(tmp_path, categorical_enums):
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    from core.data_processing.decoded_io import open_decoded_dataset
+
+    dbc = tmp_path / "enum.dbc"
+    dbc.write_text(TEST_DBC + '\nVAL_ 256 EngCnt 0 "Zero" 1 "One" 2 "Two" ;\n')
+    log_dir = tmp_path / "logs"
+    log_dir.mkdir()
+    for index in range(2):
+        with can.BLFWriter(str(log_dir / f"trip{index}.blf")) as writer:
+            for i in range(30):
+                writer.on_message_received(
+                    can.Message(timestamp=1.7e9 + index * 100 + i * 0.01, arbitration_id=0x100,
+                                is_extended_id=False, data=bytes([i, 0, 0, 0, 0, 0, 0, i % 3]))
+                )
+    CanDecoder(str(dbc), str(log_dir)).read_can_files_multi(
+        step=0.01,
+        save_dir=str(tmp_path / "out"),
+        save_formats=(".parquet",),
+        num_processes=1,
+        dataset_layout="hive",
+        partition_by=["source_file"],
+        categorical_enums=categorical_enums,
+    )
+    root = tmp_path / "out" / "dataset"
+    expected = pa.dictionary(pa.int8(), pa.string()) if categorical_enums else pa.uint8()
+    # 两个文件schema一致，都计入 _metadata
+    metadata = pq.read_metadata(root / "_metadata")
+    assert metadata.num_row_groups == 2
+    schema = metadata.schema.to_arrow_schema()
+    assert schema.field("EngCnt").type == expected
+    assert schema.field("EngSpd").type == pa.float64()
+    assert schema.field("Volt").type == pa.float64()  # 日志中没有的信号为空列
+
+    table = open_decoded_dataset(root).to_table()
+    values = table.column("EngCnt").to_pylist()[:4]
+    assert values == (["Zero", "One", "Two", "Zero"] if categorical_enums else [0, 1, 2, 0])
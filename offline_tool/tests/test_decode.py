@@ -0,0 +1,97 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+author: fenwickxie
+date: 2026-10-19 23:36:18
+filename: test_decode.py
+version: 1.0
+"""
+
+import can
+import numpy as np
+
+from core.data_processing.candecode import _build_decoder_map, _iter_decode_chunks, _new_decode_stats
+
+
+def _reference(dbc, messages):
+    """逐帧用 cantools 解码作为参考，返回 ({信号: [(时间, 值)]}, 成功解码的帧数)"""
+    signals, decoded = {}, 0
+    for msg in messages:
+        if msg.is_error_frame or msg.is_remote_frame:
+            continue
+        try:
+            values = dbc.get_message_by_frame_id(msg.arbitration_id).decode(msg.data, decode_choices=False)
+        except Exception:
+            continue
+        decoded += 1
+        for name, value in values.items():
+            signals.setdefault(name, []).append((msg.timestamp, float(value)))
+    return signals, decoded
+
+
+def _decode(dbc, messages, chunk_frames=500):
+    stats = _new_decode_stats()
+    signals = {}
+    for chunk in _iter_decode_chunks(messages, _build_decoder_map(dbc), chunk_frames=chunk_frames, stats=stats):
+        for name, (t, v) in chunk["signals"].items():
+            signals.setdefault(name, []).append(np.column_stack([t, v]))
+    return {name: np.concatenate(parts) for name, parts in signals.items()}, stats
+
+
+def _assert_same_signals(decoded, reference):
+    assert set(decoded) == set(reference)
+    for name, samples in reference.items():
+        np.testing.assert_allclose(decoded[name], np.array(samples), rtol=1e-12, err_msg=name)
+
+
+def test_invalid_frames_are_counted_by_reason(dbc):
+    rng = np.random.default_rng(3)
+    messages, expected = [], {}
+    for i in range(3000):
+        t = i * 0.001
+        kind = rng.choice(["ok", "short", "unknown", "remote", "error"], p=[0.6, 0.1, 0.1, 0.1, 0.1])
+        if kind == "ok":
+            msg = can.Message(timestamp=t, arbitration_id=0x100, is_extended_id=False,
+                              data=rng.integers(0, 256, 8, dtype=np.uint8).tobytes())
+        elif kind == "short":
+            msg = can.Message(timestamp=t, arbitration_id=0x100, is_extended_id=False,
+                              data=rng.integers(0, 256, rng.integers(0, 8), dtype=np.uint8).tobytes())
+        elif kind == "unknown":
+            msg = can.Message(timestamp=t, arbitration_id=0x123, is_extended_id=False, data=bytes(8))
+        elif kind == "remote":
+            msg = can.Message(timestamp=t, arbitration_id=0x100, is_extended_id=False, is_remote_frame=True, dlc=8)
+        else:
+            msg = can.Message(timestamp=t, is_error_frame=True)
+        messages.append(msg)
+        expected[kind] = expected.get(kind, 0) + 1
+
+    reference, reference_count = _reference(dbc, messages)
+    decoded, stats = _decode(dbc, messages)
+    _assert_same_signals(decoded, reference)
+    assert stats["total_msgs"] == len(messages)
+    assert stats["decoded_msgs"] == reference_count == expected["ok"]
+    assert stats["error_count"] == len(messages) - expected["ok"]
+    assert stats["error_types"] == {
+        "DLCMismatch": expected["short"],
+        "UnknownMessage": expected["unknown"],
+        "RemoteFrame": expected["remote"],
+        "ErrorFrame": expected["error"],
+    }
+
+
+def test_multiplexed_decode_matches_cantools(dbc):
+    rng = np.random.default_rng(4)
+    messages = []
+    for i in range(4000):
+        data = bytearray(rng.integers(0, 256, 8, dtype=np.uint8).tobytes())
+        data[0] = rng.choice([1, 2, 1, 2, 7])  # 7 不在DBC中
+        arbitration_id = 0x200 if rng.random() < 0.7 else 0x100
+        messages.append(can.Message(timestamp=i * 0.001, arbitration_id=arbitration_id, is_extended_id=False, data=data))
+
+    reference, reference_count = _reference(dbc, messages)
+    for chunk_frames in (13, 5000):
+        decoded, stats = _decode(dbc, messages, chunk_frames)
+        _assert_same_signals(decoded, reference)
+        assert stats["decoded_msgs"] == reference_count
+        assert stats["error_types"] == {"UnknownMultiplexer": len(messages) - reference_count}
@@ -0,0 +1,155 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+author: fenwickxie
+date: 2026-10-19 23:21:50
+filename: test_decoded_io.py
+version: 1.0
+"""
+
+import os
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pytest
+import scipy.io as sio
+
+from core.data_processing import decoded_io
+from core.data_processing.decoded_io import (
+    WindowedTableWriter,
+    _float_csv_text,
+    dataframe_to_table,
+    list_decoded_files,
+    load_decoded,
+    read_decoded_columns,
+    read_decoded_table,
+    save_dataframe,
+)
+
+# 覆盖定点/科学计数切换边界、pyarrow 与 pandas 记数法不同的值和特殊值
+EDGE_VALUES = [
+    0.0, -0.0, 1.0, 2.5, 100.0, 1500.0, 0.1 + 0.2, 1e-4, 9.99e-5, 1e-5, 3.6e-6, 7e-9, 0.0001234,
+    1e6, 999999.9, 7839754.5, 1.25e10, 123456789012345.6, 9999999999999998.0, 1e16, 1.5e20,
+    2.0**53, 5e-324, 1.7976931348623157e308, -1e-300, np.inf, -np.inf, np.nan,
+]
+
+
+def _frame(n: int = 7) -> pd.DataFrame:
+    rng = np.random.default_rng(0)
+    return pd.DataFrame(
+        {
+            "EngSpd": rng.normal(size=n) * 1000,
+            "Gear,Pos": rng.integers(0, 6, n).astype(np.float32),
+            "Flag": np.where(rng.random(n) < 0.3, np.nan, 1.0),
+        },
+        index=pd.Index(np.arange(n) * 0.01, name="timestamps"),
+    )
+
+
+def test_csv_matches_pandas_output(tmp_path, monkeypatch):
+    monkeypatch.setattr(decoded_io, "CSV_CHUNK_ROWS", 3)
+    df = _frame()
+    df.to_csv(tmp_path / "expected.csv")
+    assert not save_dataframe(df, str(tmp_path), "drive", (".csv",))["errors"]
+    assert (tmp_path / "drive.csv").read_text() == (tmp_path / "expected.csv").read_text()
+
+
+def test_windowed_csv_matches_pandas_output(tmp_path):
+    df = _frame(10)
+    df.to_csv(tmp_path / "expected.csv")
+    writer = WindowedTableWriter(str(tmp_path), "drive", (".csv",))
+    for start in range(0, 10, 4):
+        writer.write(dataframe_to_table(df.iloc[start : start + 4]))
+    assert not writer.close()["errors"]
+    assert (tmp_path / "drive.csv").read_text() == (tmp_path / "expected.csv").read_text()
+
+
+@pytest.mark.parametrize("dtype", [np.float64, np.float32])
+def test_float_text_matches_pandas(dtype):
+    rng = np.random.default_rng(1)
+    values = np.concatenate([EDGE_VALUES, rng.normal(size=2000) * 10.0 ** rng.integers(-30, 30, 2000)])
+    with np.errstate(over="ignore"):
+        values = values.astype(dtype)
+    # 带索引写出：单列时 csv 模块会给空字段加引号
+    lines = pd.DataFrame({"v": values}).to_csv(lineterminator="\n").split("\n")[1:-1]
+    expected = [line.split(",", 1)[1] for line in lines]
+    text = _float_csv_text(pa.array(values)).to_pylist()
+    assert [t if t is not None else "" for t in text] == expected
+
+
+def test_csv_quotes_like_pandas(tmp_path):
+    df = pd.DataFrame(
+        {
+            "Gear": pd.Categorical(["P", 'say "hi"', None, "a,b"]),
+            "Valid": [True, False, True, True],
+            "Count": np.array([1, -2, 3, 4], dtype=np.int64),
+        },
+        index=pd.Index([0.0, 0.01, 0.02, 0.03], name="timestamps"),
+    )
+    df.to_csv(tmp_path / "expected.csv")
+    assert not save_dataframe(df, str(tmp_path), "drive", (".csv",))["errors"]
+    assert (tmp_path / "drive.csv").read_bytes() == (tmp_path / "expected.csv").read_bytes()
+
+
+def test_mat_keeps_signal_columns_only(tmp_path):
+    df = _frame()
+    assert not save_dataframe(df, str(tmp_path), "drive", (".mat", ".csv"))["errors"]
+    mat = sio.loadmat(tmp_path / "drive.mat")
+    assert sorted(k for k in mat if not k.startswith("__")) == sorted(df.columns)
+    np.testing.assert_allclose(mat["EngSpd"].ravel(), df["EngSpd"])
+
+
+def test_dataset_parquet_path_is_reported(tmp_path):
+    dataset = {"dataset_root": str(tmp_path / "dataset"), "partition_values": {"vehicle": "V1"}}
+    report = save_dataframe(_frame(), str(tmp_path), "drive", (".parquet", ".csv"), dataset=dataset)
+    assert not report["errors"]
+    assert report["files"][".parquet"].startswith(str(tmp_path / "dataset" / "vehicle=V1"))
+    assert report["files"][".csv"] == str(tmp_path / "drive.csv")
+    assert not (tmp_path / "drive.parquet").exists()
+
+
+@pytest.mark.parametrize("compression", ["uncompressed", "lz4", "zstd"])
+def test_ipc_round_trip(tmp_path, compression):
+    df = _frame(50)
+    report = save_dataframe(df, str(tmp_path), "drive", (".feather", ".arrow"), ipc_compression=compression)
+    assert not report["errors"]
+    for suffix in (".feather", ".arrow"):
+        loaded = load_decoded(tmp_path / f"drive{suffix}")
+        pd.testing.assert_frame_equal(loaded, df)
+    assert read_decoded_columns(tmp_path / "drive.feather") == list(df.columns)
+
+
+def test_uncompressed_ipc_columns_are_memory_mapped(tmp_path):
+    df = _frame(100_000)
+    save_dataframe(df, str(tmp_path), "drive", (".feather",))
+    allocated = pa.total_allocated_bytes()
+    loaded = load_decoded(tmp_path / "drive.feather", columns=["EngSpd"])
+    # 无空值的列直接引用映射的文件页：不为数据分配内存（800KB的列），数组只读
+    assert pa.total_allocated_bytes() - allocated < 4096
+    assert list(loaded.columns) == ["EngSpd"] and loaded.index.name == "timestamps"
+    assert not loaded["EngSpd"].to_numpy().flags.writeable
+    np.testing.assert_array_equal(loaded["EngSpd"].to_numpy(), df["EngSpd"].to_numpy())
+
+    writable = load_decoded(tmp_path / "drive.feather", columns=["EngSpd"], copy=True)
+    writable.iloc[0, 0] = 1.0
+    assert writable["EngSpd"].iloc[0] == 1.0
+
+
+def test_columns_are_projected_when_reading(tmp_path):
+    df = _frame(20)
+    save_dataframe(df, str(tmp_path), "drive", (".arrow", ".parquet"), ipc_compression="zstd")
+    for suffix in (".arrow", ".parquet"):
+        table = read_decoded_table(tmp_path / f"drive{suffix}", columns=["Flag", "missing"])
+        assert table.column_names == ["timestamps", "Flag"]
+    frame = load_decoded(tmp_path / "drive.arrow", columns=["Flag"], index_as_column=True)
+    assert list(frame.columns) == ["timestamps", "Flag"]
+    np.testing.assert_array_equal(frame["Flag"].to_numpy(), df["Flag"].to_numpy())
+
+
+def test_list_decoded_files_prefers_fastest_format(tmp_path):
+    save_dataframe(_frame(), str(tmp_path), "a", (".csv", ".parquet", ".arrow"))
+    save_dataframe(_frame(), str(tmp_path), "b", (".csv",))
+    (tmp_path / "c.mat").write_bytes(b"")
+    assert [os.path.basename(p) for p in list_decoded_files(tmp_path)] == ["a.arrow", "b.csv"]
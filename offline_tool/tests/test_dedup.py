@@ -0,0 +1,85 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+author: fenwickxie
+date: 2026-10-19 23:44:02
+filename: test_dedup.py
+version: 1.0
+"""
+
+import can
+import numpy as np
+import pytest
+
+from core.data_processing.candecode import (
+    _build_decoder_map,
+    _duplicate_keep_mask,
+    _iter_decode_chunks,
+    _new_decode_stats,
+)
+from core.data_processing.cankernels import FrameBatch
+
+
+def _batch(rows) -> FrameBatch:
+    """rows: [(时间, ID, 通道(0起), 首字节)]"""
+    timestamps, ids, channels, first = (np.array(column) for column in zip(*rows))
+    payload = np.zeros((len(rows), 8), dtype=np.uint8)
+    payload[:, 0] = first
+    return FrameBatch(
+        timestamps.astype(np.float64),
+        ids.astype(np.int64),
+        channels.astype(np.int64),
+        np.full(len(rows), 8, dtype=np.int32),
+        payload,
+    )
+
+
+# 通道0的帧在0.0004秒后被镜像到通道1；0.5时刻的帧载荷不同，不是副本
+MIRRORED = [
+    (0.0, 0x100, 0, 1),
+    (0.0004, 0x100, 1, 1),
+    (0.5, 0x100, 0, 2),
+    (0.5004, 0x100, 1, 3),
+    (1.0, 0x200, 0, 1),
+    (1.0004, 0x200, 1, 1),
+]
+
+
+@pytest.mark.parametrize(
+    "keep, expected",
+    [
+        ("first", [True, False, True, True, True, False]),
+        ("last", [False, True, True, True, False, True]),
+        ([2, 1], [False, True, True, True, False, True]),
+    ],
+)
+def test_mirrored_copies_keep_one_frame(keep, expected):
+    assert _duplicate_keep_mask(_batch(MIRRORED), 0.001, "across", keep).tolist() == expected
+
+
+def test_copies_outside_tolerance_are_kept():
+    rows = [(0.0, 0x100, 0, 1), (0.002, 0x100, 1, 1)]
+    assert _duplicate_keep_mask(_batch(rows), 0.001).tolist() == [True, True]
+
+
+def test_within_scope_only_removes_same_channel_repeats():
+    rows = [(0.0, 0x100, 0, 1), (0.0004, 0x100, 1, 1), (0.0008, 0x100, 1, 1)]
+    assert _duplicate_keep_mask(_batch(rows), 0.001, "within").tolist() == [True, True, False]
+    assert _duplicate_keep_mask(_batch(rows), 0.001, "across").tolist() == [True, False, False]
+
+
+def test_decode_drops_mirrored_frames(dbc):
+    messages = [
+        can.Message(timestamp=t, arbitration_id=frame_id, is_extended_id=False, channel=channel,
+                    data=bytes([first, 0, 0, 0, 0, 0, 0, 0]))
+        for t, frame_id, channel, first in MIRRORED
+    ]
+    stats = _new_decode_stats()
+    dedup = {"tolerance": 0.001, "scope": "across", "keep": "first"}
+    chunks = list(_iter_decode_chunks(messages, _build_decoder_map(dbc), stats=stats, dedup=dedup))
+    t, values = chunks[0]["signals"]["EngSpd"]
+    assert t.tolist() == [0.0, 0.5, 0.5004]
+    assert values.tolist() == [0.25, 0.5, 0.75]
+    assert stats["duplicate_frames"] == 2
+    assert stats["total_msgs"] == len(MIRRORED)
@@ -0,0 +1,109 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+author: fenwickxie
+date: 2026-10-19 23:59:58
+filename: test_follow.py
+version: 1.0
+"""
+
+import numpy as np
+import pandas as pd
+from typer.testing import CliRunner
+
+from core.data_processing.candecode import CanDecoder, _read_asc_increment
+from core.data_processing.canraster import StreamingRasterizer
+
+ASC_HEADER = (
+    "date Mon Oct 19 10:00:00.000 2026\n"
+    "base hex  timestamps absolute\n"
+    "internal events logged\n"
+    "Begin Triggerblock Mon Oct 19 10:00:00.000 2026\n"
+)
+
+
+def _engine_line(t: float, speed_raw: int) -> str:
+    """0x100 Engine 报文行，EngSpd = speed_raw * 0.25"""
+    data = " ".join(f"{b:02X}" for b in (speed_raw & 0xFF, speed_raw >> 8, 0, 0, 0, 0, 0, 0))
+    return f"{t:.6f} 1  100             Rx   d 8 {data}\n"
+
+
+def test_read_asc_increment_returns_complete_lines_only(tmp_path):
+    path = tmp_path / "live.asc"
+    state = {"offset": 0, "header": None}
+    path.write_text(ASC_HEADER[:40])
+    assert _read_asc_increment(path, state) is None and state["offset"] == 0  # 文件头未写完
+
+    path.write_text(ASC_HEADER + _engine_line(0.0, 4) + _engine_line(0.01, 8)[:20])
+    assert _read_asc_increment(path, state) == _engine_line(0.0, 4)
+    assert state["header"] == ASC_HEADER
+    assert _read_asc_increment(path, state) is None  # 半行留到下次
+
+    with open(path, "a") as f:
+        f.write(_engine_line(0.01, 8)[20:] + _engine_line(0.02, 12))
+    assert _read_asc_increment(path, state) == _engine_line(0.01, 8) + _engine_line(0.02, 12)
+    assert state["offset"] == path.stat().st_size
+
+    path.write_text(ASC_HEADER + _engine_line(0.0, 1))  # 文件被重建，从头读取
+    assert _read_asc_increment(path, state) == _engine_line(0.0, 1)
+    assert state.pop("restarted") and state["offset"] == path.stat().st_size
+
+
+def test_follow_decodes_appended_lines(tmp_path, dbc_path):
+    path = tmp_path / "live.asc"
+    lines = [_engine_line(i * 0.01, i * 4) for i in range(200)]
+    path.write_text(ASC_HEADER + "".join(lines[:100]))
+    appended = []
+
+    def grow(chunk, rows):
+        # 第一块解码后日志继续增长
+        if chunk is not None and not appended:
+            appended.append(True)
+            with open(path, "a") as f:
+                f.write("".join(lines[100:]))
+
+    summary = CanDecoder(dbc_path, str(path)).follow(
+        path, step=0.02, save_dir=tmp_path / "out", callback=grow, poll_interval=0.01, idle_timeout=0.2
+    )
+    assert summary["total_msgs"] == 200 and summary["bytes_consumed"] == path.stat().st_size
+    df = pd.read_csv(tmp_path / "out" / "live.csv")
+    assert len(df) == summary["rows"] == 100
+    # EngSpd 每10ms增加1 rpm，线性插值到20ms网格上
+    np.testing.assert_allclose(df["timestamps"], np.arange(100) * 0.02, atol=1e-9)
+    np.testing.assert_allclose(df["EngSpd"], np.arange(100) * 2.0, atol=1e-6)
+
+
+def test_rows_are_not_held_back_by_a_stopped_signal():
+    rasterizer = StreamingRasterizer(0.01, columns=["fast", "stopped"], hold_seconds=1.0)
+    t = np.arange(0, 0.5, 0.01)
+    rasterizer.push({"fast": (t, t), "stopped": (t[:20], t[:20])})
+    # "stopped" 在0.19s后停发：超过自身周期3倍后不再等待它，不必等满 hold_seconds
+    assert rasterizer.next_index == len(t)
+
+
+def test_zero_order_hold_signals_do_not_wait_for_the_next_sample():
+    rasterizer = StreamingRasterizer(0.1, columns=["fast", "mode"], interpolation={"mode": "previous"})
+    rows = rasterizer.push({"fast": (np.arange(0, 2.01, 0.1), np.arange(21.0)), "mode": (np.array([0.0]), np.array([3]))})
+    assert rows["timestamps"][-1] == 2.0 and (rows["mode"] == 3).all()
+
+
+def test_linear_rows_wait_for_a_slow_signal_within_its_period():
+    rasterizer = StreamingRasterizer(0.1, columns=["fast", "slow"])
+    rows = rasterizer.push({"fast": (np.arange(0, 1.51, 0.1), np.arange(16.0)), "slow": (np.array([0.0, 1.0]), np.array([0.0, 10.0]))})
+    # 1Hz 信号0.5s前才更新过，未超过自身周期，插值需要它的下一个采样
+    assert rows["timestamps"][-1] == 1.0
+
+
+def test_follow_cli(tmp_path, dbc_path):
+    from cli import app
+
+    path = tmp_path / "live.asc"
+    path.write_text(ASC_HEADER + "".join(_engine_line(i * 0.01, i) for i in range(50)))
+    result = CliRunner().invoke(app, [
+        "follow", str(path), "--dbc", dbc_path, "--output-dir", str(tmp_path / "out"),
+        "--step", "0.01", "--idle-timeout", "0.1", "--poll-interval", "0.01", "--hold-seconds", "0.5",
+    ])
+    assert result.exit_code == 0, result.output
+    assert "Follow finished: 50 frames, 50 rows" in result.output
+    assert len(pd.read_csv(tmp_path / "out" / "live.csv")) == 50
@@ -0,0 +1,85 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+author: fenwickxie
+date: 2026-10-19 23:59:59
+filename: test_inventory.py
+version: 1.0
+"""
+
+import os
+
+import can
+import pytest
+from typer.testing import CliRunner
+
+from core.data_processing.candecode import CanDecoder
+from core.data_processing.caninventory import CanInventory
+
+T0 = 1.7e9  # 2023-11-14T22:13:20Z
+
+
+def _write_blf(path, frames):
+    with can.BLFWriter(str(path)) as writer:
+        for t, arbitration_id in frames:
+            writer.on_message_received(
+                can.Message(timestamp=t, arbitration_id=arbitration_id, is_extended_id=False, data=bytes(8))
+            )
+
+
+@pytest.fixture
+def indexed(tmp_path, dbc_path):
+    """engine.blf 只有 0x100，mux.blf 只有 0x200（一天后），both.blf 两者都有"""
+    logs = tmp_path / "logs"
+    logs.mkdir()
+    _write_blf(logs / "engine.blf", [(T0 + i * 0.1, 0x100) for i in range(10)])
+    _write_blf(logs / "mux.blf", [(T0 + 86400 + i * 0.1, 0x200) for i in range(10)])
+    _write_blf(logs / "both.blf", [(T0 + i * 0.1, 0x100 if i % 2 else 0x200) for i in range(10)])
+    inventory = CanInventory(tmp_path / "inventory.sqlite")
+    summary = inventory.build(str(logs), [dbc_path], num_processes=1)
+    assert summary == {"files": 3, "scanned": 3, "failed": []}
+    return inventory, logs
+
+
+def _names(paths):
+    return [os.path.basename(p) for p in paths]
+
+
+def test_query_by_signal_time_and_id(indexed):
+    inventory, _ = indexed
+    assert _names(inventory.query(["EngSpd"])) == ["both.blf", "engine.blf"]
+    assert _names(inventory.query(["EngSpd", "Mode"])) == ["both.blf"]
+    assert _names(inventory.query(["EngSpd", "Mode"], match="any")) == ["both.blf", "engine.blf", "mux.blf"]
+    assert _names(inventory.query(["Mode"], start=T0 + 3600)) == ["mux.blf"]
+    assert _names(inventory.query(start=T0 + 3600, end=T0 + 2 * 86400)) == ["mux.blf"]
+    assert _names(inventory.query(arbitration_ids=[0x200])) == ["both.blf", "mux.blf"]
+    assert inventory.query(["NoSuchSignal"]) == []
+
+
+def test_rebuild_only_rescans_changed_files(indexed):
+    inventory, logs = indexed
+    assert inventory.build(str(logs), num_processes=1)["scanned"] == 0
+    _write_blf(logs / "mux.blf", [(T0 + i * 0.1, 0x100) for i in range(10)])
+    assert inventory.build(str(logs), num_processes=1)["scanned"] == 1
+    assert _names(inventory.query(arbitration_ids=[0x200])) == ["both.blf"]
+
+
+def test_decoder_selects_inputs_from_the_inventory(indexed, dbc_path):
+    inventory, logs = indexed
+    decoder = CanDecoder(dbc_path, str(logs))
+    assert decoder.select_from_inventory(inventory.path, signals=["Mode"], end=T0 + 3600) == 1
+    assert _names(decoder.blf_urls) == ["both.blf"]
+
+
+def test_inventory_cli(indexed, tmp_path):
+    from cli import app
+
+    inventory, _ = indexed
+    output = tmp_path / "selected.txt"
+    result = CliRunner().invoke(
+        app, ["inventory", "query", inventory.path, "--signal", "EngSpd", "--signal", "Mode", "--any",
+              "--output", str(output)]
+    )
+    assert result.exit_code == 0, result.output
+    assert _names(output.read_text(encoding="utf-8").split()) == ["both.blf", "engine.blf", "mux.blf"]
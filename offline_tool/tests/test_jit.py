@@ -0,0 +1,105 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+author: fenwickxie
+date: 2026-10-19 23:58:40
+filename: test_jit.py
+version: 1.0
+"""
+
+import numpy as np
+import pytest
+
+from core.data_processing import canjit
+from core.data_processing.candecode import _duplicate_keep_mask
+from core.data_processing.cankernels import FrameBatch, extract_raw, signal_byte_window
+from core.data_processing.canraster import raster_signal
+
+pytestmark = pytest.mark.skipif(not canjit.NUMBA_AVAILABLE, reason="numba 未安装")
+
+
+def _jit_and_numpy(func, *args, **kwargs):
+    """分别用JIT内核和NumPy实现计算，返回 (jit, numpy)"""
+    enabled = canjit.numba_enabled()
+    try:
+        canjit.set_numba_enabled(True)
+        jit = func(*args, **kwargs)
+        canjit.set_numba_enabled(False)
+        reference = func(*args, **kwargs)
+    finally:
+        canjit.set_numba_enabled(enabled)
+    return jit, reference
+
+
+@pytest.mark.parametrize("byte_order", ["little_endian", "big_endian"])
+@pytest.mark.parametrize("is_signed", [False, True])
+def test_extract_raw(byte_order, is_signed):
+    rng = np.random.default_rng(0)
+    payload = rng.integers(0, 256, size=(300, 8), dtype=np.uint8)
+    cases = 0
+    for length in (1, 3, 8, 12, 16, 31, 32, 57, 64):
+        for start in range(64):
+            first, n_bytes, _ = signal_byte_window(start, length, byte_order)
+            if first < 0 or first + n_bytes > 8:
+                continue  # 信号超出8字节载荷
+            jit, reference = _jit_and_numpy(extract_raw, payload, start, length, byte_order, is_signed)
+            assert jit.dtype == reference.dtype
+            np.testing.assert_array_equal(jit, reference, err_msg=f"start={start} length={length}")
+            cases += 1
+    assert cases > 100
+
+
+def test_raster_previous():
+    rng = np.random.default_rng(1)
+    timestamps = np.sort(rng.uniform(0, 10, 500))
+    values = rng.normal(size=500)
+    grid = np.arange(-1.0, 11.0, 0.013)
+    jit, reference = _jit_and_numpy(raster_signal, timestamps, values, grid, "previous")
+    np.testing.assert_array_equal(jit, reference)
+
+
+def _mirrored_frames(seed: int) -> FrameBatch:
+    """两个通道互为镜像（带抖动），并混入同通道重复帧和乱序时间戳"""
+    rng = np.random.default_rng(seed)
+    n = 400
+    timestamps = np.sort(rng.uniform(0, 2, n))
+    ids = rng.choice([0x100, 0x200, 0x18FEF1FE], n)
+    payload = rng.integers(0, 4, size=(n, 8), dtype=np.uint8)
+    lengths = np.full(n, 8, dtype=np.int32)
+    mirror = rng.random(n) < 0.6
+    jitter = rng.uniform(0, 0.002, mirror.sum())
+    frames = FrameBatch(
+        np.concatenate([timestamps, timestamps[mirror] + jitter]),
+        np.concatenate([ids, ids[mirror]]),
+        np.concatenate([np.zeros(n, dtype=np.int64), np.ones(mirror.sum(), dtype=np.int64)]),
+        np.concatenate([lengths, lengths[mirror]]),
+        np.concatenate([payload, payload[mirror]]),
+    )
+    return frames.take(rng.permutation(len(frames)))
+
+
+@pytest.mark.parametrize("scope", ["across", "within"])
+@pytest.mark.parametrize("keep", ["first", "last", [2, 1]])
+def test_duplicate_keep_mask(scope, keep):
+    for seed in range(3):
+        frames = _mirrored_frames(seed)
+        jit, reference = _jit_and_numpy(_duplicate_keep_mask, frames, 0.001, scope, keep)
+        np.testing.assert_array_equal(jit, reference)
+
+
+def test_growth_phase_flags():
+    rng = np.random.default_rng(2)
+    values = np.cumsum(rng.choice([-3, -1, 0, 1, 1, 2], 2000)).astype(np.float64) % 40
+    values[rng.random(2000) < 0.02] = np.nan
+    values[rng.random(2000) < 0.005] = np.inf
+    jit, reference = _jit_and_numpy(canjit.growth_phase_flags, values, 5, 30, 0, len(values))
+    np.testing.assert_array_equal(jit, reference)
+    assert reference.any()
+
+
+def test_growth_phase_nan_discards_unfinished_phase():
+    values = np.array([0, 1, 2, np.nan, 0, 1, 2, 3, 5], dtype=np.float64)
+    jit, reference = _jit_and_numpy(canjit.growth_phase_flags, values, 0, 3, 0, len(values))
+    expected = [False, False, False, False, True, True, True, True, False]
+    assert jit.tolist() == expected and reference.tolist() == expected
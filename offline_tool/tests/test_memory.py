@@ -0,0 +1,84 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+author: fenwickxie
+date: 2026-10-19 23:59:59
+filename: test_memory.py
+version: 1.0
+"""
+
+import can
+import numpy as np
+import pandas as pd
+import pytest
+
+from core.data_processing.candecode import CanDecoder, _plan_memory
+
+MB = 1024 * 1024
+
+
+def test_plan_escalates_with_the_expected_size():
+    # 每行 (8 + 4列×8字节) × 峰值系数3 = 120 字节
+    assert _plan_memory(10_000, 4, 0.0, 10, (".parquet",))["adaptations"] == []
+
+    plan = _plan_memory(100_000, 4, 0.0, 10, (".parquet",))  # float64 11.4MB，float32 6.9MB
+    assert plan["adaptations"] == ["float32"] and plan["dtype"] == "float32"
+
+    plan = _plan_memory(1_000_000, 4, 2.0, 10, (".parquet", ".mat"))
+    assert plan["adaptations"] == ["float32", "windowed", "signal_groups"]
+    assert plan["window_rows"] == 8 * MB // 72
+    assert plan["group_columns"] == 1  # 每行放不下时退化为每组一个信号
+
+    plan = _plan_memory(1_000_000, 4, 2.0, 10, (".parquet",), in_memory=True)
+    assert plan["adaptations"] == ["float32", "over_budget"]
+
+
+@pytest.fixture
+def long_log(tmp_path):
+    log_dir = tmp_path / "logs"
+    log_dir.mkdir()
+    with can.BLFWriter(str(log_dir / "drive.blf")) as writer:
+        for i in range(2000):
+            writer.on_message_received(
+                can.Message(timestamp=1.7e9 + i * 0.01, arbitration_id=0x100, is_extended_id=False,
+                            data=bytes([i % 256, i // 256, 50, 0, 0, 0, 0, i % 16]))
+            )
+    return log_dir
+
+
+def _decode(dbc_path, log_dir, save_dir, save_formats, memory_budget_mb=None):
+    [result] = CanDecoder(dbc_path, str(log_dir)).read_can_files_multi(
+        step=0.001, save_dir=str(save_dir), save_formats=save_formats, num_processes=1,
+        memory_budget_mb=memory_budget_mb,
+    )
+    assert result["success"]
+    return result
+
+
+def test_windowed_output_matches_the_full_table(tmp_path, dbc_path, long_log):
+    _decode(dbc_path, long_log, tmp_path / "full", (".parquet",))
+    result = _decode(dbc_path, long_log, tmp_path / "budget", (".parquet",), memory_budget_mb=0.2)
+    assert result["memory_plan"]["adaptations"] == ["float32", "windowed"]
+    assert 1000 <= result["memory_plan"]["window_rows"] < 20_000  # 2万行分多个窗口写出
+
+    full = pd.read_parquet(tmp_path / "full" / "drive.parquet")
+    budget = pd.read_parquet(tmp_path / "budget" / "drive.parquet")
+    assert list(budget.columns) == list(full.columns) and len(budget) == len(full)
+    np.testing.assert_allclose(budget.index, np.arange(len(budget)) * 0.001, atol=1e-4)
+    # EngSpd 每10ms增加0.25 rpm，float32窗口输出按网格线性插值
+    np.testing.assert_allclose(budget["EngSpd"], budget.index * 25, atol=1e-3)
+    np.testing.assert_array_equal(budget["EngTemp"], full["EngTemp"])
+
+
+def test_mat_output_is_split_into_signal_groups(tmp_path, dbc_path, long_log):
+    from scipy.io import loadmat
+
+    result = _decode(dbc_path, long_log, tmp_path / "out", (".mat",), memory_budget_mb=0.2)
+    assert "signal_groups" in result["memory_plan"]["adaptations"]
+    parts = sorted((tmp_path / "out").glob("drive_part*.mat"))
+    assert len(parts) > 1
+    signals = set()
+    for part in parts:
+        signals |= {key for key in loadmat(str(part)) if not key.startswith("__")}
+    assert {"EngSpd", "EngTemp", "EngTorque", "EngCnt"} <= signals
@@ -0,0 +1,124 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+author: fenwickxie
+date: 2026-10-19 23:59:59
+filename: test_mf4.py
+version: 1.0
+"""
+
+import can
+import numpy as np
+import pandas as pd
+import pytest
+
+from core.data_processing.candecode import CanDecoder
+
+N_FRAMES = 50
+
+
+def _write_bus_logging_mf4(path, n: int = N_FRAMES) -> None:
+    """ASAM MDF总线记录：一个 CAN_DataFrame 通道组，0x100 报文 EngSpd 原始值为 i"""
+    from asammdf import MDF, Signal
+
+    dtype = np.dtype([
+        ("CAN_DataFrame.BusChannel", "u1"), ("CAN_DataFrame.ID", "<u4"), ("CAN_DataFrame.IDE", "u1"),
+        ("CAN_DataFrame.DLC", "u1"), ("CAN_DataFrame.DataLength", "u1"), ("CAN_DataFrame.DataBytes", "u1", (8,)),
+    ])
+    samples = np.zeros(n, dtype=dtype)
+    samples["CAN_DataFrame.BusChannel"] = 1
+    samples["CAN_DataFrame.ID"] = 0x100
+    samples["CAN_DataFrame.DLC"] = samples["CAN_DataFrame.DataLength"] = 8
+    samples["CAN_DataFrame.DataBytes"][:, 0] = np.arange(n)
+    mdf = MDF(version="4.10")
+    mdf.append([Signal(samples, np.arange(n) * 0.01, name="CAN_DataFrame")])
+    mdf.save(str(path), overwrite=True)
+    mdf.close()
+
+
+def _write_blf(path, n: int = N_FRAMES) -> None:
+    with can.BLFWriter(str(path)) as writer:
+        for i in range(n):
+            writer.on_message_received(
+                can.Message(timestamp=1.7e9 + i * 0.01, arbitration_id=0x100, is_extended_id=False,
+                            data=bytes([i, 0, 0, 0, 0, 0, 0, 0]))
+            )
+
+
+def _decode(dbc_path, can_path, save_dir, save_formats):
+    return CanDecoder(dbc_path, can_path).read_can_files_multi(
+        step=0.01, save_dir=str(save_dir), save_formats=save_formats, num_processes=1
+    )
+
+
+def test_bus_logging_mf4_input(tmp_path, dbc_path):
+    _write_bus_logging_mf4(tmp_path / "bus.mf4")
+    [result] = _decode(dbc_path, str(tmp_path / "bus.mf4"), tmp_path / "out", (".csv",))
+    assert result["success"] and result["total_msgs"] == N_FRAMES
+    df = pd.read_csv(tmp_path / "out" / "bus.csv")
+    np.testing.assert_allclose(df["EngSpd"], np.arange(N_FRAMES) * 0.25, atol=1e-4)
+
+
+def test_outputs_in_the_log_directory_are_not_decoded(tmp_path, dbc_path, capsys):
+    _write_bus_logging_mf4(tmp_path / "bus.mf4")
+    (tmp_path / "bus.mf4").rename(tmp_path / "bus.mdf")
+    _write_blf(tmp_path / "drive.blf")
+    formats = (".mf4", ".csv")
+    first = _decode(dbc_path, str(tmp_path), tmp_path, formats)
+    assert sorted(r["file"] for r in first) == ["bus.mdf", "drive.blf"]
+    # 信号MF4改名后不再与某个日志的输出同名，靠通道组识别
+    (tmp_path / "drive.mf4").rename(tmp_path / "signals.mf4")
+
+    second = _decode(dbc_path, str(tmp_path), tmp_path, formats)
+    assert sorted(r["file"] for r in second) == ["bus.mdf", "drive.blf"]
+    output = capsys.readouterr().out
+    assert f"跳过 {tmp_path / 'bus.mdf'} 的解码输出: {tmp_path / 'bus.mf4'}" in output
+    assert f"跳过没有 CAN_DataFrame 总线记录的MF4文件: {tmp_path / 'signals.mf4'}" in output
+
+
+def test_mf4_log_is_not_overwritten_by_its_output(tmp_path, dbc_path, capsys):
+    _write_bus_logging_mf4(tmp_path / "bus.mf4")
+    size = (tmp_path / "bus.mf4").stat().st_size
+    assert _decode(dbc_path, str(tmp_path), tmp_path, (".mf4",)) == []
+    assert (tmp_path / "bus.mf4").stat().st_size == size
+    assert "会覆盖日志本身" in capsys.readouterr().out
+
+
+def test_files_below_the_output_directory_are_skipped(tmp_path, dbc_path, capsys):
+    logs = tmp_path / "logs"
+    (logs / "decoded").mkdir(parents=True)
+    _write_blf(logs / "drive.blf")
+    _write_blf(logs / "decoded" / "copy.blf")
+    results = _decode(dbc_path, [str(logs), str(logs / "decoded")], logs, (".csv",))
+    assert [r["file"] for r in results] == ["drive.blf"]
+    assert "跳过输出目录中的文件" in capsys.readouterr().out
+
+
+def test_mf4_output_keeps_native_timestamps(tmp_path, dbc_path):
+    from asammdf import MDF
+
+    logs = tmp_path / "logs"
+    logs.mkdir()
+    frame_times = 1.7e9 + np.arange(N_FRAMES) * 0.01
+    with can.BLFWriter(str(logs / "drive.blf")) as writer:
+        for i, t in enumerate(frame_times):
+            writer.on_message_received(can.Message(timestamp=t, arbitration_id=0x100, is_extended_id=False,
+                                                   data=bytes([i, 0, 0, 0, 0, 0, 0, 0])))
+            if i % 5 == 2:
+                writer.on_message_received(can.Message(timestamp=t + 0.003, arbitration_id=0x200, is_extended_id=False,
+                                                       data=bytes([1, i, 0, 0, 0, 0, 0, 0])))
+    # 栅格步长远大于报文周期：MF4不经栅格化，每个信号保留各自的采样时刻
+    [result] = CanDecoder(dbc_path, str(logs)).read_can_files_multi(
+        step=1.0, save_dir=str(tmp_path / "out"), save_formats=(".mf4",), num_processes=1
+    )
+    assert result["success"]
+    mdf = MDF(str(tmp_path / "out" / "drive.mf4"))
+    try:
+        eng_spd, temp_a = mdf.get("EngSpd"), mdf.get("TempA")
+    finally:
+        mdf.close()
+    np.testing.assert_allclose(eng_spd.timestamps, frame_times)
+    np.testing.assert_allclose(eng_spd.samples, np.arange(N_FRAMES) * 0.25)
+    np.testing.assert_allclose(temp_a.timestamps, frame_times[2::5] + 0.003)
+    assert not (tmp_path / "out" / "drive.csv").exists()
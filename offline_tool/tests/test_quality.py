@@ -0,0 +1,86 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+author: fenwickxie
+date: 2026-10-19 23:59:59
+filename: test_quality.py
+version: 1.0
+"""
+
+import json
+
+import can
+import numpy as np
+import pytest
+
+from core.data_processing.canquality import _is_counter_name, check_signal_quality
+
+
+@pytest.mark.parametrize(
+    "name", ["RollingCounter", "AliveCnt", "MsgCntr", "EngCnt", "ABS_Alive", "MSG_CNT2", "Counter_1"]
+)
+def test_counter_names(name):
+    assert _is_counter_name(name)
+
+
+@pytest.mark.parametrize(
+    "name", ["Encounter", "DiscountRate", "ACCntrl", "Rollingresistance", "Cnt_CRC"]
+)
+def test_names_that_only_contain_a_counter_keyword(name):
+    assert not _is_counter_name(name)
+
+
+def test_counter_wraps_at_dbc_maximum():
+    t = np.arange(40) * 0.01
+    values = np.arange(40) % 16.0
+    meta = {"length": 4, "scale": 1, "offset": 0, "minimum": 0, "maximum": 15}
+    assert check_signal_quality("MsgCntr", t, values, meta) == {}
+
+    values[20:] = (values[20:] + 1) % 16  # 丢了一帧
+    breaks = check_signal_quality("MsgCntr", t, values, meta)["counter_breaks"]
+    assert breaks["count"] == 1 and breaks["modulus"] == 16
+    assert breaks["examples"] == [[pytest.approx(0.19), pytest.approx(0.2)]]
+    # 名称只是包含关键字的普通信号不做计数器检查
+    assert "counter_breaks" not in check_signal_quality("Encounter", t, values, meta)
+
+
+def test_gaps_stuck_range_and_backsteps():
+    t = np.concatenate([np.arange(0, 1, 0.01), np.arange(1.5, 3, 0.01)])
+    t[120] = t[119] - 0.005
+    values = np.ones(len(t))
+    values[-1] = 300.0
+    issues = check_signal_quality("Pressure", t, values, {"minimum": 0, "maximum": 250}, stuck_seconds=1.0)
+    assert set(issues) == {"gaps", "stuck", "out_of_range", "non_monotonic"}
+    assert issues["gaps"]["count"] == 1 and issues["gaps"]["max_gap"] == pytest.approx(0.51)
+    assert issues["out_of_range"]["observed"] == [1.0, 300.0]
+    assert issues["non_monotonic"]["count"] == 1
+    assert not issues["stuck"]["constant"]
+
+
+def test_crc_repeats():
+    t = np.arange(5) * 0.01
+    issues = check_signal_quality("Msg_CRC", t, np.array([1.0, 7.0, 7.0, 3.0, 9.0]))
+    assert issues == {"crc_repeats": {"count": 1, "examples": [[0.01, 0.02]]}}
+
+
+def test_quality_sidecar(tmp_path, dbc_path):
+    log_dir = tmp_path / "logs"
+    log_dir.mkdir()
+    with can.BLFWriter(str(log_dir / "drive.blf")) as writer:
+        for i in [*range(30), *range(31, 60)]:
+            writer.on_message_received(
+                can.Message(timestamp=1.7e9 + i * 0.01, arbitration_id=0x100, is_extended_id=False,
+                            data=bytes([i, 0, 40, 0, 0, 0, 0, i % 16]))
+            )
+    from core.data_processing.candecode import CanDecoder
+
+    [result] = CanDecoder(dbc_path, str(log_dir)).read_can_files_multi(
+        step=0.01, save_dir=str(tmp_path / "out"), save_formats=(".csv",), num_processes=1,
+        quality_checks=True, quality_stuck_seconds=0.5,
+    )
+    report = json.loads((tmp_path / "out" / "drive.quality.json").read_text())
+    assert report["signals"] == result["quality"]["signals"]
+    assert report["signals"]["EngCnt"]["counter_breaks"]["count"] == 1
+    assert report["signals"]["EngTemp"]["stuck"]["constant"]
+    assert "stuck" not in report["signals"].get("EngCnt", {})
@@ -0,0 +1,58 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+author: fenwickxie
+date: 2026-10-19 23:59:55
+filename: test_query.py
+version: 1.0
+"""
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from core.data_processing.canquery import DUCKDB_AVAILABLE, CanQuery
+from core.data_processing.decoded_io import save_dataframe
+
+pytestmark = pytest.mark.skipif(not DUCKDB_AVAILABLE, reason="duckdb 未安装")
+
+
+def _frame(n: int, offset: float, **columns) -> pd.DataFrame:
+    index = pd.Index(offset + np.arange(n) * 0.1, name="timestamps")
+    return pd.DataFrame({name: np.full(n, value, dtype=float) for name, value in columns.items()}, index=index)
+
+
+@pytest.fixture
+def decoded_dir(tmp_path):
+    save_dataframe(_frame(100, 0.0, EngSpd=1.0, EngTemp=20.0), tmp_path, "trip_a", (".feather",))
+    save_dataframe(_frame(50, 100.0, EngSpd=2.0), tmp_path, "trip_b", (".arrow",), ipc_compression="zstd")
+    save_dataframe(_frame(10, 200.0, EngSpd=3.0), tmp_path, "trip_c", (".parquet",))
+    return tmp_path
+
+
+def test_decoded_view_unions_every_format(decoded_dir):
+    with CanQuery(decoded_dir) as query:
+        df = query.sql(
+            "SELECT output, count(*) AS n, max(EngSpd) AS spd, max(EngTemp) AS temp "
+            "FROM decoded GROUP BY output ORDER BY output"
+        )
+    assert df["output"].tolist() == ["trip_a", "trip_b", "trip_c"]
+    assert df["n"].tolist() == [100, 50, 10]
+    assert df["spd"].tolist() == [1.0, 2.0, 3.0]
+    assert df["temp"].iloc[0] == 20.0 and df["temp"].iloc[1:].isna().all()
+
+
+def test_ipc_files_are_scanned_lazily_with_projection(decoded_dir):
+    import pyarrow.dataset as ds
+
+    with CanQuery(decoded_dir) as query:
+        sources = [source for name, source in query._arrow_sources.items() if name.startswith("_decoded_ipc")]
+        assert len(sources) == 2 and all(isinstance(source, ds.Dataset) for source in sources)
+        plan = "\n".join(row[1] for row in query.conn.execute(
+            "EXPLAIN SELECT EngSpd FROM decoded WHERE timestamps > 102.05"
+        ).fetchall())
+        # 只投影用到的列，过滤条件下推到Arrow扫描
+        assert "EngTemp" not in plan
+        assert "timestamps>102.05" in plan.replace(" ", "")
+        assert query.sql("SELECT count(*) AS n FROM decoded WHERE timestamps > 102.05")["n"].iloc[0] == 29 + 10
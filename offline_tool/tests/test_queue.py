@@ -0,0 +1,178 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+author: fenwickxie
+date: 2026-10-19 23:49:31
+filename: test_queue.py
+version: 1.0
+"""
+
+import json
+import time
+from types import SimpleNamespace
+
+import can
+import pytest
+import yaml
+
+from core.data_processing import canqueue
+from core.data_processing.canqueue import WorkQueue, run_worker
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    """可手动推进的时钟"""
+    now = SimpleNamespace(value=1000.0)
+    monkeypatch.setattr(canqueue, "time", SimpleNamespace(time=lambda: now.value, sleep=time.sleep))
+    return now
+
+
+@pytest.fixture
+def queue(tmp_path, clock):
+    queue = WorkQueue(tmp_path / "queue")
+    assert queue.enqueue(["a.blf", "b.blf"], {"step": 0.01}, max_attempts=2) == 2
+    return queue
+
+
+def test_enqueue_is_idempotent(queue):
+    assert queue.enqueue(["a.blf", "c.blf"], {"step": 0.01}) == 1
+    assert queue.enqueue(["a.blf"], {"step": 0.02}) == 1  # 配置不同视为新任务
+    assert queue.status()["counts"] == {"pending": 4}
+
+
+def test_expired_lease_is_requeued(queue, clock):
+    job = queue.claim("host-1", lease_seconds=30)
+    assert job["log_path"] == "a.blf" and job["attempts"] == 1
+
+    clock.value += 20
+    assert queue.heartbeat(job["id"], "host-1", lease_seconds=30)
+    clock.value += 40  # 工作进程停止续约，租约过期
+    assert queue.status()["counts"] == {"pending": 2}
+
+    again = queue.claim("host-2", lease_seconds=30)
+    assert again["id"] == job["id"] and again["attempts"] == 2
+    # 原工作进程已失去租约，不能续约或覆盖结果
+    assert not queue.heartbeat(job["id"], "host-1")
+    assert not queue.complete(job["id"], "host-1", {"success": True})
+    assert queue.complete(job["id"], "host-2", {"success": True})
+    assert queue.status()["counts"] == {"done": 1, "pending": 1}
+
+
+def test_lease_expiry_beyond_max_attempts_fails_the_job(queue, clock):
+    for attempt in (1, 2):
+        job = queue.claim(f"host-{attempt}", lease_seconds=10)
+        assert job["log_path"] == "a.blf" and job["attempts"] == attempt
+        clock.value += 11
+    status = queue.status()
+    assert status["counts"] == {"failed": 1, "pending": 1}
+    assert status["failed"][0]["error"] == "lease expired after 2 attempts"
+    assert queue.claim("host-3")["log_path"] == "b.blf"
+
+    assert queue.retry_failed() == 1
+    assert queue.claim("host-3")["log_path"] == "a.blf"
+
+
+def test_fail_requeues_until_max_attempts(queue):
+    job = queue.claim("host-1")
+    assert queue.fail(job["id"], "host-1", "boom")
+    assert queue.claim("host-1")["id"] == job["id"]
+    assert queue.fail(job["id"], "host-1", "boom again")
+    assert queue.status()["failed"] == [
+        {"id": job["id"], "log_path": "a.blf", "attempts": 2, "error": "boom again"}
+    ]
+
+
+def _write_logs(log_dir, count):
+    log_dir.mkdir()
+    for index in range(count):
+        with can.BLFWriter(str(log_dir / f"trip{index}.blf")) as writer:
+            for i in range(20):
+                writer.on_message_received(
+                    can.Message(timestamp=1.7e9 + index * 100 + i * 0.01, arbitration_id=0x100,
+                                is_extended_id=False, data=bytes([i, 0, 0, 0, 0, 0, 0, 0]))
+                )
+
+
+@pytest.fixture
+def hive_config(tmp_path, dbc_path):
+    _write_logs(tmp_path / "logs", 3)
+    config = tmp_path / "config.yaml"
+    config.write_text(yaml.safe_dump({
+        "dbc_path": dbc_path,
+        "can_data_path": str(tmp_path / "logs"),
+        "output_dir": str(tmp_path / "out"),
+        "step": 0.01,
+        "save_formats": [".parquet"],
+        "dataset_layout": "hive",
+        "partition_by": ["source_file"],
+    }))
+    return config
+
+
+def test_workers_leave_metadata_and_report_to_finalize(tmp_path, hive_config):
+    import pyarrow.parquet as pq
+
+    queue = WorkQueue(tmp_path / "queue")
+    assert queue.enqueue_from_config(hive_config) == 3
+    assert run_worker(tmp_path / "queue", worker_id="w1", poll_interval=0) == {"done": 3, "failed": 0, "lost": 0}
+
+    out = tmp_path / "out"
+    # 任务只写出分区文件和自己的报告，不生成 _metadata 和共享的 run_report.json
+    assert not (out / "dataset" / "_metadata").exists()
+    assert not (out / "run_report.json").exists()
+    assert sorted(p.name for p in (out / "run_reports").iterdir()) == ["job_1.json", "job_2.json", "job_3.json"]
+    assert not list((out / "dataset").rglob("*.tmp"))
+
+    [summary] = queue.finalize()
+    assert summary["jobs"] == 3
+    assert summary["datasets"][str(out / "dataset")]["files"] == 3
+    assert pq.read_metadata(out / "dataset" / "_metadata").num_rows == 60
+    report = json.loads((out / "run_report.json").read_text(encoding="utf-8"))
+    assert report["totals"]["files"] == 3 and report["totals"]["total_msgs"] == 60
+    assert sorted(f["file"] for f in report["files"]) == ["trip0.blf", "trip1.blf", "trip2.blf"]
+
+
+def test_merge_keeps_the_last_report_of_a_file(tmp_path):
+    from core.data_processing.candecode import merge_run_reports
+
+    first, second = tmp_path / "job_1.json", tmp_path / "job_2.json"
+    first.write_text(json.dumps({"settings": {"step": 0.01}, "files": [
+        {"file": "a.blf", "success": False, "total_msgs": 0},
+        {"file": "b.blf", "success": True, "total_msgs": 5},
+    ]}))
+    second.write_text(json.dumps({"settings": {"step": 0.01}, "files": [{"file": "a.blf", "success": True, "total_msgs": 7}]}))
+    report = merge_run_reports([first, second], tmp_path / "run_report.json")
+    assert report["totals"] == {"files": 2, "succeeded": 2, "total_msgs": 12, "decoded_msgs": 0, "error_count": 0}
+
+
+def test_worker_routes_channels_like_the_config(tmp_path, monkeypatch):
+    import pandas as pd
+
+    from conftest import TEST_DBC
+
+    (tmp_path / "ch1.dbc").write_text(TEST_DBC)
+    (tmp_path / "ch2.dbc").write_text(TEST_DBC.replace("EngSpd", "Ch2Spd"))
+    (tmp_path / "logs").mkdir()
+    with can.BLFWriter(str(tmp_path / "logs" / "bus.blf")) as writer:
+        for channel in (0, 1):
+            for i in range(10):
+                writer.on_message_received(
+                    can.Message(timestamp=1.7e9 + i * 0.01, arbitration_id=0x100, is_extended_id=False,
+                                channel=channel, data=bytes([i, 0, 0, 0, 0, 0, 0, 0]))
+                )
+    monkeypatch.chdir(tmp_path)  # 配置中的相对路径在入队时转为绝对路径
+    (tmp_path / "config.yaml").write_text(yaml.safe_dump({
+        "channel_dbc": {1: "ch1.dbc", 2: "ch2.dbc"},
+        "channel_output": "split",
+        "can_data_path": "logs",
+        "output_dir": "out",
+        "step": 0.01,
+        "save_formats": [".parquet"],
+    }))
+    WorkQueue(tmp_path / "queue").enqueue_from_config("config.yaml")
+    monkeypatch.chdir(tmp_path / "logs")
+    assert run_worker(tmp_path / "queue", worker_id="w1", poll_interval=0)["done"] == 1
+
+    assert "Ch2Spd" in pd.read_parquet(tmp_path / "out" / "bus_CH2.parquet").columns
+    assert "EngSpd" in pd.read_parquet(tmp_path / "out" / "bus_CH1.parquet").columns
@@ -0,0 +1,83 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+author: fenwickxie
+date: 2026-10-19 23:59:59
+filename: test_quicklook.py
+version: 1.0
+"""
+
+import gzip
+import json
+
+import can
+import pytest
+from typer.testing import CliRunner
+
+from core.data_processing.candecode import CanDecoder
+from core.data_processing.canquicklook import MIN_BLOCKS
+
+N_FRAMES = 40_000
+T0 = 1.7e9
+
+
+@pytest.fixture
+def big_blf(tmp_path):
+    """40秒、1ms周期的日志，小容器使文件包含上百个可抽样的容器"""
+    path = tmp_path / "drive.blf"
+    with can.BLFWriter(str(path)) as writer:
+        writer.max_container_size = 4096
+        for i in range(N_FRAMES):
+            writer.on_message_received(
+                can.Message(timestamp=T0 + i * 0.001, arbitration_id=0x100, is_extended_id=False,
+                            data=bytes([i % 256, (i // 256) % 256, 0, 0, 0, 0, 0, 0]))
+            )
+    return path, N_FRAMES
+
+
+@pytest.fixture
+def big_asc(tmp_path):
+    """ASC按256KB字节块抽样，10万行（约7MB）才有足够多的块"""
+    n = 100_000
+    path = tmp_path / "drive.asc"
+    lines = ["date Mon Oct 19 10:00:00.000 2026", "base hex  timestamps absolute", "internal events logged",
+             "Begin Triggerblock Mon Oct 19 10:00:00.000 2026"]
+    lines += [f"   {i * 0.001:.6f} 1  100             Rx   d 8 {i % 256:02X} {i // 256 % 256:02X} 00 00 00 00 00 00"
+              for i in range(n)]
+    path.write_text("\n".join(lines + ["End TriggerBlock"]) + "\n")
+    return path, n
+
+
+@pytest.mark.parametrize("log", ["big_blf", "big_asc"])
+def test_sample_covers_the_whole_file(request, dbc_path, log):
+    path, n_frames = request.getfixturevalue(log)
+    result = CanDecoder(dbc_path, str(path)).quicklook(path, fraction=0.1)
+    assert MIN_BLOCKS <= result["blocks_sampled"] < result["blocks_total"]
+    assert result["sampled_frames"] == pytest.approx(n_frames * result["sampled_fraction"], rel=0.1)
+    assert result["estimated_frames"] == pytest.approx(n_frames, rel=0.15)
+    assert result["t_end"] - result["t_start"] == pytest.approx((n_frames - 1) * 0.001, abs=0.01)
+
+    speed = result["signals"]["EngSpd"]
+    assert speed["coverage"] == 1.0
+    assert speed["sample_rate_hz"] == pytest.approx(1000, rel=0.05)
+    # 抽样块分布在整个文件上：EngSpd 原始值按16位回绕，应覆盖大部分量程
+    assert speed["min"] < 1000 and speed["max"] > 0.9 * 0.25 * min(n_frames, 65536)
+    preview = speed["preview"]
+    assert 0 < len(preview["t"]) <= 200 and preview["t"] == sorted(preview["t"])
+
+
+def test_quicklook_cli_skips_compressed_logs(tmp_path, dbc_path, big_blf):
+    from cli import app
+
+    big_blf, _ = big_blf
+    with open(big_blf, "rb") as src, gzip.open(tmp_path / "archived.blf.gz", "wb") as dst:
+        dst.write(src.read())
+    result = CliRunner().invoke(
+        app, ["quicklook", str(tmp_path), "--dbc", dbc_path, "--fraction", "0.05", "--output-dir", str(tmp_path / "out")]
+    )
+    assert result.exit_code == 0, result.output
+    assert "Skipping compressed log" in result.output and "archived.blf.gz" in result.output
+    assert "EngSpd: min=" in result.output
+    sidecar = json.loads((tmp_path / "out" / "drive.quicklook.json").read_text(encoding="utf-8"))
+    assert sidecar["file"] == "drive.blf" and "EngSpd" in sidecar["signals"]
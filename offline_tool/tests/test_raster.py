@@ -0,0 +1,50 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+author: fenwickxie
+date: 2026-10-19 23:59:48
+filename: test_raster.py
+version: 1.0
+"""
+
+import numpy as np
+import pyarrow as pa
+
+from core.data_processing.canraster import StreamingRasterizer
+from core.data_processing.decoded_io import WindowedTableWriter, read_decoded_table
+
+
+def test_streaming_rasterizer_keeps_source_dtype():
+    rasterizer = StreamingRasterizer(0.1, columns=["code", "speed", "missing"], interpolation={"code": "previous"})
+    t = np.arange(0, 2.0, 0.05)
+    codes = (np.arange(len(t)) % 4).astype(np.uint8)
+    rows = rasterizer.push({"code": (t[:20], codes[:20]), "speed": (t[:20], t[:20] * 2)})
+    rest = rasterizer.push({"code": (t[20:], codes[20:]), "speed": (t[20:], t[20:] * 2)})
+    assert rows["code"].dtype == np.uint8 and rest["code"].dtype == np.uint8
+    assert rows["speed"].dtype == np.float64
+    # 没有采样的列才需要NaN填充
+    assert rows["missing"].dtype == np.float64 and np.isnan(rows["missing"]).all()
+    assert rows["code"][:4].tolist() == [0, 2, 0, 2]
+
+
+def test_windowed_writer_keeps_first_schema_when_a_column_starts_late(tmp_path):
+    writer = WindowedTableWriter(str(tmp_path), "drive", (".parquet", ".feather"))
+    writer.write(pa.table({"timestamps": [0.0, 0.1], "code": [np.nan, np.nan]}))
+    writer.write(pa.table({"timestamps": [0.2, 0.3], "code": pa.array([1, 2], pa.uint8())}))
+    writer.write(pa.table({"timestamps": [0.4], "code": [np.nan]}))
+    report = writer.close()
+    assert report["errors"] == {}
+    for path in report["files"].values():
+        code = read_decoded_table(path).column("code")
+        assert code.type == pa.float64()
+        assert code.to_numpy()[2:4].tolist() == [1.0, 2.0] and np.isnan(code.to_numpy()[[0, 1, 4]]).all()
+
+
+def test_windowed_writer_writes_nan_as_null_in_integer_columns(tmp_path):
+    writer = WindowedTableWriter(str(tmp_path), "drive", (".parquet",))
+    writer.write(pa.table({"timestamps": [0.0], "code": pa.array([3], pa.uint8())}))
+    writer.write(pa.table({"timestamps": [0.1, 0.2], "code": [np.nan, 4.0]}))
+    report = writer.close()
+    code = read_decoded_table(report["files"][".parquet"]).column("code")
+    assert code.type == pa.uint8() and code.to_pylist() == [3, None, 4]
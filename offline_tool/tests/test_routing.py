@@ -0,0 +1,99 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+author: fenwickxie
+date: 2026-10-19 21:52:37
+filename: test_routing.py
+version: 1.0
+"""
+
+import can
+
+from core.data_processing.candecode import (
+    _build_decoder_map,
+    _iter_decode_chunks,
+    _new_decode_stats,
+)
+
+EEC1 = 0x0CF004FE
+CCVS = 0x18FEF1FE
+
+
+def _names(router, frames):
+    return [
+        None if (m := router.lookup(frame_id, extended)) is None else m.name
+        for frame_id, extended in frames
+    ]
+
+
+def test_exact_match(dbc):
+    router = _build_decoder_map(dbc, j1939=False)
+    assert _names(router, [(0x100, False), (0x200, False), (CCVS, True), (0x1AA, False)]) == [
+        "Engine",
+        "Mux",
+        "CCVS",
+        None,
+    ]
+
+
+def test_id_mask_only_applies_to_extended_frames(dbc):
+    router = _build_decoder_map(dbc, j1939=False, id_masks=[0x1FFFFF00])
+    # 标准帧不做掩码匹配
+    assert _names(router, [(0x1AA, False), (0x2FF, False), (0x101, False)]) == [None, None, None]
+    # 扩展帧：帧ID & 掩码 == DBC扩展报文ID & 掩码（忽略源地址字节）
+    assert _names(router, [(0x18FEF103, True), (0x0CF00400, True), (0x18FEF203, True)]) == [
+        "CCVS",
+        "EEC1",
+        None,
+    ]
+
+
+def test_id_mask_does_not_match_standard_dbc_messages(dbc):
+    # 0x00000100 & 掩码 == Engine(0x100) & 掩码，但 Engine 是标准帧报文
+    router = _build_decoder_map(dbc, j1939=False, id_masks=[0x1FFFFF00])
+    assert router.lookup(0x000001AA, True) is None
+
+
+def test_id_mask_string_form(dbc):
+    router = _build_decoder_map(dbc, j1939=False, id_masks=["0x1FFFFF00"])
+    assert router.lookup(0x18FEF111, True).name == "CCVS"
+
+
+def test_j1939_pgn_ignores_source_address_and_priority(dbc):
+    router = _build_decoder_map(dbc)  # DBC无J1939协议属性时默认不启用
+    assert router.lookup(0x0CF00401, True) is None
+    router = _build_decoder_map(dbc, j1939=True)
+    assert _names(router, [(0x0CF00401, True), (0x18F00400, True), (0x18FEF117, True)]) == [
+        "EEC1",
+        "EEC1",
+        "CCVS",
+    ]
+    # PDU1（PF < 240）的 PS 为目标地址，不属于PGN
+    assert router.lookup(0x18EA0021, True) is None
+
+
+def test_lookup_results_are_cached_per_frame_type(dbc):
+    router = _build_decoder_map(dbc, j1939=False, id_masks=[0x1FFFFF00])
+    assert router.lookup(0x18FEF103, True).name == "CCVS"
+    assert router.lookup(0x18FEF103, True) is router.lookup(0x18FEF1AA, True)
+    assert router.lookup(0x100, True).name == "Engine"  # 精确匹配不区分帧类型
+
+
+def test_decode_counts_masked_standard_ids_as_unknown(dbc):
+    messages = []
+    for i in range(10):
+        t = i * 0.01
+        messages.append(can.Message(timestamp=t, arbitration_id=0x1AA, is_extended_id=False, data=bytes(8)))
+        messages.append(
+            can.Message(timestamp=t, arbitration_id=0x18FEF100 | i, is_extended_id=True,
+                        data=bytes([0, 0x00, 0x20, 0, 0, 0, 0, 0]))
+        )
+    stats = _new_decode_stats()
+    router = _build_decoder_map(dbc, j1939=False, id_masks=[0x1FFFFF00])
+    chunks = list(_iter_decode_chunks(messages, router, stats=stats))
+    signals = {name: values for chunk in chunks for name, (_, values) in chunk["signals"].items()}
+    assert set(signals) == {"WheelSpeed"}
+    assert len(signals["WheelSpeed"]) == 10
+    assert signals["WheelSpeed"][0] == 0x2000 * 0.00390625
+    assert stats["error_types"] == {"UnknownMessage": 10}
@@ -0,0 +1,111 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+author: fenwickxie
+date: 2026-10-19 23:59:59
+filename: test_sessions.py
+version: 1.0
+"""
+
+import os
+
+import can
+import numpy as np
+import pandas as pd
+import pytest
+
+from core.data_processing.candecode import CanDecoder, _balance_batches, _group_sessions
+
+
+def _names(sessions):
+    return sorted([os.path.basename(p) for p in session] for session in sessions)
+
+
+def test_sessions_need_a_separated_short_index(tmp_path):
+    paths = [str(tmp_path / name) for name in (
+        "drive_002.mf4", "drive_001.mf4", "vehicle_20250301.mf4", "vehicle_20250302.mf4",
+        "trip_20250301-1.mf4", "trip_20250301-2.mf4", "run7.mf4", "run8.mf4",
+    )]
+    assert _names(_group_sessions(paths)) == [
+        ["drive_001.mf4", "drive_002.mf4"],
+        ["run7.mf4"],
+        ["run8.mf4"],
+        ["trip_20250301-1.mf4", "trip_20250301-2.mf4"],
+        ["vehicle_20250301.mf4"],
+        ["vehicle_20250302.mf4"],
+    ]
+
+
+def _write_asc(path, start: str, n: int = 50):
+    """手写ASC：date 行给出绝对起始时间，报文时间戳相对测量开始"""
+    lines = [f"date Mon Oct 19 {start} 2026", "base hex  timestamps absolute", "internal events logged",
+             f"Begin Triggerblock Mon Oct 19 {start} 2026", "   0.000000 Start of measurement"]
+    for i in range(n):
+        lines.append(f"   {i * 0.02:.6f} 1  100             Rx   d 8 {i:02X} 00 00 00 00 00 00 {i % 16:02X}")
+    lines.append("End TriggerBlock")
+    path.write_text("\n".join(lines) + "\n")
+
+
+@pytest.fixture
+def asc_segments(tmp_path):
+    log_dir = tmp_path / "logs"
+    log_dir.mkdir()
+    _write_asc(log_dir / "drive_1.asc", "10:00:00.000")
+    _write_asc(log_dir / "drive_2.asc", "10:00:01.500")  # 紧接上一片段
+    _write_asc(log_dir / "drive_3.asc", "10:05:00.000")  # 停车5分钟后的新会话
+    return log_dir
+
+
+def test_asc_segments_split_on_gap(asc_segments):
+    paths = sorted(str(p) for p in asc_segments.iterdir())
+    assert _names(_group_sessions(paths, session_gap=60)) == [["drive_1.asc", "drive_2.asc"], ["drive_3.asc"]]
+    assert len(_group_sessions(paths, session_gap=None)) == 1
+
+
+def test_concat_asc_sessions(tmp_path, dbc_path, asc_segments):
+    results = CanDecoder(dbc_path, str(asc_segments)).read_can_files_multi(
+        step=0.02, save_dir=str(tmp_path / "out"), save_formats=(".csv",), num_processes=1,
+        concat_sessions=True,
+    )
+    assert all(r["success"] for r in results)
+    assert sorted(r["file"] for r in results) == ["drive_1-2.asc", "drive_3.asc"]
+    assert sorted(p.name for p in (tmp_path / "out").glob("*.csv")) == ["drive_1-2.csv", "drive_3.csv"]
+
+
+def test_balance_batches():
+    items = [("big", 100), *((f"s{i}", size) for i, size in enumerate([9, 8, 7, 5, 4, 3, 2, 1]))]
+    batches = _balance_batches(items, small_bytes=50, target_bytes=20, min_batches=1)
+    assert batches[0] == ["big"]
+    small = batches[1:]
+    assert sorted(task for batch in small for task in batch) == sorted(f"s{i}" for i in range(8))
+    loads = [sum(dict(items)[task] for task in batch) for batch in small]
+    assert len(small) == 2 and max(loads) - min(loads) <= 1  # 39字节均分到2批
+    # 小任务数足够时至少 min_batches 批，保证每个进程都有任务
+    assert len(_balance_batches(items[1:], small_bytes=50, target_bytes=1000, min_batches=4)) == 4
+    assert _balance_batches([("big", 100)], 50, 20, 4) == [["big"]]
+
+
+def test_streamed_session_matches_concatenated_session(tmp_path, dbc_path):
+    log_dir = tmp_path / "logs"
+    log_dir.mkdir()
+    for segment in (1, 2, 3):
+        with can.BLFWriter(str(log_dir / f"drive_{segment}.blf")) as writer:
+            for i in range((segment - 1) * 100, segment * 100):
+                writer.on_message_received(
+                    can.Message(timestamp=1.7e9 + i * 0.01, arbitration_id=0x100, is_extended_id=False,
+                                data=bytes([i % 256, i // 256, 0, 0, 0, 0, 0, 0]))
+                )
+    frames = {}
+    for mode in ("concat_sessions", "session_streaming"):
+        [result] = CanDecoder(dbc_path, str(log_dir)).read_can_files_multi(
+            step=0.02, save_dir=str(tmp_path / mode), save_formats=(".csv",), num_processes=1, **{mode: True},
+        )
+        assert result["success"] and result["total_msgs"] == 300
+        frames[mode] = pd.read_csv(tmp_path / mode / "drive_1-3.csv")
+    streamed = frames["session_streaming"]
+    # 三个片段在同一网格上连续输出，片段边界处没有断点
+    np.testing.assert_allclose(streamed["timestamps"], np.arange(len(streamed)) * 0.02, atol=1e-6)
+    np.testing.assert_allclose(streamed["EngSpd"], np.arange(len(streamed)) * 0.5, atol=1e-3)
+    assert len(streamed) == 150
+    np.testing.assert_allclose(streamed["EngSpd"], frames["concat_sessions"]["EngSpd"][: len(streamed)], atol=1e-3)
@@ -0,0 +1,104 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+author: fenwickxie
+date: 2026-10-19 22:08:45
+filename: test_shared_memory.py
+version: 1.0
+"""
+
+from multiprocessing import shared_memory
+
+import can
+import numpy as np
+import pandas as pd
+
+from conftest import TEST_DBC
+from core.data_processing.candecode import CanDecoder
+from core.data_processing.decoded_io import SharedDecodeResult, export_to_shared_memory
+
+
+def _unlinked(name: str) -> bool:
+    try:
+        shared_memory.SharedMemory(name=name).close()
+    except FileNotFoundError:
+        return True
+    return False
+
+
+def _frame(values) -> pd.DataFrame:
+    return pd.DataFrame({"a": values}, index=pd.Index(np.arange(len(values), dtype=float), name="timestamps"))
+
+
+def test_close_unlinks_every_block():
+    first = export_to_shared_memory(_frame([1.0, 2.0]))
+    second = export_to_shared_memory(_frame([3.0]))
+    result = SharedDecodeResult()
+    result.attach("x.blf", first)
+    result.attach("y.blf", second)
+    assert result.arrays("x.blf")["a"].tolist() == [1.0, 2.0]
+    result.close()
+    assert _unlinked(first["name"]) and _unlinked(second["name"])
+    assert len(result) == 0
+
+
+def test_reattaching_a_label_releases_the_previous_block():
+    first = export_to_shared_memory(_frame([1.0, 2.0]))
+    second = export_to_shared_memory(_frame([5.0]))
+    with SharedDecodeResult() as result:
+        result.attach("x.blf", first)
+        result.attach("x.blf", second)
+        assert _unlinked(first["name"])
+        assert result.arrays("x.blf")["a"].tolist() == [5.0]
+    assert _unlinked(second["name"])
+
+
+def test_in_memory_results_are_keyed_by_dbc_when_several_dbcs_decode_one_log(tmp_path):
+    dbc_dir = tmp_path / "dbc"
+    dbc_dir.mkdir()
+    (dbc_dir / "a.dbc").write_text(TEST_DBC)
+    (dbc_dir / "b.dbc").write_text(TEST_DBC.replace("EngSpd", "EngSpdB"))
+    log_dir = tmp_path / "logs"
+    log_dir.mkdir()
+    with can.BLFWriter(str(log_dir / "drive.blf")) as writer:
+        for i in range(50):
+            writer.on_message_received(
+                can.Message(timestamp=1000.0 + i * 0.01, arbitration_id=0x100, is_extended_id=False,
+                            data=bytes([i, 0, 0, 0, 0, 0, 0, 0]))
+            )
+
+    decoder = CanDecoder(str(dbc_dir), str(log_dir))
+    with decoder.read_can_files_multi(
+        step=0.01, save_dir=str(tmp_path / "out"), save_formats=(".parquet",), num_processes=1, in_memory=True
+    ) as result:
+        names = [shm.name for shm in result._handles.values()]
+        assert sorted(result.keys()) == ["a.dbc/drive.blf", "b.dbc/drive.blf"]
+        assert "EngSpd" in result.tables["a.dbc/drive.blf"].column_names
+        assert "EngSpdB" in result.tables["b.dbc/drive.blf"].column_names
+    assert all(_unlinked(name) for name in names)
+
+
+def test_columns_keep_their_dtype():
+    df = pd.DataFrame(
+        {
+            "code": np.array([1, 2, 3], dtype=np.uint8),
+            "speed": np.array([0.5, 1.5, 2.5], dtype=np.float32),
+            "flag": np.array([True, False, True]),
+            "nullable": pd.array([1, None, 3], dtype="Int64"),
+            "value": [1.0, np.nan, 3.0],
+        },
+        index=pd.Index([0.0, 0.1, 0.2], name="timestamps"),
+    )
+    with SharedDecodeResult() as result:
+        result.attach("x.blf", export_to_shared_memory(df))
+        arrays = result.arrays("x.blf")
+        assert {name: a.dtype for name, a in arrays.items()} == {
+            "timestamps": np.float64, "code": np.uint8, "speed": np.float32,
+            "flag": np.bool_, "nullable": np.float64, "value": np.float64,
+        }
+        assert arrays["code"].tolist() == [1, 2, 3]
+        assert arrays["flag"].tolist() == [True, False, True]
+        np.testing.assert_array_equal(arrays["value"], [1.0, np.nan, 3.0])
+        np.testing.assert_array_equal(arrays["nullable"], [1.0, np.nan, 3.0])
+        assert str(result.tables["x.blf"].schema.field("code").type) == "uint8"
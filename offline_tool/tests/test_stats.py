@@ -0,0 +1,72 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+author: fenwickxie
+date: 2026-10-19 23:59:59
+filename: test_stats.py
+version: 1.0
+"""
+
+import json
+
+import can
+import numpy as np
+import pytest
+
+from core.data_processing.candecode import CanDecoder
+from core.data_processing.canstats import SignalAccumulator
+
+
+def test_chunked_accumulator_matches_numpy():
+    rng = np.random.default_rng(4)
+    timestamps = np.cumsum(rng.uniform(0.005, 0.02, 5000))
+    values = rng.normal(10.0, 3.0, 5000)
+    values[rng.random(5000) < 0.01] = np.nan
+    accumulator = SignalAccumulator((0.0, 20.0), bins=8)
+    for part in np.array_split(np.arange(5000), [1, 7, 1000, 1001, 3500]):
+        accumulator.update(timestamps[part], values[part])
+    stats = accumulator.to_dict()
+
+    finite = values[np.isfinite(values)]
+    assert stats["count"] == len(finite) and stats["nan_count"] == 5000 - len(finite)
+    assert stats["mean"] == pytest.approx(finite.mean(), rel=1e-12)
+    assert stats["std"] == pytest.approx(finite.std(ddof=1), rel=1e-12)
+    assert (stats["min"], stats["max"]) == (finite.min(), finite.max())
+    assert stats["first"] == {"t": timestamps[0], "value": values[0]}
+    dt = np.diff(timestamps)
+    assert (stats["dt_min"], stats["dt_max"]) == (pytest.approx(dt.min()), pytest.approx(dt.max()))
+    assert stats["sample_rate_hz"] == pytest.approx(4999 / (timestamps[-1] - timestamps[0]))
+    inside = finite[(finite >= 0) & (finite <= 20)]
+    assert stats["histogram"]["counts"] == np.histogram(inside, bins=8, range=(0, 20))[0].tolist()
+    assert stats["histogram"]["underflow"] == int((finite < 0).sum())
+    assert stats["histogram"]["overflow"] == int((finite > 20).sum())
+
+
+def test_stats_sidecar_and_run_report(tmp_path, dbc_path):
+    log_dir = tmp_path / "logs"
+    log_dir.mkdir()
+    with can.BLFWriter(str(log_dir / "drive.blf")) as writer:
+        for i in range(200):
+            writer.on_message_received(
+                can.Message(timestamp=1.7e9 + i * 0.01, arbitration_id=0x100, is_extended_id=False,
+                            data=bytes([i, 0, 40 + i % 3, 0, 0, 0, 0, 0]))
+            )
+    [result] = CanDecoder(dbc_path, str(log_dir)).read_can_files_multi(
+        step=0.01, save_dir=str(tmp_path / "out"), save_formats=(".csv",), num_processes=1,
+        signal_corr={"EngSpd": "speed"}, stats_histogram_bins=4,
+    )
+    sidecar = json.loads((tmp_path / "out" / "drive.stats.json").read_text(encoding="utf-8"))
+    assert sidecar["total_msgs"] == sidecar["decoded_msgs"] == 200
+    speed = sidecar["signals"]["speed"]
+    assert speed["unit"] == "rpm" and speed["count"] == 200
+    assert (speed["min"], speed["max"], speed["mean"]) == (0.0, 49.75, pytest.approx(24.875))
+    assert speed["sample_rate_hz"] == pytest.approx(100.0)
+    assert sum(speed["histogram"]["counts"]) == 200
+    temp = sidecar["signals"]["EngTemp"]
+    assert (temp["min"], temp["max"]) == (0.0, 2.0)
+
+    report = json.loads((tmp_path / "out" / "run_report.json").read_text(encoding="utf-8"))
+    [entry] = report["files"]
+    assert entry["signal_stats"] == sidecar["signals"] == result["signal_stats"]
+    assert entry["stats_file"] == str(tmp_path / "out" / "drive.stats.json")
@@ -0,0 +1,41 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+author: fenwickxie
+date: 2026-10-19 23:59:59
+filename: test_streaming.py
+version: 1.0
+"""
+
+import can
+import numpy as np
+
+from core.data_processing.candecode import CanDecoder
+
+
+def test_chunks_are_time_slices_of_the_whole_file(tmp_path, dbc_path):
+    path = tmp_path / "drive.blf"
+    with can.BLFWriter(str(path)) as writer:
+        for i in range(1000):
+            writer.on_message_received(
+                can.Message(timestamp=1.7e9 + i * 0.01, arbitration_id=0x100, is_extended_id=False,
+                            data=bytes([i % 256, i // 256, 0, 0, 0, 0, 0, 0]))
+            )
+    decoder = CanDecoder(dbc_path, str(path))
+    stats = {}
+    chunks = list(decoder.iter_decoded_chunks(path, chunk_seconds=2.0, signal_names=["EngSpd"],
+                                              signal_corr={"EngSpd": "speed"}, stats=stats))
+    # 10秒的日志按2秒切片
+    assert len(chunks) == 5
+    assert sum(chunk["frames"] for chunk in chunks) == 1000 == stats["decoded_msgs"]
+    for chunk in chunks:
+        assert list(chunk["signals"]) == ["speed"]
+        t, _ = chunk["signals"]["speed"]
+        assert chunk["t_end"] - chunk["t_start"] < 2.0
+        assert chunk["t_start"] <= t[0] and t[-1] <= chunk["t_end"]
+
+    t = np.concatenate([chunk["signals"]["speed"][0] for chunk in chunks])
+    values = np.concatenate([chunk["signals"]["speed"][1] for chunk in chunks])
+    np.testing.assert_allclose(t, 1.7e9 + np.arange(1000) * 0.01)
+    np.testing.assert_allclose(values, np.arange(1000) * 0.25)